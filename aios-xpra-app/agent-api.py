@@ -967,20 +967,9 @@ def execute_fastagent():
             'agent': 'fastagent'
         })
         
-        # Screenshot function
-        def get_screenshot():
-            try:
-                from superagent.executor import ActionExecutor
-                executor = ActionExecutor()
-                return executor.capture_screen()
-            except Exception as e:
-                logger.error(f"Screenshot capture failed: {e}")
-                return None
-        
-        # Execute task
+        # Execute task (frames come from the executor's shared ScreenSource)
         result = fast_agent.execute_task(
             task=task,
-            screenshot_func=get_screenshot,
             timeout=timeout
         )
         
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare OmniParser icon detector backends (torch / onnx / openvino) on CPU.
+
+Loads the YOLO icon detector once per backend (exporting and quantizing
+it on first use), runs it over a fixture corpus and reports latency and
+how closely each backend's boxes match the torch model's (IoU >= --iou).
+Run inside the container:
+
+    python3 benchmarks/bench_backends.py fixtures/*.png --backends torch onnx openvino
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import OmniParserModelLoader, OMNIPARSER_BACKENDS
+from superagent.element_tracker import iou_matrix
+
+
+def detect(model, image, conf):
+    """(N, 4) xyxy boxes of one prediction."""
+    result = model.predict(source=image, conf=conf, verbose=False, device='cpu')[0]
+    return result.boxes.xyxy.cpu().numpy().reshape(-1, 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('images', nargs='+', help='Fixture screenshots')
+    parser.add_argument('--backends', nargs='+', default=list(OMNIPARSER_BACKENDS),
+                        choices=OMNIPARSER_BACKENDS)
+    parser.add_argument('--conf', type=float, default=0.3, help='Detection confidence threshold')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU that counts as the same box')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per image')
+    args = parser.parse_args()
+
+    loader = OmniParserModelLoader()
+    if not (loader.weights_dir / "icon_detect" / "model.pt").exists():
+        print(f"No icon_detect/model.pt under {loader.weights_dir} - nothing to benchmark")
+        return 1
+
+    images = [Image.open(path).convert('RGB') for path in args.images]
+    backends = ['torch'] + [b for b in args.backends if b != 'torch']
+    reference = None
+
+    print(f"{'backend':<10} {'ms/image':>9} {'speedup':>8} {'boxes':>6} {'recall':>7} {'prec':>6}")
+    baseline_ms = None
+    for backend in backends:
+        model, used = loader.load_icon_detector(backend)
+        if used != backend:
+            print(f"{backend:<10} unavailable")
+            continue
+
+        detect(model, images[0], args.conf)  # warm-up
+        predictions, elapsed = [], 0.0
+        for image in images:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                boxes = detect(model, image, args.conf)
+            elapsed += (time.perf_counter() - start) / args.repeat
+            predictions.append(boxes)
+        ms = elapsed * 1000 / len(images)
+
+        if reference is None:
+            reference, baseline_ms = predictions, ms
+        recalls, precisions = [], []
+        for expected, got in zip(reference, predictions):
+            if len(expected) and len(got):
+                ious = iou_matrix(expected, got)
+                recalls.append((ious.max(axis=1) >= args.iou).mean())
+                precisions.append((ious.max(axis=0) >= args.iou).mean())
+            else:
+                same = float(len(expected) == len(got))
+                recalls.append(same)
+                precisions.append(same)
+
+        print(f"{backend:<10} {ms:>9.1f} {baseline_ms / ms:>7.2f}x "
+              f"{sum(len(p) for p in predictions):>6} {np.mean(recalls):>7.1%} {np.mean(precisions):>6.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark Florence-2 element captioning throughput against batch size.
+
+Detects elements on a screenshot with the OmniParser YOLO model (or tiles
+the image when detection finds too few), then captions the same crops with
+each batch size and reports elements/sec. Captions of every batch size are
+checked against the one-crop-per-call path. Run inside the container:
+
+    python3 benchmarks/bench_captioning.py --image screen.png --batch-sizes 1 4 8 16 32
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import OmniParserV2
+
+
+def element_crops(parser, image, count):
+    """Crops of detected elements, padded out with grid tiles if needed."""
+    parser.generate_captions = False
+    result = parser.parse(image, force_refresh=True)
+    crops = [parser._crop_element(image, e) for e in result.elements]
+
+    tile = 64
+    x = y = 0
+    while len(crops) < count:
+        crops.append(image.crop((x, y, x + tile, y + tile)))
+        x += tile
+        if x + tile > image.width:
+            x, y = 0, (y + tile) % (image.height - tile)
+    return crops[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--image', required=True, help='Screenshot to caption')
+    parser.add_argument('--elements', type=int, default=80, help='Number of crops to caption')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    omniparser = OmniParserV2(cache_enabled=False, track_elements=False)
+    if not omniparser.model_loader.has_caption:
+        print("Florence-2 caption model not loaded - nothing to benchmark")
+        return 1
+
+    image = Image.open(args.image).convert('RGB')
+    crops = element_crops(omniparser, image, args.elements)
+    print(f"Captioning {len(crops)} crops from {args.image} "
+          f"on {omniparser.model_loader.device}\n")
+
+    # Warm-up (first generate() call initialises kernels / caches)
+    omniparser._generate_captions(crops[:2], batch_size=2)
+
+    reference = None
+    baseline = None
+    print(f"{'batch':>5} {'seconds':>9} {'elem/s':>8} {'speedup':>8}  matches batch=1")
+    for batch_size in sorted(set(args.batch_sizes) | {1}):
+        start = time.perf_counter()
+        captions = omniparser._generate_captions(crops, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+
+        if reference is None:
+            reference, baseline = captions, elapsed
+        matches = sum(a == b for a, b in zip(captions, reference))
+        print(f"{batch_size:>5} {elapsed:>8.2f}s {len(crops) / elapsed:>8.1f} "
+              f"{baseline / elapsed:>7.1f}x  {matches}/{len(crops)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark screen capture backends on the agent display.
+
+Compares the ScreenSource backends (in-process XShm, xpra and scrot
+subprocesses), plus a window-scoped XShm grab of the active window, and
+prints the per-backend counters ScreenSource keeps. Run inside the container:
+
+    python3 benchmarks/bench_capture.py --display :100 --iterations 30
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.screen_source import ScreenSource
+
+
+def time_backend(name, capture, iterations):
+    """Run a capture function repeatedly and collect latency stats."""
+    # Warm-up (first XShm call opens the display and allocates the segment)
+    first = capture()
+    if first is None:
+        return {'backend': name, 'available': False}
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        img = capture()
+        samples.append((time.perf_counter() - start) * 1000)
+        if img is None:
+            return {'backend': name, 'available': False}
+
+    samples.sort()
+    return {
+        'backend': name,
+        'available': True,
+        'size': first.size,
+        'median_ms': statistics.median(samples),
+        'p95_ms': samples[int(len(samples) * 0.95) - 1],
+        'min_ms': samples[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--display', default=os.environ.get('DISPLAY', ':100'))
+    parser.add_argument('--iterations', type=int, default=20)
+    args = parser.parse_args()
+
+    source = ScreenSource(display=args.display, backend='auto')
+
+    backends = [(b.name, b.grab) for b in source.backends]
+
+    region = source.window_region()
+    if region is not None:
+        xshm_backend = source.backends[0]
+        backends.insert(1, ('window', lambda: xshm_backend.grab(region)))
+
+    print(f"Capture benchmark on {args.display} ({args.iterations} iterations)\n")
+    print(f"{'backend':<8} {'median':>10} {'p95':>10} {'min':>10}  size")
+    results = []
+    for name, capture in backends:
+        try:
+            result = time_backend(name, capture, args.iterations)
+        except Exception as e:
+            result = {'backend': name, 'available': False, 'error': str(e)}
+        results.append(result)
+
+        if not result['available']:
+            print(f"{name:<8} {'unavailable':>10}  {result.get('error', '')}")
+            continue
+        print(f"{name:<8} {result['median_ms']:>8.1f}ms {result['p95_ms']:>8.1f}ms "
+              f"{result['min_ms']:>8.1f}ms  {result['size'][0]}x{result['size'][1]}")
+
+    available = [r for r in results if r['available']]
+    if len(available) > 1:
+        fastest = min(available, key=lambda r: r['median_ms'])
+        print()
+        for r in available:
+            if r is not fastest:
+                print(f"{fastest['backend']} is {r['median_ms'] / fastest['median_ms']:.1f}x "
+                      f"faster than {r['backend']}")
+
+    print("\nScreenSource counters:")
+    for stats in source.get_stats()['backends']:
+        print(f"  {stats['backend']:<8} {stats['total_captures']:>4} ok {stats['failed_captures']:>4} failed  "
+              f"avg {stats['avg_capture_ms']:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
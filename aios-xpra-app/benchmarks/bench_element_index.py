@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark of indexed ParseResult lookups against linear scans.
+
+Builds synthetic parse results with 100/500/2000 elements and times id,
+text, point and similarity lookups through the ElementIndex against the
+linear scans they replace. The index build is timed separately (it is
+paid once per parse, on the first lookup of each kind). No model needed:
+
+    python3 benchmarks/bench_element_index.py --sizes 100 500 2000 --queries 200
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import ParseResult, UIElement, BoundingBox, ElementType
+
+WORDS = ("save open file edit view help cancel submit search settings profile logout "
+         "new delete copy paste share print export import zoom undo redo bold").split()
+
+
+def make_result(count, rng):
+    elements = []
+    for i in range(count):
+        x, y = rng.uniform(0, 1800), rng.uniform(0, 1000)
+        element = UIElement(id=i + 1, element_type=ElementType.INTERACTABLE, confidence=0.5,
+                            bbox=BoundingBox(x, y, x + rng.uniform(16, 240), y + rng.uniform(12, 60)))
+        element.text = " ".join(rng.sample(WORDS, 2)) if i % 3 else ""
+        element.description = "" if i % 3 else f"{rng.choice(WORDS)} icon"
+        elements.append(element)
+    return ParseResult(elements=elements, screen_size=(1920, 1080), parse_time_ms=0,
+                       element_count=count, interactable_count=count)
+
+
+def linear_by_id(result, element_id):
+    for element in result.elements:
+        if element.id == element_id:
+            return element
+    return None
+
+
+def linear_by_text(result, text):
+    text = text.lower()
+    return [e for e in result.elements if text in (e.text + e.description + e.ocr_text).lower()]
+
+
+def linear_at(result, x, y):
+    return [e for e in result.elements if e.bbox.contains_point(x, y)]
+
+
+def per_query_us(fn, queries):
+    start = time.perf_counter()
+    for query in queries:
+        fn(*query)
+    return (time.perf_counter() - start) * 1e6 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 2000], help='Elements per result')
+    parser.add_argument('--queries', type=int, default=200, help='Queries per lookup kind')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'elements':>8} {'lookup':<10} {'linear us':>10} {'indexed us':>11} {'speedup':>8} {'build ms':>9}")
+    for size in args.sizes:
+        result = make_result(size, rng)
+        ids = [(rng.randint(1, size),) for _ in range(args.queries)]
+        texts = [(" ".join(rng.sample(WORDS, 2))[:rng.randint(3, 12)],) for _ in range(args.queries)]
+        points = [(rng.uniform(0, 1920), rng.uniform(0, 1080)) for _ in range(args.queries)]
+        fuzzy = [(rng.choice(WORDS)[1:] + " " + rng.choice(WORDS),) for _ in range(args.queries)]
+
+        lookups = [
+            ('id', ids, lambda i: linear_by_id(result, i), result.get_element_by_id,
+             lambda: result.index.grouped('id', lambda e: e.id)),
+            ('text', texts, lambda t: linear_by_text(result, t), result.find_elements_by_text,
+             lambda: result.index.contains("")),
+            ('point', points, lambda x, y: linear_at(result, x, y), result.elements_at,
+             lambda: result.index.at(0, 0)),
+            ('similar', fuzzy, None, result.find_similar_elements, None),
+        ]
+        for name, queries, linear, indexed, build in lookups:
+            build_ms = 0.0
+            if build is not None:
+                result.reindex()
+                start = time.perf_counter()
+                build()
+                build_ms = (time.perf_counter() - start) * 1000
+            indexed_us = per_query_us(indexed, queries)
+            if linear is None:
+                print(f"{size:>8} {name:<10} {'-':>10} {indexed_us:>11.1f} {'-':>8} {'-':>9}")
+                continue
+            linear_us = per_query_us(linear, queries)
+            print(f"{size:>8} {name:<10} {linear_us:>10.1f} {indexed_us:>11.1f} "
+                  f"{linear_us / max(indexed_us, 1e-9):>7.1f}x {build_ms:>9.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Latency and model overlap of the heuristic fallback detector.
+
+Times the edge/connected-component fallback (and, for reference, the old
+50px contrast grid) on every fixture. With the OmniParser YOLO weights
+present, also reports how well the fallback boxes overlap the model's:
+recall = model boxes matched by a fallback box at IoU >= --iou,
+precision = fallback boxes matched by a model box. Two synthetic 1080p
+layouts are always timed as well: a dense mail client (tab bar, sidebar,
+25 long text rows) and 300 scattered labelled boxes - long text rows are
+the worst case for component labeling. Run inside the container:
+
+    python3 benchmarks/bench_fallback_detector.py fixtures/*.png
+"""
+
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import OmniParserV2
+from superagent.fallback_detector import detect_boxes
+from superagent.element_tracker import iou_matrix
+
+
+def contrast_grid(image, grid_size=50):
+    """The previous fallback: 50px cells with a min/max contrast > 100."""
+    gray = image.convert('L')
+    boxes = []
+    for y in range(0, image.height - grid_size, grid_size):
+        for x in range(0, image.width - grid_size, grid_size):
+            pixels = list(gray.crop((x, y, x + grid_size, y + grid_size)).getdata())
+            if max(pixels) - min(pixels) > 100:
+                boxes.append((x, y, x + grid_size, y + grid_size))
+    return np.array(boxes, dtype=np.float32).reshape(-1, 4)
+
+
+def mail_layout():
+    """Dense mail client: tab bar, folder sidebar, 25 long subject/preview rows."""
+    font = ImageFont.load_default(size=14)
+    image = Image.new('RGB', (1920, 1080), (245, 245, 245))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1920, 40), fill=(60, 60, 70))
+    for i in range(8):
+        draw.rectangle((10 + i * 200, 6, 190 + i * 200, 34), fill=(90, 90, 100))
+        draw.text((20 + i * 200, 12), f"Tab {i} title", fill='white', font=font)
+    draw.rectangle((0, 40, 250, 1080), fill=(230, 230, 235))
+    for i in range(15):
+        draw.text((20, 60 + i * 30), f"Folder {i}", fill='black', font=font)
+    for i in range(25):
+        draw.text((280, 60 + i * 38), f"Sender name {i}   Subject line number {i} with a long preview "
+                  f"of the message body text that goes on and on", fill='black', font=font)
+        draw.line((270, 90 + i * 38, 1900, 90 + i * 38), fill=(200, 200, 200))
+    return image
+
+
+def scattered_layout(count=300):
+    """`count` outlined, labelled boxes at random positions."""
+    font = ImageFont.load_default(size=14)
+    rng = random.Random(1)
+    image = Image.new('RGB', (1920, 1080), 'white')
+    draw = ImageDraw.Draw(image)
+    for i in range(count):
+        x, y = rng.randint(0, 1800), rng.randint(0, 1050)
+        draw.rectangle((x, y, x + 90, y + 24), outline='gray')
+        draw.text((x + 5, y + 5), f"Label {i}", fill='black', font=font)
+    return image
+
+
+def timed(fn, *args, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000 / repeat
+
+
+def overlap(model_boxes, boxes, threshold):
+    """(recall, precision) of boxes against the model's."""
+    if not len(model_boxes) or not len(boxes):
+        same = float(len(model_boxes) == len(boxes))
+        return same, same
+    ious = iou_matrix(model_boxes, boxes)
+    return float((ious.max(axis=1) >= threshold).mean()), float((ious.max(axis=0) >= threshold).mean())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('images', nargs='*', help='Fixture screenshots')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU that counts as the same element')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per image')
+    args = parser.parse_args()
+
+    omniparser = OmniParserV2(cache_enabled=False, caption_cache=False, track_elements=False)
+    with_model = omniparser.model_loader.has_detection
+    if not with_model:
+        print("OmniParser YOLO model not loaded - reporting latency only\n")
+
+    rows = []
+    header = f"{'image':<28} {'boxes':>5} {'ms':>6} {'grid ms':>8}"
+    if with_model:
+        header += f" {'model':>6} {'model ms':>9} {'recall':>7} {'prec':>6} {'grid rec':>9}"
+    print(header)
+    layouts = [(Path(path).name, Image.open(path).convert('RGB')) for path in args.images]
+    layouts += [('synthetic mail (dense)', mail_layout()), ('synthetic 300 boxes', scattered_layout())]
+    for name, image in layouts:
+        detections, ms = timed(detect_boxes, image, repeat=args.repeat)
+        grid, grid_ms = timed(contrast_grid, image)
+        boxes = detections[:, :4]
+
+        line = f"{name[:28]:<28} {len(boxes):>5} {ms:>6.1f} {grid_ms:>8.1f}"
+        row = [ms, grid_ms]
+        if with_model:
+            model, model_ms = timed(omniparser._run_omniparser, image)
+            model_boxes = np.array([e.bbox.to_tuple() for e in model.elements], dtype=np.float32).reshape(-1, 4)
+            recall, precision = overlap(model_boxes, boxes, args.iou)
+            grid_recall, _ = overlap(model_boxes, grid, args.iou)
+            row += [model_ms, recall, precision, grid_recall]
+            line += (f" {len(model_boxes):>6} {model_ms:>9.0f} {recall:>7.0%} {precision:>6.0%} "
+                     f"{grid_recall:>9.0%}")
+        rows.append(row)
+        print(line)
+
+    means = np.mean(rows, axis=0)
+    print(f"\n{len(rows)} images: fallback {means[0]:.1f}ms vs contrast grid {means[1]:.1f}ms per image")
+    if with_model:
+        print(f"Model {means[2]:.0f}ms per image; fallback overlap with model: recall {means[3]:.1%}, "
+              f"precision {means[4]:.1%} (contrast grid recall {means[5]:.1%}, IoU >= {args.iou})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
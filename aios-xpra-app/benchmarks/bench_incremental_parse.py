@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Check incremental OmniParser parses against full parses on a recorded session.
+
+For every consecutive pair of screenshots (in file name order), parses the
+second one in full and incrementally from the full parse of the first,
+then reports how well the incremental elements match the full ones (box
+IoU >= --iou) and the speedup. Run inside the container:
+
+    python3 benchmarks/bench_incremental_parse.py recordings/session1/*.png
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import OmniParserV2
+from superagent.element_tracker import iou_matrix
+from superagent.change_detection import get_change_detector
+
+
+def boxes(result):
+    return np.array([e.bbox.to_tuple() for e in result.elements], dtype=np.float32).reshape(-1, 4)
+
+
+def match(full, incremental, threshold):
+    """(recall, precision) of incremental boxes against the full parse."""
+    if not full.elements or not incremental.elements:
+        same = len(full.elements) == len(incremental.elements)
+        return float(same), float(same)
+    ious = iou_matrix(boxes(full), boxes(incremental))
+    recall = float((ious.max(axis=1) >= threshold).mean())
+    precision = float((ious.max(axis=0) >= threshold).mean())
+    return recall, precision
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('images', nargs='+', help='Screenshots of one session, in order')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU that counts as the same element')
+    args = parser.parse_args()
+
+    paths = sorted(args.images)
+    if len(paths) < 2:
+        print("Need at least two screenshots")
+        return 1
+
+    omniparser = OmniParserV2(cache_enabled=False, caption_cache=False, track_elements=False)
+    detector = get_change_detector()
+
+    previous_image = Image.open(paths[0]).convert('RGB')
+    previous_full = omniparser.parse(previous_image)
+    full_ms = incremental_ms = 0.0
+    recalls, precisions = [], []
+
+    print(f"{'frame':<28} {'elems':>5} {'area':>6} {'full ms':>8} {'incr ms':>8} {'recall':>7} {'prec':>6}")
+    for path in paths[1:]:
+        image = Image.open(path).convert('RGB')
+        regions = detector.compare(previous_image, image).boxes
+
+        fallbacks = omniparser.incremental_fallbacks
+        area_before = omniparser.incremental_area
+        incremental, inc_ms = timed(omniparser.parse, image, force_refresh=True,
+                                    previous_result=previous_full, changed_regions=regions)
+        full, f_ms = timed(omniparser.parse, image, force_refresh=True)
+
+        recall, precision = match(full, incremental, args.iou)
+        recalls.append(recall)
+        precisions.append(precision)
+        full_ms += f_ms
+        incremental_ms += inc_ms
+        area = ("full" if omniparser.incremental_fallbacks > fallbacks
+                else f"{omniparser.incremental_area - area_before:.0%}")
+        print(f"{Path(path).name[:28]:<28} {full.element_count:>5} {area:>6} {f_ms:>8.0f} "
+              f"{inc_ms:>8.0f} {recall:>7.0%} {precision:>6.0%}")
+
+        previous_image, previous_full = image, full
+
+    stats = omniparser.get_stats()['incremental']
+    print(f"\n{len(paths) - 1} transitions, {stats['parses']} incremental, {stats['fallbacks']} full fallbacks")
+    print(f"Recall {np.mean(recalls):.1%}, precision {np.mean(precisions):.1%} (IoU >= {args.iou})")
+    print(f"Total {full_ms:.0f}ms full vs {incremental_ms:.0f}ms incremental "
+          f"({full_ms / max(incremental_ms, 1e-6):.1f}x speedup)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark OCR labels against Florence-2 captions on a screenshot corpus.
+
+Parses every screenshot twice - captioning every element, then labeling
+text-bearing elements from OCR and captioning only the rest - and reports
+label coverage, captions avoided and parse time per image and in total.
+Needs the OmniParser weights and pytesseract. Run inside the container:
+
+    python3 benchmarks/bench_ocr_labels.py screenshots/*.png
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import OmniParserV2
+from superagent.ocr_labels import TESSERACT_AVAILABLE
+
+
+def timed_parse(parser, image):
+    start = time.perf_counter()
+    result = parser.parse(image, force_refresh=True)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('images', nargs='+', help='Screenshots (PNG/JPEG)')
+    args = parser.parse_args()
+
+    if not TESSERACT_AVAILABLE:
+        print("pytesseract not installed - nothing to benchmark")
+        return 1
+
+    options = dict(cache_enabled=False, caption_cache=False, track_elements=False)
+    captions_only = OmniParserV2(ocr_labels=False, **options)
+    with_ocr = OmniParserV2(ocr_labels=True, **options)
+    if not captions_only.model_loader.has_caption:
+        print("Florence-2 caption model not loaded - nothing to benchmark")
+        return 1
+
+    totals = {'elements': 0, 'labeled': 0, 'base_ms': 0.0, 'ocr_ms': 0.0}
+    print(f"{'image':<32} {'elems':>5} {'ocr':>5} {'cover':>6} {'captions ms':>12} {'ocr ms':>8}")
+    for path in args.images:
+        image = Image.open(path).convert('RGB')
+        base, base_ms = timed_parse(captions_only, image)
+        labeled_before = with_ocr.ocr_labeled
+        result, ocr_ms = timed_parse(with_ocr, image)
+        labeled = with_ocr.ocr_labeled - labeled_before
+
+        totals['elements'] += result.element_count
+        totals['labeled'] += labeled
+        totals['base_ms'] += base_ms
+        totals['ocr_ms'] += ocr_ms
+        print(f"{Path(path).name[:32]:<32} {result.element_count:>5} {labeled:>5} "
+              f"{labeled / max(result.element_count, 1):>6.0%} {base_ms:>12.0f} {ocr_ms:>8.0f}")
+
+    print(f"\n{len(args.images)} screenshots, {totals['elements']} elements")
+    print(f"OCR label coverage: {totals['labeled'] / max(totals['elements'], 1):.1%}")
+    print(f"Parse time: {totals['base_ms']:.0f}ms captions only, {totals['ocr_ms']:.0f}ms with OCR labels "
+          f"({totals['base_ms'] - totals['ocr_ms']:+.0f}ms saved)")
+    print(f"OCR pass: {with_ocr.ocr_time_ms / max(with_ocr.ocr_runs, 1):.0f}ms avg, "
+          f"caption: {with_ocr.get_stats()['avg_caption_ms']:.1f}ms avg per element")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
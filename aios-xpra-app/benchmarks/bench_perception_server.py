@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Throughput of concurrent sessions parsing through the perception server.
+
+Runs the fixtures through one in-process OmniParserV2 sequentially (one
+session at a time, as separate agent processes would each do), then
+through a PerceptionServer with --sessions clients parsing concurrently,
+and reports frames/s, per-parse latency and how well the server's model
+calls were batched. Result caches are bypassed (force_refresh) so every
+parse reaches the models. Run inside the container:
+
+    python3 benchmarks/bench_perception_server.py fixtures/*.png --sessions 4 --window-ms 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import OmniParserV2
+from superagent.perception_server import PerceptionServer, PerceptionClient
+
+
+def run_sessions(parse_fns, images, rounds):
+    """Parse every image `rounds` times in each session concurrently; returns (seconds, latencies ms)."""
+    latencies = []
+    lock = threading.Lock()
+
+    def session(parse):
+        own = []
+        for _ in range(rounds):
+            for image in images:
+                start = time.perf_counter()
+                parse(image)
+                own.append((time.perf_counter() - start) * 1000)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=session, args=(fn,)) for fn in parse_fns]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('images', nargs='+', help='Fixture screenshots')
+    parser.add_argument('--sessions', type=int, default=4, help='Concurrent clients')
+    parser.add_argument('--rounds', type=int, default=3, help='Passes over the fixtures per session')
+    parser.add_argument('--window-ms', type=float, default=8, help='Server batching window')
+    parser.add_argument('--max-batch', type=int, default=8, help='Most frames per YOLO call')
+    parser.add_argument('--no-captions', action='store_true', help='Detection only')
+    args = parser.parse_args()
+
+    images = [Image.open(path).convert('RGB') for path in args.images]
+    options = dict(generate_captions=not args.no_captions, caption_cache=False)
+
+    local = OmniParserV2(track_elements=False, lazy_captions=False, **options)
+    if not local.model_loader.has_detection:
+        print("OmniParser YOLO model not loaded - timings would only cover the fallback detector")
+    local.parse(images[0], force_refresh=True)  # warm-up
+    seconds, latencies = run_sessions([lambda im: local.parse(im, force_refresh=True)],
+                                      images, args.rounds * args.sessions)
+    frames = len(latencies)
+    print(f"{'mode':<26} {'frames':>6} {'frames/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+    print(f"{'in-process, sequential':<26} {frames:>6} {frames / seconds:>9.2f} "
+          f"{np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 95):>8.0f}")
+
+    socket_path = os.path.join(tempfile.mkdtemp(), 'omniparser.sock')
+    server = PerceptionServer(socket_path, window_ms=args.window_ms, max_batch=args.max_batch, **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    while not os.path.exists(socket_path):
+        time.sleep(0.01)
+
+    clients = [PerceptionClient(socket_path, local_fallback=False, track_elements=False)
+               for _ in range(args.sessions)]
+    clients[0].parse(images[0], force_refresh=True)  # warm-up
+    seconds, latencies = run_sessions([lambda im, c=c: c.parse(im, force_refresh=True) for c in clients],
+                                      images, args.rounds)
+    frames = len(latencies)
+    label = f"server, {args.sessions} sessions"
+    print(f"{label:<26} {frames:>6} {frames / seconds:>9.2f} "
+          f"{np.percentile(latencies, 50):>8.0f} {np.percentile(latencies, 95):>8.0f}")
+
+    stats = server.get_stats()
+    for name in ('detect_batches', 'caption_batches'):
+        batches = stats[name]
+        print(f"{name}: {batches['batches']} calls, {batches['avg_batch']:.1f} items and "
+              f"{batches['avg_requests_per_batch']:.1f} requests per call (largest {batches['largest_batch']})")
+    print(f"Round trip per parse: {np.mean([c.get_stats()['avg_round_trip_ms'] for c in clients]):.0f}ms "
+          f"(server-side {stats['avg_request_ms']:.0f}ms)")
+
+    for client in clients:
+        client.close()
+    server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Latency/recall tradeoff of the YOLO input-size ladder, per app.
+
+Screenshots are grouped by app using their parent directory
+(screens/gmail/*.png, screens/sheets/*.png, ...). Each one is detected at
+every fixed ladder size and with the adaptive ladder. Recall is measured
+against the largest size (IoU >= --iou). Run inside the container:
+
+    python3 benchmarks/bench_resolution_ladder.py screens/*/*.png
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+from collections import defaultdict
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import OmniParserV2
+from superagent.element_tracker import iou_matrix
+
+
+def boxes(result):
+    return np.array([e.bbox.to_tuple() for e in result.elements], dtype=np.float32).reshape(-1, 4)
+
+
+def recall(reference, result, threshold):
+    expected, got = boxes(reference), boxes(result)
+    if not len(expected):
+        return 1.0
+    if not len(got):
+        return 0.0
+    return float((iou_matrix(expected, got).max(axis=1) >= threshold).mean())
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('images', nargs='+', help='Screenshots, grouped by app directory')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU that counts as the same element')
+    args = parser.parse_args()
+
+    omniparser = OmniParserV2(cache_enabled=False, caption_cache=False, track_elements=False)
+    if not omniparser.model_loader.has_detection:
+        print("OmniParser YOLO model not loaded - nothing to benchmark")
+        return 1
+    ladder = omniparser.imgsz_ladder
+    if not ladder:
+        print("OMNIPARSER_IMGSZ_LADDER is empty - nothing to compare")
+        return 1
+
+    # app -> config -> [(ms, recall)]
+    rows = defaultdict(lambda: defaultdict(list))
+    for path in args.images:
+        image = Image.open(path).convert('RGB')
+        app = Path(path).parent.name
+        omniparser.masks.set_active_app(app)  # per-app ladder history
+
+        fixed = {size: timed(omniparser._run_omniparser, image, imgsz=size) for size in ladder}
+        reference = fixed[ladder[-1]][0]
+        for size, (result, ms) in fixed.items():
+            rows[app][str(size)].append((ms, recall(reference, result, args.iou)))
+        result, ms = timed(omniparser._detect_with_ladder, image)
+        rows[app]['ladder'].append((ms, recall(reference, result, args.iou)))
+
+    configs = [str(size) for size in ladder] + ['ladder']
+    print(f"{'app':<16}" + "".join(f"{c:>18}" for c in configs))
+    print(f"{'':<16}" + "".join(f"{'ms':>9}{'recall':>9}" for _ in configs))
+    for app, by_config in sorted(rows.items()):
+        line = f"{app[:16]:<16}"
+        for config in configs:
+            ms, rec = np.mean(by_config[config], axis=0)
+            line += f"{ms:>9.0f}{rec:>9.1%}"
+        print(line)
+
+    stats = omniparser.get_stats()['resolution']
+    print(f"\nLadder final sizes: {stats['final_imgsz']}, escalations: {stats['escalations']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
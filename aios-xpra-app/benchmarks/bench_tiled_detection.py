@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Compare tiled OmniParser detection against single-pass detection.
+
+Each screenshot is detected once in a single downscaled pass and once on
+overlapping full-resolution tiles (one batch, merged with cross-tile NMS).
+Reports latency, element counts and how many single-pass elements the
+tiled mode recovers (and vice versa) at IoU >= --iou. Small-target recall
+only counts elements below --small px on their short side. Run inside the
+container:
+
+    python3 benchmarks/bench_tiled_detection.py screens/*.png --tile 640 --overlap 96
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from superagent.omniparser import OmniParserV2, _tile_grid
+from superagent.element_tracker import iou_matrix
+
+
+def boxes(result):
+    return np.array([e.bbox.to_tuple() for e in result.elements], dtype=np.float32).reshape(-1, 4)
+
+
+def covered(expected, got, threshold):
+    """Boolean per expected box: matched by some box in got."""
+    if not len(expected) or not len(got):
+        return np.zeros(len(expected), dtype=bool)
+    return iou_matrix(expected, got).max(axis=1) >= threshold
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('images', nargs='+', help='Screenshots (PNG/JPEG)')
+    parser.add_argument('--tile', type=int, default=640, help='Tile size in pixels')
+    parser.add_argument('--overlap', type=int, default=96, help='Tile overlap in pixels')
+    parser.add_argument('--iou', type=float, default=0.5, help='IoU that counts as the same element')
+    parser.add_argument('--small', type=int, default=24, help='Short side (px) of a small target')
+    args = parser.parse_args()
+
+    omniparser = OmniParserV2(cache_enabled=False, caption_cache=False, track_elements=False,
+                              tiled_detection=True, tile_size=args.tile, tile_overlap=args.overlap)
+    if not omniparser.model_loader.has_detection:
+        print("OmniParser YOLO model not loaded - nothing to benchmark")
+        return 1
+
+    totals = {'single_ms': 0.0, 'tiled_ms': 0.0}
+    only_tiled = only_single = small_single = small_tiled = small_total = 0
+    print(f"{'image':<28} {'tiles':>5} {'single':>6} {'tiled':>6} {'single ms':>10} {'tiled ms':>9}")
+    for path in args.images:
+        image = Image.open(path).convert('RGB')
+        single, single_ms = timed(omniparser._run_omniparser, image)
+        tiled, tiled_ms = timed(omniparser._detect_tiled, image)
+        totals['single_ms'] += single_ms
+        totals['tiled_ms'] += tiled_ms
+
+        single_boxes, tiled_boxes = boxes(single), boxes(tiled)
+        only_single += int((~covered(single_boxes, tiled_boxes, args.iou)).sum())
+        only_tiled += int((~covered(tiled_boxes, single_boxes, args.iou)).sum())
+
+        # Small targets: union of both modes is the reference
+        union = np.concatenate([single_boxes, tiled_boxes[~covered(tiled_boxes, single_boxes, args.iou)]])
+        small = union[np.minimum(union[:, 2] - union[:, 0], union[:, 3] - union[:, 1]) < args.small]
+        small_total += len(small)
+        small_single += int(covered(small, single_boxes, args.iou).sum())
+        small_tiled += int(covered(small, tiled_boxes, args.iou).sum())
+
+        tiles = len(_tile_grid(image.size, omniparser.tile_size, omniparser.tile_overlap))
+        print(f"{Path(path).name[:28]:<28} {tiles:>5} {single.element_count:>6} {tiled.element_count:>6} "
+              f"{single_ms:>10.0f} {tiled_ms:>9.0f}")
+
+    count = len(args.images)
+    print(f"\n{count} screenshots, tile {omniparser.tile_size}px, overlap {omniparser.tile_overlap}px")
+    print(f"Latency: {totals['single_ms'] / count:.0f}ms single-pass, {totals['tiled_ms'] / count:.0f}ms tiled "
+          f"({totals['tiled_ms'] / max(totals['single_ms'], 1e-6):.1f}x)")
+    print(f"Elements found only tiled: {only_tiled}, only single-pass: {only_single}")
+    if small_total:
+        print(f"Small-target recall (< {args.small}px): {small_single / small_total:.1%} single-pass, "
+              f"{small_tiled / small_total:.1%} tiled ({small_total} targets)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
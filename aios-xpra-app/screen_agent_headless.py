@@ -10,7 +10,6 @@ import asyncio
 import logging
 from typing import Optional, List, Dict
 from PIL import Image
-import subprocess
 import yaml
 
 # Mock PyQt5 before importing ScreenAgent
@@ -24,6 +23,10 @@ sys.path.insert(0, SCREENAGENT_PATH)
 from automaton import Automaton
 from action import MouseAction, KeyboardAction, PlanAction, WaitAction
 
+# Shared screen capture (same pipeline as the SuperAgent engines)
+sys.path.insert(0, '/opt/lumina-search-flow-main')
+from superagent.screen_source import get_screen_source
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -43,39 +46,17 @@ class HeadlessVNCClient:
         self.current_screenshot = None
         self.llm_client = llm_client
         self.send_prompt = ""
+        self.screen = get_screen_source(display)
         logger.info(f"HeadlessVNCClient initialized with display {display}")
     
     def get_now_screenshot(self) -> Image.Image:
-        """Capture current screen using scrot"""
+        """Capture current screen via the shared ScreenSource"""
         try:
-            screenshot_path = "/tmp/screenagent_screenshot.png"
-            
-            # Remove old screenshot
-            if os.path.exists(screenshot_path):
-                os.remove(screenshot_path)
-            
-            # Capture with scrot
-            result = subprocess.run([
-                'scrot', screenshot_path
-            ], env={'DISPLAY': self.display}, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.error(f"Scrot failed: {result.stderr}")
-                return None
-            
-            # Wait for file
-            import time
-            for _ in range(10):
-                if os.path.exists(screenshot_path):
-                    break
-                time.sleep(0.1)
-            
-            if not os.path.exists(screenshot_path):
-                logger.error("Screenshot not created")
+            img = self.screen.capture()
+            if img is None:
+                logger.error("Screenshot capture failed")
                 return None
             
-            # Load image
-            img = Image.open(screenshot_path)
             self.current_screenshot = img
             logger.info(f"Screenshot captured: {img.size}")
             return img
@@ -14,6 +14,7 @@ Features:
 from .core import SuperAgent
 from .vision import VisionAPI
 from .executor import ActionExecutor
+from .screen_source import ScreenSource, get_screen_source
 from .memory import ShortTermMemory, WorkflowMemory
 from .actions import Action, ActionType
 from .workflows import (
@@ -44,6 +45,8 @@ __all__ = [
     'SuperAgent',
     'VisionAPI',
     'ActionExecutor',
+    'ScreenSource',
+    'get_screen_source',
     'ShortTermMemory',
     'WorkflowMemory',
     'Action',
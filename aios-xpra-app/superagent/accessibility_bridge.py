@@ -141,17 +141,23 @@ class AccessibilityBridge:
         """
         Use OCR to find text elements when AT-SPI misses them.
         This catches canvas-based UIs, custom widgets, etc.
+        Boxes are in screen coordinates (window-scoped frames are shifted
+        by their offset, like AT-SPI extents).
         """
         if not HAS_OCR or not screenshot_path:
             return []
         
         try:
             # Run pytesseract to get bounding boxes
-            # Handle both file paths and PIL Image objects
+            # Handle file paths, PIL Image objects and captured Frames
+            dx, dy = 0, 0
             if isinstance(screenshot_path, str):
                 img = Image.open(screenshot_path)
             elif hasattr(screenshot_path, 'convert'):  # Already a PIL Image
                 img = screenshot_path
+            elif hasattr(screenshot_path, 'image') and hasattr(screenshot_path, 'offset'):
+                img = screenshot_path.image
+                dx, dy = screenshot_path.offset
             else:
                 return []
             data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT)
@@ -160,7 +166,7 @@ class AccessibilityBridge:
             for i in range(len(data['text'])):
                 text = data['text'][i].strip()
                 if text and data['conf'][i] > 30:  # Confidence threshold
-                    x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
+                    x, y, w, h = data['left'][i] + dx, data['top'][i] + dy, data['width'][i], data['height'][i]
                     ocr_elements.append({
                         "id": f"ocr_{i}",
                         "type": "text_ocr",
@@ -94,6 +94,8 @@ class ActionResult:
     duration: float = 0.0
     screenshot_before: Optional[Any] = None
     screenshot_after: Optional[Any] = None
+    screen_changed: Optional[bool] = None  # from X Damage; None if not tracked
+    settle_ms: Optional[float] = None  # time until the screen stopped changing
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary"""
@@ -101,5 +103,7 @@ class ActionResult:
             'success': self.success,
             'action': self.action.to_dict(),
             'error': self.error,
-            'duration': self.duration
+            'duration': self.duration,
+            'screen_changed': self.screen_changed,
+            'settle_ms': self.settle_ms
         }
@@ -13,13 +13,21 @@ Enhancements over basic vision:
 import os
 import time
 import logging
-import hashlib
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Union
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 import base64
 from io import BytesIO
 import json
 
+from .frames import Frame
+from .change_detection import ScreenSnapshot, get_change_detector
+from .perceptual_hash import hamming, to_hex, HammingIndex, DEFAULT_RADIUS
+from .volatile_masks import get_volatile_masks
+from .ocr_labels import OcrWord, words_from_boxes
+from .element_index import ElementIndex
+from .element_table import ElementTable, ElementRow, type_code
+
 logger = logging.getLogger(__name__)
 
 # Optional: pytesseract for OCR (install separately)
@@ -34,9 +42,13 @@ except ImportError:
 OMNIPARSER_AVAILABLE = False
 omniparser_instance = None
 try:
-    from .omniparser import OmniParserV2, check_omniparser_available
+    from .omniparser import check_omniparser_available
+    from .perception_server import create_parser, OMNIPARSER_USE_SERVER
     status = check_omniparser_available()
-    if status.get('ultralytics') and status.get('torch'):
+    if OMNIPARSER_USE_SERVER:
+        OMNIPARSER_AVAILABLE = True  # models live in the perception server
+        logger.info("OmniParser V2 via perception server - SOTA UI detection enabled")
+    elif status.get('ultralytics') and status.get('torch'):
         OMNIPARSER_AVAILABLE = True
         logger.info("OmniParser V2 available - SOTA UI detection enabled")
     else:
@@ -79,34 +91,56 @@ class UIElement:
 
 
 class ScreenAnalysis:
-    """Complete screen analysis result"""
+    """
+    Complete screen analysis result
+    
+    Elements are stored column-wise in `table` (see element_table);
+    `elements` are row views of it with the UIElement interface.
+    """
     def __init__(self):
-        self.elements: List[UIElement] = []
+        self.table: ElementTable = ElementTable.empty()
         self.text_content: str = ""
         self.layout: Dict[str, Any] = {}
         self.regions: Dict[str, Tuple[int, int, int, int]] = {}
         self.confidence: float = 0.0
+        self._index: Optional[ElementIndex] = None
         
+    @property
+    def elements(self) -> List[ElementRow]:
+        return self.table.rows()
+    
     def add_element(self, element: UIElement):
-        self.elements.append(element)
+        row = ElementTable.from_xywh([element.bbox], element.element_type, [element.text or ""],
+                                     element.confidence, extra={0: dict(element.attributes)})
+        row.interactable[0] = bool(element.attributes.get('is_interactable', False))
+        self.table = ElementTable.concat([self.table, row])
+    
+    @property
+    def index(self) -> ElementIndex:
+        """Lookup indexes over the elements (rebuilt when the list is replaced or grows)."""
+        if self._index is None or not self._index.matches(self.elements):
+            self._index = ElementIndex(
+                self.elements,
+                box=lambda e: (e.bbox[0], e.bbox[1], e.bbox[0] + e.bbox[2], e.bbox[1] + e.bbox[3]),
+                text=lambda e: e.text or "")
+        return self._index
     
-    def find_element_by_text(self, text: str, fuzzy: bool = True) -> Optional[UIElement]:
+    def find_element_by_text(self, text: str, fuzzy: bool = True) -> Optional[ElementRow]:
         """Find UI element containing specific text"""
-        text_lower = text.lower()
-        for elem in self.elements:
-            if elem.text:
-                elem_text_lower = elem.text.lower()
-                if fuzzy:
-                    if text_lower in elem_text_lower or elem_text_lower in text_lower:
-                        return elem
-                else:
-                    if text_lower == elem_text_lower:
-                        return elem
-        return None
+        if not fuzzy:
+            matches = [e for e in self.index.equals(text) if e.text]
+            return matches[0] if matches else None
+        contained = [e for e in self.index.contains(text) if e.text][:1]
+        return self.index.earliest(contained + self.index.within(text)[:1])
     
-    def find_elements_by_type(self, element_type: str) -> List[UIElement]:
+    def find_elements_by_type(self, element_type: str) -> List[ElementRow]:
         """Find all elements of specific type"""
-        return [e for e in self.elements if e.element_type == element_type]
+        rows = self.elements
+        return [rows[i] for i in np.flatnonzero(self.table.of_type(element_type))]
+    
+    def elements_at(self, x: int, y: int) -> List[ElementRow]:
+        """Elements whose box contains the point"""
+        return self.index.at(x, y)
     
     def to_dict(self) -> Dict:
         return {
@@ -138,18 +172,24 @@ class AdvancedVisionAnalyzer:
         
         self.last_screenshot = None
         self.last_analysis = None
-        self._ai_ocr_signature: Optional[str] = None
-        self._ai_ocr_cache: List[UIElement] = []
+        self.last_frame: Optional[Frame] = None
+        self._ai_ocr_signature: Optional[int] = None
+        self._ai_ocr_cache: ElementTable = ElementTable.empty()
         
         # 🔥 SPEED: Cache OCR results by screenshot hash to avoid redundant processing
         self._screen_cache: Dict[str, ScreenAnalysis] = {}
+        self._screen_index = HammingIndex()  # caret blinks / clock ticks still hit
+        self._screen_raw: Dict[str, int] = {}  # unmasked hashes, for mask hit metrics
+        self._screen_snapshots: Dict[str, ScreenSnapshot] = {}  # to confirm hits against
+        self.masks = get_volatile_masks()
         self._cache_max_size = 5  # Keep last 5 screenshots
+        self.change_detector = get_change_detector()
         
         # Initialize OmniParser V2 if available
         self.omniparser = None
         if self.enable_omniparser:
             try:
-                self.omniparser = OmniParserV2(
+                self.omniparser = create_parser(
                     cache_enabled=True,
                     min_confidence=0.25,
                     max_elements=50,
@@ -166,61 +206,97 @@ class AdvancedVisionAnalyzer:
         logger.info(f"  UI detection: {'enabled' if self.enable_ui_detection else 'disabled'}")
         logger.info(f"  OmniParser V2: {'ACTIVE 🎯' if self.omniparser else 'disabled'}")
     
-    def analyze_screen(self, screenshot: Image.Image) -> ScreenAnalysis:
+    def analyze_screen(self, screenshot: Union[Image.Image, Frame]) -> ScreenAnalysis:
         """
         Perform comprehensive screen analysis
         
+        Accepts a PIL image or a captured Frame. For frames with X Damage
+        info, an unrepainted screen reuses the previous analysis outright.
+        Element and region boxes of window-scoped frames are returned in
+        absolute screen coordinates.
+        
         Returns rich structured data about screen content
         """
+        # Plain images are wrapped too, so hashes are shared with other consumers
+        frame = Frame.wrap(screenshot)
+        screenshot = frame.image
+        # 🔥 SPEED: Nothing repainted since the last analysis - O(1) reuse
+        if self.last_analysis is not None and frame.unchanged_since(self.last_frame):
+            logger.info(f"✅ No screen damage since frame {self.last_frame.seq} - reusing analysis")
+            self.last_frame = frame
+            self.last_screenshot = screenshot
+            return self.last_analysis
+        
         # 🔥 SPEED: Check cache first to avoid redundant OCR
-        screenshot_hash = hashlib.md5(screenshot.tobytes()).hexdigest()
-        if screenshot_hash in self._screen_cache:
-            logger.info(f"✅ Using cached screen analysis (hash: {screenshot_hash[:8]}...)")
-            return self._screen_cache[screenshot_hash]
+        fingerprint = self.masks.fingerprint(frame)
+        offset = frame.offset
+        screenshot_hash = to_hex(fingerprint.hash)
+        if offset != (0, 0):
+            screenshot_hash += f"@{offset[0]},{offset[1]}"
+        cached_key = self._find_cached_screen(fingerprint.hash, screenshot_hash, frame)
+        self.masks.record_lookup('screen_analysis', fingerprint,
+                                 self._screen_raw.get(cached_key) if cached_key else None)
+        if cached_key is not None:
+            logger.info(f"✅ Using cached screen analysis (hash: {cached_key[:8]}...)")
+            self.last_frame = frame
+            self.last_screenshot = screenshot
+            self.last_analysis = self._screen_cache[cached_key]
+            return self.last_analysis
         
         analysis = ScreenAnalysis()
         
         # 1. OCR text extraction
-        text_elements: List[UIElement] = []
+        text_table = ElementTable.empty()
 
         if self.enable_ocr:
-            text_elements = self._extract_text_ocr(screenshot)
+            text_table = self._extract_text_ocr(screenshot)
         elif self.vision_api and hasattr(self.vision_api, 'extract_text'):
-            text_elements = self._extract_text_ai(screenshot)
-
-        for elem in text_elements:
-            analysis.add_element(elem)
+            text_table = self._extract_text_ai(frame)
 
-        if text_elements:
-            analysis.text_content = "\n".join([
-                e.text for e in text_elements if e.text
-            ])
+        if len(text_table):
+            analysis.text_content = "\n".join(text for text in text_table.text if text)
+        tables = [text_table]
         
         # 2. UI element detection (vision AI-based)
         if self.enable_ui_detection:
-            ui_elements = self._detect_ui_elements(screenshot)
-            for elem in ui_elements:
-                analysis.add_element(elem)
+            # Reuse the OCR pass for OmniParser's text labels
+            ocr_words = None
+            if self.enable_ocr:
+                ocr_words = words_from_boxes(zip(text_table.text, text_table.xywh.tolist(),
+                                                 (text_table.confidence * 100).tolist()))
+            tables.append(self._detect_ui_elements(screenshot, ocr_words))
+        analysis.table = ElementTable.concat(tables)
         
         # 3. Layout analysis
-        analysis.layout = self._analyze_layout(screenshot, analysis.elements)
+        analysis.layout = self._analyze_layout(screenshot, analysis.table)
         
         # 4. Region detection (header, sidebar, main, etc.)
-        analysis.regions = self._detect_regions(screenshot, analysis.elements)
+        analysis.regions = self._detect_regions(screenshot, analysis.table)
+        
+        # 5. Map window-relative boxes back to the screen
+        if offset != (0, 0):
+            self._offset_analysis(analysis, offset)
         
         # Store for change detection
         self.last_screenshot = screenshot
         self.last_analysis = analysis
+        self.last_frame = frame
         
         analysis.confidence = self._calculate_confidence(analysis)
         
         # 🔥 SPEED: Cache this analysis
         self._screen_cache[screenshot_hash] = analysis
+        self._screen_index.add(fingerprint.hash, screenshot_hash)
+        self._screen_raw[screenshot_hash] = fingerprint.raw
+        self._screen_snapshots[screenshot_hash] = self.masks.snapshot(frame)
         # Limit cache size
         if len(self._screen_cache) > self._cache_max_size:
             # Remove oldest entry
             oldest_key = next(iter(self._screen_cache))
             del self._screen_cache[oldest_key]
+            self._screen_raw.pop(oldest_key, None)
+            self._screen_snapshots.pop(oldest_key, None)
+            self._screen_index.remove(oldest_key)
         
         logger.info(f"Screen analysis complete:")
         logger.info(f"  Elements detected: {len(analysis.elements)}")
@@ -230,10 +306,26 @@ class AdvancedVisionAnalyzer:
         
         return analysis
     
-    def _extract_text_ocr(self, screenshot: Image.Image) -> List[UIElement]:
+    def _find_cached_screen(self, perceptual_hash: int, screenshot_hash: str,
+                            frame: Frame) -> Optional[str]:
+        """
+        Key of the cached analysis for this screen or a near-identical one at
+        the same offset, if its snapshot confirms that at most a caret- or
+        glyph-sized change happened outside the volatile regions.
+        """
+        candidates = [screenshot_hash] if screenshot_hash in self._screen_cache else []
+        suffix = screenshot_hash.partition('@')[2]
+        candidates += [key for _, key in self._screen_index.find(perceptual_hash)
+                       if key != screenshot_hash and key.partition('@')[2] == suffix]
+        for key in candidates:
+            if self.masks.confirm_hit(self._screen_snapshots.get(key), frame):
+                return key
+        return None
+    
+    def _extract_text_ocr(self, screenshot: Image.Image) -> ElementTable:
         """Extract all text using OCR"""
         if not TESSERACT_AVAILABLE:
-            return []
+            return ElementTable.empty()
         
         try:
             # Get detailed OCR data with bounding boxes
@@ -242,117 +334,89 @@ class AdvancedVisionAnalyzer:
                 output_type=pytesseract.Output.DICT
             )
             
-            elements = []
-            n_boxes = len(ocr_data['text'])
-            
-            for i in range(n_boxes):
-                text = ocr_data['text'][i].strip()
-                conf = float(ocr_data['conf'][i])
-                
-                # Filter out low confidence and empty text
-                if conf < 30 or not text:
-                    continue
-                
-                x = ocr_data['left'][i]
-                y = ocr_data['top'][i]
-                w = ocr_data['width'][i]
-                h = ocr_data['height'][i]
-                
-                element = UIElement(
-                    element_type='text',
-                    bbox=(x, y, w, h),
-                    text=text,
-                    confidence=conf / 100.0,
-                    attributes={'ocr_conf': conf}
-                )
-                elements.append(element)
+            # Filter out low confidence and empty text
+            texts = [text.strip() for text in ocr_data['text']]
+            conf = np.array(ocr_data['conf'], dtype=np.float32)
+            keep = np.flatnonzero((conf >= 30) & np.array([bool(text) for text in texts], dtype=bool))
+            boxes = np.column_stack([ocr_data['left'], ocr_data['top'],
+                                     ocr_data['width'], ocr_data['height']])[keep]
+            table = ElementTable.from_xywh(boxes, 'text', [texts[i] for i in keep.tolist()],
+                                           conf[keep] / 100.0)
             
-            logger.info(f"OCR extracted {len(elements)} text elements")
-            return elements
+            logger.info(f"OCR extracted {len(table)} text elements")
+            return table
             
         except Exception as e:
             logger.error(f"OCR failed: {e}")
-            return []
+            return ElementTable.empty()
 
-    def _extract_text_ai(self, screenshot: Image.Image) -> List[UIElement]:
+    def _extract_text_ai(self, screenshot: Union[Image.Image, Frame]) -> ElementTable:
         """Fallback OCR using the connected vision API when local OCR is unavailable."""
 
+        screenshot = Frame.wrap(screenshot)
         try:
-            signature = hashlib.sha1(screenshot.tobytes()).hexdigest()
+            signature = self.masks.fingerprint(screenshot).hash
         except Exception:
             signature = None
 
-        if signature and signature == self._ai_ocr_signature:
-            return list(self._ai_ocr_cache)
+        if (signature is not None and self._ai_ocr_signature is not None
+                and hamming(signature, self._ai_ocr_signature) <= DEFAULT_RADIUS):
+            return self._ai_ocr_cache
 
-        elements: List[UIElement] = []
+        table = ElementTable.empty()
 
         if not self.vision_api or not hasattr(self.vision_api, 'extract_text'):
-            return elements
+            return table
 
         try:
             extracted_text = self.vision_api.extract_text(screenshot)
             if extracted_text:
                 width, height = screenshot.size
-                elements.append(UIElement(
-                    element_type='ai_text',
-                    bbox=(0, 0, width, height),
-                    text=extracted_text,
-                    confidence=0.65,
-                    attributes={'source': 'gemini_ocr'}
-                ))
+                table = ElementTable.from_xywh([(0, 0, width, height)], 'ai_text', [extracted_text], 0.65,
+                                               extra={0: {'source': 'gemini_ocr'}})
                 logger.info(f"AI OCR extracted {len(extracted_text)} characters of text")
         except Exception as exc:
             logger.warning(f"AI OCR fallback failed: {exc}")
 
         if signature is not None:
             self._ai_ocr_signature = signature
-            self._ai_ocr_cache = list(elements)
+            self._ai_ocr_cache = table
 
-        return elements
+        return table
     
-    def _detect_ui_elements(self, screenshot: Image.Image) -> List[UIElement]:
+    def _detect_ui_elements(self, screenshot: Image.Image,
+                            ocr_words: Optional[List[OcrWord]] = None) -> ElementTable:
         """
         Detect UI elements using OmniParser V2 (Microsoft SOTA model)
         
         OmniParser V2 achieves 39.6% on ScreenSpot Pro benchmark.
-        Uses YOLOv8 for detection + Florence-2 for element captioning.
+        Uses YOLOv8 for detection + Florence-2 for element captioning
+        (OCR words, when given, label text-bearing elements instead).
         """
-        elements = []
         width, height = screenshot.size
         
         # 🎯 USE OMNIPARSER V2 IF AVAILABLE (SOTA UI detection)
         if self.omniparser is not None:
             try:
                 logger.info("🎯 Running OmniParser V2 detection (YOLO + Florence-2)...")
-                omni_result = self.omniparser.parse(screenshot)
+                omni_result = self.omniparser.parse(screenshot, ocr_words=ocr_words)
                 
                 logger.info(f"  OmniParser detected {omni_result.element_count} elements ({omni_result.interactable_count} interactable)")
                 logger.info(f"  Parse time: {omni_result.parse_time_ms:.1f}ms")
                 
-                # Convert OmniParser elements to our UIElement format
-                for omni_elem in omni_result.elements:
-                    bbox = omni_elem.bbox
-                    elem = UIElement(
-                        element_type=omni_elem.element_type.name.lower() if hasattr(omni_elem.element_type, 'name') else 'interactable',
-                        bbox=(int(bbox.x1), int(bbox.y1), int(bbox.width), int(bbox.height)),
-                        text=omni_elem.description or omni_elem.text or omni_elem.ocr_text,
-                        confidence=omni_elem.confidence,
-                        attributes={
-                            'is_interactable': omni_elem.is_interactable,
-                            'omniparser_id': omni_elem.id,
-                            'center': omni_elem.bbox.center_int
-                        }
-                    )
-                    elements.append(elem)
+                # OmniParser elements as table columns (captions first, in one batch)
+                omni_result.ensure_captions()
+                table = ElementTable.from_parse_result(
+                    omni_result, label=lambda e: e.description or e.text or e.ocr_text)
                 
                 # Log clickable elements for debugging
-                clickable = [e for e in elements if e.attributes.get('is_interactable', False)]
+                clickable = np.flatnonzero(table.interactable)
                 logger.info(f"  Clickable elements: {len(clickable)}")
-                for e in clickable[:5]:
-                    logger.debug(f"    [{e.attributes.get('omniparser_id')}] {e.text or 'unknown'} at {e.center}")
+                for row in clickable[:5].tolist():
+                    e = table[row]
+                    logger.debug(f"    [{e.id}] {e.text or 'unknown'} at {e.center}")
                 
-                return elements
+                return table
                 
             except Exception as e:
                 logger.error(f"OmniParser V2 failed: {e}")
@@ -362,58 +426,32 @@ class AdvancedVisionAnalyzer:
         logger.warning("⚠️  Using fallback heuristic detection (OmniParser not available)")
         
         # Just detect title bar region as before
-        elements.append(UIElement(
-            element_type='titlebar',
-            bbox=(0, 0, width, 40),
-            confidence=0.8,
-            attributes={'position': 'top'}
-        ))
-        
-        return elements
+        return ElementTable.from_xywh([(0, 0, width, 40)], 'titlebar', [""], 0.8,
+                                      extra={0: {'position': 'top'}})
     
-    def _analyze_layout(self, screenshot: Image.Image, elements: List[UIElement]) -> Dict[str, Any]:
+    def _analyze_layout(self, screenshot: Image.Image, table: ElementTable) -> Dict[str, Any]:
         """Analyze screen layout and structure"""
         width, height = screenshot.size
         
         layout = {
             'screen_size': (width, height),
             'aspect_ratio': width / height,
-            'element_density': len(elements) / (width * height / 10000),  # per 100x100 block
+            'element_density': len(table) / (width * height / 10000),  # per 100x100 block
             'text_regions': []
         }
         
-        # Group elements by vertical position
-        if elements:
-            # Sort by Y position
-            sorted_elements = sorted(elements, key=lambda e: e.bbox[1])
-            
-            # Detect horizontal bands of elements (rows)
-            rows = []
-            current_row = []
-            current_y = -100
-            
-            for elem in sorted_elements:
-                elem_y = elem.bbox[1]
-                if abs(elem_y - current_y) < 50:  # Same row threshold
-                    current_row.append(elem)
-                else:
-                    if current_row:
-                        rows.append(current_row)
-                    current_row = [elem]
-                    current_y = elem_y
-            
-            if current_row:
-                rows.append(current_row)
-            
-            layout['horizontal_bands'] = len(rows)
-            layout['elements_per_band'] = len(elements) / max(len(rows), 1)
+        # Horizontal bands of elements (rows, 50px threshold)
+        if len(table):
+            bands = table.row_bands(threshold=50)
+            layout['horizontal_bands'] = bands
+            layout['elements_per_band'] = len(table) / max(bands, 1)
         
         return layout
     
     def _detect_regions(
         self,
         screenshot: Image.Image,
-        elements: List[UIElement]
+        table: ElementTable
     ) -> Dict[str, Tuple[int, int, int, int]]:
         """Detect semantic regions (header, sidebar, main content, etc.)"""
         width, height = screenshot.size
@@ -432,26 +470,37 @@ class AdvancedVisionAnalyzer:
         
         # Detect sidebar based on element clustering
         # (simplified - production would analyze actual content)
-        left_elements = [e for e in elements if e.bbox[0] < width * 0.2]
-        right_elements = [e for e in elements if e.bbox[0] > width * 0.8]
+        left_x = table.xywh[:, 0]
+        left_elements = int((left_x < width * 0.2).sum())
+        right_elements = int((left_x > width * 0.8).sum())
         
-        if len(left_elements) > len(elements) * 0.3:
+        if left_elements > len(table) * 0.3:
             regions['left_sidebar'] = (0, header_height, int(width * 0.2), height - header_height)
         
-        if len(right_elements) > len(elements) * 0.3:
+        if right_elements > len(table) * 0.3:
             regions['right_sidebar'] = (int(width * 0.8), header_height, int(width * 0.2), height - header_height)
         
         return regions
     
+    def _offset_analysis(self, analysis: ScreenAnalysis, offset: Tuple[int, int]):
+        """Shift element and region boxes by a frame's screen offset."""
+        dx, dy = offset
+        # New columns - tables may be shared with the OCR caches
+        analysis.table = analysis.table.shifted(dx, dy)
+        analysis.regions = {
+            name: (x + dx, y + dy, w, h)
+            for name, (x, y, w, h) in analysis.regions.items()
+        }
+    
     def _calculate_confidence(self, analysis: ScreenAnalysis) -> float:
         """Calculate overall confidence in analysis"""
-        if not analysis.elements:
+        if not len(analysis.table):
             return 0.3
         
-        avg_elem_confidence = sum(e.confidence for e in analysis.elements) / len(analysis.elements)
+        avg_elem_confidence = float(analysis.table.confidence.mean())
         
         # Penalize if too few elements detected
-        element_factor = min(len(analysis.elements) / 10.0, 1.0)
+        element_factor = min(len(analysis.table) / 10.0, 1.0)
         
         # Boost if we have good text content
         text_factor = min(len(analysis.text_content) / 500.0, 1.0)
@@ -459,70 +508,34 @@ class AdvancedVisionAnalyzer:
         confidence = (avg_elem_confidence * 0.5 + element_factor * 0.3 + text_factor * 0.2)
         return min(confidence, 0.95)
     
-    def detect_changes(self, new_screenshot: Image.Image) -> Dict[str, Any]:
+    def detect_changes(self, new_screenshot: Union[Image.Image, Frame],
+                       previous: Optional[Union[Image.Image, Frame]] = None) -> Dict[str, Any]:
         """
         Detect what changed between last screenshot and new one
         
+        Given Frames with X Damage info, an unrepainted screen is reported
+        without touching pixels, and only damaged tiles are diffed.
+        
+        Args:
+            new_screenshot: Screenshot to compare
+            previous: Screenshot to compare against (default: last analyzed)
+        
         Key advantage: Helps agent understand if actions had effect
         """
-        if self.last_screenshot is None:
+        if previous is None:
+            previous = self.last_frame
+            if previous is None or previous.image is not self.last_screenshot:
+                previous = self.last_screenshot
+        if previous is None:
             return {'changed': False, 'reason': 'No previous screenshot'}
         
-        # Simple pixel difference for now
-        # Production would use perceptual hashing or feature matching
-        
         try:
-            # Ensure same size
-            if new_screenshot.size != self.last_screenshot.size:
-                return {
-                    'changed': True,
-                    'reason': 'Screen size changed',
-                    'magnitude': 1.0
-                }
-            
-            # Convert to arrays and compare
-            import numpy as np
-            
-            new_array = np.array(new_screenshot)
-            old_array = np.array(self.last_screenshot)
-            
-            # Calculate difference
-            diff = np.abs(new_array.astype(float) - old_array.astype(float))
-            total_diff = np.sum(diff)
-            max_diff = diff.size * 255 * 3  # RGB
-            
-            change_magnitude = total_diff / max_diff
-            
-            # Detect which regions changed most
-            h, w = new_array.shape[:2]
-            grid_size = 10
-            
-            changed_regions = []
-            for i in range(grid_size):
-                for j in range(grid_size):
-                    y1 = i * h // grid_size
-                    y2 = (i + 1) * h // grid_size
-                    x1 = j * w // grid_size
-                    x2 = (j + 1) * w // grid_size
-                    
-                    region_diff = np.sum(diff[y1:y2, x1:x2])
-                    region_max = (y2 - y1) * (x2 - x1) * 255 * 3
-                    region_change = region_diff / region_max
-                    
-                    if region_change > 0.1:  # 10% threshold
-                        changed_regions.append({
-                            'grid_pos': (i, j),
-                            'bbox': (x1, y1, x2 - x1, y2 - y1),
-                            'change_magnitude': region_change
-                        })
-            
-            return {
-                'changed': change_magnitude > 0.01,  # 1% threshold
-                'magnitude': change_magnitude,
-                'changed_regions': changed_regions,
-                'num_regions_changed': len(changed_regions)
-            }
-            
+            new_frame = Frame.wrap(new_screenshot)
+            report = self.change_detector.compare(previous, new_frame,
+                                                  ignore=self.masks.image_rects(new_frame))
+            if not report.changed:
+                # Small diffs between otherwise identical screens: clocks, spinners
+                self.masks.observe(report, new_frame.offset)
         except Exception as e:
             logger.error(f"Change detection failed: {e}")
             return {
@@ -530,33 +543,52 @@ class AdvancedVisionAnalyzer:
                 'reason': f'Detection error: {e}',
                 'magnitude': 0.5
             }
+        
+        changed_regions = [
+            {
+                'grid_pos': (row, col),
+                'bbox': report.tile_bbox(row, col),
+                'change_magnitude': float(report.tile_magnitudes[row, col])
+            }
+            for row, col in report.changed_tiles()
+        ]
+        result = {
+            'changed': report.changed,
+            'magnitude': report.magnitude,
+            'changed_regions': changed_regions,
+            'num_regions_changed': len(changed_regions),
+            'boxes': report.boxes
+        }
+        if report.reason:
+            result['reason'] = report.reason
+        return result
     
-    def find_clickable_elements(self, screenshot: Image.Image) -> List[UIElement]:
+    def find_clickable_elements(self, screenshot: Union[Image.Image, Frame]) -> List[ElementRow]:
         """
         Find likely clickable elements
         
         Uses heuristics + vision AI to identify buttons, links, etc.
         """
         analysis = self.analyze_screen(screenshot)
-        
-        clickable = []
+        table = analysis.table
         
         # Filter for likely clickable types
-        for elem in analysis.elements:
-            if elem.element_type in ['button', 'link', 'icon', 'menu_item']:
-                clickable.append(elem)
-            # Also check for text that looks like buttons/links
-            elif elem.element_type == 'text' and elem.text:
-                text = elem.text.strip()
-                # Common button text patterns
-                if any(keyword in text.lower() for keyword in [
-                    'click', 'submit', 'send', 'save', 'cancel', 'ok',
-                    'yes', 'no', 'continue', 'next', 'back', 'close'
-                ]):
-                    elem.element_type = 'button_text'
-                    clickable.append(elem)
-        
-        return clickable
+        clickable = table.of_type('button', 'link', 'icon', 'menu_item')
+        
+        # Also check for text that looks like buttons/links
+        button_text = type_code('button_text')
+        for row in np.flatnonzero(table.of_type('text')).tolist():
+            text = table.text[row].strip().lower()
+            # Common button text patterns
+            if text and any(keyword in text for keyword in [
+                'click', 'submit', 'send', 'save', 'cancel', 'ok',
+                'yes', 'no', 'continue', 'next', 'back', 'close'
+            ]):
+                table.type_codes[row] = button_text
+                clickable[row] = True
+        
+        rows = analysis.elements
+        return [rows[i] for i in np.flatnonzero(clickable)]
     
     def create_annotated_screenshot(
         self,
@@ -611,7 +643,7 @@ class AdvancedVisionAnalyzer:
 
     def analyze_with_vision_api(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any] = None
     ) -> Dict[str, Any]:
@@ -630,6 +662,9 @@ class AdvancedVisionAnalyzer:
         if context is None:
             context = {}
         
+        # One Frame for both steps so hashes and the encoded image are shared
+        screenshot = Frame.wrap(screenshot)
+        
         # Step 1: Do local OCR and UI detection
         logger.info("🔍 Step 1: Local OCR and UI detection...")
         analysis = self.analyze_screen(screenshot)
@@ -693,29 +728,21 @@ class AdvancedVisionAnalyzer:
     def _build_enhanced_prompt(self, task: str, analysis: ScreenAnalysis) -> str:
         """Build enhanced prompt with OCR data and OmniParser elements for vision API"""
         
-        # Extract interactable elements (from OmniParser)
-        interactable_elements = []
-        for elem in analysis.elements:
-            if elem.attributes.get('is_interactable', False):
-                center = elem.attributes.get('center', elem.center)
-                interactable_elements.append({
-                    'id': elem.attributes.get('omniparser_id', 0),
-                    'type': elem.element_type,
-                    'text': elem.text or 'unknown',
-                    'center': center,
-                    'confidence': elem.confidence
-                })
+        # Interactable elements (from OmniParser)
+        table = analysis.table
+        interactable = np.flatnonzero(table.interactable)
+        centers = table.centers
         
         # Extract clickable items by type
         clickable_items = [
-            f"[{e['id']}] \"{e['text']}\" at ({e['center'][0]}, {e['center'][1]})"
-            for e in interactable_elements[:15]
+            f"[{table.ids[i]}] \"{table.text[i] or 'unknown'}\" at ({centers[i, 0]}, {centers[i, 1]})"
+            for i in interactable[:15].tolist()
         ]
         
         # Extract text inputs
         text_inputs = [
-            elem.text for elem in analysis.elements
-            if elem.element_type in ['textbox', 'input_text', 'input_search'] and elem.text
+            table.text[i] for i in np.flatnonzero(table.of_type('textbox', 'input_text', 'input_search')).tolist()
+            if table.text[i]
         ][:5]
         
         # Build structured prompt with OmniParser data
@@ -724,7 +751,7 @@ TASK: {task}
 
 === UI ELEMENT DETECTION (OmniParser V2 - SOTA) ===
 Detected {len(analysis.elements)} UI elements total
-Interactable elements: {len(interactable_elements)}
+Interactable elements: {len(interactable)}
 Detection confidence: {analysis.confidence:.1%}
 
 CLICKABLE ELEMENTS (click by coordinates):
@@ -0,0 +1,322 @@
+"""
+Caption Cache - Content-addressed icon captions that survive restarts
+
+The same icons show up all day: Gmail's compose pencil, Chrome's tab close
+button, Slack's sidebar entries, YouTube's search magnifier. Captioning
+them with Florence-2 every time is the most expensive part of a parse, so
+captions are cached by a perceptual hash of the padded element crop:
+
+    cache = get_caption_cache()
+    keys = [cache.key(crop) for crop in crops]
+    found = cache.get_many(keys)          # {key: caption}
+    ...
+    cache.put_many(new_captions)           # {key: caption}
+
+Two tiers:
+- In-memory LRU (per process)
+- SQLite file (WAL mode), shared by every process on the node and kept
+  across restarts; pruned to a row cap by least recent use
+
+Keys include a namespace (caption model + prompt), so captions of an old
+model are never served for a new one.
+"""
+
+import os
+import time
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from PIL import Image
+
+from .perceptual_hash import dhash, to_hex
+
+logger = logging.getLogger(__name__)
+
+# SQLite file shared by all processes on the node ("" = memory tier only)
+CAPTION_CACHE_PATH = os.environ.get(
+    'OMNIPARSER_CAPTION_CACHE',
+    os.path.join(os.environ.get('OMNIPARSER_CACHE_DIR', '/tmp/omniparser_cache'), 'captions.sqlite3')
+)
+
+# Entries kept in the in-memory LRU tier
+CAPTION_CACHE_MEMORY = int(os.environ.get('OMNIPARSER_CAPTION_CACHE_MEMORY', '4096'))
+
+# Rows kept in the SQLite tier (least recently used pruned first, 0 = unbounded)
+CAPTION_CACHE_ROWS = int(os.environ.get('OMNIPARSER_CAPTION_CACHE_ROWS', '50000'))
+
+# Hash edge for crop keys (2 * n * n bits; icons are small, so 8 is plenty)
+CROP_HASH_SIZE = 8
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captions (
+    key TEXT PRIMARY KEY,
+    caption TEXT NOT NULL,
+    cost_ms REAL NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+_INDEX = "CREATE INDEX IF NOT EXISTS captions_last_used ON captions (last_used)"
+
+
+class CaptionCache:
+    """
+    Two-tier (LRU + SQLite) caption store keyed by crop fingerprints.
+
+    Features:
+    - Perceptual crop keys, bucketed by crop size so look-alike icons of
+      different sizes don't collide
+    - Batched reads/writes (one query per caption batch)
+    - Row cap on the database with LRU pruning (memory-tier hits refresh
+      their rows' last_used on the next write)
+    - Hit rate and estimated captioning time saved
+    - Falls back to the memory tier if the database is unavailable
+    """
+
+    def __init__(self,
+                 path: Optional[str] = CAPTION_CACHE_PATH,
+                 memory_entries: int = CAPTION_CACHE_MEMORY,
+                 namespace: str = "",
+                 max_rows: int = CAPTION_CACHE_ROWS):
+        """
+        Initialize caption cache.
+
+        Args:
+            path: SQLite file (None or "" for memory only)
+            memory_entries: Size of the in-memory LRU tier
+            namespace: Prefix for every key (identifies model and prompt)
+            max_rows: Database rows kept across all namespaces (0 = unbounded);
+                writes past the cap prune the least recently used tenth
+        """
+        self.path = path or None
+        self.memory_entries = max(0, memory_entries)
+        self.namespace = namespace
+        self.max_rows = max(0, max_rows)
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (caption, cost_ms)
+        self._touched: Dict[str, float] = {}  # memory hits whose rows' last_used is stale
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        if self.path:
+            self._open()
+
+        # Statistics
+        self.lookups = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.stores = 0
+        self.evicted = 0            # database rows pruned by this process
+        self.ms_per_caption = 0.0   # moving average of real captioning cost
+        self.ms_saved = 0.0         # captioning time the hits would have cost
+
+    def _open(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")  # concurrent readers across processes
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(_SCHEMA)
+            db.execute(_INDEX)
+            self._db = db
+            logger.info(f"💾 Caption cache at {self.path}")
+        except (sqlite3.Error, OSError) as e:
+            logger.warning(f"Caption cache database unavailable ({e}), using memory only")
+            self._db = None
+
+    def key(self, crop: Image.Image) -> str:
+        """Cache key of an element crop."""
+        width, height = crop.size
+        return f"{self.namespace}:{crop_hash(crop)}:{width // 8}x{height // 8}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, str]:
+        """
+        Look up captions.
+
+        Args:
+            keys: Keys from key()
+
+        Returns:
+            {key: caption} for the keys found in either tier
+        """
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        with self._lock:
+            self.lookups += len(keys)
+            for key in keys:
+                entry = self._memory.get(key)
+                if entry is not None:
+                    self._memory.move_to_end(key)
+                    if self._db is not None:
+                        self._touched[key] = time.time()
+                    found[key] = entry[0]
+                    self.memory_hits += 1
+                    self.ms_saved += entry[1]
+                else:
+                    missing.append(key)
+
+            if missing and self._db is not None:
+                unique = list(dict.fromkeys(missing))
+                try:
+                    rows = self._db.execute(
+                        f"SELECT key, caption, cost_ms FROM captions "
+                        f"WHERE key IN ({','.join('?' * len(unique))})",
+                        unique).fetchall()
+                    if rows:
+                        with self._db:
+                            self._db.executemany(
+                                "UPDATE captions SET hits = hits + 1, last_used = ? WHERE key = ?",
+                                [(time.time(), row[0]) for row in rows])
+                except sqlite3.Error as e:
+                    logger.debug(f"Caption cache read failed: {e}")
+                    rows = []
+                disk = {key: (caption, cost) for key, caption, cost in rows}
+                for key in missing:
+                    if key in disk:
+                        found[key] = disk[key][0]
+                        self.disk_hits += 1
+                        self.ms_saved += disk[key][1]
+                for key, entry in disk.items():
+                    self._remember(key, entry)
+        return found
+
+    def put_many(self, captions: Dict[str, str]):
+        """Store captions in both tiers (empty captions are skipped)."""
+        captions = {k: c for k, c in captions.items() if c}
+        if not captions:
+            return
+        now = time.time()
+        with self._lock:
+            cost = self.ms_per_caption
+            for key, caption in captions.items():
+                self._remember(key, (caption, cost))
+            self.stores += len(captions)
+            if self._db is not None:
+                try:
+                    with self._db:  # one transaction per batch
+                        self._flush_touched()
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO captions (key, caption, cost_ms, created, last_used) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            [(key, caption, cost, now, now) for key, caption in captions.items()])
+                        self._prune()
+                except sqlite3.Error as e:
+                    logger.debug(f"Caption cache write failed: {e}")
+
+    def _flush_touched(self):
+        """Write last_used of memory-tier hits, so pruning sees them as recent."""
+        if self._touched:
+            self._db.executemany(
+                "UPDATE captions SET hits = hits + 1, last_used = ? WHERE key = ?",
+                [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def _prune(self):
+        """Delete the least recently used rows once the table exceeds max_rows."""
+        if not self.max_rows:
+            return
+        rows = self._db.execute("SELECT COUNT(*) FROM captions").fetchone()[0]
+        if rows <= self.max_rows:
+            return
+        # Down to 90% of the cap, so the next prune is a while away
+        excess = rows - self.max_rows * 9 // 10
+        self._db.execute(
+            "DELETE FROM captions WHERE key IN "
+            "(SELECT key FROM captions ORDER BY last_used LIMIT ?)", (excess,))
+        self.evicted += excess
+        logger.debug(f"Caption cache pruned {excess} least recently used rows")
+
+    def record_cost(self, count: int, elapsed_ms: float):
+        """
+        Feed real captioning time into the savings estimate.
+
+        Call before put_many(): stored entries remember what they cost, so
+        hits after a restart still count the time they save.
+        """
+        if count <= 0:
+            return
+        per_caption = elapsed_ms / count
+        with self._lock:
+            if self.ms_per_caption == 0.0:
+                self.ms_per_caption = per_caption
+            else:
+                self.ms_per_caption = 0.9 * self.ms_per_caption + 0.1 * per_caption
+
+    def _remember(self, key: str, entry: Tuple[str, float]):
+        if self.memory_entries == 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def disk_entries(self) -> int:
+        if self._db is None:
+            return 0
+        with self._lock:
+            try:
+                return self._db.execute("SELECT COUNT(*) FROM captions").fetchone()[0]
+            except sqlite3.Error:
+                return 0
+
+    def clear(self):
+        """Drop all cached captions (both tiers)."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._db is not None:
+                try:
+                    with self._db:
+                        self._db.execute("DELETE FROM captions")
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not clear caption cache: {e}")
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                try:
+                    with self._db:
+                        self._flush_touched()
+                except sqlite3.Error as e:
+                    logger.debug(f"Caption cache write failed: {e}")
+                self._db.close()
+                self._db = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        hits = self.memory_hits + self.disk_hits
+        return {
+            'path': self.path if self._db is not None else None,
+            'lookups': self.lookups,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'hit_rate': hits / max(self.lookups, 1),
+            'stores': self.stores,
+            'evicted': self.evicted,
+            'memory_entries': len(self._memory),
+            'disk_entries': self.disk_entries(),
+            'avg_caption_ms': self.ms_per_caption,
+            'ms_saved': self.ms_saved
+        }
+
+
+# Singleton instances (one per namespace)
+_caches: Dict[str, CaptionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def crop_hash(crop: Image.Image) -> str:
+    """Perceptual hash of an element crop (hex); equal hashes share a caption."""
+    return to_hex(dhash(crop, CROP_HASH_SIZE), 2 * CROP_HASH_SIZE ** 2)
+
+
+def get_caption_cache(namespace: str = "") -> CaptionCache:
+    """Get or create the shared caption cache for a namespace."""
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = CaptionCache(namespace=namespace)
+        return cache
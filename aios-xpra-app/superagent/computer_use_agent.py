@@ -41,9 +41,14 @@ import hashlib
 import threading
 from typing import Optional, Dict, Any, List, Tuple, Callable
 from dataclasses import dataclass, field
-from PIL import Image, ImageChops
+from PIL import Image
 from collections import deque
 
+from .screen_source import ScreenSource, get_screen_source
+from .change_detection import get_change_detector
+from .perceptual_hash import to_hex
+from .volatile_masks import get_volatile_masks
+
 logger = logging.getLogger(__name__)
 
 
@@ -82,25 +87,38 @@ class ActionRecord:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 class CoordinateEngine:
-    """Handles coordinate normalization/denormalization with precision."""
+    """
+    Handles coordinate normalization/denormalization with precision.
+
+    Normalized coordinates are relative to the image the model saw. For a
+    window-scoped capture, set_viewport() maps them onto that window's
+    rectangle so denormalize() still yields absolute screen pixels.
+    """
 
     def __init__(self, screen_width: int = 1920, screen_height: int = 1080):
         self.width = screen_width
         self.height = screen_height
+        self.offset_x = 0
+        self.offset_y = 0
+
+    def set_viewport(self, offset: Tuple[int, int], size: Tuple[int, int]):
+        """Map normalized coords onto the screen area of the last screenshot."""
+        self.offset_x, self.offset_y = offset
+        self.width, self.height = size
 
     def denormalize(self, x: int, y: int) -> Tuple[int, int]:
         """Convert normalized (0-1000) coords to actual pixels."""
         px = int(x / 1000 * self.width)
         py = int(y / 1000 * self.height)
-        # Clamp to screen bounds
+        # Clamp to viewport bounds
         px = max(0, min(px, self.width - 1))
         py = max(0, min(py, self.height - 1))
-        return px, py
+        return px + self.offset_x, py + self.offset_y
 
     def normalize(self, px: int, py: int) -> Tuple[int, int]:
         """Convert actual pixels to normalized (0-1000) coords."""
-        x = int(px / self.width * 1000)
-        y = int(py / self.height * 1000)
+        x = int((px - self.offset_x) / self.width * 1000)
+        y = int((py - self.offset_y) / self.height * 1000)
         return max(0, min(x, 999)), max(0, min(y, 999))
 
 
@@ -119,34 +137,22 @@ class VisionVerifier:
         self._last_hash: Optional[str] = None
         self._stuck_count = 0
         self._max_stuck = 3  # Trigger self-heal after 3 identical screens
+        self.detector = get_change_detector()
+        self.masks = get_volatile_masks()
 
     def compute_hash(self, image: Image.Image) -> str:
-        """Fast perceptual hash of an image."""
-        small = image.resize((16, 16), Image.LANCZOS).convert("L")
-        pixels = list(small.getdata())
-        avg = sum(pixels) / len(pixels)
-        bits = "".join("1" if p > avg else "0" for p in pixels)
-        return hashlib.md5(bits.encode()).hexdigest()
+        """Fast perceptual hash of an image (volatile regions masked)."""
+        return to_hex(self.masks.fingerprint(image).hash)
 
     def screen_changed(self, before: Image.Image, after: Image.Image) -> bool:
         """Check if the screen meaningfully changed between two screenshots."""
         try:
-            # Quick hash comparison first
-            h_before = self.compute_hash(before)
-            h_after = self.compute_hash(after)
-            if h_before == h_after:
-                self._stuck_count += 1
-                return False
-
-            # Detailed pixel diff for more accuracy
-            b = before.resize((256, 256), Image.LANCZOS).convert("RGB")
-            a = after.resize((256, 256), Image.LANCZOS).convert("RGB")
-            diff = ImageChops.difference(b, a)
-            pixels = list(diff.getdata())
-            changed = sum(1 for r, g, b in pixels if r + g + b > 30)
-            ratio = changed / len(pixels)
-
-            if ratio < self.threshold:
+            # Always the tile diff: fingerprints within the cache radius can
+            # still differ by typed text or a small icon (volatile regions
+            # never count)
+            report = self.detector.compare(before, after, ignore=self.masks.image_rects(after))
+            if report.magnitude < self.threshold:
+                self.masks.observe(report)
                 self._stuck_count += 1
                 return False
 
@@ -237,6 +243,10 @@ class AdaptiveTimer:
     """
     Learns optimal wait times based on historical action latencies.
     Competitors use fixed delays; we adapt to the actual network/page speed.
+
+    Waits are ceilings: after an action the agent waits for the screen to
+    stop changing for quiet_ms, and only falls back to the full wait when it
+    keeps changing.
     """
 
     def __init__(self):
@@ -256,6 +266,13 @@ class AdaptiveTimer:
             "hover_at": 0.2,
             "drag_and_drop": 0.5,
         }
+        # How long the screen must stay unchanged to count as settled
+        self.quiet_ms = {
+            "navigate": 600,
+            "search": 500,
+            "go_back": 500,
+            "go_forward": 500,
+        }
 
     def get_wait(self, action: str) -> float:
         """Get the optimal wait time for an action based on history."""
@@ -270,6 +287,10 @@ class AdaptiveTimer:
 
         return base
 
+    def get_quiet_ms(self, action: str) -> float:
+        """Quiet window that ends the wait after an action."""
+        return self.quiet_ms.get(action, 250)
+
     def record(self, action: str, duration: float):
         """Record how long an action took."""
         if action not in self.action_times:
@@ -313,9 +334,14 @@ class ComputerUseAgent:
         vertex_project: Optional[str] = None,
         vertex_location: str = "us-central1",
         progress_callback: Optional[Callable] = None,
+        screen_source: Optional[ScreenSource] = None,
     ):
         self.api_key = api_key
         self.executor = executor
+        # Capture through the executor's ScreenSource when there is one
+        if screen_source is None:
+            screen_source = getattr(executor, "screen", None) or get_screen_source()
+        self.screen = screen_source
         self.max_iterations = max_iterations
         self._cancelled = False
         self._lock = threading.Lock()
@@ -397,10 +423,17 @@ class ComputerUseAgent:
         return base64.b64encode(buf.getvalue()).decode("utf-8")
 
     def _get_screenshot(self) -> Optional[Image.Image]:
-        """Capture current screen."""
+        """Capture current screen (or the target window, in window capture scope)."""
         try:
-            if self.executor and hasattr(self.executor, "capture_screen"):
-                return self.executor.capture_screen()
+            if self.executor and hasattr(self.executor, "capture_frame"):
+                # Executor focuses the hinted window before capturing
+                frame = self.executor.capture_frame()
+            else:
+                frame = self.screen.capture_frame()
+            if frame is None:
+                return None
+            self.coords.set_viewport(frame.offset, frame.size)
+            return frame.image
         except Exception as e:
             logger.error(f"Screenshot failed: {e}")
         return None
@@ -432,6 +465,14 @@ class ComputerUseAgent:
             logger.error(f"Action execution error [{fname}]: {e}")
             return {"error": str(e)}
 
+    def _settle(self, action: str):
+        """Wait for the screen to settle after an action (the timer's wait is the ceiling)."""
+        waiter = self.executor if hasattr(self.executor, "wait_until_stable") else self.screen
+        waiter.wait_until_stable(
+            quiet_ms=self.timer.get_quiet_ms(action),
+            max_wait=self.timer.get_wait(action)
+        )
+
     def _dispatch_action(self, fname: str, args: Dict) -> Dict:
         """Route function call to the correct handler."""
 
@@ -444,12 +485,12 @@ class ComputerUseAgent:
 
         elif fname == "go_back":
             self.executor.hotkey("alt", "Left")
-            time.sleep(self.timer.get_wait("go_back"))
+            self._settle("go_back")
             return {"result": "Navigated back"}
 
         elif fname == "go_forward":
             self.executor.hotkey("alt", "Right")
-            time.sleep(self.timer.get_wait("go_forward"))
+            self._settle("go_forward")
             return {"result": "Navigated forward"}
 
         elif fname == "search":
@@ -459,7 +500,7 @@ class ComputerUseAgent:
             if query:
                 self.executor.type_text(query)
                 self.executor.hotkey("return")
-                time.sleep(self.timer.get_wait("search"))
+                self._settle("search")
             return {"result": f"Searched: {query}"}
 
         elif fname == "navigate":
@@ -470,15 +511,14 @@ class ComputerUseAgent:
             time.sleep(0.3)
             self.executor.type_text(url)
             self.executor.hotkey("return")
-            time.sleep(self.timer.get_wait("navigate"))
+            self._settle("navigate")
             return {"result": f"Navigated to {url}"}
 
         elif fname == "click_at":
             raw_x, raw_y = int(args.get("x", 500)), int(args.get("y", 500))
             px, py = self.coords.denormalize(raw_x, raw_y)
             logger.info(f"  🖱️ click: ({raw_x},{raw_y}) → ({px},{py})px")
-            self.executor.click(px, py, f"CU click")
-            time.sleep(self.timer.get_wait("click_at"))
+            self.executor.click(px, py, f"CU click")  # settles before returning
             return {"result": f"Clicked ({px},{py})"}
 
         elif fname == "hover_at":
@@ -507,9 +547,9 @@ class ComputerUseAgent:
                 self.executor.type_text(text)
             if press_enter:
                 self.executor.hotkey("return")
-                time.sleep(self.timer.get_wait("navigate"))
+                self._settle("navigate")
             else:
-                time.sleep(self.timer.get_wait("type_text_at"))
+                self._settle("type_text_at")
             return {"result": f"Typed '{text[:40]}' at ({px},{py})"}
 
         elif fname == "key_combination":
@@ -524,13 +564,13 @@ class ComputerUseAgent:
             parts = keys_str.split("+")
             mapped = [key_map.get(p.strip(), p.strip().lower()) for p in parts]
             self.executor.hotkey(*mapped)
-            time.sleep(self.timer.get_wait("key_combination"))
+            self._settle("key_combination")
             return {"result": f"Pressed {keys_str}"}
 
         elif fname == "scroll_document":
             direction = args.get("direction", "down")
             self.executor.scroll(direction, 5)
-            time.sleep(self.timer.get_wait("scroll_document"))
+            self._settle("scroll_document")
             return {"result": f"Scrolled {direction}"}
 
         elif fname == "scroll_at":
@@ -545,7 +585,7 @@ class ComputerUseAgent:
                 pyautogui.scroll(clicks if direction == "up" else -clicks)
             except Exception:
                 self.executor.scroll(direction, 3)
-            time.sleep(self.timer.get_wait("scroll_at"))
+            self._settle("scroll_at")
             return {"result": f"Scrolled {direction} at ({px},{py})"}
 
         elif fname == "drag_and_drop":
@@ -936,6 +976,7 @@ def get_computer_use_agent(
     vertex_project: Optional[str] = None,
     vertex_location: str = "us-central1",
     max_iterations: int = 30,
+    screen_source: Optional[ScreenSource] = None,
 ) -> ComputerUseAgent:
     """Get or create the singleton ComputerUseAgent."""
     global _computer_use_agent
@@ -947,5 +988,6 @@ def get_computer_use_agent(
             use_vertex_ai=use_vertex_ai,
             vertex_project=vertex_project,
             vertex_location=vertex_location,
+            screen_source=screen_source,
         )
     return _computer_use_agent
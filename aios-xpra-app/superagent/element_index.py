@@ -0,0 +1,212 @@
+"""
+Element Index - Lazy lookup structures over a parsed element list
+
+Grounding asks the same ParseResult / ScreenAnalysis for elements by id,
+by text and by position many times per iteration. ElementIndex builds
+each structure on first use and keeps it while the element list stays
+the same:
+
+    index = ElementIndex(elements, box=box_of, text=label_of)
+    index.grouped('id', attrgetter('id')).get(7)    # key -> [elements]
+    index.at(640, 360)                              # boxes containing a point
+    index.overlapping((0, 0, 400, 80))              # boxes touching a region
+    index.contains("save")                          # substring of the text
+    index.similar("Sve as", min_similarity=0.4)     # trigram similarity
+
+Text lookups go through a trigram index of the lowercased texts, so a
+substring query only verifies the elements sharing all its trigrams.
+Positions use a uniform grid of `cell` px; boxes spanning many cells
+(panels, backgrounds) are kept in a short list that is always checked.
+All results are in element order.
+"""
+
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+# Box = (x1, y1, x2, y2)
+Box = Tuple[float, float, float, float]
+
+# Uniform grid cell for point / region queries (px)
+GRID_CELL = 64
+
+# Boxes covering more grid cells than this are checked linearly
+MAX_CELLS_PER_BOX = 64
+
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a (normalized) text."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ElementIndex:
+    """
+    Id/key, spatial and text indexes over a list of elements.
+
+    The index holds a reference to the list; owners rebuild it when the
+    list is replaced or changes length (see `matches`).
+    """
+
+    def __init__(self, elements: Sequence[Any], box: Callable[[Any], Box],
+                 text: Callable[[Any], str], cell: int = GRID_CELL):
+        """
+        Args:
+            elements: Elements in their canonical order
+            box: (x1, y1, x2, y2) of an element
+            text: Searchable text of an element (normalized to lowercase)
+            cell: Spatial grid cell size in pixels
+        """
+        self.elements = elements
+        self.signature = (id(elements), len(elements))
+        self._box = box
+        self._text = text
+        self.cell = cell
+
+        self._groups: Dict[str, Dict[Any, List[Any]]] = {}
+        self._positions: Optional[Dict[int, int]] = None
+        self._boxes: Optional[List[Box]] = None
+        self._grid: Optional[Dict[Tuple[int, int], List[int]]] = None
+        self._large: List[int] = []
+        self._texts: Optional[List[str]] = None
+        self._exact: Dict[str, List[int]] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self._short: List[int] = []  # texts under 3 characters (no trigrams)
+        self._trigram_counts: List[int] = []
+
+    def matches(self, elements: Sequence[Any]) -> bool:
+        """True if this index was built over `elements` as it is now."""
+        return self.signature == (id(elements), len(elements))
+
+    # ---- keys ----
+
+    def grouped(self, name: str, key: Callable[[Any], Any]) -> Dict[Any, List[Any]]:
+        """Elements grouped by key (built once per name)."""
+        groups = self._groups.get(name)
+        if groups is None:
+            groups = {}
+            for element in self.elements:
+                groups.setdefault(key(element), []).append(element)
+            self._groups[name] = groups
+        return groups
+
+    def earliest(self, elements: Sequence[Any]) -> Optional[Any]:
+        """The element that comes first in the indexed list (None if empty)."""
+        if len(elements) < 2:
+            return elements[0] if elements else None
+        if self._positions is None:
+            self._positions = {id(e): i for i, e in enumerate(self.elements)}
+        return min(elements, key=lambda e: self._positions[id(e)])
+
+    # ---- space ----
+
+    def _build_grid(self):
+        self._boxes = [self._box(e) for e in self.elements]
+        self._grid = {}
+        self._large = []
+        cell = self.cell
+        for i, (x1, y1, x2, y2) in enumerate(self._boxes):
+            c1, c2 = int(x1 // cell), int(x2 // cell)
+            r1, r2 = int(y1 // cell), int(y2 // cell)
+            if (c2 - c1 + 1) * (r2 - r1 + 1) > MAX_CELLS_PER_BOX:
+                self._large.append(i)
+                continue
+            for r in range(r1, r2 + 1):
+                for c in range(c1, c2 + 1):
+                    self._grid.setdefault((r, c), []).append(i)
+
+    def _candidates(self, x1: float, y1: float, x2: float, y2: float) -> Set[int]:
+        if self._grid is None:
+            self._build_grid()
+        cell = self.cell
+        found = set(self._large)
+        for r in range(int(y1 // cell), int(y2 // cell) + 1):
+            for c in range(int(x1 // cell), int(x2 // cell) + 1):
+                found.update(self._grid.get((r, c), ()))
+        return found
+
+    def at(self, x: float, y: float) -> List[Any]:
+        """Elements whose box contains the point."""
+        candidates = self._candidates(x, y, x, y)
+        boxes = self._boxes
+        hits = [i for i in candidates
+                if boxes[i][0] <= x <= boxes[i][2] and boxes[i][1] <= y <= boxes[i][3]]
+        return [self.elements[i] for i in sorted(hits)]
+
+    def overlapping(self, region: Box) -> List[Any]:
+        """Elements whose box intersects the region."""
+        x1, y1, x2, y2 = region
+        candidates = self._candidates(x1, y1, x2, y2)
+        boxes = self._boxes
+        hits = [i for i in candidates
+                if boxes[i][0] < x2 and boxes[i][2] > x1 and boxes[i][1] < y2 and boxes[i][3] > y1]
+        return [self.elements[i] for i in sorted(hits)]
+
+    # ---- text ----
+
+    @property
+    def has_text(self) -> bool:
+        """True once the text index is built (texts are read at that point)."""
+        return self._texts is not None
+
+    def _build_text(self):
+        self._texts = [(self._text(e) or "").lower() for e in self.elements]
+        for i, text in enumerate(self._texts):
+            self._exact.setdefault(text, []).append(i)
+            grams = trigrams(text)
+            self._trigram_counts.append(len(grams))
+            if not grams:
+                self._short.append(i)
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(i)
+
+    def _normalized(self, query: str) -> str:
+        if self._texts is None:
+            self._build_text()
+        return query.lower()
+
+    def equals(self, query: str) -> List[Any]:
+        """Elements whose normalized text equals the query."""
+        query = self._normalized(query)
+        return [self.elements[i] for i in self._exact.get(query, ())]
+
+    def contains(self, query: str) -> List[Any]:
+        """Elements whose normalized text contains the query."""
+        query = self._normalized(query)
+        grams = trigrams(query)
+        if not grams:
+            candidates = range(len(self._texts))
+        else:
+            postings = sorted((self._postings.get(g, []) for g in grams), key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+            candidates = sorted(candidates)
+        return [self.elements[i] for i in candidates if query in self._texts[i]]
+
+    def within(self, query: str) -> List[Any]:
+        """Non-empty elements whose normalized text is contained in the query."""
+        query = self._normalized(query)
+        grams = trigrams(query)
+        hits = Counter(i for gram in grams for i in self._postings.get(gram, ()))
+        candidates = [i for i, n in hits.items() if n == self._trigram_counts[i]]
+        candidates.extend(i for i in self._short if self._texts[i])
+        return [self.elements[i] for i in sorted(candidates) if self._texts[i] in query]
+
+    def similar(self, query: str, min_similarity: float = 0.5, limit: int = 10) -> List[Tuple[Any, float]]:
+        """
+        Elements ranked by trigram similarity (Dice) to the query.
+
+        Tolerates OCR errors and partial labels ("Sve as" finds "Save As").
+
+        Returns:
+            (element, similarity) pairs, best first
+        """
+        query = self._normalized(query)
+        grams = trigrams(query)
+        if not grams:
+            return [(e, 1.0) for e in self.equals(query)][:limit]
+        shared = Counter(i for gram in grams for i in self._postings.get(gram, ()))
+        scored = [(2.0 * n / (len(grams) + self._trigram_counts[i]), i) for i, n in shared.items()]
+        scored = sorted((s for s in scored if s[0] >= min_similarity), key=lambda s: (-s[0], s[1]))
+        return [(self.elements[i], score) for score, i in scored[:limit]]
@@ -0,0 +1,314 @@
+"""
+Element Table - Columnar store for perceived UI elements
+
+A screen's elements live in one table of numpy columns (boxes,
+confidence, type codes, interactable flags, ids, track ids) plus a text
+column, instead of one object per element per consumer. Layout, region
+and filtering code works on the columns; code that wants objects gets
+row views, which hold only (table, row):
+
+    table = ElementTable.from_parse_result(result)      # one pass over ParseResult.elements
+    clickable = table.take(np.flatnonzero(table.interactable))
+    for row in table.take(table.prioritized(30)):
+        print(row.to_prompt_line())
+
+Boxes are stored as float32 x1, y1, x2, y2; rows expose the integer
+(x, y, width, height) boxes the agents click on. Type names are interned
+into small integer codes shared by all tables (type_code / TYPE_NAMES).
+"""
+
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Interned element type names (code -> name) and their codes
+TYPE_NAMES: List[str] = []
+_TYPE_CODES: Dict[str, int] = {}
+
+
+def type_code(name: str) -> int:
+    """Code of an element type name (interned on first use)."""
+    code = _TYPE_CODES.get(name)
+    if code is None:
+        code = _TYPE_CODES[name] = len(TYPE_NAMES)
+        TYPE_NAMES.append(name)
+    return code
+
+
+def _omniparser_type(element) -> str:
+    element_type = element.element_type
+    return element_type.name.lower() if hasattr(element_type, 'name') else 'element'
+
+
+class ElementRow:
+    """
+    View of one table row with the attribute interface of the former
+    per-consumer element objects (bbox, center, text, attributes, ...).
+    """
+    __slots__ = ('table', 'row')
+
+    def __init__(self, table: 'ElementTable', row: int):
+        self.table = table
+        self.row = row
+
+    @property
+    def id(self) -> int:
+        return int(self.table.ids[self.row])
+
+    @property
+    def element_type(self) -> str:
+        return TYPE_NAMES[self.table.type_codes[self.row]]
+
+    @element_type.setter
+    def element_type(self, name: str):
+        self.table.type_codes[self.row] = type_code(name)
+
+    @property
+    def text(self) -> Optional[str]:
+        return self.table.text[self.row] or None
+
+    @property
+    def confidence(self) -> float:
+        return float(self.table.confidence[self.row])
+
+    @property
+    def is_interactable(self) -> bool:
+        return bool(self.table.interactable[self.row])
+
+    @property
+    def track_id(self) -> Optional[int]:
+        track_id = int(self.table.track_ids[self.row])
+        return track_id if track_id >= 0 else None
+
+    @property
+    def bbox(self) -> Tuple[int, int, int, int]:
+        """(x, y, width, height) in screen pixels"""
+        x, y, w, h = self.table.xywh[self.row].tolist()
+        return (x, y, w, h)
+
+    @property
+    def x(self) -> int:
+        return int(self.table.xywh[self.row, 0])
+
+    @property
+    def y(self) -> int:
+        return int(self.table.xywh[self.row, 1])
+
+    @property
+    def width(self) -> int:
+        return int(self.table.xywh[self.row, 2])
+
+    @property
+    def height(self) -> int:
+        return int(self.table.xywh[self.row, 3])
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        """Center point for clicking"""
+        x, y = self.table.centers[self.row].tolist()
+        return (x, y)
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        attributes = {}
+        if self.id:  # detected by OmniParser
+            attributes = {
+                'is_interactable': self.is_interactable,
+                'omniparser_id': self.id,
+                'track_id': self.track_id,
+                'center': self.center
+            }
+        attributes.update(self.table.extra.get(self.row, {}))
+        return attributes
+
+    def to_dict(self) -> Dict:
+        return {
+            'type': self.element_type,
+            'bbox': self.bbox,
+            'center': self.center,
+            'text': self.text,
+            'confidence': self.confidence,
+            'attributes': self.attributes
+        }
+
+    def to_prompt_line(self) -> str:
+        """Format element for LLM prompt (compact)."""
+        text_preview = self.text[:30] if self.text else ""
+        cx, cy = self.center
+        return f"[{self.id}] {self.element_type}: \"{text_preview}\" at ({cx},{cy})"
+
+    def __repr__(self) -> str:
+        return f"ElementRow(id={self.id}, type={self.element_type!r}, bbox={self.bbox}, text={self.text!r})"
+
+
+class ElementTable:
+    """
+    Struct-of-arrays element store.
+
+    Columns (N rows): boxes (N, 4) float32 xyxy, confidence float32,
+    type_codes int16, interactable bool, ids int32 (0 = not from
+    OmniParser), track_ids int64 (-1 = untracked) and text (list of str,
+    "" = none). `extra` holds
+    the rare per-row attributes (OCR confidence, source) by row.
+    """
+
+    def __init__(self, boxes: np.ndarray, confidence: np.ndarray, type_codes: np.ndarray,
+                 interactable: np.ndarray, text: List[str],
+                 ids: Optional[np.ndarray] = None, track_ids: Optional[np.ndarray] = None,
+                 extra: Optional[Dict[int, Dict[str, Any]]] = None):
+        count = len(text)
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(count, 4)
+        self.confidence = np.asarray(confidence, dtype=np.float32).reshape(count)
+        self.type_codes = np.asarray(type_codes, dtype=np.int16).reshape(count)
+        self.interactable = np.asarray(interactable, dtype=bool).reshape(count)
+        self.text = text
+        self.ids = (np.arange(1, count + 1, dtype=np.int32) if ids is None
+                    else np.asarray(ids, dtype=np.int32).reshape(count))
+        self.track_ids = (np.full(count, -1, dtype=np.int64) if track_ids is None
+                          else np.asarray(track_ids, dtype=np.int64).reshape(count))
+        self.extra = extra or {}
+        self._xywh: Optional[np.ndarray] = None
+        self._rows: Optional[List[ElementRow]] = None
+
+    # ---- construction ----
+
+    @classmethod
+    def empty(cls) -> 'ElementTable':
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), np.zeros(0), [])
+
+    @classmethod
+    def from_parse_result(cls, result, label: Optional[Callable[[Any], str]] = None) -> 'ElementTable':
+        """
+        Columns of an OmniParser ParseResult, in one pass over its elements.
+
+        Args:
+            result: ParseResult (boxes already in screen coordinates)
+            label: Text of an element (default: text, else OCR text)
+        """
+        label = label or (lambda e: e.text or e.ocr_text or "")
+        elements = result.elements
+        if not elements:
+            return cls.empty()
+        columns = [((e.bbox.x1, e.bbox.y1, e.bbox.x2, e.bbox.y2), e.confidence,
+                    type_code(_omniparser_type(e)), e.is_interactable, e.id,
+                    -1 if e.track_id is None else e.track_id, label(e))
+                   for e in elements]
+        boxes, confidence, codes, interactable, ids, track_ids, text = zip(*columns)
+        return cls(np.array(boxes), np.array(confidence), np.array(codes), np.array(interactable),
+                   list(text), ids=np.array(ids), track_ids=np.array(track_ids))
+
+    @classmethod
+    def from_xywh(cls, boxes: Sequence[Tuple[int, int, int, int]], element_type: str,
+                  text: List[str], confidence: Union[float, Sequence[float]],
+                  extra: Optional[Dict[int, Dict[str, Any]]] = None) -> 'ElementTable':
+        """
+        Non-interactable rows of one type from (x, y, width, height) boxes
+        (OCR words, regions). Their id is 0: not an OmniParser element.
+        """
+        xywh = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        count = len(xywh)
+        xyxy = np.concatenate([xywh[:, :2], xywh[:, :2] + xywh[:, 2:]], axis=1)
+        return cls(xyxy, np.array(np.broadcast_to(np.asarray(confidence, dtype=np.float32), (count,))),
+                   np.full(count, type_code(element_type)), np.zeros(count, dtype=bool),
+                   list(text), ids=np.zeros(count), extra=extra)
+
+    @classmethod
+    def concat(cls, tables: Iterable['ElementTable']) -> 'ElementTable':
+        """Rows of all tables, in order (ids are kept)."""
+        tables = [t for t in tables if len(t)]
+        if not tables:
+            return cls.empty()
+        if len(tables) == 1:
+            return tables[0].take(np.arange(len(tables[0])))  # never share columns with a cache
+        extra, start = {}, 0
+        for table in tables:
+            extra.update({row + start: value for row, value in table.extra.items()})
+            start += len(table)
+        return cls(np.concatenate([t.boxes for t in tables]),
+                   np.concatenate([t.confidence for t in tables]),
+                   np.concatenate([t.type_codes for t in tables]),
+                   np.concatenate([t.interactable for t in tables]),
+                   [s for t in tables for s in t.text],
+                   ids=np.concatenate([t.ids for t in tables]),
+                   track_ids=np.concatenate([t.track_ids for t in tables]),
+                   extra=extra)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[ElementRow]) -> 'ElementTable':
+        """Copies of row views (possibly of different tables), in order."""
+        return cls.concat(row.table.take([row.row]) for row in rows)
+
+    def take(self, rows: Union[np.ndarray, Sequence[int]]) -> 'ElementTable':
+        """New table with the given rows, in the given order."""
+        rows = np.asarray(rows, dtype=np.int64).reshape(-1)
+        positions = {int(old): new for new, old in enumerate(rows.tolist())}
+        extra = {positions[row]: value for row, value in self.extra.items() if row in positions}
+        return ElementTable(self.boxes[rows], self.confidence[rows], self.type_codes[rows],
+                            self.interactable[rows], [self.text[i] for i in rows.tolist()],
+                            ids=self.ids[rows], track_ids=self.track_ids[rows], extra=extra)
+
+    def shifted(self, dx: float, dy: float) -> 'ElementTable':
+        """Copy with every box moved by (dx, dy)."""
+        table = self.take(np.arange(len(self)))
+        table.boxes += np.array([dx, dy, dx, dy], dtype=np.float32)
+        return table
+
+    # ---- derived columns ----
+
+    @property
+    def xywh(self) -> np.ndarray:
+        """(N, 4) int32 (x, y, width, height) boxes"""
+        if self._xywh is None:
+            xywh = self.boxes.copy()
+            xywh[:, 2:] -= xywh[:, :2]
+            self._xywh = xywh.astype(np.int32)
+        return self._xywh
+
+    @property
+    def centers(self) -> np.ndarray:
+        """(N, 2) int32 click points"""
+        return ((self.boxes[:, :2] + self.boxes[:, 2:]) / 2).astype(np.int32)
+
+    def of_type(self, *names: str) -> np.ndarray:
+        """Bool mask of rows with one of the type names."""
+        codes = [_TYPE_CODES[name] for name in names if name in _TYPE_CODES]
+        return np.isin(self.type_codes, codes)
+
+    def prioritized(self, limit: Optional[int] = None) -> np.ndarray:
+        """Row order for prompts: interactable first, then by confidence."""
+        order = np.lexsort((-self.confidence, ~self.interactable))
+        return order[:limit] if limit is not None else order
+
+    def row_bands(self, threshold: float = 50) -> int:
+        """
+        Number of horizontal bands: rows sorted by top edge, a new band
+        starting at the first top at least `threshold` below the band's first.
+        """
+        tops = np.sort(self.xywh[:, 1])
+        bands, start = 0, 0
+        while start < len(tops):
+            bands += 1
+            start = int(np.searchsorted(tops, tops[start] + threshold, side='left'))
+        return bands
+
+    def find_id(self, element_id: int) -> Optional[ElementRow]:
+        """Row with the given id (None if absent)."""
+        rows = np.flatnonzero(self.ids == element_id)
+        return self[int(rows[0])] if len(rows) else None
+
+    # ---- sequence of rows ----
+
+    def rows(self) -> List[ElementRow]:
+        """Row views (created once per table)."""
+        if self._rows is None:
+            self._rows = [ElementRow(self, i) for i in range(len(self))]
+        return self._rows
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __iter__(self) -> Iterator[ElementRow]:
+        return iter(self.rows())
+
+    def __getitem__(self, index: int) -> ElementRow:
+        return self.rows()[index]
@@ -0,0 +1,293 @@
+"""
+Element Tracker - Stable identities for UI elements across frames
+
+OmniParser numbers elements 1..N on every parse, so nothing connects "the
+Compose button" in one frame with the same button in the next. The tracker
+matches each new ParseResult against the previous one by box overlap (IoU)
+and label similarity and gives every element a persistent track_id:
+
+    tracker = ElementTracker()
+    update = tracker.update(result)
+    for element in result.elements:
+        element.track_id                  # same value while the element stays
+    update.added, update.removed           # element diff since the last frame
+
+Matched elements whose pixels are unchanged (same crop_hash) inherit
+captions, OCR text and classifications the new parse did not produce, so
+per-element work done once (e.g. captioning an icon) survives later frames.
+A repainted element - a cleared input, a swapped icon - inherits nothing.
+Tracking never triggers a lazy caption, and an inherited caption makes the
+element's own lazy caption unnecessary.
+"""
+
+import time
+import logging
+import threading
+from difflib import SequenceMatcher
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Element types that carry no information beyond the detector class
+_GENERIC_TYPES = {'INTERACTABLE', 'NON_INTERACTABLE', 'UNKNOWN'}
+
+
+@dataclass
+class Track:
+    """One element followed across frames."""
+    track_id: int
+    element: Any                # latest UIElement for this track
+    first_seen: float
+    last_seen: float
+    hits: int = 1
+    missed: int = 0             # consecutive frames without a match
+
+
+@dataclass
+class TrackUpdate:
+    """How one ParseResult relates to the previous one."""
+    matched: List[Tuple[Any, Any]] = field(default_factory=list)  # (previous, current) elements
+    added: List[Any] = field(default_factory=list)
+    removed: List[Any] = field(default_factory=list)
+    carried: int = 0            # attributes inherited from previous frames
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed)
+
+    def to_prompt_diff(self, max_elements: int = 20) -> str:
+        """Compact element diff for an LLM prompt."""
+        lines = []
+        for element in self.added[:max_elements]:
+            lines.append(f"+ {element.to_prompt_string()}")
+        for element in self.removed[:max_elements]:
+            lines.append(f"- {element.to_prompt_string()}")
+        if not lines:
+            return "No element changes"
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'matched': len(self.matched),
+            'added': [e.track_id for e in self.added],
+            'removed': [e.track_id for e in self.removed],
+            'carried': self.carried
+        }
+
+
+def _description(element) -> str:
+    # Lazily captioned elements must not be captioned just to be tracked
+    if hasattr(element, 'cached_description'):
+        return element.cached_description
+    return element.description
+
+
+def _label(element) -> str:
+    return (_description(element) or element.text or element.ocr_text or "").strip().lower()
+
+
+def _boxes(elements) -> np.ndarray:
+    return np.array([[e.bbox.x1, e.bbox.y1, e.bbox.x2, e.bbox.y2] for e in elements],
+                    dtype=np.float32).reshape(-1, 4)
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy boxes."""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-6), 0.0)
+
+
+class ElementTracker:
+    """
+    Greedy IoU + text matcher that assigns persistent track IDs.
+
+    Features:
+    - Vectorized IoU between consecutive element sets
+    - Label similarity to follow elements that moved (e.g. after scrolling)
+    - Carry-over of captions, OCR text and element types of unchanged elements
+    - Short grace period so a missed detection keeps its track
+    """
+
+    def __init__(self,
+                 iou_threshold: float = 0.5,
+                 text_threshold: float = 0.85,
+                 max_missed: int = 2):
+        """
+        Initialize tracker.
+
+        Args:
+            iou_threshold: Overlap that matches elements regardless of label
+            text_threshold: Label similarity that matches elements of similar
+                size that moved or overlap less
+            max_missed: Frames a track survives without a match
+        """
+        self.iou_threshold = iou_threshold
+        self.text_threshold = text_threshold
+        self.max_missed = max_missed
+
+        self._tracks: List[Track] = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.last_update: Optional[TrackUpdate] = None
+
+        # Statistics
+        self.updates = 0
+        self.total_matched = 0
+        self.total_added = 0
+        self.total_carried = 0
+
+    def _candidates(self, previous: List[Any], current: List[Any]) -> List[Tuple[float, int, int]]:
+        """(score, previous index, current index) for every plausible pair."""
+        ious = iou_matrix(_boxes(previous), _boxes(current))
+        prev_labels = [_label(e) for e in previous]
+        cur_labels = [_label(e) for e in current]
+        candidates = []
+
+        for i, j in zip(*np.nonzero(ious > 0.1)):
+            iou = float(ious[i, j])
+            similarity = 0.0
+            if prev_labels[i] and cur_labels[j]:
+                similarity = SequenceMatcher(None, prev_labels[i], cur_labels[j]).ratio()
+            if iou >= self.iou_threshold or similarity >= self.text_threshold:
+                candidates.append((iou + similarity, int(i), int(j)))
+
+        # Same label, same size, anywhere on screen: the element moved
+        by_label: Dict[str, List[int]] = {}
+        for i, label in enumerate(prev_labels):
+            if label:
+                by_label.setdefault(label, []).append(i)
+        for j, label in enumerate(cur_labels):
+            for i in by_label.get(label, ()):
+                if ious[i, j] > 0.1:
+                    continue  # already scored above
+                p, c = previous[i].bbox, current[j].bbox
+                if (abs(p.width - c.width) <= 0.2 * max(p.width, 1) and
+                        abs(p.height - c.height) <= 0.2 * max(p.height, 1)):
+                    candidates.append((1.0, i, j))
+
+        candidates.sort(key=lambda c: -c[0])
+        return candidates
+
+    @staticmethod
+    def _carry_over(previous, current) -> int:
+        """
+        Copy attributes the new detection lacks; returns how many were copied.
+
+        Only between identical crops: an element matched by position or label
+        may still have been repainted, and its old text would be stale.
+        """
+        fingerprint = getattr(current, 'crop_hash', None)
+        if fingerprint is None or fingerprint != getattr(previous, 'crop_hash', None):
+            return 0
+        carried = 0
+        if not _description(current) and _description(previous):
+            current.description = _description(previous)  # also cancels a pending lazy caption
+            carried += 1
+        for attr in ('text', 'ocr_text'):
+            if not getattr(current, attr) and getattr(previous, attr):
+                setattr(current, attr, getattr(previous, attr))
+                carried += 1
+        if (current.element_type.name in _GENERIC_TYPES and
+                previous.element_type.name not in _GENERIC_TYPES):
+            current.element_type = previous.element_type
+            carried += 1
+        return carried
+
+    def update(self, result) -> TrackUpdate:
+        """
+        Assign track IDs to the elements of a new ParseResult.
+
+        Args:
+            result: ParseResult of the current frame (elements are updated in place)
+
+        Returns:
+            TrackUpdate with matched / added / removed elements
+        """
+        now = time.time()
+        current = list(result.elements)
+        update = TrackUpdate()
+
+        with self._lock:
+            tracks = self._tracks
+            previous = [t.element for t in tracks]
+            used_tracks, used_elements = set(), set()
+
+            if previous and current:
+                for _, i, j in self._candidates(previous, current):
+                    if i in used_tracks or j in used_elements:
+                        continue
+                    used_tracks.add(i)
+                    used_elements.add(j)
+                    track, element = tracks[i], current[j]
+                    if element is not track.element:
+                        update.carried += self._carry_over(track.element, element)
+                    element.track_id = track.track_id
+                    update.matched.append((track.element, element))
+                    track.element = element
+                    track.last_seen = now
+                    track.hits += 1
+                    track.missed = 0
+
+            for j, element in enumerate(current):
+                if j in used_elements:
+                    continue
+                element.track_id = self._next_id
+                tracks.append(Track(track_id=self._next_id, element=element,
+                                    first_seen=now, last_seen=now))
+                self._next_id += 1
+                update.added.append(element)
+
+            survivors = []
+            for i, track in enumerate(tracks[:len(previous)]):
+                if i in used_tracks:
+                    survivors.append(track)
+                    continue
+                track.missed += 1
+                if track.missed == 1:
+                    update.removed.append(track.element)
+                if track.missed <= self.max_missed:
+                    survivors.append(track)
+            self._tracks = survivors + tracks[len(previous):]
+
+            self.last_update = update
+            self.updates += 1
+            self.total_matched += len(update.matched)
+            self.total_added += len(update.added)
+            self.total_carried += update.carried
+
+        return update
+
+    def get_track(self, track_id: int) -> Optional[Track]:
+        """Track by ID (None once it expired)."""
+        with self._lock:
+            for track in self._tracks:
+                if track.track_id == track_id:
+                    return track
+        return None
+
+    def reset(self):
+        """Forget all tracks (e.g. after switching apps)."""
+        with self._lock:
+            self._tracks = []
+            self.last_update = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get tracker statistics."""
+        return {
+            'active_tracks': len(self._tracks),
+            'updates': self.updates,
+            'total_matched': self.total_matched,
+            'total_added': self.total_added,
+            'total_carried': self.total_carried,
+            'match_rate': self.total_matched / max(self.total_matched + self.total_added, 1)
+        }
@@ -25,6 +25,7 @@ from .executor import ActionExecutor
 from .memory import ShortTermMemory, WorkflowMemory
 from .vision import VisionAPI
 from .advanced_vision import AdvancedVisionAnalyzer
+from .volatile_masks import get_volatile_masks
 from .workflows import WorkflowEngine, WorkflowStep, StepType
 from .accessibility_bridge import AccessibilityBridge
 
@@ -127,6 +128,11 @@ class EnhancedSuperAgent:
         # NEW: Store app launcher for direct app opening
         self.app_launcher = app_launcher
         
+        # 🎭 Declared volatile regions (clocks, spinners) from the app configs
+        self.volatile_masks = get_volatile_masks()
+        if app_launcher is not None and isinstance(getattr(app_launcher, 'apps', None), dict):
+            self.volatile_masks.load_app_configs(app_launcher.apps)
+        
         # NEW: Store socketio for emitting events to frontend
         self.socketio = socketio
         
@@ -171,6 +177,7 @@ class EnhancedSuperAgent:
         self.reflection_count = 0
         self.replan_count = 0
         self.parallel_executions = 0
+        self.last_iteration_captures: Dict[str, int] = {}
         
         model_name = getattr(self.vision, 'model', model)
         logger.info(f"🚀 EnhancedSuperAgent initialized")
@@ -462,7 +469,7 @@ Be concise. Focus on extractable data, not UI descriptions."""
             if not self._is_app_window_open(app, windows):
                 logger.info(f"🔧 Ensuring {app} is running for this task")
                 self.app_launcher.launch_app(app)
-                time.sleep(2)
+                self.executor.wait_until_stable(quiet_ms=500, max_wait=2.0, require_change=True)
                 windows = self.app_launcher.window_controller.list_windows()
             
             # 🎓 Track app in working memory
@@ -474,9 +481,10 @@ Be concise. Focus on extractable data, not UI descriptions."""
         if not self.app_launcher.switch_app(primary):
             logger.info(f"Retrying focus for {primary} by relaunching")
             self.app_launcher.launch_app(primary)
-            time.sleep(2)
+            self.executor.wait_until_stable(quiet_ms=500, max_wait=2.0, require_change=True)
             self.app_launcher.switch_app(primary)
         self.executor.set_focus_hint(primary)
+        self.volatile_masks.set_active_app(primary)
 
     def _is_app_window_open(self, app: str, windows: List[Dict[str, str]]) -> bool:
         """Check if an app window already exists."""
@@ -957,6 +965,7 @@ RESPOND WITH JSON - steps array MUST have at least 3 items:
                     }
                 
                 logger.info(f"\n--- Iteration {iteration} (sub: {sub_iteration}) ---")
+                captures_at_start = self.executor.capture_counts()
                 
                 # Enhanced OODA cycle
                 action = self._enhanced_ooda_cycle(step, overall_task)
@@ -1154,15 +1163,14 @@ Answer honestly: Is this specific step complete based on what you see on screen?
                                 except Exception as e:
                                     logger.error(f"❌ Failed to emit SocketIO event: {e}")
                             
-                            # FIX #1: Wait for app to render (optimized for speed)
-                            if app_to_launch.lower() == 'chrome':
-                                logger.info("⏳ Waiting 5s for Chrome to render...")
-                                time.sleep(5)  # Reduced from 15s
-                            else:
-                                time.sleep(3)  # Reduced from 8s
-                            
-                            # Simple additional wait - skip complex image check
-                            logger.info("✅ Chrome should be ready after 15s wait")
+                            # FIX #1: Wait for app to render - returns once the new
+                            # window has painted and gone quiet (5s/3s at most)
+                            max_wait = 5.0 if app_to_launch.lower() == 'chrome' else 3.0
+                            logger.info(f"⏳ Waiting up to {max_wait:.0f}s for {app_to_launch} to render...")
+                            settle = self.executor.wait_until_stable(
+                                quiet_ms=800, max_wait=max_wait, require_change=True
+                            )
+                            logger.info(f"✅ {app_to_launch} rendered after {settle.elapsed_ms / 1000:.1f}s")
                         except Exception as e:
                             logger.error(f"❌ Failed to launch app: {e}")
                             result = ActionResult(success=False, action=action, error=str(e))
@@ -1189,7 +1197,7 @@ Answer honestly: Is this specific step complete based on what you see on screen?
                             action=action
                         )
                         url_was_prevented = True
-                        time.sleep(2)  # Wait for prevented URL
+                        self.executor.wait_until_stable(quiet_ms=500, max_wait=2.0)  # Let the earlier URL finish loading
                     
                     # 🔥 SEARCH QUERY PREVENTION: Don't type same search twice
                     elif (action.type == ActionType.TYPE and action.text and 
@@ -1207,7 +1215,7 @@ Answer honestly: Is this specific step complete based on what you see on screen?
                             action=action
                         )
                         url_was_prevented = True  # Reuse this flag for search too
-                        time.sleep(1)  # Brief wait
+                        self.executor.wait_until_stable(quiet_ms=300, max_wait=1.0)  # Brief wait
                         
                         # 🔥 IMPORTANT: After preventing duplicate search, mark step as potentially complete
                         # The search results should be visible, agent should click on them
@@ -1295,10 +1303,11 @@ Answer honestly: Is this specific step complete based on what you see on screen?
                         logger.info("✅ Auto-pressed Enter")
                         self.short_memory.add(enter_action, enter_result, context={'iteration': iteration, 'sub_goal': step, 'auto_fix': True})
                         actions_taken.append(enter_action)
-                    # 🔥 SPEED: Reduced wait times - URLs: 2s (was 3s), searches: 1.5s (was 2s)
-                    reduced_wait = 2 if wait_time >= 5 else 1.5
-                    logger.info(f"⏳ Waiting {reduced_wait}s for page/results to load...")
-                    time.sleep(reduced_wait)
+                    # 🔥 SPEED: Return as soon as the page/results stop repainting
+                    # (URLs: up to 5s, searches: up to 3s)
+                    logger.info(f"⏳ Waiting up to {wait_time}s for page/results to load...")
+                    settle = self.executor.wait_until_stable(quiet_ms=500, max_wait=wait_time)
+                    logger.info(f"   Page settled after {settle.settle_ms / 1000:.1f}s")
                     
                     # Update current_url after navigation
                     if is_url:
@@ -1319,6 +1328,7 @@ Answer honestly: Is this specific step complete based on what you see on screen?
                 # Remember it
                 self.short_memory.add(action, result, context={'iteration': iteration, 'sub_goal': step})
                 actions_taken.append(action)
+                self._record_iteration_captures(iteration, captures_at_start)
                 
                 # 🧬 SELF-EVOLUTION: Record experience for learning
                 try:
@@ -1518,8 +1528,8 @@ Return JSON: {{"changed": true/false, "evidence": "what changed"}}"""
                                 logger.info("✅ Alternative approach executed, continuing...")
                         else:
                             # Final fallback: wait and observe
-                            logger.info("⏸️ No alternative found, waiting 3s for UI to settle...")
-                            time.sleep(3)
+                            logger.info("⏸️ No alternative found, waiting up to 3s for UI to settle...")
+                            self.executor.wait_until_stable(quiet_ms=500, max_wait=3.0)
                     
                     # 🔥 FIX #3: TYPE loop detection - if typing same text 3x, it's already typed!
                     elif recent_actions and all(
@@ -1593,7 +1603,9 @@ Return JSON: {{"changed": true/false, "evidence": "what changed"}}"""
         """
         try:
             # OBSERVE - Enhanced with Advanced Vision + Accessibility
-            screenshot = self.executor._capture_screen()
+            # (the last action's after-frame is reused if nothing repainted since)
+            frame = self.executor.capture_frame("observe", reuse=True)
+            screenshot = frame.image if frame else None
             if not screenshot:
                 logger.error("Failed to capture screenshot")
                 return None
@@ -1604,7 +1616,7 @@ Return JSON: {{"changed": true/false, "evidence": "what changed"}}"""
                 logger.info("🔌 Extracting accessibility tree (X-Ray Vision)...")
                 try:
                     ui_tree = self.accessibility.get_flat_interactive_elements(
-                        screenshot_path=screenshot,
+                        screenshot_path=frame,
                         use_ocr_fallback=True
                     )
                     logger.info(f"   📊 Found {len(ui_tree)} interactive elements via AT-SPI/OCR")
@@ -1614,12 +1626,16 @@ Return JSON: {{"changed": true/false, "evidence": "what changed"}}"""
             
             # Use Advanced Vision Analyzer for rich screen understanding
             logger.info("🔍 Running advanced vision analysis (OCR + UI detection)...")
-            screen_analysis = self.advanced_vision.analyze_screen(screenshot)
+            # (the frame carries X Damage info, so an unchanged screen is reused)
+            screen_analysis = self.advanced_vision.analyze_screen(frame)
             
             # Extract valuable information
             detected_text = screen_analysis.text_content if screen_analysis.text_content else ""
             ui_elements = screen_analysis.elements if hasattr(screen_analysis, 'elements') else []
-            clickable_elements = self.advanced_vision.find_clickable_elements(screenshot) if hasattr(self.advanced_vision, 'find_clickable_elements') else []
+            # Full-screen frames carry their memoized hashes/encodings into the
+            # analyzer and vision client; window frames stay in image coordinates
+            vision_input = frame if frame.offset == (0, 0) else screenshot
+            clickable_elements = self.advanced_vision.find_clickable_elements(vision_input) if hasattr(self.advanced_vision, 'find_clickable_elements') else []
             text_elements = [elem for elem in ui_elements if getattr(elem, 'text', None)]
             
             logger.info(f"   Found {len(detected_text)} chars of text")
@@ -1688,7 +1704,7 @@ Return JSON: {{"changed": true/false, "evidence": "what changed"}}"""
             # ORIENT + DECIDE (using enhanced vision with OCR + UI detection + AI)
             logger.info("🔍 Using Advanced Vision (OCR + UI + AI)...")
             result = self.advanced_vision.analyze_with_vision_api(
-                screenshot=screenshot,
+                screenshot=vision_input,
                 task=current_goal,
                 context=context
             )
@@ -1747,6 +1763,10 @@ Return JSON: {{"changed": true/false, "evidence": "what changed"}}"""
                 **normalized_data
             )
             
+            # Coordinates were read off a window-scoped frame - map to the screen
+            if frame is not None and frame.offset != (0, 0) and action.x is not None and action.y is not None:
+                action.x, action.y = frame.to_screen(action.x, action.y)
+            
             return action
             
         except Exception as e:
@@ -1843,30 +1863,33 @@ RESPOND WITH JSON:
         """
         try:
             # Wait for UI to update
-            time.sleep(0.3)
+            self.executor.wait_until_stable(quiet_ms=200, max_wait=1.0)
             
             recent_entries = list(self.short_memory.memory)[-1:] if self.short_memory.memory else []
             screenshot_before = recent_entries[0].action.get('screenshot') if recent_entries else None
-            screenshot_after = self.executor._capture_screen()
+            frame_after = self.executor.capture_frame("verify", reuse=True)
+            screenshot_after = frame_after.image if frame_after else None
             
             # Use Advanced Vision to detect changes
-            if screenshot_before:
+            changes = None
+            if screenshot_before and screenshot_after:
                 logger.info("🔍 Detecting screen changes after action...")
                 changes = self.advanced_vision.detect_changes(
-                    screenshot_before,
-                    screenshot_after
+                    frame_after,
+                    previous=screenshot_before
                 )
-                logger.info(f"   Detected {len(changes)} visual changes")
+                logger.info(f"   Detected {changes.get('num_regions_changed', 0)} changed regions "
+                           f"(magnitude {changes.get('magnitude', 0):.3f})")
             
             # Also get text and UI elements for verification
-            screen_analysis = self.advanced_vision.analyze_screen(screenshot_after)
+            screen_analysis = self.advanced_vision.analyze_screen(frame_after or screenshot_after)
             
             prompt = f"""Verify if this action succeeded by analyzing the screen.
 
 GOAL: {goal}
 ACTION TAKEN: {action.type.value} - {getattr(action, 'reason', 'no reason')}
 
-VISUAL CHANGES DETECTED: {len(changes) if screenshot_before else 'N/A'}
+VISUAL CHANGES DETECTED: {changes.get('num_regions_changed', 0) if changes else 'N/A'}
 TEXT ON SCREEN: {screen_analysis.text_content[:200] if screen_analysis.text_content else 'No text detected'}
 UI ELEMENTS: {[el.element_type for el in screen_analysis.elements[:5]]}
 
@@ -1884,7 +1907,7 @@ RESPOND WITH JSON:
 }}"""
             
             result = self.advanced_vision.analyze_with_vision_api(
-                screenshot=screenshot_after,
+                screenshot=frame_after or screenshot_after,
                 task=prompt,
                 context={'mode': 'verification'}
             )
@@ -1992,6 +2015,17 @@ RESPOND WITH JSON:
             'results': self.task_results.copy() if self.task_results else []
         }
     
+    def _record_iteration_captures(self, iteration: int, captures_at_start: Tuple[int, int]):
+        """Log how many screen captures this iteration took and how many frame reuse saved."""
+        taken, avoided = self.executor.capture_counts()
+        self.last_iteration_captures = {
+            'iteration': iteration,
+            'taken': taken - captures_at_start[0],
+            'avoided': avoided - captures_at_start[1]
+        }
+        logger.debug(f"📷 Captures this iteration: {self.last_iteration_captures['taken']} taken, "
+                     f"{self.last_iteration_captures['avoided']} avoided")
+
     def get_stats(self) -> Dict[str, Any]:
         """Get performance statistics"""
         vision_stats = {
@@ -2010,7 +2044,13 @@ RESPOND WITH JSON:
                 'reflections_performed': self.reflection_count,
                 'replans_triggered': self.replan_count,
                 'parallel_executions': self.parallel_executions
-            }
+            },
+            'capture': {
+                'captures_taken': self.executor.captures_taken,
+                'captures_avoided': self.executor.captures_avoided,
+                'last_iteration': self.last_iteration_captures
+            },
+            'volatile_masks': self.volatile_masks.get_stats()
         }
     
     def execute_workflow(self, workflow_steps: List[WorkflowStep]) -> Dict[str, Any]:
@@ -21,9 +21,23 @@ except ImportError:
     logging.warning("pyautogui not available - install for full functionality")
 
 from .actions import Action, ActionType, ActionResult
+from .frames import Frame
+from .frame_grabber import FrameGrabber
+from .screen_source import ScreenSource, StabilityResult, get_screen_source
 
 logger = logging.getLogger(__name__)
 
+# How long the screen must stay quiet, and the most to wait, after an action
+# of each category (see _categorize_click): (quiet window ms, max wait s)
+SETTLE_PROFILES = {
+    'navigation': (600, 6.0),
+    'search': (400, 4.0),
+    'button': (250, 2.0),
+    'input': (150, 1.0),
+    'ui': (200, 1.5),
+    'default': (200, 1.5),
+}
+
 
 class ActionExecutor:
     """
@@ -36,10 +50,33 @@ class ActionExecutor:
     - Safety bounds checking
     """
     
-    def __init__(self, display: str = ':100', screen_size: Tuple[int, int] = (1920, 1080)):
+    def __init__(self, display: str = ':100', screen_size: Tuple[int, int] = (1920, 1080),
+                 capture_backend: Optional[str] = None, capture_scope: Optional[str] = None,
+                 screen_source: Optional[ScreenSource] = None):
+        """
+        Args:
+            display: X display to act on
+            screen_size: Screen size for coordinate validation
+            capture_backend: Use a private ScreenSource with this backend chain
+                instead of the display's shared one
+            capture_scope: Override the capture scope ('screen' or 'window')
+            screen_source: ScreenSource to capture through (default: shared
+                instance for the display)
+        """
         self.display = display
         self.screen_width, self.screen_height = screen_size
         
+        # All captures go through one ScreenSource per display, shared with
+        # the other engines (frame sequence, damage log and grabber included)
+        if screen_source is None:
+            if capture_backend is None:
+                screen_source = get_screen_source(display)
+            else:
+                screen_source = ScreenSource(display, backend=capture_backend, screen_size=screen_size)
+        self.screen = screen_source
+        if capture_scope:
+            self.screen.set_capture_scope(capture_scope)
+        
         # Configure environment
         os.environ['DISPLAY'] = display
         
@@ -55,8 +92,44 @@ class ActionExecutor:
         self._preferred_keywords: List[str] = []
         self._preferred_wm_class: Optional[str] = None
         
+        self._focus_pending = True
+        
+        # Last frame handed out; an action's after-frame can stand in for the
+        # next observation while damage tracking proves the screen unchanged
+        self.last_frame: Optional[Frame] = None
+        self.last_settle: Optional[StabilityResult] = None
+        self.captures_taken = 0
+        self.captures_avoided = 0
+        
         logger.info(f"ActionExecutor initialized on {display} ({screen_size[0]}x{screen_size[1]})")
     
+    @property
+    def frame_grabber(self) -> FrameGrabber:
+        """Frame grabber of the shared screen source."""
+        return self.screen.grabber
+    
+    @property
+    def capture_backend(self) -> str:
+        return self.screen.backend
+    
+    @property
+    def capture_scope(self) -> str:
+        return self.screen.capture_scope
+    
+    def start_frame_grabber(self, fps: float = 5.0, buffer_size: int = 8) -> FrameGrabber:
+        """
+        Start sampling the display in the background.
+        
+        Once running, capture_screen() returns the newest buffered frame
+        instead of capturing synchronously, and execute() takes its
+        after-frame from the first sample following the action.
+        """
+        return self.screen.start_grabber(fps=fps, buffer_size=buffer_size)
+    
+    def stop_frame_grabber(self):
+        """Stop background sampling and return to on-demand capture."""
+        self.screen.stop_grabber()
+    
     def execute(self, action: Action, verify: bool = True) -> ActionResult:
         """
         Execute action and optionally verify success
@@ -69,24 +142,52 @@ class ActionExecutor:
             ActionResult with success status
         """
         start_time = time.time()
-        screenshot_before = None
-        screenshot_after = None
+        frame_before = None
+        frame_after = None
+        
+        grabber = self.frame_grabber if self.frame_grabber.running else None
         
         try:
-            # Capture before state if verifying
+            # Capture before state if verifying - usually the frame the
+            # action was decided on, reused when nothing changed since
             if verify and action.type not in [ActionType.WAIT, ActionType.DONE]:
-                screenshot_before = self._capture_screen()
+                frame_before = self._capture_frame(f"before:{action.type.value}", reuse=True)
             
             # Execute the action
             success = self._execute_action(action)
+            acted_at = time.time()
             
-            # Small delay for UI to respond
-            if action.type != ActionType.WAIT:
-                time.sleep(0.15)  # 🔥 SPEED: Reduced from 0.3s
+            # Wait for the UI to settle instead of a fixed delay
+            settle = None
+            if success and action.type not in [ActionType.WAIT, ActionType.DONE]:
+                settle = self._settle(action.reason)
             
-            # Capture after state if verifying
+            # Capture after state if verifying - the settled frame when the
+            # stability wait already sampled one
             if verify and success and action.type not in [ActionType.WAIT, ActionType.DONE]:
-                screenshot_after = self._capture_screen()
+                if (settle is not None and settle.stable and settle.frame is not None
+                        and settle.frame.timestamp >= acted_at):
+                    frame_after = settle.frame
+                    frame_after.provenance.append(f"after:{action.type.value}")
+                    self.last_frame = frame_after
+                elif grabber:
+                    # First frame whose capture started after the action (one
+                    # in flight during the action is numbered later but stale)
+                    frame_after = grabber.wait_for_newer(grabber.latest_seq, timeout=1.0,
+                                                         captured_after=acted_at)
+                    if frame_after is not None:
+                        frame_after.provenance.append(f"after:{action.type.value}")
+                        self.last_frame = frame_after
+                if frame_after is None:
+                    frame_after = self._capture_frame(f"after:{action.type.value}")
+            
+            # Damage between the two frames answers "did anything change?"
+            # without diffing pixels (None when damage is not tracked)
+            screen_changed = None
+            if frame_before is not None and frame_after is not None:
+                damage = frame_after.damage_since(frame_before)
+                if damage is not None:
+                    screen_changed = bool(damage)
             
             # Track performance
             duration = time.time() - start_time
@@ -102,8 +203,10 @@ class ActionExecutor:
                 success=success,
                 action=action,
                 duration=duration,
-                screenshot_before=screenshot_before,
-                screenshot_after=screenshot_after
+                screenshot_before=frame_before.image if frame_before else None,
+                screenshot_after=frame_after.image if frame_after else None,
+                screen_changed=screen_changed,
+                settle_ms=settle.settle_ms if settle is not None else None
             )
             
         except Exception as e:
@@ -125,6 +228,8 @@ class ActionExecutor:
         self._preferred_keywords = []
         self._preferred_wm_class = None
         self._preferred_description = None
+        self.screen.target_window = None
+        self._focus_pending = True
 
         if not app_name:
             logger.info("Window focus hint cleared")
@@ -212,60 +317,39 @@ class ActionExecutor:
             return False
         
         pyautogui.click(x, y)
-        
-        # Adaptive wait based on action context
-        wait_time = self._calculate_adaptive_wait(reason)
-        if wait_time > 0:
-            logger.info("Waiting %.1fs after click (%s)", wait_time, 
-                       self._categorize_click(reason))
-            time.sleep(wait_time)
-        
         return True
     
-    def _calculate_adaptive_wait(self, reason: str) -> float:
+    def wait_until_stable(self, region: Optional[Tuple[int, int, int, int]] = None,
+                          quiet_ms: float = 300, max_wait: float = 5.0,
+                          require_change: bool = False) -> StabilityResult:
         """
-        Calculate wait time based on action reason.
+        Block until the screen stops changing (see ScreenSource.wait_until_stable).
         
-        Navigation actions need longer waits, UI clicks need minimal waits.
+        In 'window' capture scope only the target window is watched. The
+        last sampled frame is kept so the next observation can reuse it.
         """
-        if not reason:
-            return 0.5  # Default minimal wait
-        
-        reason_lower = reason.lower()
-        
-        # Long waits (1.5s) - page navigation actions
-        navigation_keywords = [
-            'navigate', 'go to', 'open page', 'new page', 'load',
-            'submit', 'search result', 'link', 'url', 'website',
-            'login', 'sign in', 'redirect'
-        ]
-        for keyword in navigation_keywords:
-            if keyword in reason_lower:
-                return 1.5
-        
-        # Medium waits (0.8s) - content loading
-        content_keywords = [
-            'search', 'find', 'video', 'image', 'content',
-            'expand', 'dropdown', 'menu', 'tab', 'modal'
-        ]
-        for keyword in content_keywords:
-            if keyword in reason_lower:
-                return 0.8
-        
-        # Short waits (0.3s) - UI interactions
-        ui_keywords = [
-            'button', 'click', 'select', 'check', 'toggle',
-            'input', 'field', 'focus', 'icon'
-        ]
-        for keyword in ui_keywords:
-            if keyword in reason_lower:
-                return 0.3
-        
-        # Default minimal wait
-        return 0.5
+        if region is None and self.capture_scope == 'window':
+            region = self.screen.window_region()
+        result = self.screen.wait_until_stable(region, quiet_ms=quiet_ms, max_wait=max_wait,
+                                               require_change=require_change)
+        self.last_settle = result
+        if result.frame is not None:
+            result.frame.provenance.append("settle")
+            self.last_frame = result.frame
+        return result
+    
+    def _settle(self, reason: str = "") -> StabilityResult:
+        """Wait for the UI to settle after an action, sized by the action's category."""
+        category = self._categorize_click(reason)
+        quiet_ms, max_wait = SETTLE_PROFILES[category]
+        result = self.wait_until_stable(quiet_ms=quiet_ms, max_wait=max_wait)
+        logger.info("Screen %s in %.0fms (%s, waited %.0fms)",
+                    "settled" if result.stable else "still changing",
+                    result.settle_ms, category, result.elapsed_ms)
+        return result
     
     def _categorize_click(self, reason: str) -> str:
-        """Categorize click for logging."""
+        """Categorize an action reason (picks the settle profile; also logged)."""
         if not reason:
             return "default"
         
@@ -279,6 +363,8 @@ class ActionExecutor:
             return "button"
         elif any(k in reason_lower for k in ['input', 'field', 'type']):
             return "input"
+        elif any(k in reason_lower for k in ['load', 'login', 'sign in', 'website', 'page']):
+            return "navigation"
         else:
             return "ui"
     
@@ -447,6 +533,10 @@ class ActionExecutor:
                     logger.warning("Unable to parse Chrome window line")
                     return False
                 window_id = parts[0]
+                try:
+                    self.screen.target_window = int(window_id, 16)
+                except ValueError:
+                    self.screen.target_window = None
                 if preferred_keywords:
                     logger.info(f"Focusing Chrome window matching {preferred_keywords}: {window_id}")
                 else:
@@ -467,62 +557,84 @@ class ActionExecutor:
             return False
     
     def _capture_screen(self) -> Optional[Image.Image]:
-        """Capture current screen state via Xpra (what user actually sees)"""
+        """
+        Capture current screen state.
+
+        Captures go through the display's shared ScreenSource: in-process XShm
+        (no subprocess, no file), then `xpra screenshot` (what the user
+        actually sees), then scrot. Set AIOS_CAPTURE_BACKEND to pin a single
+        backend (no fallback if it fails). When the background frame grabber is running, the newest
+        buffered frame is returned instead. In 'window' capture scope the
+        image covers only the target window; use _capture_frame() when the
+        screen offset is needed.
+        """
+        frame = self._capture_frame()
+        return frame.image if frame is not None else None
+
+    def _capture_frame(self, purpose: str = "observe", reuse: bool = False) -> Optional[Frame]:
+        """
+        Capture current screen state as a Frame (see _capture_screen).
+
+        Args:
+            purpose: Recorded in the frame's provenance ('observe', 'verify', ...)
+            reuse: Return the last frame instead of capturing when damage
+                tracking proves the screen has not changed since (ignored
+                after a focus change)
+        """
         try:
-            # Focus preferred window (or fallback to latest Chrome)
-            if not self._focus_preferred_window():
-                self._focus_latest_chrome_window()
-            
-            screenshot_path = '/tmp/action_verify.png'
-            # Remove previous screenshot if it exists
-            if os.path.exists(screenshot_path):
-                os.remove(screenshot_path)
-            
-            # Method 1: Capture exactly what Xpra streams (requires active client)
-            try:
-                result = subprocess.run(
-                    ['xpra', 'screenshot', screenshot_path, self.display],
-                    capture_output=True,
-                    timeout=5,
-                    check=False
-                )
-                if result.returncode == 0 and os.path.exists(screenshot_path):
-                    size_bytes = os.path.getsize(screenshot_path)
-                    if size_bytes > 50_000:  # Real screenshots are at least ~50KB
-                        logger.info(f"✅ Captured via Xpra ({size_bytes // 1024}KB)")
-                        img = Image.open(screenshot_path)
-                        if img.mode == 'RGBA':
-                            img = img.convert('RGB')
-                        return img
-                    logger.warning(f"Xpra screenshot too small ({size_bytes} bytes) - falling back")
-                else:
-                    logger.warning(f"Xpra screenshot failed (code {result.returncode})")
-            except Exception as e:
-                logger.debug(f"Xpra screenshot error: {e}")
-            
-            # Method 2: Fallback to scrot (original method)
-            subprocess.run(
-                ['scrot', screenshot_path],
-                env={'DISPLAY': self.display},
-                check=True,
-                stderr=subprocess.DEVNULL,
-                timeout=3
-            )
-            
-            if os.path.exists(screenshot_path):
-                img = Image.open(screenshot_path)
-                if img.mode == 'RGBA':
-                    img = img.convert('RGB')
-                logger.info(f"📸 Screenshot captured via fallback: {img.size}")
-                return img
-            
-            logger.error("Screenshot file not created")
-            return None
-            
+            if self.frame_grabber.running:
+                # Refocus only when the hint changed, then wait for a frame
+                # sampled after the focus switch
+                fresh = self._focus_pending
+                if fresh:
+                    self._focus_target_window()
+                frame = self.screen.capture_frame(fresh=fresh)
+            else:
+                if reuse and not self._focus_pending:
+                    frame = self._reusable_frame()
+                    if frame is not None:
+                        self.captures_avoided += 1
+                        frame.provenance.append(purpose)
+                        return frame
+
+                self._focus_target_window()
+                frame = self.screen.capture_frame()
+                if frame is not None:
+                    self.captures_taken += 1
+
+            if frame is not None:
+                frame.provenance.append(purpose)
+                self.last_frame = frame
+            return frame
+
         except Exception as e:
             logger.error(f"Failed to capture screen: {e}")
             return None
-    
+
+    def _reusable_frame(self) -> Optional[Frame]:
+        """Last frame, if it can stand in for a new capture."""
+        frame = self.screen.reuse_frame(self.last_frame)
+        settle = self.last_settle
+        if frame is None and settle is not None and settle.stable and settle.frame is self.last_frame:
+            # The screen was quiet for quiet_ms up to this frame - trust it for as long again
+            if self.last_frame is not None and self.last_frame.age * 1000 <= settle.quiet_ms:
+                frame = self.last_frame
+        return frame
+
+    def _focus_target_window(self):
+        """Focus preferred window (or fallback to latest Chrome)."""
+        if not self._focus_preferred_window():
+            self._focus_latest_chrome_window()
+        self._focus_pending = False
+
+    def set_capture_scope(self, scope: str):
+        """Choose what captures cover: 'screen' or 'window' (see ScreenSource)."""
+        self.screen.set_capture_scope(scope)
+
+    def capture_counts(self) -> Tuple[int, int]:
+        """(captures taken, captures avoided by reusing a frame) so far."""
+        return self.captures_taken, self.captures_avoided
+
     def get_mouse_position(self) -> Tuple[int, int]:
         """Get current mouse position"""
         if pyautogui:
@@ -560,15 +672,23 @@ class ActionExecutor:
             'successful_actions': self.successful_actions,
             'success_rate': self.success_rate,
             'avg_execution_time': self.avg_execution_time,
-            'total_time': self.total_time
+            'total_time': self.total_time,
+            'capture_backend': self.capture_backend,
+            'capture_scope': self.capture_scope,
+            'captures_taken': self.captures_taken,
+            'captures_avoided': self.captures_avoided,
+            'screen_source': self.screen.get_stats()
         }
     
     # ====================== FastAgent Public API ======================
     # Simple methods for direct use by FastAgent
     
     def click(self, x: int, y: int, reason: str = "") -> bool:
-        """Public method: Click at coordinates."""
-        return self._click(x, y, reason)
+        """Public method: Click at coordinates and wait for the UI to settle."""
+        if not self._click(x, y, reason):
+            return False
+        self._settle(reason)
+        return True
     
     def type_text(self, text: str) -> bool:
         """Public method: Type text."""
@@ -586,4 +706,8 @@ class ActionExecutor:
     def capture_screen(self) -> Optional[Image.Image]:
         """Public method: Capture screen and return PIL Image."""
         return self._capture_screen()
+    
+    def capture_frame(self, purpose: str = "observe", reuse: bool = False) -> Optional[Frame]:
+        """Public method: Capture screen and return a Frame with capture metadata."""
+        return self._capture_frame(purpose, reuse=reuse)
 
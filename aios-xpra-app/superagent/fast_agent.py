@@ -16,13 +16,18 @@ import os
 import time
 import json
 import logging
-import hashlib
 from typing import Dict, Any, Optional, List, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
 from io import BytesIO
 from PIL import Image
 
+from .frames import Frame
+from .change_detection import ScreenSnapshot
+from .perceptual_hash import HammingIndex, DEFAULT_RADIUS
+from .volatile_masks import get_volatile_masks
+from .element_table import ElementTable, ElementRow, type_code
+
 logger = logging.getLogger(__name__)
 
 
@@ -37,28 +42,16 @@ class ActionType(Enum):
     DONE = "done"
 
 
-@dataclass
-class Element:
-    """Detected UI element with coordinates."""
-    id: int
-    element_type: str
-    text: str
-    x: int
-    y: int
-    width: int
-    height: int
-    confidence: float
-    is_interactable: bool = True
-    
-    @property
-    def center(self) -> Tuple[int, int]:
-        """Get center coordinates for clicking."""
-        return (self.x + self.width // 2, self.y + self.height // 2)
-    
-    def to_prompt_line(self) -> str:
-        """Format element for LLM prompt (compact)."""
-        text_preview = self.text[:30] if self.text else ""
-        return f"[{self.id}] {self.element_type}: \"{text_preview}\" at ({self.center[0]},{self.center[1]})"
+def Element(id: int, element_type: str, text: str, x: int, y: int, width: int, height: int,
+            confidence: float, is_interactable: bool = True) -> ElementRow:
+    """
+    A single detected element. Detected elements are row views of an
+    ElementTable (id, element_type, text, x/y/width/height, center,
+    confidence, is_interactable, track_id); this builds a one-row table.
+    """
+    table = ElementTable([[x, y, x + width, y + height]], [confidence], [type_code(element_type)],
+                         [is_interactable], [text or ""], ids=[id])
+    return table[0]
 
 
 @dataclass
@@ -87,44 +80,73 @@ class ExecutionResult:
 
 
 class ElementCache:
-    """Cache for detected elements to avoid redundant detection."""
+    """Cache for detected elements to avoid redundant detection.
+
+    Screens are matched by perceptual hash with volatile regions (clocks,
+    spinners, carets) masked out, so a blinking caret or ticking clock
+    still hits the entry for the otherwise identical screen. Every hit is
+    confirmed against the entry's pixels, which tolerates a caret or a
+    glyph the masks do not cover yet: typed text or a new icon moves the
+    hash by only a few bits, and must miss.
+    """
     
-    def __init__(self, max_age_seconds: float = 2.0, max_entries: int = 3):
-        self._cache: Dict[str, Tuple[float, List[Element]]] = {}
+    def __init__(self, max_age_seconds: float = 2.0, max_entries: int = 3,
+                 radius: int = DEFAULT_RADIUS):
+        self._cache: Dict[Tuple[int, Tuple[int, int]], Tuple[float, ElementTable, int, ScreenSnapshot]] = {}
+        self._index = HammingIndex(radius)
+        self.masks = get_volatile_masks()
+        self.radius = radius
         self.max_age = max_age_seconds
         self.max_entries = max_entries
         self.hits = 0
+        self.near_hits = 0  # hits on a slightly different screen
+        self.rejects = 0    # hash matches whose pixels had changed
         self.misses = 0
     
-    def _compute_hash(self, image: Image.Image) -> str:
-        """Fast image hash using sampling."""
-        small = image.resize((32, 32), Image.Resampling.LANCZOS)
-        return hashlib.md5(small.tobytes()).hexdigest()
+    def _evict(self, key):
+        del self._cache[key]
+        self._index.remove(key)
     
-    def get(self, image: Image.Image) -> Optional[List[Element]]:
+    def get(self, image: Union[Image.Image, Frame], offset: Tuple[int, int] = (0, 0)) -> Optional[ElementTable]:
         """Get cached elements if still valid."""
-        img_hash = self._compute_hash(image)
-        if img_hash in self._cache:
-            timestamp, elements = self._cache[img_hash]
-            if time.time() - timestamp < self.max_age:
+        # Memoized on the frame, so get() followed by set() hashes once
+        fingerprint = self.masks.fingerprint(image)
+        offset = tuple(offset)
+        for distance, key in self._index.find(fingerprint.hash):
+            if key[1] != offset:
+                continue
+            timestamp, elements, raw, snapshot = self._cache[key]
+            if time.time() - timestamp >= self.max_age:
+                self._evict(key)
+            elif not self.masks.confirm_hit(snapshot, image):
+                self.rejects += 1
+            else:
                 self.hits += 1
+                if distance:
+                    self.near_hits += 1
+                self.masks.record_lookup('element_cache', fingerprint, raw, self.radius)
                 return elements
-            else:
-                del self._cache[img_hash]
         self.misses += 1
+        self.masks.record_lookup('element_cache', fingerprint)
         return None
     
-    def set(self, image: Image.Image, elements: List[Element]):
-        """Cache detected elements."""
-        if len(self._cache) >= self.max_entries:
+    def set(self, image: Union[Image.Image, Frame], elements: Union[ElementTable, List[ElementRow]],
+            offset: Tuple[int, int] = (0, 0)):
+        """Cache detected elements (a table, or a list of rows copied into one)."""
+        if not isinstance(elements, ElementTable):
+            elements = ElementTable.from_rows(elements)
+        fingerprint = self.masks.fingerprint(image)
+        key = (fingerprint.hash, tuple(offset))
+        if key not in self._cache and len(self._cache) >= self.max_entries:
             oldest_key = min(self._cache.keys(), key=lambda k: self._cache[k][0])
-            del self._cache[oldest_key]
-        img_hash = self._compute_hash(image)
-        self._cache[img_hash] = (time.time(), elements)
+            self._evict(oldest_key)
+        self._cache[key] = (time.time(), elements, fingerprint.raw, self.masks.snapshot(image))
+        self._index.add(fingerprint.hash, key)
     
     def clear(self):
         """Clear all cached entries."""
         self._cache.clear()
+        self._index.clear()
 
 
 class FastAgent:
@@ -182,7 +204,7 @@ Select NEXT action. Respond ONLY with JSON:
         self.action_timeout = action_timeout
         
         self.element_cache = ElementCache() if enable_cache else None
-        self.current_elements: List[Element] = []
+        self.current_elements: ElementTable = ElementTable.empty()
         self.action_history: List[str] = []
         self.last_navigated_url: Optional[str] = None  # Track last URL to prevent repeats
         self.last_action_type: Optional[str] = None  # Track last action type
@@ -210,7 +232,8 @@ Select NEXT action. Respond ONLY with JSON:
         """Request cancellation of current task."""
         self._cancelled = True
     
-    def detect_elements(self, screenshot: Image.Image) -> List[Element]:
+    def detect_elements(self, screenshot: Union[Image.Image, Frame],
+                        goal: Optional[str] = None) -> ElementTable:
         """
         Detect UI elements using OmniParser.
         
@@ -218,23 +241,27 @@ Select NEXT action. Respond ONLY with JSON:
         OmniParser provides element type, text, and coordinates.
         
         Args:
-            screenshot: PIL Image to analyze
+            screenshot: PIL Image or captured Frame to analyze
+            goal: Current task (goals about small icons detect at higher resolution)
             
         Returns:
-            List of detected elements with coordinates
+            Table of detected elements with screen coordinates
         """
         start_time = time.time()
         
+        frame = Frame.wrap(screenshot)
+        offset = frame.offset
+        
         # Check cache first
         if self.element_cache:
-            cached = self.element_cache.get(screenshot)
+            cached = self.element_cache.get(frame, offset)
             if cached is not None:
                 self.stats["cache_hits"] += 1
                 logger.debug("Element cache hit")
                 return cached
             self.stats["cache_misses"] += 1
         
-        elements: List[Element] = []
+        elements = ElementTable.empty()
         
         if self.omniparser is None:
             logger.error("OmniParser not available - cannot detect elements")
@@ -242,23 +269,10 @@ Select NEXT action. Respond ONLY with JSON:
         
         try:
             # Run OmniParser detection
-            result = self.omniparser.parse(screenshot)
-            
-            # Convert to Element objects
-            for i, omni_elem in enumerate(result.elements):
-                bbox = omni_elem.bbox
-                elem = Element(
-                    id=i + 1,
-                    element_type=omni_elem.element_type.name.lower() if hasattr(omni_elem.element_type, 'name') else 'element',
-                    text=omni_elem.text or omni_elem.ocr_text or "",
-                    x=int(bbox.x1),
-                    y=int(bbox.y1),
-                    width=int(bbox.width),
-                    height=int(bbox.height),
-                    confidence=omni_elem.confidence,
-                    is_interactable=omni_elem.is_interactable
-                )
-                elements.append(elem)
+            result = self.omniparser.parse(frame, goal=goal)
+            
+            # Columns straight from the parse (ids are OmniParser's 1..N)
+            elements = ElementTable.from_parse_result(result)
             
             detection_ms = (time.time() - start_time) * 1000
             self.stats["total_detection_ms"] += detection_ms
@@ -267,37 +281,32 @@ Select NEXT action. Respond ONLY with JSON:
             
             # Cache results
             if self.element_cache:
-                self.element_cache.set(screenshot, elements)
+                self.element_cache.set(frame, elements, offset)
             
         except Exception as e:
             logger.error(f"Element detection failed: {e}")
         
         return elements
     
-    def build_elements_prompt(self, elements: List[Element], max_elements: int = 60) -> str:
+    def build_elements_prompt(self, elements: ElementTable, max_elements: int = 60) -> str:
         """
         Build compact element list for LLM prompt.
         
         Args:
-            elements: List of detected elements
+            elements: Detected elements
             max_elements: Maximum elements to include
             
         Returns:
             Formatted element list string
         """
-        if not elements:
+        if not len(elements):
             return "No elements detected"
         
         # Prioritize interactable elements
-        sorted_elements = sorted(
-            elements,
-            key=lambda e: (-int(e.is_interactable), -e.confidence)
-        )[:max_elements]
-        
-        lines = [e.to_prompt_line() for e in sorted_elements]
+        lines = [elements[i].to_prompt_line() for i in elements.prioritized(max_elements).tolist()]
         return "\n".join(lines)
     
-    def get_action(self, screenshot: Image.Image, task: str, iteration: int) -> Optional[AgentAction]:
+    def get_action(self, screenshot: Union[Image.Image, Frame], task: str, iteration: int) -> Optional[AgentAction]:
         """
         Get next action from vision API.
         
@@ -308,7 +317,8 @@ Select NEXT action. Respond ONLY with JSON:
         4. Parse response and map to action
         
         Args:
-            screenshot: Current screen state
+            screenshot: Current screen state (image or Frame; window-scoped
+                frames map coordinates back to the screen)
             task: Task to accomplish
             iteration: Current iteration number
             
@@ -317,8 +327,12 @@ Select NEXT action. Respond ONLY with JSON:
         """
         start_time = time.time()
         
+        # One Frame for the whole decision: hashes and encodings are shared
+        frame = Frame.wrap(screenshot)
+        offset = frame.offset
+        
         # Step 1: Detect elements
-        self.current_elements = self.detect_elements(screenshot)
+        self.current_elements = self.detect_elements(frame, goal=task)
         
         if not self.current_elements:
             logger.warning("No elements detected - returning wait action")
@@ -342,7 +356,7 @@ Select NEXT action. Respond ONLY with JSON:
         # Step 3: Query vision API
         llm_start = time.time()
         try:
-            response = self._call_vision_api(screenshot, prompt)
+            response = self._call_vision_api(frame, prompt)
             llm_ms = (time.time() - llm_start) * 1000
             self.stats["total_llm_ms"] += llm_ms
             logger.info(f"LLM response in {llm_ms:.0f}ms")
@@ -354,19 +368,19 @@ Select NEXT action. Respond ONLY with JSON:
             )
         
         # Step 4: Parse response
-        action = self._parse_response(response)
+        action = self._parse_response(response, offset)
         
         total_ms = (time.time() - start_time) * 1000
         logger.info(f"Action decision in {total_ms:.0f}ms total")
         
         return action
     
-    def _call_vision_api(self, screenshot: Image.Image, prompt: str) -> str:
+    def _call_vision_api(self, screenshot: Union[Image.Image, Frame], prompt: str) -> str:
         """
         Call vision API with screenshot and prompt.
         
         Args:
-            screenshot: PIL Image
+            screenshot: PIL Image or Frame
             prompt: User prompt
             
         Returns:
@@ -424,7 +438,7 @@ Select NEXT action. Respond ONLY with JSON:
         
         elif hasattr(self.vision_api, 'call_with_image'):
             return self.vision_api.call_with_image(
-                image=screenshot,
+                image=Frame.wrap(screenshot).image,
                 prompt=prompt,
                 system_prompt=self.SYSTEM_PROMPT
             )
@@ -432,12 +446,14 @@ Select NEXT action. Respond ONLY with JSON:
         else:
             raise ValueError(f"Unsupported vision API type: {type(self.vision_api)}")
     
-    def _parse_response(self, response: str) -> AgentAction:
+    def _parse_response(self, response: str, offset: Tuple[int, int] = (0, 0)) -> AgentAction:
         """
         Parse LLM response into AgentAction.
         
         Args:
             response: Raw LLM response
+            offset: Screen position of the image the LLM saw; direct x/y
+                are read off that image and shifted by it
             
         Returns:
             Parsed AgentAction
@@ -489,15 +505,14 @@ Select NEXT action. Respond ONLY with JSON:
                 action.element_id = elem_id
                 
                 # Get coordinates from element
-                for elem in self.current_elements:
-                    if elem.id == elem_id:
-                        action.x, action.y = elem.center
-                        break
+                elem = self.current_elements.find_id(elem_id)
+                if elem is not None:
+                    action.x, action.y = elem.center
             
             # Handle direct coordinates
             if "x" in data and "y" in data:
-                action.x = int(data["x"])
-                action.y = int(data["y"])
+                action.x = int(data["x"]) + offset[0]
+                action.y = int(data["y"]) + offset[1]
             
             # Handle text
             if "text" in data:
@@ -630,7 +645,7 @@ Select NEXT action. Respond ONLY with JSON:
     def execute_task(
         self,
         task: str,
-        screenshot_func,
+        screenshot_func=None,
         timeout: float = 120.0
     ) -> ExecutionResult:
         """
@@ -638,12 +653,17 @@ Select NEXT action. Respond ONLY with JSON:
         
         Args:
             task: Natural language task description
-            screenshot_func: Function that returns PIL Image of current screen
+            screenshot_func: Function that returns a PIL Image or Frame of the
+                current screen (defaults to the executor's capture_frame, which
+                reads the background frame grabber when it is running)
             timeout: Maximum time for task completion
             
         Returns:
             ExecutionResult with success status and metrics
         """
+        if screenshot_func is None:
+            screenshot_func = self.executor.capture_frame
+        
         start_time = time.time()
         self._cancelled = False
         self.action_history.clear()
@@ -712,8 +732,11 @@ Select NEXT action. Respond ONLY with JSON:
                 
                 last_action = action
                 
-                # Brief pause to let UI update
-                time.sleep(0.3)
+                # Let the UI update - returns as soon as the screen is quiet
+                if hasattr(self.executor, 'wait_until_stable'):
+                    self.executor.wait_until_stable(quiet_ms=200, max_wait=1.0)
+                else:
+                    time.sleep(0.3)
             
             # Max iterations reached
             return ExecutionResult(
@@ -742,6 +765,8 @@ Select NEXT action. Respond ONLY with JSON:
         if self.element_cache:
             stats["cache_hits"] = self.element_cache.hits
             stats["cache_misses"] = self.element_cache.misses
+            stats["cache_near_hits"] = self.element_cache.near_hits
+            stats["cache_rejects"] = self.element_cache.rejects
         
         # Calculate averages
         if stats["total_actions"] > 0:
@@ -771,6 +796,8 @@ Select NEXT action. Respond ONLY with JSON:
         if self.element_cache:
             self.element_cache.hits = 0
             self.element_cache.misses = 0
+            self.element_cache.near_hits = 0
+            self.element_cache.rejects = 0
 
 
 def create_fast_agent(
@@ -25,8 +25,8 @@ def get_omniparser():
     global _omniparser
     if _omniparser is None:
         try:
-            from .omniparser import OmniParserV2
-            _omniparser = OmniParserV2(
+            from .perception_server import create_parser
+            _omniparser = create_parser(
                 cache_enabled=True,
                 min_confidence=0.25,
                 max_elements=50,
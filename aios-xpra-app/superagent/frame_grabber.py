@@ -0,0 +1,286 @@
+"""
+Frame Grabber - Background screen sampling into a ring buffer
+
+Instead of every consumer blocking the agent loop on its own capture, one
+thread samples the display at a fixed rate and keeps the last N frames.
+Observation becomes a pointer read:
+
+    grabber = FrameGrabber(screen_source.grab, fps=5)
+    grabber.start()
+
+    frame = grabber.latest()                       # newest frame, no capture
+    executor.click(x, y)
+    clicked = time.time()
+    after = grabber.wait_for_newer(frame.seq, timeout=1, captured_after=clicked)
+
+With a damage tracker attached, each frame records the rectangles repainted
+since the previous frame, so `after.unchanged_since(frame)` answers "did the
+click do anything?" without touching pixels.
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable, Optional, List, Dict, Any, Tuple, Union
+
+from PIL import Image
+
+from .frames import Frame, DamageLog
+from .xshm_capture import bounding_rect
+
+logger = logging.getLogger(__name__)
+
+
+class FrameGrabber:
+    """
+    Capture thread that fills a bounded ring of sequence-numbered frames.
+
+    Features:
+    - Configurable sampling rate and ring size
+    - latest() / wait_for_newer() / frames_since() for consumers
+    - Capture latency and drop tracking
+    """
+
+    def __init__(self,
+                 capture_func: Callable[[], Union[None, Image.Image, Tuple[Image.Image, Tuple[int, int]]]],
+                 fps: float = 5.0,
+                 buffer_size: int = 8,
+                 name: str = "frame-grabber",
+                 damage_tracker=None):
+        """
+        Initialize frame grabber.
+
+        Args:
+            capture_func: Returns a PIL image of the screen, (image, (x, y))
+                for a capture of part of the screen, or None on failure
+            fps: Target sampling rate
+            buffer_size: Number of frames kept in the ring
+            name: Thread name (for logs / debugging)
+            damage_tracker: Optional XDamageTracker; its collect() is polled
+                right before each capture
+        """
+        self.capture_func = capture_func
+        self.fps = fps
+        self.interval = 1.0 / fps if fps > 0 else 0.2
+        self.name = name
+        self.damage_tracker = damage_tracker
+        self.damage_log = DamageLog()
+
+        self._frames: deque = deque(maxlen=buffer_size)
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._carried_damage: Optional[List] = None  # damage from failed captures
+
+        # Statistics
+        self.total_captures = 0
+        self.failed_captures = 0
+        self.total_capture_ms = 0.0
+        self.overruns = 0  # captures slower than the sampling interval
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the capture thread (no-op if already running)."""
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"FrameGrabber started ({self.fps:.1f} fps, ring={self._frames.maxlen})")
+
+    def stop(self, timeout: float = 2.0):
+        """Stop the capture thread and wake any waiters."""
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info("FrameGrabber stopped")
+
+    def configure(self, fps: Optional[float] = None, buffer_size: Optional[int] = None):
+        """Change the sampling rate and/or ring size (keeps buffered frames)."""
+        if fps is not None and fps > 0:
+            self.fps = fps
+            self.interval = 1.0 / fps
+        if buffer_size is not None and buffer_size != self._frames.maxlen:
+            with self._cond:
+                self._frames = deque(self._frames, maxlen=buffer_size)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            tick = time.time()
+            self.capture_once()
+
+            elapsed = time.time() - tick
+            if elapsed > self.interval:
+                self.overruns += 1
+            self._stop_event.wait(max(0.0, self.interval - elapsed))
+
+    def capture_once(self) -> Optional[Frame]:
+        """
+        Capture a frame synchronously and append it to the ring.
+
+        The frame's timestamp is taken before the damage poll, so damage
+        and pixels of a frame are both from after its timestamp.
+        """
+        start = time.time()
+        damage = self._collect_damage()
+
+        grab_start = time.time()
+        try:
+            image = self.capture_func()
+        except Exception as e:
+            logger.debug(f"FrameGrabber capture error: {e}")
+            image = None
+
+        self.total_capture_ms += (time.time() - grab_start) * 1000
+        offset = (0, 0)
+        if isinstance(image, tuple):
+            image, offset = image
+        if image is None:
+            self.failed_captures += 1
+            # Keep the damage so the next frame still reports it
+            self._carried_damage = damage
+            return None
+
+        with self._cond:
+            if self._seq == 0:
+                damage = None  # nothing to compare the first frame against
+            self._seq += 1
+            frame = Frame(image=image, seq=self._seq, timestamp=start, source="grabber",
+                          offset=offset, damage=damage, damage_log=self.damage_log)
+            self.damage_log.record(frame.seq, damage)
+            self._frames.append(frame)
+            self.total_captures += 1
+            self._cond.notify_all()
+        return frame
+
+    def _collect_damage(self) -> Optional[List]:
+        """Poll the damage tracker, merging anything left over from a failed capture."""
+        damage = self._poll_tracker()
+        carried, self._carried_damage = self._carried_damage, None
+        return self._merge_damage(carried, damage)
+
+    def _poll_tracker(self) -> Optional[List]:
+        if self.damage_tracker is None:
+            return None
+        try:
+            return self.damage_tracker.collect()
+        except Exception as e:
+            logger.debug(f"FrameGrabber damage poll error: {e}")
+            return None
+
+    def _merge_damage(self, carried: Optional[List], damage: Optional[List]) -> Optional[List]:
+        if damage is None or carried is None:
+            return damage
+        if carried and len(carried) + len(damage) > getattr(self.damage_tracker, 'max_rects', 256):
+            carried = [bounding_rect(carried)]  # long polling runs collapse to one rect
+        return carried + damage
+
+    def latest(self) -> Optional[Frame]:
+        """Newest frame in the ring, or None if nothing captured yet."""
+        with self._cond:
+            return self._frames[-1] if self._frames else None
+
+    @property
+    def latest_seq(self) -> int:
+        """Sequence number of the newest frame (0 if none)."""
+        with self._cond:
+            return self._seq
+
+    def wait_for_newer(self, seq: int, timeout: float = 1.0,
+                       captured_after: Optional[float] = None) -> Optional[Frame]:
+        """
+        Block until a frame with sequence number > seq is available.
+
+        Sequence numbers are assigned when a capture finishes, so a frame
+        whose capture started before an action can still be numbered after
+        it; pass the action's end time as captured_after to skip those.
+
+        Args:
+            seq: Sequence number the caller already has
+            timeout: Maximum seconds to wait
+            captured_after: Only accept frames whose capture (and damage
+                poll) started at or after this time.time()
+
+        Returns:
+            The first matching frame, or None on timeout
+        """
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                for frame in self._frames:
+                    if frame.seq > seq and (captured_after is None or frame.timestamp >= captured_after):
+                        return frame
+                remaining = deadline - time.time()
+                if remaining <= 0 or self._stop_event.is_set():
+                    return None
+                self._cond.wait(remaining)
+
+    def still_current(self, frame: Frame) -> bool:
+        """
+        True only if damage tracking proves nothing inside `frame` was
+        repainted since it was captured.
+
+        Frames already in the ring are checked through the damage log. When
+        the grabber is not running the tracker is also polled for damage not
+        yet attached to a frame; that damage is kept for the next capture.
+        """
+        if frame.damage_log is not self.damage_log:
+            return False
+        latest = self.latest()
+        if latest is None or not latest.unchanged_since(frame):
+            return False
+        if self.running:
+            return True
+
+        if self.pending_damage() is None:
+            return False
+        damage = self._carried_damage or []  # everything since the newest frame
+        fx, fy, fw, fh = frame.screen_rect
+        for x, y, w, h in damage:
+            if x < fx + fw and fx < x + w and y < fy + fh and fy < y + h:
+                return False
+        return True
+
+    def pending_damage(self) -> Optional[List]:
+        """
+        Poll the damage tracker without capturing.
+
+        The rects are kept and attached to the next captured frame, so
+        polling never hides damage from frame consumers. Only call this
+        while the grabber thread is stopped (it owns the tracker otherwise).
+
+        Returns:
+            Rects repainted since the previous poll or capture, or None if
+            damage is not tracked
+        """
+        damage = self._poll_tracker()
+        self._carried_damage = self._merge_damage(self._carried_damage, damage)
+        return damage
+
+    def frames_since(self, seq: int) -> List[Frame]:
+        """All frames still in the ring with sequence number > seq (oldest first)."""
+        with self._cond:
+            return [f for f in self._frames if f.seq > seq]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get grabber statistics."""
+        attempts = self.total_captures + self.failed_captures
+        return {
+            'running': self.running,
+            'fps': self.fps,
+            'latest_seq': self._seq,
+            'damage_tracking': self.damage_tracker is not None,
+            'buffered_frames': len(self._frames),
+            'total_captures': self.total_captures,
+            'failed_captures': self.failed_captures,
+            'overruns': self.overruns,
+            'avg_capture_ms': self.total_capture_ms / max(attempts, 1)
+        }
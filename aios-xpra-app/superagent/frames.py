@@ -0,0 +1,283 @@
+"""
+Frames - Captured screen images with capture metadata
+
+A Frame is what every capture path hands to the perception stack: the pixels
+plus where and when they came from. Sequence numbers are monotonic per
+grabber, so consumers can ask for "a frame newer than the one I acted on".
+
+A frame may cover only part of the screen (e.g. the focused window); its
+`offset` is the screen position of pixel (0, 0), and to_screen() maps
+frame coordinates back to absolute screen coordinates for the executor.
+
+When X Damage tracking is available each frame also carries the rectangles
+repainted since the previous frame, and frames from the same grabber share a
+DamageLog so any consumer can ask what changed since the frame it last saw:
+
+    if frame.unchanged_since(self.last_frame):
+        return self.last_result          # nothing repainted - skip the work
+
+Frames also record their provenance: what they were captured for and what
+they were reused as afterwards (e.g. ['after:click', 'verify', 'observe']),
+so an action's after-frame can serve as the next observation when the
+screen has provably not changed since.
+
+Derived artifacts (RGB/grayscale copies, numpy view, thumbnails, digests,
+JPEG/PNG encodings, base64) are computed at most once per frame, on demand,
+so the cache, parser, analyzer and vision client of one iteration share the
+work instead of each converting the screenshot again:
+
+    frame.thumbnail_digest((32, 32))       # element cache key
+    frame.base64('JPEG', max_size=1920)    # vision API payload
+
+Frame pixels must therefore be treated as read-only.
+"""
+
+import time
+import base64
+import hashlib
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Tuple, List, Optional, Set, Dict, Any, Callable, Union
+
+from PIL import Image
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Rectangle as (x, y, width, height) in screen pixels
+DamageRect = Tuple[int, int, int, int]
+
+
+class DamageLog:
+    """
+    Rolling record of per-frame damage for one frame sequence.
+
+    Entries map seq -> rects damaged since seq - 1 (None when unknown, e.g.
+    the first frame or a capture while damage tracking was unavailable).
+    """
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[int, Optional[List[DamageRect]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, seq: int, rects: Optional[List[DamageRect]]):
+        """Record the damage of frame `seq` relative to frame `seq - 1`."""
+        with self._lock:
+            self._entries[seq] = rects
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def between(self, after_seq: int, upto_seq: int) -> Optional[List[DamageRect]]:
+        """
+        All rects damaged after frame `after_seq` up to and including `upto_seq`.
+
+        Returns:
+            List of rects ([] if nothing changed), or None if any frame in the
+            range has unknown damage or has already rolled out of the log
+        """
+        if upto_seq <= after_seq:
+            return []
+        rects: List[DamageRect] = []
+        with self._lock:
+            for seq in range(after_seq + 1, upto_seq + 1):
+                damage = self._entries.get(seq)
+                if damage is None:
+                    return None
+                rects.extend(damage)
+        return rects
+
+
+@dataclass
+class Frame:
+    """A single captured screen image."""
+    image: Image.Image
+    seq: int = 0
+    timestamp: float = field(default_factory=time.time)
+    source: str = "capture"
+    # Screen position of the frame's top-left pixel (non-zero for window captures)
+    offset: Tuple[int, int] = (0, 0)
+    # Screen rects repainted since the previous frame in this sequence (None = unknown)
+    damage: Optional[List[DamageRect]] = None
+    damage_log: Optional[DamageLog] = field(default=None, repr=False, compare=False)
+    # What the frame was captured for, then each later reuse ('observe', 'before:click', ...)
+    provenance: List[str] = field(default_factory=list, compare=False)
+    # Memoized derived artifacts (see module docstring)
+    _artifacts: Dict[Any, Any] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _artifact_lock: Any = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
+
+    @classmethod
+    def wrap(cls, image: Union['Frame', Image.Image]) -> 'Frame':
+        """Return `image` if it already is a Frame, else a Frame around the PIL image."""
+        if isinstance(image, Frame):
+            return image
+        return cls(image=image, source="image")
+
+    @property
+    def age(self) -> float:
+        """Seconds since the frame was captured."""
+        return time.time() - self.timestamp
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.image.size
+
+    @property
+    def screen_rect(self) -> Tuple[int, int, int, int]:
+        """(x, y, w, h) of the area this frame covers, in screen coordinates."""
+        return (self.offset[0], self.offset[1], self.image.width, self.image.height)
+
+    @property
+    def reuses(self) -> int:
+        """Number of times the frame served a purpose beyond the one it was captured for."""
+        return max(len(self.provenance) - 1, 0)
+
+    # ------------------------------------------------------------------ artifacts
+
+    def memo(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """Return the artifact stored under `key`, computing it on first use."""
+        with self._artifact_lock:
+            if key not in self._artifacts:
+                self._artifacts[key] = compute()
+            return self._artifacts[key]
+
+    def rgb(self) -> Image.Image:
+        """The image in RGB mode (the image itself when it already is)."""
+        if self.image.mode == 'RGB':
+            return self.image
+        return self.memo('rgb', lambda: self.image.convert('RGB'))
+
+    def gray(self) -> Image.Image:
+        """Grayscale ('L') copy of the image."""
+        return self.memo('gray', lambda: self.image.convert('L'))
+
+    def array(self, gray: bool = False):
+        """Read-only numpy array of the RGB (or grayscale) pixels."""
+        if np is None:
+            raise ImportError("numpy is required for Frame.array()")
+
+        def compute():
+            arr = np.asarray(self.gray() if gray else self.rgb())
+            arr.flags.writeable = False
+            return arr
+
+        return self.memo(('array', gray), compute)
+
+    def thumbnail(self, size: Tuple[int, int],
+                  resample: int = Image.Resampling.LANCZOS) -> Image.Image:
+        """The image resized to exactly `size`."""
+        return self.memo(('thumbnail', size, resample), lambda: self.image.resize(size, resample))
+
+    def digest(self, algorithm: str = 'md5') -> str:
+        """Hex digest of the raw pixel bytes."""
+        return self.memo(('digest', algorithm),
+                          lambda: hashlib.new(algorithm, self.image.tobytes()).hexdigest())
+
+    def thumbnail_digest(self, size: Tuple[int, int], algorithm: str = 'md5') -> str:
+        """Hex digest of a LANCZOS thumbnail - a cheap content key for caches."""
+        return self.memo(('thumbnail_digest', size, algorithm),
+                          lambda: hashlib.new(algorithm, self.thumbnail(size).tobytes()).hexdigest())
+
+    def encode(self, format: str = 'JPEG', quality: int = 85, max_size: Optional[int] = None) -> bytes:
+        """
+        Encoded image file bytes.
+
+        Args:
+            format: 'JPEG' or 'PNG' (PNG is saved with optimize=True)
+            quality: JPEG quality
+            max_size: Downscale so neither side exceeds this (keeps aspect)
+        """
+        width, height = self.image.size
+        if max_size is not None and max(width, height) <= max_size:
+            max_size = None  # same bytes as the unscaled encoding
+
+        def compute():
+            image = self.rgb() if format == 'JPEG' else self.image
+            if max_size is not None:
+                ratio = max_size / max(width, height)
+                image = image.resize((int(width * ratio), int(height * ratio)), Image.Resampling.LANCZOS)
+            buffer = BytesIO()
+            if format == 'PNG':
+                image.save(buffer, format='PNG', optimize=True)
+            else:
+                image.save(buffer, format=format, quality=quality)
+            return buffer.getvalue()
+
+        return self.memo(('encode', format, quality, max_size), compute)
+
+    def base64(self, format: str = 'JPEG', quality: int = 85, max_size: Optional[int] = None) -> str:
+        """Base64 text of encode() - the payload vision APIs expect."""
+        width, height = self.image.size
+        if max_size is not None and max(width, height) <= max_size:
+            max_size = None
+        return self.memo(('base64', format, quality, max_size),
+                          lambda: base64.b64encode(self.encode(format, quality, max_size)).decode('utf-8'))
+
+    # ------------------------------------------------------------------ geometry
+
+    def to_screen(self, x: float, y: float) -> Tuple[int, int]:
+        """Map a point in frame coordinates to absolute screen coordinates."""
+        return int(x) + self.offset[0], int(y) + self.offset[1]
+
+    def damage_since(self, other: Optional['Frame']) -> Optional[List[DamageRect]]:
+        """
+        Rects repainted between `other` and this frame, in frame coordinates.
+
+        Returns:
+            List of rects ([] if nothing changed), or None if unknown - the
+            frames come from different grabbers or cover different screen
+            areas, or damage was not tracked
+        """
+        if other is None:
+            return None
+        if other is self:
+            return []
+        if self.damage_log is None or other.damage_log is not self.damage_log:
+            return None
+        if other.seq > self.seq or other.screen_rect != self.screen_rect:
+            return None
+        damage = self.damage_log.between(other.seq, self.seq)
+        if damage is None:
+            return None
+
+        # Keep only what falls inside this frame, relative to its origin
+        ox, oy = self.offset
+        width, height = self.size
+        rects = []
+        for x, y, w, h in damage:
+            x1, y1 = max(x - ox, 0), max(y - oy, 0)
+            x2, y2 = min(x + w - ox, width), min(y + h - oy, height)
+            if x2 > x1 and y2 > y1:
+                rects.append((x1, y1, x2 - x1, y2 - y1))
+        return rects
+
+    def unchanged_since(self, other: Optional['Frame']) -> bool:
+        """True only if damage tracking proves nothing was repainted since `other`."""
+        damage = self.damage_since(other)
+        return damage is not None and not damage
+
+    def damaged_tiles(self, other: Optional['Frame'], tile_size: int = 64) -> Optional[Set[Tuple[int, int]]]:
+        """
+        Grid cells (row, col) touched by damage since `other`.
+
+        Args:
+            other: Frame to compare against
+            tile_size: Tile edge in pixels
+
+        Returns:
+            Set of (row, col) tiles, or None if damage is unknown
+        """
+        damage = self.damage_since(other)
+        if damage is None:
+            return None
+        tiles = set()
+        for x1, y1, w, h in damage:
+            x2, y2 = x1 + w, y1 + h
+            for row in range(y1 // tile_size, (y2 - 1) // tile_size + 1):
+                for col in range(x1 // tile_size, (x2 - 1) // tile_size + 1):
+                    tiles.add((row, col))
+        return tiles
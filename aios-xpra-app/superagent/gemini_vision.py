@@ -8,12 +8,13 @@ import time
 import base64
 import json
 import logging
-from io import BytesIO
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 
 import requests
 from PIL import Image
 
+from .frames import Frame
+
 logger = logging.getLogger(__name__)
 
 # Try to import Vertex AI SDK (optional)
@@ -114,7 +115,7 @@ class GeminiVisionAPI:
     
     def analyze_screen(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any],
         mode: str = "action"
@@ -364,22 +365,11 @@ ADVANCED EXAMPLES:
 
 RESPOND WITH COMPACT JSON ONLY:"""
     
-    def _encode_image(self, screenshot: Image.Image) -> str:
-        """Encode image for Gemini API"""
-        
-        # Resize if too large
-        max_size = 1920
-        if screenshot.width > max_size or screenshot.height > max_size:
-            ratio = max_size / max(screenshot.width, screenshot.height)
-            new_size = (int(screenshot.width * ratio), int(screenshot.height * ratio))
-            screenshot = screenshot.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Convert to JPEG (Gemini prefers JPEG)
-        buffer = BytesIO()
-        screenshot.save(buffer, format='JPEG', quality=85)
-        img_bytes = buffer.getvalue()
-        
-        return base64.b64encode(img_bytes).decode('utf-8')
+    def _encode_image(self, screenshot: Union[Image.Image, Frame]) -> str:
+        """Encode image for Gemini API (PIL image or captured Frame)"""
+        # Gemini prefers JPEG; memoized on the frame, so the same screenshot
+        # is only resized and encoded once per iteration
+        return Frame.wrap(screenshot).base64('JPEG', quality=85, max_size=1920)
     
     def _call_gemini_api(self, prompt: str, img_base64: str, max_retries: int = 3) -> Dict:
         """Call Gemini API with retry logic - supports both Vertex AI and AI Studio"""
@@ -666,7 +656,7 @@ RESPOND WITH COMPACT JSON ONLY:"""
 
         return objects
 
-    def extract_text(self, screenshot: Image.Image) -> str:
+    def extract_text(self, screenshot: Union[Image.Image, Frame]) -> str:
         """Lightweight OCR fallback powered by Gemini"""
 
         prompt = (
@@ -746,7 +736,7 @@ RESPOND WITH COMPACT JSON ONLY:"""
     
     def get_action(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any],
         mode: str = "action"
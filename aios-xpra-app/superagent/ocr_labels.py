@@ -0,0 +1,207 @@
+"""
+OCR Labels - Text labels for detected elements without a caption model
+
+Most detected boxes are buttons, links, tabs and menu entries whose label
+is rendered text. One OCR pass over the element boxes labels all of them,
+so Florence-2 only has to caption boxes without legible text (pure icons):
+
+    words = extract_element_words(image, boxes)   # or words_from_boxes(...) for existing OCR output
+    labeled = assign_labels(result.elements, words)
+    icons = [e for e in result.elements if not e.text]
+
+Words are assigned to the smallest element box that contains most of the
+word, and joined in reading order (tesseract line, then x).
+"""
+
+import os
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Optional: pytesseract for OCR (install separately)
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+# Words below this tesseract confidence (0-100) are ignored
+OCR_MIN_CONFIDENCE = float(os.environ.get('OMNIPARSER_OCR_MIN_CONF', '60'))
+
+
+@dataclass
+class OcrWord:
+    """One recognized word, in image coordinates."""
+    text: str
+    box: Tuple[int, int, int, int]      # x1, y1, x2, y2
+    confidence: float                   # 0-100 (tesseract scale)
+    line: Tuple[int, int, int] = (0, 0, 0)  # (block, paragraph, line) for reading order
+
+
+def extract_words(image: Image.Image, min_confidence: float = OCR_MIN_CONFIDENCE) -> List[OcrWord]:
+    """
+    OCR the whole image once.
+
+    Args:
+        image: Screenshot
+        min_confidence: Minimum tesseract word confidence
+
+    Returns:
+        Recognized words ([] without pytesseract or on failure)
+    """
+    if not TESSERACT_AVAILABLE:
+        return []
+    try:
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+    except Exception as e:
+        logger.warning(f"OCR labeling failed: {e}")
+        return []
+
+    words = []
+    for i, text in enumerate(data['text']):
+        text = text.strip()
+        conf = float(data['conf'][i])
+        if not text or conf < min_confidence:
+            continue
+        x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
+        words.append(OcrWord(text=text, box=(x, y, x + w, y + h), confidence=conf,
+                             line=(data['block_num'][i], data['par_num'][i], data['line_num'][i])))
+    return words
+
+
+def extract_element_words(image: Image.Image, boxes: np.ndarray, pad: int = 4,
+                          min_confidence: float = OCR_MIN_CONFIDENCE) -> List[OcrWord]:
+    """
+    OCR only the pixels under element boxes, in one pass.
+
+    Text outside every box can never become a label, so the image is cut
+    to the boxes' union and the rest painted in the background color:
+    tesseract skips body text, photos and empty space.
+
+    Args:
+        image: Screenshot
+        boxes: (N, 4) x1, y1, x2, y2 element boxes in image coordinates
+        pad: Pixels kept around each box (glyphs touching its edge)
+        min_confidence: Minimum tesseract word confidence
+
+    Returns:
+        Recognized words in image coordinates
+    """
+    if not TESSERACT_AVAILABLE:
+        return []
+    masked = _mask_to_boxes(image, boxes, pad)
+    if masked is None:
+        return []
+    canvas, (left, top) = masked
+    words = extract_words(canvas, min_confidence)
+    for word in words:
+        x1, y1, x2, y2 = word.box
+        word.box = (x1 + left, y1 + top, x2 + left, y2 + top)
+    return words
+
+
+def _mask_to_boxes(image: Image.Image, boxes: np.ndarray,
+                   pad: int = 4) -> Optional[Tuple[Image.Image, Tuple[int, int]]]:
+    """Union crop of the boxes with outside pixels in the dominant color, and its origin."""
+    width, height = image.size
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    x1 = np.clip(np.floor(boxes[:, 0]) - pad, 0, width).astype(int)
+    y1 = np.clip(np.floor(boxes[:, 1]) - pad, 0, height).astype(int)
+    x2 = np.clip(np.ceil(boxes[:, 2]) + pad, 0, width).astype(int)
+    y2 = np.clip(np.ceil(boxes[:, 3]) + pad, 0, height).astype(int)
+    keep = (x2 > x1) & (y2 > y1)
+    if not keep.any():
+        return None
+    x1, y1, x2, y2 = x1[keep], y1[keep], x2[keep], y2[keep]
+    left, top = int(x1.min()), int(y1.min())
+
+    pixels = np.asarray(image.convert('RGB').crop((left, top, int(x2.max()), int(y2.max()))))
+    inside = np.zeros(pixels.shape[:2], dtype=bool)
+    for bx1, by1, bx2, by2 in zip(x1 - left, y1 - top, x2 - left, y2 - top):
+        inside[by1:by2, bx1:bx2] = True
+    background = np.median(pixels[::8, ::8].reshape(-1, 3), axis=0).astype(np.uint8)
+    canvas = np.where(inside[..., None], pixels, background)
+    return Image.fromarray(canvas), (left, top)
+
+
+def words_from_boxes(items: Iterable[Tuple[str, Tuple[int, int, int, int], float]],
+                     min_confidence: float = OCR_MIN_CONFIDENCE) -> List[OcrWord]:
+    """
+    Words from OCR output that was already computed elsewhere.
+
+    Args:
+        items: (text, (x, y, width, height), confidence 0-100) per word
+
+    Returns:
+        OcrWords (reading order falls back to top-to-bottom, left-to-right)
+    """
+    words = []
+    for text, (x, y, w, h), conf in items:
+        text = (text or "").strip()
+        if text and conf >= min_confidence:
+            words.append(OcrWord(text=text, box=(x, y, x + w, y + h), confidence=conf,
+                                 line=(0, 0, (y + h // 2) // 10)))  # ~same row
+    return words
+
+
+def is_legible(label: str) -> bool:
+    """True for labels worth showing instead of a caption (OCR noise on icons is not)."""
+    return sum(ch.isalnum() for ch in label) >= 2
+
+
+def assign_labels(elements: List[Any], words: List[OcrWord],
+                  offset: Tuple[int, int] = (0, 0), min_overlap: float = 0.6) -> int:
+    """
+    Set each element's ocr_text (and text, when legible) from the words inside it.
+
+    Args:
+        elements: UIElements (boxes in screen coordinates)
+        words: OCR words in image coordinates
+        offset: Screen position of the OCR'd image
+        min_overlap: Fraction of a word's area that must lie inside the box
+
+    Returns:
+        Number of elements that got a legible text label
+    """
+    if not elements or not words:
+        return 0
+
+    dx, dy = offset
+    boxes = np.array([[e.bbox.x1 - dx, e.bbox.y1 - dy, e.bbox.x2 - dx, e.bbox.y2 - dy]
+                      for e in elements], dtype=np.float32)
+    word_boxes = np.array([w.box for w in words], dtype=np.float32)
+
+    # (words, elements) fraction of each word inside each box
+    x1 = np.maximum(word_boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(word_boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(word_boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(word_boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    word_area = np.maximum((word_boxes[:, 2] - word_boxes[:, 0]) * (word_boxes[:, 3] - word_boxes[:, 1]), 1)
+    inside = inter / word_area[:, None] >= min_overlap
+
+    # Innermost box wins (a button inside a toolbar gets the word, not the toolbar)
+    box_area = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    owner = np.where(inside, box_area[None, :], np.inf).argmin(axis=1)
+    has_owner = inside.any(axis=1)
+
+    per_element: Dict[int, List[OcrWord]] = {}
+    for w, e in zip(np.nonzero(has_owner)[0], owner[has_owner]):
+        per_element.setdefault(int(e), []).append(words[int(w)])
+
+    labeled = 0
+    for index, element_words in per_element.items():
+        element_words.sort(key=lambda w: (w.line, w.box[0]))
+        label = " ".join(w.text for w in element_words)
+        element = elements[index]
+        element.ocr_text = label
+        if is_legible(label):
+            if not element.text:
+                element.text = label
+            labeled += 1
+    return labeled
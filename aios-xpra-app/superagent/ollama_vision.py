@@ -5,14 +5,14 @@ Uses local Llama 3.2 Vision 11B - FREE and NO RATE LIMITS
 
 import os
 import time
-import base64
 import json
 import requests
-from io import BytesIO
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 from PIL import Image
 import logging
 
+from .frames import Frame
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,7 +42,7 @@ class OllamaVisionAPI:
     
     def analyze_screen(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any],
         mode: str = "action"
@@ -100,7 +100,7 @@ class OllamaVisionAPI:
     
     def get_action(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any],
         mode: str = "action"
@@ -147,7 +147,7 @@ class OllamaVisionAPI:
     
     def verify_action(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         expected_outcome: str,
         context: Dict[str, Any]
     ) -> Dict[str, Any]:
@@ -237,23 +237,10 @@ DECISION RULES:
 
 RESPOND ONLY WITH JSON, NO OTHER TEXT."""
     
-    def _encode_image(self, screenshot: Image.Image) -> str:
-        """Encode image for Ollama API"""
-        
+    def _encode_image(self, screenshot: Union[Image.Image, Frame]) -> str:
+        """Encode image for Ollama API (PIL image or captured Frame)"""
         # Ollama prefers smaller images for faster processing
-        max_size = 1024
-        if screenshot.width > max_size or screenshot.height > max_size:
-            ratio = max_size / max(screenshot.width, screenshot.height)
-            new_size = (int(screenshot.width * ratio), int(screenshot.height * ratio))
-            screenshot = screenshot.resize(new_size, Image.Resampling.LANCZOS)
-            logger.info(f"Resized image to {new_size} for faster Ollama processing")
-        
-        # Convert to PNG
-        buffer = BytesIO()
-        screenshot.save(buffer, format='PNG', optimize=True)
-        img_bytes = buffer.getvalue()
-        
-        return base64.b64encode(img_bytes).decode('utf-8')
+        return Frame.wrap(screenshot).base64('PNG', max_size=1024)
     
     def _call_ollama_api(self, prompt: str, img_base64: str, max_retries: int = 2) -> Dict:
         """Call Ollama API with retry logic"""
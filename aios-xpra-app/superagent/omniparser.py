@@ -23,18 +23,31 @@ import os
 import sys
 import time
 import json
-import hashlib
 import logging
 import threading
+import re
 import subprocess
+import copy
 from io import BytesIO
 from pathlib import Path
+from collections import deque
 from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional, Tuple, Union
 from enum import Enum, auto
 
+import numpy as np
 from PIL import Image, ImageDraw, ImageFont
 
+from .frames import Frame
+from .perceptual_hash import to_hex, HammingIndex
+from .volatile_masks import Fingerprint, get_volatile_masks
+from .element_tracker import ElementTracker, TrackUpdate, iou_matrix
+from .change_detection import ScreenSnapshot, get_change_detector
+from .caption_cache import get_caption_cache, crop_hash
+from .ocr_labels import OcrWord, TESSERACT_AVAILABLE, extract_element_words, assign_labels
+from .fallback_detector import detect_boxes
+from .element_index import ElementIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -47,6 +60,33 @@ OMNIPARSER_CACHE_DIR = os.environ.get(
     'OMNIPARSER_CACHE_DIR',
     '/tmp/omniparser_cache'
 )
+# Element crops per Florence-2 generate() call
+OMNIPARSER_CAPTION_BATCH = int(os.environ.get('OMNIPARSER_CAPTION_BATCH', '16'))
+# Caption elements only when a consumer reads them (boxes return immediately)
+OMNIPARSER_LAZY_CAPTIONS = os.environ.get('OMNIPARSER_LAZY_CAPTIONS', '0') == '1'
+# Label text-bearing elements from OCR and caption only the rest (needs pytesseract;
+# runs only when captions are generated, and only over the element boxes)
+OMNIPARSER_OCR_LABELS = os.environ.get('OMNIPARSER_OCR_LABELS', '1') == '1'
+# Inference runtime: 'torch', 'onnx' (int8 ONNX Runtime) or 'openvino' (OpenVINO CPU)
+OMNIPARSER_BACKEND = os.environ.get('OMNIPARSER_BACKEND', 'torch').lower()
+OMNIPARSER_BACKENDS = ('torch', 'onnx', 'openvino')
+# Calibration dataset YAML (ultralytics format) for an int8 OpenVINO export;
+# without it the OpenVINO model uses FP16-compressed weights
+OMNIPARSER_CALIBRATION_DATA = os.environ.get('OMNIPARSER_CALIBRATION_DATA', '')
+# YOLO input sizes tried in order; detection escalates to the next one only when
+# the result suggests small targets were missed ("" = the model's default size)
+OMNIPARSER_IMGSZ_LADDER = tuple(int(v) for v in
+                                os.environ.get('OMNIPARSER_IMGSZ_LADDER', '640,960,1280').split(',') if v.strip())
+# Detect on overlapping full-resolution tiles (large/HiDPI screens, dense apps)
+OMNIPARSER_TILED = os.environ.get('OMNIPARSER_TILED', '0') == '1'
+OMNIPARSER_TILE_SIZE = int(os.environ.get('OMNIPARSER_TILE_SIZE', '640'))
+OMNIPARSER_TILE_OVERLAP = int(os.environ.get('OMNIPARSER_TILE_OVERLAP', '96'))  # px
+# Goals that name small targets go straight to the top of the ladder
+_SMALL_TARGET_GOAL = re.compile(
+    r'\b(icon|checkbox|check box|radio|toggle|favicon|arrow|caret|chevron|kebab|'
+    r'hamburger|three dots|ellipsis|close button|tiny|small|star|thumbnail|badge)\b', re.I)
+# Incremental parses fall back to a full parse above this changed-area fraction
+OMNIPARSER_INCREMENTAL_MAX_AREA = float(os.environ.get('OMNIPARSER_INCREMENTAL_MAX_AREA', '0.4'))
 
 
 class ElementType(Enum):
@@ -134,24 +174,67 @@ class BoundingBox:
         return [self.x1, self.y1, self.x2, self.y2]
 
 
-@dataclass
+@dataclass(init=False)
 class UIElement:
     """
     Represents a detected UI element from OmniParser.
+    
+    `description` is a property: reading it captions a lazily parsed
+    element on first access, assigning it cancels the pending caption.
     """
     id: int
     element_type: ElementType
     bbox: BoundingBox
     text: str = ""
-    description: str = ""
     confidence: float = 0.0
     is_interactable: bool = True
     interaction_types: List[InteractionType] = field(default_factory=list)
     ocr_text: str = ""
+    track_id: Optional[int] = None  # stable across frames (set by ElementTracker)
+    crop_hash: Optional[str] = field(default=None, repr=False, compare=False)  # hash of the parsed crop (ElementTracker)
+    _description: str = field(default="", repr=False, compare=False)
+    caption_pending: bool = field(default=False, repr=False, compare=False)
+    _captioner: Optional['LazyCaptioner'] = field(default=None, repr=False, compare=False)
+    
+    def __init__(self, id: int, element_type: ElementType, bbox: BoundingBox, text: str = "",
+                 description: str = "", confidence: float = 0.0, is_interactable: bool = True,
+                 interaction_types: Optional[List[InteractionType]] = None, ocr_text: str = "",
+                 track_id: Optional[int] = None, crop_hash: Optional[str] = None):
+        self.id = id
+        self.element_type = element_type
+        self.bbox = bbox
+        self.text = text
+        self.confidence = confidence
+        self.is_interactable = is_interactable
+        self.interaction_types = [] if interaction_types is None else interaction_types
+        self.ocr_text = ocr_text
+        self.track_id = track_id
+        self.crop_hash = crop_hash
+        self._description = description
+        self.caption_pending = False
+        self._captioner = None
+    
+    @property
+    def description(self) -> str:
+        """Caption (captioning a lazily parsed element now if still pending)."""
+        if self.caption_pending and self._captioner is not None:
+            self._captioner.caption([self])
+        return self._description
+    
+    @description.setter
+    def description(self, value: str):
+        self._description = value
+        self.caption_pending = False
+    
+    @property
+    def cached_description(self) -> str:
+        """Description without triggering a lazy caption."""
+        return self._description
     
     def to_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
+            'track_id': self.track_id,
             'type': self.element_type.name.lower(),
             'bbox': self.bbox.to_dict(),
             'center': self.bbox.center_int,
@@ -175,9 +258,59 @@ class UIElement:
         return f"[{self.id}] {interactable_str} \"{label}\" at ({cx}, {cy})"
 
 
+def ensure_captions(elements: List[UIElement]):
+    """Caption every lazily parsed element in `elements` in as few batches as possible."""
+    by_captioner: Dict[int, Tuple['LazyCaptioner', List[UIElement]]] = {}
+    for element in elements:
+        if element.caption_pending and element._captioner is not None:
+            entry = by_captioner.setdefault(id(element._captioner), (element._captioner, []))
+            entry[1].append(element)
+    for captioner, pending in by_captioner.values():
+        captioner.caption(pending)
+
+
+class LazyCaptioner:
+    """
+    Captions the elements of one parse on demand.
+    
+    Holds the parsed image until released; a released captioner leaves its
+    elements pending (description reads return "") until revived with an
+    image of the same screen.
+    """
+    
+    def __init__(self, parser: 'OmniParserV2', image: Image.Image, offset: Tuple[int, int]):
+        self.parser = parser
+        self.image: Optional[Image.Image] = image
+        self.offset = offset
+        self._lock = threading.Lock()
+    
+    def caption(self, elements: List[UIElement]):
+        """Caption the given elements that are still pending (one batched call)."""
+        with self._lock:
+            pending = [e for e in elements if e.caption_pending and e._captioner is self]
+            if not pending or self.image is None:
+                return
+            crops = [self.parser._crop_element(self.image, e, self.offset) for e in pending]
+            captions = self.parser._caption_crops(crops)
+            for element, caption in zip(pending, captions):
+                self.parser._apply_caption(element, caption)
+                element._captioner = None
+            self.parser.lazy_captions_generated += len(pending)
+    
+    def release(self):
+        """Drop the image (pending elements stay pending)."""
+        self.image = None
+
+
 @dataclass
 class ParseResult:
-    """Complete result of parsing a screenshot with OmniParser."""
+    """
+    Complete result of parsing a screenshot with OmniParser.
+    
+    Element bboxes are in screen coordinates: when the parsed image was a
+    window-scoped Frame they are already shifted by `offset`, while
+    screen_size stays the size of the parsed image.
+    """
     elements: List[UIElement]
     screen_size: Tuple[int, int]
     parse_time_ms: float
@@ -185,28 +318,65 @@ class ParseResult:
     interactable_count: int
     model_version: str = "v2.0"
     raw_detections: List[Dict] = field(default_factory=list)
+    offset: Tuple[int, int] = (0, 0)
+    tracking: Optional[TrackUpdate] = None  # element diff vs. the previous parse
+    imgsz: Optional[int] = None  # effective YOLO input size (native size when tiled)
+    timings: Dict[str, float] = field(default_factory=dict)  # ms per stage (detect, predict, ocr, ...)
+    _index: Optional[ElementIndex] = field(default=None, init=False, repr=False, compare=False)
     
     def get_interactable_elements(self) -> List[UIElement]:
         return [e for e in self.elements if e.is_interactable]
     
+    @property
+    def index(self) -> ElementIndex:
+        """Lookup indexes over the elements (rebuilt when the list is replaced or resized)."""
+        if self._index is None or not self._index.matches(self.elements):
+            self._index = ElementIndex(
+                self.elements,
+                box=lambda e: (e.bbox.x1, e.bbox.y1, e.bbox.x2, e.bbox.y2),
+                text=lambda e: e.text + e.description + e.ocr_text)
+        return self._index
+    
+    def reindex(self):
+        """Drop the indexes after editing elements in place (ids, boxes, labels)."""
+        self._index = None
+    
     def get_element_by_id(self, element_id: int) -> Optional[UIElement]:
-        for element in self.elements:
-            if element.id == element_id:
-                return element
-        return None
+        matches = self.index.grouped('id', lambda e: e.id).get(element_id)
+        return matches[0] if matches else None
+    
+    def get_element_by_track(self, track_id: int) -> Optional[UIElement]:
+        matches = self.index.grouped('track_id', lambda e: e.track_id).get(track_id)
+        return matches[0] if matches else None
+    
+    def ensure_captions(self, elements: Optional[List[UIElement]] = None):
+        """Caption lazily parsed elements (all, or just `elements`) in batch."""
+        ensure_captions(self.elements if elements is None else elements)
+    
+    def _text_index(self) -> ElementIndex:
+        """The index, with every caption in place before texts get indexed."""
+        index = self.index
+        if not index.has_text:
+            self.ensure_captions()
+        return index
     
     def find_elements_by_text(self, text: str, partial: bool = True) -> List[UIElement]:
-        text_lower = text.lower()
-        results = []
-        for element in self.elements:
-            search_text = (element.text + element.description + element.ocr_text).lower()
-            if partial:
-                if text_lower in search_text:
-                    results.append(element)
-            else:
-                if text_lower == search_text:
-                    results.append(element)
-        return results
+        if partial:
+            return self._text_index().contains(text)
+        return self._text_index().equals(text)
+    
+    def find_similar_elements(self, text: str, min_similarity: float = 0.5,
+                              limit: int = 10) -> List[Tuple[UIElement, float]]:
+        """Elements whose label is close to `text` (OCR typos, partial labels), best first."""
+        return self._text_index().similar(text, min_similarity, limit)
+    
+    def elements_at(self, x: float, y: float) -> List[UIElement]:
+        """Elements whose box contains the point (screen coordinates)."""
+        return self.index.at(x, y)
+    
+    def elements_in(self, x1: float, y1: float, x2: float, y2: float) -> List[UIElement]:
+        """Elements whose box intersects the region (screen coordinates)."""
+        return self.index.overlapping((x1, y1, x2, y2))
     
     def to_prompt_context(self, max_elements: int = 30) -> str:
         """Generate structured context for LLM prompt."""
@@ -222,6 +392,8 @@ class ParseResult:
         
         prioritized = interactable + non_interactable
         
+        # Only elements that make it into the prompt need captions
+        self.ensure_captions(prioritized[:max_elements])
         for element in prioritized[:max_elements]:
             lines.append(element.to_prompt_string())
         
@@ -238,6 +410,10 @@ class OmniParserModelLoader:
     Models required:
     1. icon_detect/ - YOLOv8 model for element detection
     2. icon_caption_florence/ - Florence-2 model for element description
+    
+    With OMNIPARSER_BACKEND=onnx or openvino the YOLO model is exported once
+    (next to the weights) and run by that CPU runtime through ultralytics,
+    and Florence-2 on CPU gets int8 dynamic quantization of its Linear layers.
     """
     
     _instance = None
@@ -260,6 +436,9 @@ class OmniParserModelLoader:
         self.icon_detect_model = None
         self.icon_caption_model = None
         self.icon_caption_processor = None
+        self.backend = OMNIPARSER_BACKEND if OMNIPARSER_BACKEND in OMNIPARSER_BACKENDS else 'torch'
+        self.detect_backend: Optional[str] = None   # runtime the detector actually uses
+        self.caption_precision: Optional[str] = None  # 'fp16', 'fp32' or 'int8' once Florence-2 loads
         self._models_loaded = False
         self._load_error = None
         
@@ -318,8 +497,7 @@ class OmniParserModelLoader:
             return False
         
         try:
-            # Import required libraries
-            from ultralytics import YOLO
+            # Import required libraries (ultralytics is imported by load_icon_detector)
             import torch
             
             # Determine device
@@ -333,8 +511,8 @@ class OmniParserModelLoader:
             # Load icon detection model (YOLOv8) - REQUIRED
             icon_detect_path = self.weights_dir / "icon_detect" / "model.pt"
             if icon_detect_path.exists():
-                self.icon_detect_model = YOLO(str(icon_detect_path))
-                logger.info("✅ Loaded icon detection model (YOLOv8)")
+                self.icon_detect_model, self.detect_backend = self.load_icon_detector(self.backend)
+                logger.info("✅ Loaded icon detection model (YOLOv8, %s)", self.detect_backend)
             else:
                 logger.error("Icon detection model not found at %s", icon_detect_path)
                 return False
@@ -354,12 +532,16 @@ class OmniParserModelLoader:
                         trust_remote_code=True,
                         torch_dtype=torch.float16 if self.device == "cuda" else torch.float32
                     ).to(self.device)
-                    logger.info("✅ Loaded icon caption model (Florence-2)")
+                    self.caption_precision = "fp16" if self.device == "cuda" else "fp32"
+                    if self.backend != 'torch' and self.device == "cpu":
+                        self.icon_caption_model = self._quantize_caption_model(self.icon_caption_model)
+                    logger.info("✅ Loaded icon caption model (Florence-2, %s)", self.caption_precision)
                 except Exception as e:
                     logger.warning("⚠️  Florence-2 caption model failed to load: %s", e)
                     logger.warning("   Continuing with YOLO detection only (no element descriptions)")
                     self.icon_caption_model = None
                     self.icon_caption_processor = None
+                    self.caption_precision = None
             else:
                 logger.warning("Icon caption model not found at %s", icon_caption_path)
                 self.icon_caption_model = None
@@ -379,6 +561,75 @@ class OmniParserModelLoader:
             logger.error("Failed to load OmniParser models: %s", e)
             return False
     
+    def export_icon_detector(self, backend: str) -> Path:
+        """
+        Export icon_detect/model.pt for a CPU runtime (cached next to the weights).
+        
+        Args:
+            backend: 'onnx' (dynamic-shape ONNX, int8 dynamic quantization)
+                or 'openvino' (OpenVINO IR, int8 with calibration data)
+            
+        Returns:
+            Path of the exported model
+        """
+        from ultralytics import YOLO
+        
+        pt_path = self.weights_dir / "icon_detect" / "model.pt"
+        if backend == 'onnx':
+            target = pt_path.with_name("model.int8.onnx")
+            if target.exists() and target.stat().st_mtime >= pt_path.stat().st_mtime:
+                return target
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            logger.info("Exporting icon detector to ONNX (int8)...")
+            exported = YOLO(str(pt_path)).export(format='onnx', dynamic=True, simplify=True)
+            quantize_dynamic(str(exported), str(target), weight_type=QuantType.QUInt8)
+            return target
+        
+        if backend == 'openvino':
+            int8 = bool(OMNIPARSER_CALIBRATION_DATA)
+            target = pt_path.with_name(f"model_{'int8_' if int8 else ''}openvino_model")
+            if target.exists() and target.stat().st_mtime >= pt_path.stat().st_mtime:
+                return target
+            logger.info("Exporting icon detector to OpenVINO (%s)...", "int8" if int8 else "fp16")
+            options = dict(format='openvino', dynamic=True)
+            if int8:
+                options.update(int8=True, data=OMNIPARSER_CALIBRATION_DATA)
+            else:
+                options.update(half=True)
+            return Path(YOLO(str(pt_path)).export(**options))
+        
+        raise ValueError(f"Unknown OmniParser backend: {backend}")
+    
+    def load_icon_detector(self, backend: str) -> Tuple[Any, str]:
+        """
+        Load the YOLO icon detector for a backend.
+        
+        Returns:
+            (model, backend actually used) - falls back to torch if the
+            export or the runtime is unavailable
+        """
+        from ultralytics import YOLO
+        
+        if backend != 'torch':
+            try:
+                return YOLO(str(self.export_icon_detector(backend)), task='detect'), backend
+            except Exception as e:
+                logger.warning("⚠️  %s icon detector unavailable (%s), using torch", backend, e)
+        return YOLO(str(self.weights_dir / "icon_detect" / "model.pt")), 'torch'
+    
+    def _quantize_caption_model(self, model):
+        """int8 dynamic quantization of Florence-2's Linear layers (CPU only)."""
+        import torch
+        
+        try:
+            quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.caption_precision = "int8"
+            logger.info("Florence-2 quantized to int8 for CPU inference")
+            return quantized
+        except Exception as e:
+            logger.warning("⚠️  Florence-2 int8 quantization failed (%s), keeping float32", e)
+            return model
+    
     @property
     def is_loaded(self) -> bool:
         return self._models_loaded
@@ -412,7 +663,15 @@ class OmniParserV2:
                  min_confidence: float = 0.3,
                  max_elements: int = 100,
                  generate_captions: bool = True,
-                 auto_download: bool = True):
+                 auto_download: bool = True,
+                 track_elements: bool = True,
+                 caption_batch_size: int = OMNIPARSER_CAPTION_BATCH,
+                 lazy_captions: bool = OMNIPARSER_LAZY_CAPTIONS,
+                 caption_cache: bool = True,
+                 ocr_labels: bool = OMNIPARSER_OCR_LABELS,
+                 tiled_detection: bool = OMNIPARSER_TILED,
+                 tile_size: int = OMNIPARSER_TILE_SIZE,
+                 tile_overlap: int = OMNIPARSER_TILE_OVERLAP):
         """
         Initialize OmniParser V2.
         
@@ -423,12 +682,32 @@ class OmniParserV2:
             max_elements: Maximum elements to return
             generate_captions: Generate descriptions for elements
             auto_download: Auto-download weights if not present
+            track_elements: Give elements stable track IDs across parses
+            caption_batch_size: Element crops captioned per model call
+            lazy_captions: Return boxes immediately and caption elements only
+                when their description is read (or ensure_captions() is called)
+            caption_cache: Reuse captions of previously seen icon crops
+                (in memory and in a SQLite file shared across processes)
+            ocr_labels: Use OCR text as the label of elements that have
+                legible text, so Florence-2 only captions the rest (OCR runs
+                only while captions are generated)
+            tiled_detection: Detect on overlapping tiles at full resolution
+                (one batched predict) instead of one downscaled pass
+            tile_size: Tile edge in pixels (also the YOLO input size)
+            tile_overlap: Pixels shared by neighbouring tiles; should exceed
+                the largest element that must not be cut
         """
         self.cache_enabled = cache_enabled
         self.cache_max_size = cache_max_size
         self.min_confidence = min_confidence
         self.max_elements = max_elements
         self.generate_captions = generate_captions
+        self.caption_batch_size = max(1, caption_batch_size)
+        self.lazy_captions = lazy_captions
+        self.ocr_labels = ocr_labels and TESSERACT_AVAILABLE
+        self.tiled_detection = tiled_detection
+        self.tile_size = max(64, tile_size)
+        self.tile_overlap = min(max(0, tile_overlap), self.tile_size // 2)
         self.auto_download = auto_download
         
         # Model loader (singleton)
@@ -436,16 +715,78 @@ class OmniParserV2:
         
         # Result cache
         self._cache: Dict[str, ParseResult] = {}
+        self._cache_index = HammingIndex()  # near-duplicate screens share a result
+        self._cache_raw: Dict[str, int] = {}  # unmasked hashes, for mask hit metrics
+        self._cache_snapshots: Dict[str, ScreenSnapshot] = {}  # to confirm hits against
+        self.masks = get_volatile_masks()
         self._cache_lock = threading.Lock()
         
+        # Lazy captioners still holding their image (oldest released first)
+        self._captioners: deque = deque()
+        self._max_live_captioners = 4
+        
+        # Cross-frame element identities
+        self.tracker = ElementTracker() if track_elements else None
+        
+        # Last parsed frame - X Damage can prove the next one is identical
+        self._last_frame: Optional[Frame] = None
+        self._last_frame_result: Optional[ParseResult] = None
+        self._last_parsed: Optional[Frame] = None  # any input, for incremental diffs
+        self._last_parsed_result: Optional[ParseResult] = None
+        
+        # Detection resolution ladder
+        self.imgsz_ladder = sorted(OMNIPARSER_IMGSZ_LADDER)
+        self.ladder_min_confidence = 0.45  # median detection confidence
+        self.ladder_small_px = 10          # box side (model pixels) below which targets are "small"
+        self.ladder_small_fraction = 0.25
+        self.ladder_dense_elements = 120   # elements per 640x640 of model input
+        self._ladder_history: Dict[Optional[str], deque] = {}  # app -> recent final rungs
+        
+        # Incremental parsing
+        self.incremental_max_area = OMNIPARSER_INCREMENTAL_MAX_AREA
+        self.incremental_margin = 24   # px of context around changed regions
+        self.incremental_iou = 0.5     # NMS threshold when merging kept and fresh boxes
+        
         # Statistics
         self.total_parses = 0
         self.cache_hits = 0
+        self.near_hits = 0
+        self.cache_rejects = 0            # fingerprint matches whose pixels had changed
+        self.damage_skips = 0
+        self.captions_generated = 0
+        self.captions_deferred = 0
+        self.lazy_captions_generated = 0
+        self.caption_model_calls = 0      # crops that actually went through Florence-2
+        self.caption_model_ms = 0.0
+        self.ocr_runs = 0
+        self.ocr_time_ms = 0.0
+        self.ocr_elements = 0             # elements considered for OCR labels
+        self.ocr_labeled = 0
+        self.captions_bypassed = 0        # captions not needed thanks to OCR labels
+        self.tiled_parses = 0
+        self.tiles_detected = 0
+        self.ladder_passes = 0            # YOLO passes run by the ladder
+        self.ladder_rungs: Dict[int, int] = {}        # imgsz -> parses that ended there
+        self.ladder_escalations: Dict[str, int] = {}  # reason -> count
+        self.incremental_parses = 0
+        self.incremental_fallbacks = 0
+        self.incremental_area = 0.0       # summed changed-area fraction
+        self.incremental_reused = 0       # elements kept from previous results
         self.total_parse_time = 0.0
+        self.stage_time_ms: Dict[str, float] = {}  # summed per-stage timings of fresh parses
         
         # Try to load models
         self._init_models()
         
+        # Captions by icon-crop fingerprint (namespaced by caption weights and
+        # precision - int8 and float captions of the same crop differ)
+        self.caption_cache = None
+        if caption_cache:
+            weights = self.model_loader.weights_dir / "icon_caption_florence" / "model.safetensors"
+            version = weights.stat().st_size if weights.exists() else 0
+            precision = self.model_loader.caption_precision or "none"
+            self.caption_cache = get_caption_cache(f"florence2-{version}-{precision}:<CAPTION>")
+        
         logger.info("OmniParserV2 initialized (cache=%s, captions=%s)",
                    cache_enabled, generate_captions)
     
@@ -458,14 +799,31 @@ class OmniParserV2:
         if not self.model_loader.load_models():
             logger.warning("OmniParser models not loaded, will use fallback")
     
-    def parse(self, image: Union[Image.Image, str, bytes],
-             force_refresh: bool = False) -> ParseResult:
+    def parse(self, image: Union[Image.Image, Frame, str, bytes],
+             force_refresh: bool = False,
+             ocr_words: Optional[List[OcrWord]] = None,
+             previous_result: Optional[ParseResult] = None,
+             changed_regions: Optional[List[Tuple[int, int, int, int]]] = None,
+             goal: Optional[str] = None) -> ParseResult:
         """
         Parse a screenshot and detect all UI elements.
         
+        With previous_result, the parse is incremental: detection only runs
+        on the (dilated) changed regions, elements elsewhere are kept with
+        their captions, and both sets are merged with NMS. Falls back to a
+        full parse when the change is large or cannot be determined.
+        
         Args:
-            image: PIL Image, file path, or bytes
+            image: PIL Image, captured Frame, file path, or bytes
             force_refresh: Bypass cache
+            ocr_words: OCR of this image the caller already has (image
+                coordinates); saves the OCR pass of the labeling stage
+            previous_result: Parse of an earlier screenshot of the same area
+            changed_regions: (x, y, width, height) image regions that changed
+                since previous_result (default: from X Damage or a diff
+                against the last parsed screenshot)
+            goal: Current task; goals about small targets (icons,
+                checkboxes, ...) detect at the highest ladder resolution
             
         Returns:
             ParseResult with all detected elements
@@ -473,6 +831,24 @@ class OmniParserV2:
         start_time = time.time()
         self.total_parses += 1
         
+        # Frames with damage info skip parsing entirely when nothing was repainted
+        frame = None
+        offset = (0, 0)
+        if isinstance(image, Frame):
+            frame = image
+            image = frame.image
+            offset = frame.offset
+            if self.cache_enabled and not force_refresh:
+                with self._cache_lock:
+                    last_frame, last_result = self._last_frame, self._last_frame_result
+                if last_result is not None and frame.unchanged_since(last_frame):
+                    self.cache_hits += 1
+                    self.damage_skips += 1
+                    logger.debug("No damage since frame %d - reusing parse", last_frame.seq)
+                    with self._cache_lock:
+                        self._last_frame = frame
+                    return self._track(last_result)
+        
         # Load image if needed
         if isinstance(image, str):
             image = Image.open(image)
@@ -483,31 +859,59 @@ class OmniParserV2:
         if image.mode != 'RGB':
             image = image.convert('RGB')
         
-        # Check cache
-        if self.cache_enabled and not force_refresh:
-            cache_key = self._compute_image_hash(image)
-            cached = self._get_cached(cache_key)
+        current = frame if frame is not None else Frame.wrap(image)
+        
+        # Check cache (results are in screen coordinates, so the key
+        # includes where the image sits on screen)
+        cache_key = None
+        fingerprint = None
+        if self.cache_enabled:
+            fingerprint = self.masks.fingerprint(current)
+            cache_key = to_hex(fingerprint.hash)
+            if offset != (0, 0):
+                cache_key += f"@{offset[0]},{offset[1]}"
+        if cache_key and not force_refresh:
+            cached = self._get_cached(cache_key, fingerprint, current)
+            if cached is not None and self._too_coarse_for(cached, image, goal):
+                cached = None
             if cached is not None:
                 self.cache_hits += 1
                 logger.debug("Cache hit for image hash %s", cache_key[:16])
-                return cached
+                self._remember_parsed(frame, current, cached)
+                self._revive_captions(cached, image)
+                return self._track(cached)
         
-        # Check if detection model is loaded (YOLO is required, Florence-2 is optional)
-        if not self.model_loader.has_detection:
-            logger.warning("OmniParser YOLO model not loaded, using fallback detection")
-            result = self._fallback_parse(image)
-        else:
-            result = self._run_omniparser(image)
+        result = None
+        if previous_result is not None:
+            if changed_regions is None:
+                changed_regions = self._changed_regions(current, previous_result)
+            if changed_regions is not None and not changed_regions:
+                self.cache_hits += 1  # nothing changed since previous_result
+                self._remember_parsed(frame, current, previous_result)
+                return self._track(previous_result)
+            result = self._parse_incremental(image, offset, previous_result,
+                                             changed_regions, ocr_words, goal)
         
-        # Filter by confidence
-        result.elements = [e for e in result.elements 
-                          if e.confidence >= self.min_confidence]
+        if result is None:
+            stage = time.time()
+            result = self._detect(image, goal)
+            result.timings['detect'] = (time.time() - stage) * 1000
+            result.elements = self._place_elements(result.elements, offset)
+            result.offset = offset
+            self._label_and_caption(result.elements, image, offset, ocr_words, result.timings)
         
         # Limit elements
         if len(result.elements) > self.max_elements:
             result.elements.sort(key=lambda e: (-int(e.is_interactable), -e.confidence))
             result.elements = result.elements[:self.max_elements]
         
+        # Crop hashes tell the tracker which elements were repainted (kept ones have theirs)
+        stage = time.time()
+        for element in result.elements:
+            if element.crop_hash is None:
+                element.crop_hash = crop_hash(self._crop_element(image, element, offset))
+        result.timings['crop_hash'] = (time.time() - stage) * 1000
+        
         # Reassign IDs
         for i, element in enumerate(result.elements):
             element.id = i + 1
@@ -516,108 +920,484 @@ class OmniParserV2:
         result.element_count = len(result.elements)
         result.interactable_count = len(result.get_interactable_elements())
         
+        # Stable identities (and carried-over captions) before caching
+        stage = time.time()
+        result = self._track(result)
+        result.timings['track'] = (time.time() - stage) * 1000
+        
         # Record parse time
         result.parse_time_ms = (time.time() - start_time) * 1000
         self.total_parse_time += result.parse_time_ms
+        for name, ms in result.timings.items():
+            self.stage_time_ms[name] = self.stage_time_ms.get(name, 0.0) + ms
         
         # Cache result
-        if self.cache_enabled:
-            cache_key = self._compute_image_hash(image)
-            self._cache_result(cache_key, result)
+        if cache_key:
+            self._cache_result(cache_key, result, fingerprint.raw, self.masks.snapshot(current))
+        self._remember_parsed(frame, current, result)
         
         logger.info("OmniParser V2: Parsed %d elements (%d interactable) in %.1fms",
                    result.element_count, result.interactable_count, result.parse_time_ms)
         
         return result
     
-    def _run_omniparser(self, image: Image.Image) -> ParseResult:
-        """Run actual OmniParser V2 inference."""
-        import torch
+    def _detect(self, image: Image.Image, goal: Optional[str] = None) -> ParseResult:
+        """Detect elements (image coordinates, uncaptioned)."""
+        # YOLO is required, Florence-2 is optional
+        if not self.model_loader.has_detection:
+            logger.warning("OmniParser YOLO model not loaded, using fallback detection")
+            return self._fallback_parse(image)
+        if self.tiled_detection and max(image.size) > self.tile_size:
+            return self._detect_tiled(image)
+        if not self.imgsz_ladder:
+            return self._run_omniparser(image)
+        return self._detect_with_ladder(image, goal)
+    
+    def _too_coarse_for(self, result: ParseResult, image: Image.Image, goal: Optional[str]) -> bool:
+        """True if a small-target goal needs a finer detection than `result` had."""
+        if not (self.imgsz_ladder and goal and _SMALL_TARGET_GOAL.search(goal)):
+            return False
+        return result.imgsz is not None and result.imgsz < self._ladder_for(image.size)[-1]
+    
+    def _ladder_for(self, image_size: Tuple[int, int]) -> List[int]:
+        """Ladder rungs worth trying for an image (none far above its native size)."""
+        native = _native_imgsz(image_size)
+        rungs = [size for size in self.imgsz_ladder if size <= native]
+        return rungs or [self.imgsz_ladder[0]]
+    
+    def _detect_with_ladder(self, image: Image.Image, goal: Optional[str] = None) -> ParseResult:
+        """
+        Detect at the lowest useful input size, escalating while the result
+        looks like small targets were missed.
+        """
+        rungs = self._ladder_for(image.size)
+        app = self.masks.active_app
+        if goal and _SMALL_TARGET_GOAL.search(goal):
+            rung = len(rungs) - 1
+            self.ladder_escalations['goal'] = self.ladder_escalations.get('goal', 0) + 1
+        else:
+            rung = min(self._ladder_start(app), len(rungs) - 1)
+        first = rung
         
-        elements = []
+        detections, predict_ms = self._predict(image, imgsz=rungs[rung])
+        while rung + 1 < len(rungs):
+            reason = self._escalation_reason(detections, image.size, rungs[rung])
+            if reason is None:
+                break
+            logger.debug("Detection at imgsz=%d: %s - escalating", rungs[rung], reason)
+            self.ladder_escalations[reason] = self.ladder_escalations.get(reason, 0) + 1
+            rung += 1
+            detections, elapsed_ms = self._predict(image, imgsz=rungs[rung])
+            predict_ms += elapsed_ms
+        
+        result = self._detections_result(detections, image.size)
+        result.timings['predict'] = predict_ms
+        result.imgsz = rungs[rung]
+        self.ladder_passes += rung - first + 1
+        self.ladder_rungs[rungs[rung]] = self.ladder_rungs.get(rungs[rung], 0) + 1
+        self._ladder_history.setdefault(app, deque(maxlen=5)).append(rung)
+        return result
+    
+    def _ladder_start(self, app: Optional[str]) -> int:
+        """
+        First rung for an app: the lowest one any of its recent parses
+        settled on, so apps that always escalate skip the wasted low pass.
+        Every 8th parse probes from the bottom again.
+        """
+        history = self._ladder_history.get(app)
+        if not history or self.total_parses % 8 == 0:
+            return 0
+        return min(history)
+    
+    def _escalation_reason(self, detections: np.ndarray, image_size: Tuple[int, int],
+                           imgsz: int) -> Optional[str]:
+        """Why a detection pass should be repeated at higher resolution (None if it shouldn't)."""
+        detections = detections[detections[:, 4] >= self.min_confidence]
+        if not len(detections):
+            return None  # blank or loading screen - more pixels won't help
+        
+        confidences = np.sort(detections[:, 4])
+        if confidences[len(confidences) // 2] < self.ladder_min_confidence:
+            return 'low_confidence'
+        
+        scale = imgsz / max(image_size)  # model pixels per image pixel
+        sides = np.minimum(detections[:, 2] - detections[:, 0], detections[:, 3] - detections[:, 1])
+        if (sides * scale < self.ladder_small_px).sum() > self.ladder_small_fraction * len(detections):
+            return 'small_targets'
+        
+        if len(detections) / (imgsz / 640.0) ** 2 > self.ladder_dense_elements:
+            return 'dense'
+        return None
+    
+    def _place_elements(self, elements: List[UIElement], offset: Tuple[int, int],
+                        origin: Tuple[int, int] = (0, 0)) -> List[UIElement]:
+        """Drop low-confidence detections and map the rest to screen coordinates."""
+        elements = [e for e in elements if e.confidence >= self.min_confidence]
+        dx, dy = offset[0] + origin[0], offset[1] + origin[1]
+        if (dx, dy) != (0, 0):
+            for element in elements:
+                bbox = element.bbox
+                element.bbox = BoundingBox(bbox.x1 + dx, bbox.y1 + dy, bbox.x2 + dx, bbox.y2 + dy)
+        return elements
+    
+    def _label_and_caption(self, elements: List[UIElement], image: Image.Image,
+                           offset: Tuple[int, int], ocr_words: Optional[List[OcrWord]],
+                           timings: Optional[Dict[str, float]] = None):
+        """OCR labels, then captions for the elements still without text."""
+        timings = {} if timings is None else timings
+        
+        # Text-bearing elements get their OCR text as label. OCR only pays
+        # for itself by sparing captions; words the caller has are free.
+        captioning = self.generate_captions and self.model_loader.has_caption
+        needs_caption = elements
+        if self.ocr_labels and elements and (captioning or ocr_words is not None):
+            stage = time.time()
+            needs_caption = self._label_from_ocr(elements, image, offset, ocr_words)
+            timings['ocr'] = timings.get('ocr', 0.0) + (time.time() - stage) * 1000
+        
+        # Captions only for the elements that survived filtering and have no text
+        stage = time.time()
+        if captioning and elements:
+            self.captions_bypassed += len(elements) - len(needs_caption)
+            if self.lazy_captions:
+                self._defer_captions(needs_caption, image, offset)
+            elif needs_caption:
+                crops = [self._crop_element(image, e, offset) for e in needs_caption]
+                for element, caption in zip(needs_caption, self._caption_crops(crops)):
+                    self._apply_caption(element, caption)
+            timings['caption'] = timings.get('caption', 0.0) + (time.time() - stage) * 1000
+    
+    def _changed_regions(self, current: Frame,
+                         previous_result: ParseResult) -> Optional[List[Tuple[int, int, int, int]]]:
+        """Regions changed since previous_result was parsed (None if unknown)."""
+        with self._cache_lock:
+            last_frame, last_result = self._last_parsed, self._last_parsed_result
+        if last_result is not previous_result or last_frame is None:
+            return None
+        if last_frame.size != current.size or last_frame.offset != current.offset:
+            return None
+        damage = current.damage_since(last_frame)
+        if damage is not None:
+            return damage
+        return get_change_detector().compare(last_frame, current).boxes
+    
+    def _parse_incremental(self, image: Image.Image, offset: Tuple[int, int],
+                           previous: ParseResult, changed_regions: List[Tuple[int, int, int, int]],
+                           ocr_words: Optional[List[OcrWord]],
+                           goal: Optional[str] = None) -> Optional[ParseResult]:
+        """
+        Re-detect only the changed regions of the screen.
+        
+        Regions are detected at the scale of the previous result, so kept
+        and fresh elements come from the same effective resolution and the
+        merged result reports the previous imgsz truthfully.
+        
+        Returns:
+            Merged ParseResult, or None when a full parse is needed
+        """
+        width, height = image.size
+        if previous.screen_size != (width, height) or previous.offset != offset:
+            return None
+        if self._too_coarse_for(previous, image, goal):
+            self.incremental_fallbacks += 1
+            logger.debug("Previous imgsz=%s too coarse for goal - full parse", previous.imgsz)
+            return None
+        
+        dx, dy = offset
+        old_boxes = np.array([[e.bbox.x1 - dx, e.bbox.y1 - dy, e.bbox.x2 - dx, e.bbox.y2 - dy]
+                              for e in previous.elements], dtype=np.float32).reshape(-1, 4)
+        regions = _dilate_regions(changed_regions, old_boxes, (width, height),
+                                  margin=self.incremental_margin)
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions) / float(width * height)
+        if area > self.incremental_max_area:
+            self.incremental_fallbacks += 1
+            logger.debug("Changed area %.0f%% too large for an incremental parse", area * 100)
+            return None
+        
+        # Elements outside every region are unchanged (copies keep their captions)
+        touched = np.zeros(len(previous.elements), dtype=bool)
+        for x1, y1, x2, y2 in regions:
+            touched |= ((old_boxes[:, 0] < x2) & (old_boxes[:, 2] > x1) &
+                        (old_boxes[:, 1] < y2) & (old_boxes[:, 3] > y1))
+        kept = [copy.copy(e) for e, t in zip(previous.elements, touched) if not t]
+        
+        fresh: List[UIElement] = []
         raw_detections = []
+        timings: Dict[str, float] = {}
+        stage = time.time()
+        scale = previous.imgsz / float(_native_imgsz((width, height))) if previous.imgsz else None
+        for x1, y1, x2, y2 in regions:
+            detected = self._detect_region(image.crop((x1, y1, x2, y2)), scale)
+            fresh.extend(self._place_elements(detected.elements, offset, origin=(x1, y1)))
+            raw_detections.extend(detected.raw_detections)
+            for name, ms in detected.timings.items():
+                timings[name] = timings.get(name, 0.0) + ms
+        timings['detect'] = (time.time() - stage) * 1000
+        
+        # Merge both sources (a fresh box may overlap a kept one near a region edge)
+        merged = _nms(kept + fresh, self.incremental_iou)
+        fresh_ids = {id(e) for e in fresh}
+        fresh = [e for e in merged if id(e) in fresh_ids]
+        self._label_and_caption(fresh, image, offset, ocr_words, timings)
+        
+        self.incremental_parses += 1
+        self.incremental_area += area
+        self.incremental_reused += len(merged) - len(fresh)
+        return ParseResult(
+            elements=merged,
+            screen_size=(width, height),
+            parse_time_ms=0,
+            element_count=len(merged),
+            interactable_count=len([e for e in merged if e.is_interactable]),
+            model_version=previous.model_version,
+            raw_detections=raw_detections,
+            offset=offset,
+            imgsz=previous.imgsz,
+            timings=timings
+        )
+    
+    def _detect_region(self, crop: Image.Image, scale: Optional[float]) -> ParseResult:
+        """
+        Detect in a changed-region crop at a fixed model-pixels-per-image-pixel
+        `scale` (None: the model's size). Bypasses the ladder, so region
+        passes don't skew its history or statistics.
+        """
+        if not self.model_loader.has_detection:
+            return self._fallback_parse(crop)
+        imgsz = None
+        if scale is not None:
+            imgsz = _native_imgsz((round(crop.width * scale), round(crop.height * scale)))
+        return self._run_omniparser(crop, imgsz)
+    
+    def _run_omniparser(self, image: Image.Image, imgsz: Optional[int] = None) -> ParseResult:
+        """Run actual OmniParser V2 inference (at `imgsz`, default: the model's size)."""
+        detections, predict_ms = self._predict(image, imgsz)
+        result = self._detections_result(detections, image.size)
+        result.timings['predict'] = predict_ms
+        return result
+    
+    def _predict(self, image: Image.Image, imgsz: Optional[int] = None) -> Tuple[np.ndarray, float]:
+        """
+        Run YOLO icon detection on one image.
         
-        # Step 1: Run YOLO icon detection
+        Returns:
+            (N, 6) [x1, y1, x2, y2, conf, cls] detections and the time taken in ms
+        """
+        start = time.time()
+        detections = _yolo_detections(None)
         if self.model_loader.has_detection:
-            results = self.model_loader.icon_detect_model.predict(
-                source=image,
-                conf=self.min_confidence,
-                verbose=False
-            )
-            
+            results = self._yolo_predict([image], imgsz)
             if results and len(results) > 0:
-                result = results[0]
-                boxes = result.boxes
-                
-                for i, box in enumerate(boxes):
-                    # Get bounding box coordinates
-                    xyxy = box.xyxy[0].cpu().numpy()
-                    conf = float(box.conf[0].cpu().numpy())
-                    cls = int(box.cls[0].cpu().numpy()) if hasattr(box, 'cls') else 0
-                    
-                    bbox = BoundingBox(
-                        x1=float(xyxy[0]),
-                        y1=float(xyxy[1]),
-                        x2=float(xyxy[2]),
-                        y2=float(xyxy[3])
-                    )
-                    
-                    # Determine if interactable (class 0 = interactable in OmniParser)
-                    is_interactable = (cls == 0)
-                    
-                    element = UIElement(
-                        id=i + 1,
-                        element_type=ElementType.INTERACTABLE if is_interactable else ElementType.NON_INTERACTABLE,
-                        bbox=bbox,
-                        confidence=conf,
-                        is_interactable=is_interactable,
-                        interaction_types=[InteractionType.CLICKABLE] if is_interactable else []
-                    )
-                    
-                    elements.append(element)
-                    raw_detections.append({
-                        'bbox': bbox.to_list(),
-                        'conf': conf,
-                        'class': cls
-                    })
-        
-        # Step 2: Generate captions for each element
-        if self.generate_captions and self.model_loader.has_caption:
-            for element in elements:
-                try:
-                    # Crop element region
-                    x1, y1, x2, y2 = element.bbox.to_tuple()
-                    # Add small padding
-                    pad = 5
-                    x1 = max(0, x1 - pad)
-                    y1 = max(0, y1 - pad)
-                    x2 = min(image.width, x2 + pad)
-                    y2 = min(image.height, y2 + pad)
-                    
-                    crop = image.crop((x1, y1, x2, y2))
-                    
-                    # Generate caption
-                    description = self._generate_caption(crop)
-                    element.description = description
-                    
-                    # Infer element type from description
-                    element.element_type = self._infer_element_type(description)
-                    
-                except Exception as e:
-                    logger.debug("Caption generation failed for element %d: %s", element.id, e)
+                detections = _yolo_detections(results[0])
+        return detections, (time.time() - start) * 1000
+    
+    def _yolo_predict(self, images: List[Image.Image], imgsz: Optional[int] = None) -> List[Any]:
+        """One YOLO predict() call over a list of images (one ultralytics result per image)."""
+        options = {'imgsz': imgsz} if imgsz else {}
+        return self.model_loader.icon_detect_model.predict(
+            source=images,
+            conf=self.min_confidence,
+            verbose=False,
+            **options
+        )
+    
+    def _detections_result(self, detections: np.ndarray, image_size: Tuple[int, int]) -> ParseResult:
+        """
+        Build a ParseResult from a detection array.
+        
+        Confidence filtering and the max_elements cut run on the array, so
+        Python objects are only built for the elements that are kept.
+        """
+        start = time.time()
+        detections = _select_detections(detections, self.min_confidence, self.max_elements)
+        
+        elements = []
+        raw_detections = []
+        for i, (x1, y1, x2, y2, conf, cls) in enumerate(detections.tolist()):
+            bbox = BoundingBox(x1=x1, y1=y1, x2=x2, y2=y2)
+            cls = int(cls)
+            
+            # Determine if interactable (class 0 = interactable in OmniParser)
+            is_interactable = (cls == 0)
+            
+            elements.append(UIElement(
+                id=i + 1,
+                element_type=ElementType.INTERACTABLE if is_interactable else ElementType.NON_INTERACTABLE,
+                bbox=bbox,
+                confidence=conf,
+                is_interactable=is_interactable,
+                interaction_types=[InteractionType.CLICKABLE] if is_interactable else []
+            ))
+            raw_detections.append({
+                'bbox': [x1, y1, x2, y2],
+                'conf': conf,
+                'class': cls
+            })
         
         return ParseResult(
             elements=elements,
-            screen_size=(image.width, image.height),
+            screen_size=image_size,
             parse_time_ms=0,
             element_count=len(elements),
-            interactable_count=len([e for e in elements if e.is_interactable]),
+            interactable_count=int((detections[:, 5] == 0).sum()),
             model_version="v2.0",
-            raw_detections=raw_detections
+            raw_detections=raw_detections,
+            timings={'postprocess': (time.time() - start) * 1000}
         )
     
+    def _detect_tiled(self, image: Image.Image) -> ParseResult:
+        """
+        Detect on overlapping full-resolution tiles in one batch and merge
+        the boxes across tile borders.
+        """
+        start = time.time()
+        tiles = _tile_grid(image.size, self.tile_size, self.tile_overlap)
+        results = self._yolo_predict([image.crop(tile) for tile in tiles], self.tile_size)
+        predict_ms = (time.time() - start) * 1000
+        
+        parts = [_yolo_detections(result, origin=tile[:2]) for tile, result in zip(tiles, results)]
+        cut = [_touches_inner_edge(part[:, :4], tile, image.size) for tile, part in zip(tiles, parts)]
+        detections = np.concatenate(parts) if parts else _yolo_detections(None)
+        keep = _merge_tiled(detections, np.concatenate(cut) if cut else np.zeros(0, dtype=bool),
+                            self.incremental_iou)
+        
+        self.tiled_parses += 1
+        self.tiles_detected += len(tiles)
+        result = self._detections_result(detections[keep], image.size)
+        result.timings['predict'] = predict_ms
+        # Tiles are full-resolution crops, so the screen was seen at its native size
+        result.imgsz = _native_imgsz(image.size)
+        return result
+    
+    def _crop_element(self, image: Image.Image, element: UIElement,
+                      offset: Tuple[int, int] = (0, 0), pad: int = 5) -> Image.Image:
+        """Crop an element's region (with a little padding) for captioning."""
+        x1, y1, x2, y2 = element.bbox.to_tuple()
+        dx, dy = offset  # boxes are in screen coordinates, the image may not be
+        x1 = max(0, x1 - dx - pad)
+        y1 = max(0, y1 - dy - pad)
+        x2 = min(image.width, x2 - dx + pad)
+        y2 = min(image.height, y2 - dy + pad)
+        return image.crop((x1, y1, x2, y2))
+    
+    def _apply_caption(self, element: UIElement, description: str):
+        """Store a caption and the element type it implies."""
+        element.description = description
+        if description:
+            # Infer element type from description
+            element.element_type = self._infer_element_type(description)
+        self.captions_generated += 1
+    
+    def _label_from_ocr(self, elements: List[UIElement], image: Image.Image,
+                        offset: Tuple[int, int], words: Optional[List[OcrWord]]) -> List[UIElement]:
+        """Assign OCR text to elements; returns the elements still without text."""
+        if words is None:
+            # Only the boxes that could take a label (fresh elements of an
+            # incremental parse are already confined to the changed regions)
+            start = time.time()
+            dx, dy = offset
+            words = extract_element_words(image, np.array(
+                [[e.bbox.x1 - dx, e.bbox.y1 - dy, e.bbox.x2 - dx, e.bbox.y2 - dy]
+                 for e in elements if not e.text], dtype=np.float32).reshape(-1, 4))
+            self.ocr_runs += 1
+            self.ocr_time_ms += (time.time() - start) * 1000
+        self.ocr_elements += len(elements)
+        self.ocr_labeled += assign_labels(elements, words, offset)
+        return [e for e in elements if not e.text]
+    
+    def _defer_captions(self, elements: List[UIElement], image: Image.Image, offset: Tuple[int, int]):
+        """Mark elements for lazy captioning against this image."""
+        if not elements:
+            return
+        captioner = LazyCaptioner(self, image, offset)
+        pending = 0
+        for element in elements:
+            if not element.cached_description:
+                element._captioner = captioner
+                element.caption_pending = True
+                pending += 1
+        self.captions_deferred += pending
+        with self._cache_lock:
+            self._captioners.append(captioner)
+            while len(self._captioners) > self._max_live_captioners:
+                self._captioners.popleft().release()
+    
+    def _revive_captions(self, result: ParseResult, image: Image.Image):
+        """Give released captioners of a cached result the current (same) screen."""
+        for element in result.elements:
+            captioner = element._captioner
+            if element.caption_pending and captioner is not None and captioner.image is None:
+                captioner.image = image
+                with self._cache_lock:
+                    self._captioners.append(captioner)
+                    while len(self._captioners) > self._max_live_captioners:
+                        self._captioners.popleft().release()
+    
     def _generate_caption(self, image_crop: Image.Image) -> str:
         """Generate caption for an element using Florence-2."""
+        return self._generate_captions([image_crop], batch_size=1)[0]
+    
+    def _caption_crops(self, crops: List[Image.Image]) -> List[str]:
+        """Captions for element crops, from the caption cache where possible."""
+        if self.caption_cache is None:
+            return self._timed_captions(crops)
+        
+        keys = [self.caption_cache.key(crop) for crop in crops]
+        captions = self.caption_cache.get_many(keys)
+        # One model call per distinct uncached crop (repeated icons share it)
+        todo = {key: crop for key, crop in zip(keys, crops) if key not in captions}
+        if todo:
+            start = time.time()
+            generated = self._timed_captions(list(todo.values()))
+            self.caption_cache.record_cost(len(todo), (time.time() - start) * 1000)
+            generated = dict(zip(todo.keys(), generated))
+            self.caption_cache.put_many(generated)
+            captions.update(generated)
+        return [captions.get(key, "") for key in keys]
+    
+    def _timed_captions(self, crops: List[Image.Image]) -> List[str]:
+        """_generate_captions() with model time accounting."""
+        start = time.time()
+        captions = self._generate_captions(crops)
+        self.caption_model_calls += len(crops)
+        self.caption_model_ms += (time.time() - start) * 1000
+        return captions
+    
+    def _generate_captions(self, crops: List[Image.Image],
+                           batch_size: Optional[int] = None) -> List[str]:
+        """
+        Caption element crops with Florence-2 in mini-batches.
+        
+        The processor resizes every crop to the model's input size and pads
+        the prompt tokens, so a batch yields the same captions as one
+        generate() call per crop at a fraction of the cost.
+        
+        Args:
+            crops: Element crops
+            batch_size: Crops per generate() call (default: caption_batch_size)
+            
+        Returns:
+            One caption per crop ("" where captioning failed)
+        """
+        batch_size = batch_size or self.caption_batch_size
+        captions: List[str] = []
+        for start in range(0, len(crops), batch_size):
+            batch = crops[start:start + batch_size]
+            try:
+                captions.extend(self._caption_batch(batch))
+            except Exception as e:
+                logger.debug("Caption batch at %d failed (%s), retrying per crop", start, e)
+                for crop in batch:
+                    try:
+                        captions.extend(self._caption_batch([crop]))
+                    except Exception as e:
+                        logger.debug("Caption generation failed for element %d: %s",
+                                     len(captions) + 1, e)
+                        captions.append("")
+        return captions
+    
+    def _caption_batch(self, crops: List[Image.Image]) -> List[str]:
+        """Run one Florence-2 generate() call over a batch of crops."""
         import torch
         
         processor = self.model_loader.icon_caption_processor
@@ -627,31 +1407,30 @@ class OmniParserV2:
         # Prepare input
         prompt = "<CAPTION>"
         inputs = processor(
-            text=prompt,
-            images=image_crop,
-            return_tensors="pt"
+            text=[prompt] * len(crops),
+            images=crops,
+            return_tensors="pt",
+            padding=True
         ).to(device)
         
         # Generate
         with torch.no_grad():
             generated_ids = model.generate(
                 input_ids=inputs["input_ids"],
-                pixel_values=inputs["pixel_values"],
+                pixel_values=inputs["pixel_values"].to(model.dtype),
                 max_new_tokens=50,
                 num_beams=3,
                 early_stopping=True
             )
         
         # Decode
-        generated_text = processor.batch_decode(
+        generated_texts = processor.batch_decode(
             generated_ids, 
             skip_special_tokens=True
-        )[0]
+        )
         
         # Clean up
-        caption = generated_text.replace("<CAPTION>", "").strip()
-        
-        return caption
+        return [text.replace("<CAPTION>", "").strip() for text in generated_texts]
     
     def _infer_element_type(self, description: str) -> ElementType:
         """Infer element type from description."""
@@ -681,117 +1460,352 @@ class OmniParserV2:
     def _fallback_parse(self, image: Image.Image) -> ParseResult:
         """
         Fallback parsing when OmniParser models are not available.
-        Uses basic image processing for element detection.
+        Finds UI-like rectangles from an edge map (see fallback_detector).
         """
         logger.info("Using fallback detection (OmniParser models not available)")
         
-        # Simple edge-based detection
-        elements = []
+        start = time.time()
+        detections = detect_boxes(image)
+        predict_ms = (time.time() - start) * 1000
         
-        # Convert to grayscale for processing
-        gray = image.convert('L')
-        width, height = image.size
-        
-        # Grid-based region detection
-        grid_size = 50
-        element_id = 0
-        
-        for y in range(0, height - grid_size, grid_size):
-            for x in range(0, width - grid_size, grid_size):
-                region = gray.crop((x, y, x + grid_size, y + grid_size))
-                pixels = list(region.getdata())
-                
-                if len(pixels) < 100:
-                    continue
-                
-                # Check for high contrast (potential UI element)
-                min_val = min(pixels)
-                max_val = max(pixels)
-                contrast = max_val - min_val
-                
-                if contrast > 100:
-                    element_id += 1
-                    elements.append(UIElement(
-                        id=element_id,
-                        element_type=ElementType.UNKNOWN,
-                        bbox=BoundingBox(
-                            x1=float(x),
-                            y1=float(y),
-                            x2=float(x + grid_size),
-                            y2=float(y + grid_size)
-                        ),
-                        confidence=0.5,
-                        is_interactable=True,
-                        interaction_types=[InteractionType.CLICKABLE]
-                    ))
-        
-        return ParseResult(
-            elements=elements,
-            screen_size=(image.width, image.height),
-            parse_time_ms=0,
-            element_count=len(elements),
-            interactable_count=len(elements),
-            model_version="fallback"
-        )
+        result = self._detections_result(detections, image.size)
+        result.model_version = "fallback"
+        result.timings['predict'] = predict_ms
+        return result
     
-    def _compute_image_hash(self, image: Image.Image) -> str:
-        """Compute hash of image for caching."""
-        small = image.resize((64, 64), Image.Resampling.LANCZOS)
-        pixels = list(small.getdata())
-        pixel_str = str(pixels)
-        return hashlib.md5(pixel_str.encode()).hexdigest()
+    def _compute_image_hash(self, image: Union[Image.Image, Frame]) -> str:
+        """Perceptual hash of image (volatile regions masked) for caching."""
+        return to_hex(self.masks.fingerprint(image).hash)
     
-    def _get_cached(self, cache_key: str) -> Optional[ParseResult]:
-        """Get cached result if exists."""
+    def _get_cached(self, cache_key: str, fingerprint: Optional[Fingerprint] = None,
+                    current: Optional[Frame] = None) -> Optional[ParseResult]:
+        """
+        Get the cached result for this screen or a near-identical one at the
+        same offset. A candidate is only reused when its snapshot confirms
+        that at most a caret- or glyph-sized change happened outside the
+        volatile regions.
+        """
+        hex_hash, _, suffix = cache_key.partition('@')
         with self._cache_lock:
-            return self._cache.get(cache_key)
+            candidates = [cache_key] if cache_key in self._cache else []
+            candidates += [key for _, key in self._cache_index.find(int(hex_hash, 16))
+                           if key != cache_key and key.partition('@')[2] == suffix]
+            entries = [(key, self._cache[key], self._cache_raw.get(key), self._cache_snapshots.get(key))
+                       for key in candidates if key in self._cache]
+        match = result = raw = None
+        for key, cached, cached_raw, snapshot in entries:
+            if current is not None and not self.masks.confirm_hit(snapshot, current):
+                self.cache_rejects += 1
+                continue
+            match, result, raw = key, cached, cached_raw
+            break
+        if match is not None and match != cache_key:
+            self.near_hits += 1
+        if fingerprint is not None:
+            self.masks.record_lookup('omniparser', fingerprint, raw)
+        return result
     
-    def _cache_result(self, cache_key: str, result: ParseResult):
-        """Cache a parse result."""
+    def _cache_result(self, cache_key: str, result: ParseResult, raw_hash: Optional[int] = None,
+                      snapshot: Optional[ScreenSnapshot] = None):
+        """Cache a parse result (with the snapshot later hits are confirmed against)."""
         with self._cache_lock:
-            if len(self._cache) >= self.cache_max_size:
+            if cache_key not in self._cache and len(self._cache) >= self.cache_max_size:
                 oldest_key = next(iter(self._cache))
                 del self._cache[oldest_key]
+                self._cache_raw.pop(oldest_key, None)
+                self._cache_snapshots.pop(oldest_key, None)
+                self._cache_index.remove(oldest_key)
             self._cache[cache_key] = result
+            if raw_hash is not None:
+                self._cache_raw[cache_key] = raw_hash
+            if snapshot is not None:
+                self._cache_snapshots[cache_key] = snapshot
+            self._cache_index.add(int(cache_key.partition('@')[0], 16), cache_key)
+    
+    def _track(self, result: ParseResult) -> ParseResult:
+        """
+        Match result elements to the previous parse and assign track IDs.
+        
+        Works on a shallow copy of the result and its elements, so cached
+        and previous results are never changed in place.
+        """
+        if self.tracker is None:
+            return result
+        result = copy.copy(result)
+        result.elements = [copy.copy(e) for e in result.elements]
+        try:
+            result.tracking = self.tracker.update(result)
+        except Exception as e:
+            logger.debug("Element tracking failed: %s", e)
+        result.reindex()  # track ids and carried-over captions changed
+        return result
+    
+    def _remember_frame(self, frame: Optional[Frame], result: ParseResult):
+        """Track the frame a result belongs to for damage-based reuse."""
+        if frame is None:
+            return
+        with self._cache_lock:
+            self._last_frame = frame
+            self._last_frame_result = result
+    
+    def _remember_parsed(self, frame: Optional[Frame], current: Frame, result: ParseResult):
+        """Remember the last parse (for damage reuse and incremental change regions)."""
+        self._remember_frame(frame, result)
+        with self._cache_lock:
+            self._last_parsed = current
+            self._last_parsed_result = result
     
     def clear_cache(self):
         """Clear the result cache."""
         with self._cache_lock:
             self._cache.clear()
+            self._cache_raw.clear()
+            self._cache_snapshots.clear()
+            self._cache_index.clear()
+            self._last_frame = None
+            self._last_frame_result = None
+            self._last_parsed = None
+            self._last_parsed_result = None
+    
+    def _ocr_stats(self) -> Dict[str, Any]:
+        avg_caption_ms = self.caption_model_ms / max(self.caption_model_calls, 1)
+        return {
+            'enabled': self.ocr_labels,
+            'labeled': self.ocr_labeled,
+            'coverage': self.ocr_labeled / max(self.ocr_elements, 1),
+            'captions_bypassed': self.captions_bypassed,
+            'ocr_runs': self.ocr_runs,
+            'ocr_time_ms': self.ocr_time_ms,
+            # Caption time avoided minus what the OCR passes cost
+            'est_ms_saved': self.captions_bypassed * avg_caption_ms - self.ocr_time_ms
+        }
     
     def get_stats(self) -> Dict[str, Any]:
         """Get parser statistics."""
         return {
             'total_parses': self.total_parses,
             'cache_hits': self.cache_hits,
+            'near_hits': self.near_hits,
+            'cache_rejects': self.cache_rejects,
+            'damage_skips': self.damage_skips,
+            'tracking': self.tracker.get_stats() if self.tracker else None,
+            'lazy_captions': self.lazy_captions,
+            'captions_generated': self.captions_generated,
+            'captions_deferred': self.captions_deferred,
+            'captions_skipped': self.captions_deferred - self.lazy_captions_generated,
+            'avg_caption_ms': self.caption_model_ms / max(self.caption_model_calls, 1),
+            'ocr_labels': self._ocr_stats(),
+            'resolution': {
+                'ladder': self.imgsz_ladder,
+                'passes': self.ladder_passes,
+                'final_imgsz': dict(self.ladder_rungs),
+                'escalations': dict(self.ladder_escalations)
+            },
+            'tiled': {
+                'enabled': self.tiled_detection,
+                'tile_size': self.tile_size,
+                'tile_overlap': self.tile_overlap,
+                'parses': self.tiled_parses,
+                'avg_tiles': self.tiles_detected / max(self.tiled_parses, 1)
+            },
+            'incremental': {
+                'parses': self.incremental_parses,
+                'fallbacks': self.incremental_fallbacks,
+                'avg_area': self.incremental_area / max(self.incremental_parses, 1),
+                'elements_reused': self.incremental_reused
+            },
             'cache_hit_rate': self.cache_hits / max(self.total_parses, 1),
             'avg_parse_time_ms': self.total_parse_time / max(self.total_parses, 1),
+            'avg_stage_ms': {name: ms / max(self.total_parses - self.cache_hits, 1)
+                             for name, ms in self.stage_time_ms.items()},
             'cache_size': len(self._cache),
             'models_loaded': self.model_loader.is_loaded,
+            'backend': self.model_loader.detect_backend,
             'has_detection': self.model_loader.has_detection,
-            'has_caption': self.model_loader.has_caption
+            'has_caption': self.model_loader.has_caption,
+            'caption_precision': self.model_loader.caption_precision,
+            'caption_cache': self.caption_cache.get_stats() if self.caption_cache else None
         }
 
 
+def _dilate_regions(regions: List[Tuple[int, int, int, int]], element_boxes: np.ndarray,
+                    image_size: Tuple[int, int], margin: int) -> List[Tuple[int, int, int, int]]:
+    """
+    Grow changed regions into self-contained detection windows.
+    
+    Each (x, y, width, height) region is padded by `margin`, extended to
+    fully cover every old element box it touches (so no element is cut in
+    half), and overlapping windows are merged.
+    
+    Returns:
+        Windows as (x1, y1, x2, y2), clipped to the image
+    """
+    width, height = image_size
+    windows = [[max(0, x - margin), max(0, y - margin),
+                min(width, x + w + margin), min(height, y + h + margin)]
+               for x, y, w, h in regions if w > 0 and h > 0]
+    
+    changed = True
+    while changed:
+        changed = False
+        for window in windows:
+            x1, y1, x2, y2 = window
+            hit = ((element_boxes[:, 0] < x2) & (element_boxes[:, 2] > x1) &
+                   (element_boxes[:, 1] < y2) & (element_boxes[:, 3] > y1))
+            if hit.any():
+                covered = [min(x1, element_boxes[hit, 0].min()), min(y1, element_boxes[hit, 1].min()),
+                           max(x2, element_boxes[hit, 2].max()), max(y2, element_boxes[hit, 3].max())]
+                covered = [max(0, int(covered[0])), max(0, int(covered[1])),
+                           min(width, int(np.ceil(covered[2]))), min(height, int(np.ceil(covered[3])))]
+                if covered != window:
+                    window[:] = covered
+                    changed = True
+        
+        merged: List[List[int]] = []
+        for window in windows:
+            for other in merged:
+                if (window[0] < other[2] and window[2] > other[0] and
+                        window[1] < other[3] and window[3] > other[1]):
+                    other[:] = [min(window[0], other[0]), min(window[1], other[1]),
+                                max(window[2], other[2]), max(window[3], other[3])]
+                    changed = True
+                    break
+            else:
+                merged.append(window)
+        windows = merged
+    return [tuple(w) for w in windows]
+
+
+def _native_imgsz(image_size: Tuple[int, int]) -> int:
+    """YOLO input size that keeps every pixel of an image (its long side, stride-aligned)."""
+    return -(-max(image_size) // 32) * 32
+
+
+def _tile_grid(image_size: Tuple[int, int], tile: int, overlap: int) -> List[Tuple[int, int, int, int]]:
+    """Overlapping (x1, y1, x2, y2) tiles covering the image; edge tiles are flush with it."""
+    def starts(length: int) -> List[int]:
+        if length <= tile:
+            return [0]
+        stride = tile - overlap
+        positions = list(range(0, length - tile, stride))
+        return positions + [length - tile]
+    
+    width, height = image_size
+    return [(x, y, min(x + tile, width), min(y + tile, height))
+            for y in starts(height) for x in starts(width)]
+
+
+def _yolo_detections(result, origin: Tuple[int, int] = (0, 0)) -> np.ndarray:
+    """
+    (N, 6) float32 [x1, y1, x2, y2, conf, cls] of an ultralytics result,
+    shifted by `origin`. Moves each tensor to numpy once, not per box.
+    """
+    boxes = getattr(result, 'boxes', None)
+    if boxes is None or len(boxes) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    xyxy = boxes.xyxy.cpu().numpy().reshape(-1, 4)
+    conf = boxes.conf.cpu().numpy().reshape(-1)
+    cls = boxes.cls.cpu().numpy().reshape(-1) if hasattr(boxes, 'cls') else np.zeros_like(conf)
+    detections = np.column_stack([xyxy, conf, cls]).astype(np.float32)
+    if origin != (0, 0):
+        detections[:, [0, 2]] += origin[0]
+        detections[:, [1, 3]] += origin[1]
+    return detections
+
+
+def _select_detections(detections: np.ndarray, min_confidence: float, limit: int) -> np.ndarray:
+    """
+    Detections at or above min_confidence, cut to the `limit` best
+    (interactable first, then by confidence) in their original order.
+    """
+    detections = detections[detections[:, 4] >= min_confidence]
+    if len(detections) > limit:
+        order = np.lexsort((-detections[:, 4], detections[:, 5] != 0))
+        detections = detections[np.sort(order[:limit])]
+    return detections
+
+
+def _touches_inner_edge(boxes: np.ndarray, tile: Tuple[int, int, int, int],
+                        image_size: Tuple[int, int], margin: float = 2.0) -> np.ndarray:
+    """Per box: True if it ends at a tile edge inside the image (it may be cut off)."""
+    x1, y1, x2, y2 = tile
+    width, height = image_size
+    return (((x1 > 0) & (boxes[:, 0] <= x1 + margin)) | ((y1 > 0) & (boxes[:, 1] <= y1 + margin)) |
+            ((x2 < width) & (boxes[:, 2] >= x2 - margin)) | ((y2 < height) & (boxes[:, 3] >= y2 - margin)))
+
+
+def _merge_tiled(detections: np.ndarray, cut: np.ndarray, iou_threshold: float,
+                 containment: float = 0.8) -> np.ndarray:
+    """
+    NMS across tiles: whole boxes beat boxes cut by a tile edge, then
+    higher confidence wins. A box mostly inside a kept one (a cut-off
+    half of the same element) is suppressed even at low IoU.
+    
+    Returns:
+        Sorted indices of the detections to keep
+    """
+    if len(detections) < 2:
+        return np.arange(len(detections))
+    boxes = detections[:, :4]
+    ious = iou_matrix(boxes, boxes)
+    areas = np.maximum((boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1]), 1)
+    x1 = np.maximum(boxes[:, None, 0], boxes[None, :, 0])
+    y1 = np.maximum(boxes[:, None, 1], boxes[None, :, 1])
+    x2 = np.minimum(boxes[:, None, 2], boxes[None, :, 2])
+    y2 = np.minimum(boxes[:, None, 3], boxes[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    inside_smaller = inter / np.minimum(areas[:, None], areas[None, :])
+    
+    order = np.lexsort((-detections[:, 4], cut))
+    suppressed = np.zeros(len(detections), dtype=bool)
+    keep = []
+    for i in order:
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= (ious[i] > iou_threshold) | (inside_smaller[i] > containment)
+    return np.sort(np.array(keep, dtype=np.int64))
+
+
+def _nms(elements: List[UIElement], iou_threshold: float) -> List[UIElement]:
+    """Greedy non-maximum suppression by confidence (input order breaks ties)."""
+    if len(elements) < 2:
+        return list(elements)
+    boxes = np.array([e.bbox.to_tuple() for e in elements], dtype=np.float32)
+    ious = iou_matrix(boxes, boxes)
+    order = sorted(range(len(elements)), key=lambda i: -elements[i].confidence)
+    suppressed = np.zeros(len(elements), dtype=bool)
+    keep = []
+    for i in order:
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        suppressed |= ious[i] > iou_threshold
+    return [elements[i] for i in sorted(keep)]
+
+
 # Aliases for backward compatibility
 OmniParser = OmniParserV2
 OmniParserWithOCR = OmniParserV2
 
 
-def create_omniparser(use_ocr: bool = False,
+def create_omniparser(use_ocr: Optional[bool] = None,
                      cache_enabled: bool = True,
                      **kwargs) -> OmniParserV2:
     """
     Factory function to create OmniParser instance.
     
     Args:
-        use_ocr: Ignored (OmniParser V2 uses Florence-2 for captions)
+        use_ocr: Label text-bearing elements from OCR instead of Florence-2
+            (default: OMNIPARSER_OCR_LABELS)
         cache_enabled: Enable result caching
         **kwargs: Additional arguments
     
     Returns:
         Configured OmniParserV2 instance
     """
+    if use_ocr is not None:
+        kwargs.setdefault('ocr_labels', use_ocr)
     return OmniParserV2(
         cache_enabled=cache_enabled,
         generate_captions=True,
@@ -833,6 +1847,15 @@ def check_omniparser_available() -> Dict[str, Any]:
     except ImportError:
         pass
     
+    # Optional CPU runtimes (OMNIPARSER_BACKEND=onnx / openvino)
+    status['backend'] = OMNIPARSER_BACKEND
+    for module, key in (('onnxruntime', 'onnxruntime'), ('openvino', 'openvino')):
+        try:
+            __import__(module)
+            status[key] = True
+        except ImportError:
+            status[key] = False
+    
     weights_dir = Path(OMNIPARSER_WEIGHTS_DIR)
     if (weights_dir / "icon_detect" / "model.pt").exists():
         status['weights_downloaded'] = True
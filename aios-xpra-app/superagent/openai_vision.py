@@ -5,14 +5,14 @@ Uses GPT-4 Vision which you already have credits for
 
 import os
 import time
-import base64
 import json
 import requests
-from io import BytesIO
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 from PIL import Image
 import logging
 
+from .frames import Frame
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,7 +51,7 @@ class OpenAIVisionAPI:
     
     def analyze_screen(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any],
         mode: str = "action"
@@ -148,22 +148,10 @@ DECISION RULES:
 - Precise coordinates: Measure pixel positions carefully
 - Be fast: Choose simplest path to goal"""
     
-    def _encode_image(self, screenshot: Image.Image) -> str:
-        """Encode image for OpenAI API"""
-        
-        # Resize if too large
-        max_size = 1920
-        if screenshot.width > max_size or screenshot.height > max_size:
-            ratio = max_size / max(screenshot.width, screenshot.height)
-            new_size = (int(screenshot.width * ratio), int(screenshot.height * ratio))
-            screenshot = screenshot.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Convert to PNG
-        buffer = BytesIO()
-        screenshot.save(buffer, format='PNG', optimize=True)
-        img_bytes = buffer.getvalue()
-        
-        return base64.b64encode(img_bytes).decode('utf-8')
+    def _encode_image(self, screenshot: Union[Image.Image, Frame]) -> str:
+        """Encode image for OpenAI API (PIL image or captured Frame)"""
+        # Resized to at most 1920px and PNG-encoded once per frame
+        return Frame.wrap(screenshot).base64('PNG', max_size=1920)
     
     def _call_openai_api(self, prompt: str, img_base64: str, max_retries: int = 3) -> Dict:
         """Call OpenAI API with retry logic"""
@@ -289,7 +277,7 @@ DECISION RULES:
     
     def get_action(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any],
         mode: str = "action"
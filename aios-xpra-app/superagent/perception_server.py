@@ -0,0 +1,749 @@
+"""
+Perception Server - One OmniParser model copy shared by every agent on the node
+
+Without it every agent process loads its own YOLO and Florence-2 and
+parses on its own thread, so N concurrent workspace sessions hold N model
+copies and never share an inference call. The server is one process that
+owns the models and parses for all of them over a Unix socket:
+
+    # once per node
+    python3 -m superagent.perception_server --socket /tmp/omniparser.sock
+
+    # in each agent: same parse() signature and ParseResult as OmniParserV2
+    parser = PerceptionClient(min_confidence=0.25, max_elements=50)
+    result = parser.parse(frame, goal="click the settings icon")
+
+Each connection is parsed on its own server thread with the regular
+OmniParserV2 pipeline (cache, ladder, OCR labels, incremental parses);
+only the model calls are shared. YOLO predict() and Florence-2 caption
+calls are handed to a MicroBatcher, which waits up to
+OMNIPARSER_BATCH_WINDOW_MS after the first request for concurrent ones
+and runs them as a single batched call.
+
+Per-session state stays in the client: damage-based reuse of unchanged
+frames, the change regions of incremental parses and element tracking.
+Requests are a JSON header plus the raw RGB pixels; results come back as
+JSON and are rebuilt into ParseResults. When the server is not reachable
+the client parses locally (loading the models in-process) and retries the
+socket later.
+"""
+
+import os
+import copy
+import json
+import time
+import socket
+import struct
+import logging
+import argparse
+import threading
+import socketserver
+from io import BytesIO
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from .frames import Frame
+from .ocr_labels import OcrWord
+from .element_tracker import ElementTracker
+from .change_detection import get_change_detector
+from .omniparser import (
+    OmniParserV2, ParseResult, UIElement, BoundingBox, ElementType, InteractionType
+)
+
+logger = logging.getLogger(__name__)
+
+# Unix socket the server listens on and clients connect to
+OMNIPARSER_SERVER_SOCKET = os.environ.get('OMNIPARSER_SERVER_SOCKET', '/tmp/omniparser.sock')
+# Agents parse through the server instead of loading the models (see create_parser)
+OMNIPARSER_USE_SERVER = os.environ.get('OMNIPARSER_USE_SERVER', '0') == '1'
+# How long the first request of a batch waits for concurrent ones (ms)
+OMNIPARSER_BATCH_WINDOW_MS = float(os.environ.get('OMNIPARSER_BATCH_WINDOW_MS', '8'))
+# Most frames per batched YOLO call
+OMNIPARSER_MAX_BATCH = int(os.environ.get('OMNIPARSER_MAX_BATCH', '8'))
+
+# Parser options a client may set per request (the server keeps one parser per combination)
+REMOTE_OPTIONS = ('min_confidence', 'max_elements', 'generate_captions')
+
+# Seconds before a client retries a server it could not reach
+RECONNECT_INTERVAL = 5.0
+
+_HEADER = struct.Struct('!II')  # JSON header length, payload length
+
+
+@dataclass
+class _Pending:
+    """One caller's share of a batch."""
+    key: Any
+    items: List[Any]
+    outputs: Optional[List[Any]] = None
+    error: Optional[BaseException] = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent calls into batched ones.
+
+    Callers block in submit(). A worker thread takes the first pending
+    request, waits up to `window_ms` (or until `max_batch` items are
+    queued) for more, then calls `run(key, items)` once per key with the
+    items of all requests sharing it and hands each caller its outputs.
+    """
+
+    def __init__(self, run: Callable[[Any, List[Any]], List[Any]],
+                 window_ms: float = OMNIPARSER_BATCH_WINDOW_MS,
+                 max_batch: int = OMNIPARSER_MAX_BATCH, name: str = 'batcher'):
+        """
+        Args:
+            run: Batched call; returns one output per item, in order
+            window_ms: Longest wait for more requests after the first
+            max_batch: Items that end the wait early (a single larger
+                request still runs whole)
+            name: Worker thread name
+        """
+        self._run = run
+        self.window = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._pending: List[_Pending] = []
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # Statistics
+        self.batches = 0
+        self.requests = 0
+        self.items = 0
+        self.largest_batch = 0
+
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, key: Any, items: List[Any]) -> List[Any]:
+        """Run `items` in the next batch for `key`; returns their outputs."""
+        request = _Pending(key, list(items))
+        if not request.items:
+            return []
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append(request)
+            self._cond.notify()
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.outputs
+
+    def close(self):
+        """Stop the worker once the queued requests have run."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=5)
+
+    def _queued(self) -> int:
+        return sum(len(r.items) for r in self._pending)
+
+    def _take(self) -> List[_Pending]:
+        """Oldest requests up to max_batch items (always at least one)."""
+        taken, count = [], 0
+        while self._pending and (not taken or count + len(self._pending[0].items) <= self.max_batch):
+            request = self._pending.pop(0)
+            taken.append(request)
+            count += len(request.items)
+        return taken
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return  # closed and drained
+                deadline = time.monotonic() + self.window
+                while self._queued() < self.max_batch and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = self._take()
+            self._execute(batch)
+
+    def _execute(self, batch: List[_Pending]):
+        groups: Dict[Any, List[_Pending]] = {}
+        for request in batch:
+            groups.setdefault(request.key, []).append(request)
+        for key, requests in groups.items():
+            items = [item for request in requests for item in request.items]
+            try:
+                outputs = self._run(key, items)
+                if len(outputs) != len(items):
+                    raise RuntimeError(f"batched call returned {len(outputs)} outputs for {len(items)} items")
+            except Exception as e:
+                logger.warning("Batched call failed for %d requests: %s", len(requests), e)
+                for request in requests:
+                    request.error = e
+                    request.done.set()
+                continue
+            start = 0
+            for request in requests:
+                request.outputs = outputs[start:start + len(request.items)]
+                start += len(request.items)
+                request.done.set()
+            self.batches += 1
+            self.requests += len(requests)
+            self.items += len(items)
+            self.largest_batch = max(self.largest_batch, len(items))
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'requests': self.requests,
+            'items': self.items,
+            'avg_batch': self.items / max(self.batches, 1),
+            'avg_requests_per_batch': self.requests / max(self.batches, 1),
+            'largest_batch': self.largest_batch,
+            'window_ms': self.window * 1000,
+            'max_batch': self.max_batch
+        }
+
+
+class BatchingOmniParser(OmniParserV2):
+    """
+    OmniParserV2 whose YOLO and Florence-2 calls go through the server's
+    shared batchers. Captions are eager (there is no image to caption
+    lazily against once the result has left the server) and tracking is
+    left to the clients.
+    """
+
+    def __init__(self, server: 'PerceptionServer', **options):
+        self.server = server
+        options.update(track_elements=False, lazy_captions=False)
+        super().__init__(**options)
+
+    def _yolo_predict(self, images: List[Image.Image], imgsz: Optional[int] = None) -> List[Any]:
+        return self.server.detect_batcher.submit((self.min_confidence, imgsz), images)
+
+    def _generate_captions(self, crops: List[Image.Image],
+                           batch_size: Optional[int] = None) -> List[str]:
+        if batch_size is not None:  # explicit batch size: run as asked
+            return super()._generate_captions(crops, batch_size)
+        return self.server.caption_batcher.submit(None, crops)
+
+    def generate_captions_now(self, crops: List[Image.Image]) -> List[str]:
+        """Caption crops on the calling thread (the caption batcher's run)."""
+        return super()._generate_captions(crops)
+
+
+# ---- wire format ----
+
+def _json_default(value):
+    if hasattr(value, 'item'):  # numpy scalars
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _send(sock: socket.socket, header: Dict[str, Any], payload: bytes = b''):
+    data = json.dumps(header, default=_json_default).encode('utf-8')
+    sock.sendall(_HEADER.pack(len(data), len(payload)) + data)
+    if payload:
+        sock.sendall(payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if not count:
+            raise ConnectionError("connection closed")
+        received += count
+    return bytes(buffer)
+
+
+def _recv(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    header_size, payload_size = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, header_size).decode('utf-8'))
+    return header, _recv_exact(sock, payload_size) if payload_size else b''
+
+
+def encode_result(result: ParseResult) -> Dict[str, Any]:
+    """JSON-ready form of a ParseResult (descriptions must be captioned already)."""
+    return {
+        'elements': [{
+            'id': e.id,
+            'type': e.element_type.name,
+            'bbox': e.bbox.to_list(),
+            'text': e.text,
+            'description': e.cached_description,
+            'confidence': e.confidence,
+            'interactable': e.is_interactable,
+            'interactions': [t.name for t in e.interaction_types],
+            'ocr_text': e.ocr_text,
+            'track_id': e.track_id,
+            'crop_hash': e.crop_hash
+        } for e in result.elements],
+        'screen_size': list(result.screen_size),
+        'parse_time_ms': result.parse_time_ms,
+        'model_version': result.model_version,
+        'raw_detections': result.raw_detections,
+        'offset': list(result.offset),
+        'imgsz': result.imgsz,
+        'timings': result.timings
+    }
+
+
+def decode_result(data: Dict[str, Any]) -> ParseResult:
+    """ParseResult from encode_result() output."""
+    elements = [UIElement(
+        id=e['id'],
+        element_type=ElementType[e['type']],
+        bbox=BoundingBox(*e['bbox']),
+        text=e['text'],
+        description=e['description'],
+        confidence=e['confidence'],
+        is_interactable=e['interactable'],
+        interaction_types=[InteractionType[name] for name in e['interactions']],
+        ocr_text=e['ocr_text'],
+        track_id=e['track_id'],
+        crop_hash=e.get('crop_hash')
+    ) for e in data['elements']]
+    return ParseResult(
+        elements=elements,
+        screen_size=tuple(data['screen_size']),
+        parse_time_ms=data['parse_time_ms'],
+        element_count=len(elements),
+        interactable_count=sum(1 for e in elements if e.is_interactable),
+        model_version=data['model_version'],
+        raw_detections=data['raw_detections'],
+        offset=tuple(data['offset']),
+        imgsz=data['imgsz'],
+        timings=data['timings']
+    )
+
+
+def _encode_words(words: Optional[List[OcrWord]]) -> Optional[List[List[Any]]]:
+    if words is None:
+        return None
+    return [[w.text, list(w.box), w.confidence, list(w.line)] for w in words]
+
+
+def _decode_words(data: Optional[List[List[Any]]]) -> Optional[List[OcrWord]]:
+    if data is None:
+        return None
+    return [OcrWord(text, tuple(box), confidence, tuple(line)) for text, box, confidence, line in data]
+
+
+# ---- server ----
+
+class _ConnectionHandler(socketserver.BaseRequestHandler):
+    """Serves the requests of one client connection, one at a time."""
+
+    def handle(self):
+        server: 'PerceptionServer' = self.server.perception
+        while True:
+            try:
+                header, payload = _recv(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                response = server.handle(header, payload)
+            except Exception as e:
+                logger.exception("Perception request failed")
+                response = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+            try:
+                _send(self.request, response)
+            except OSError:
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class PerceptionServer:
+    """
+    Owns the OmniParser models and parses for every connected client.
+
+    One BatchingOmniParser per distinct set of client options; all of them
+    share the model loader and the two batchers.
+    """
+
+    def __init__(self, socket_path: str = OMNIPARSER_SERVER_SOCKET,
+                 window_ms: float = OMNIPARSER_BATCH_WINDOW_MS,
+                 max_batch: int = OMNIPARSER_MAX_BATCH, **parser_options):
+        """
+        Args:
+            socket_path: Unix socket to listen on
+            window_ms: Batching window for model calls
+            max_batch: Most frames per batched YOLO call
+            **parser_options: OmniParserV2 options of every parser
+                (clients may still override REMOTE_OPTIONS)
+        """
+        self.socket_path = socket_path
+        self.parser_options = parser_options
+        self.detect_batcher = MicroBatcher(self._detect_batch, window_ms, max_batch,
+                                           name='perception-detect')
+        self._parsers: Dict[Tuple, BatchingOmniParser] = {}
+        self._parsers_lock = threading.Lock()
+        self.default = self.parser_for({})
+        self.caption_batcher = MicroBatcher(self._caption_batch, window_ms,
+                                            self.default.caption_batch_size,
+                                            name='perception-caption')
+        self._server: Optional[_UnixServer] = None
+
+        # Statistics
+        self.requests = 0
+        self.parse_time_ms = 0.0
+        self.errors = 0
+
+    def parser_for(self, options: Dict[str, Any]) -> BatchingOmniParser:
+        """The parser for a client's options (created on first use)."""
+        options = {name: options[name] for name in REMOTE_OPTIONS if options.get(name) is not None}
+        key = tuple(sorted(options.items()))
+        with self._parsers_lock:
+            parser = self._parsers.get(key)
+            if parser is None:
+                parser = BatchingOmniParser(self, **{**self.parser_options, **options})
+                self._parsers[key] = parser
+        return parser
+
+    def _detect_batch(self, key: Tuple[float, Optional[int]], images: List[Image.Image]) -> List[Any]:
+        """One YOLO call over the frames of every waiting request."""
+        min_confidence, imgsz = key
+        options = {'imgsz': imgsz} if imgsz else {}
+        return list(self.default.model_loader.icon_detect_model.predict(
+            source=images,
+            conf=min_confidence,
+            verbose=False,
+            **options
+        ))
+
+    def _caption_batch(self, key: None, crops: List[Image.Image]) -> List[str]:
+        """Florence-2 over the uncached crops of every waiting request."""
+        return self.default.generate_captions_now(crops)
+
+    def handle(self, header: Dict[str, Any], payload: bytes) -> Dict[str, Any]:
+        """Answer one request."""
+        op = header.get('op')
+        if op == 'stats':
+            return {'ok': True, 'stats': self.get_stats()}
+        if op != 'parse':
+            raise ValueError(f"unknown op {op!r}")
+
+        start = time.time()
+        self.requests += 1
+        image = Image.frombytes('RGB', tuple(header['size']), payload)
+        frame = Frame(image=image, source='perception-client', offset=tuple(header.get('offset', (0, 0))))
+        previous = header.get('previous_result')
+        regions = header.get('changed_regions')
+        result = self.parser_for(header.get('options') or {}).parse(
+            frame,
+            force_refresh=header.get('force_refresh', False),
+            ocr_words=_decode_words(header.get('ocr_words')),
+            previous_result=decode_result(previous) if previous is not None else None,
+            changed_regions=[tuple(r) for r in regions] if regions is not None else None,
+            goal=header.get('goal')
+        )
+        self.parse_time_ms += (time.time() - start) * 1000
+        return {'ok': True, 'result': encode_result(result)}
+
+    def serve_forever(self):
+        """Listen on the socket until shutdown()."""
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)  # stale socket of a dead server
+            else:
+                raise RuntimeError(f"Perception server already running on {self.socket_path}")
+            finally:
+                probe.close()
+
+        self._server = _UnixServer(self.socket_path, _ConnectionHandler)
+        self._server.perception = self
+        os.chmod(self.socket_path, 0o660)
+        logger.info("Perception server listening on %s (window %.0fms, batch %d)",
+                    self.socket_path, self.detect_batcher.window * 1000, self.detect_batcher.max_batch)
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        """Stop serving (from another thread) and the batchers."""
+        if self._server is not None:
+            self._server.shutdown()
+        self.detect_batcher.close()
+        self.caption_batcher.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._parsers_lock:
+            parsers = list(self._parsers.values())
+        return {
+            'requests': self.requests,
+            'avg_request_ms': self.parse_time_ms / max(self.requests, 1),
+            'parsers': len(parsers),
+            'detect_batches': self.detect_batcher.get_stats(),
+            'caption_batches': self.caption_batcher.get_stats(),
+            'cache_hits': sum(p.cache_hits for p in parsers),
+            'models_loaded': self.default.model_loader.is_loaded,
+            'has_detection': self.default.model_loader.has_detection,
+            'has_caption': self.default.model_loader.has_caption
+        }
+
+
+# ---- client ----
+
+class PerceptionClient:
+    """
+    Drop-in for OmniParserV2.parse() that parses on the perception server.
+
+    Damage-based reuse, incremental change regions and element tracking
+    run here, per session, exactly as in OmniParserV2. Falls back to an
+    in-process OmniParserV2 while the server is unreachable.
+    """
+
+    def __init__(self, socket_path: str = OMNIPARSER_SERVER_SOCKET, timeout: float = 60.0,
+                 local_fallback: bool = True, **options):
+        """
+        Args:
+            socket_path: Server socket
+            timeout: Seconds to wait for one parse
+            local_fallback: Parse in-process when the server is unreachable
+                (otherwise raise ConnectionError)
+            **options: OmniParserV2 options; REMOTE_OPTIONS are sent with
+                each request, all of them configure the local fallback
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.local_fallback = local_fallback
+        self.options = options
+        self.cache_enabled = options.get('cache_enabled', True)
+        self.tracker = ElementTracker() if options.pop('track_elements', True) else None
+
+        self._sock: Optional[socket.socket] = None
+        self._lock = threading.Lock()
+        self._retry_at = 0.0
+        self._local: Optional[OmniParserV2] = None
+
+        # Last parsed frame - X Damage can prove the next one is identical
+        self._last_frame: Optional[Frame] = None
+        self._last_frame_result: Optional[ParseResult] = None
+        self._last_parsed: Optional[Frame] = None  # any input, for incremental diffs
+        self._last_parsed_result: Optional[ParseResult] = None
+
+        # Statistics
+        self.total_parses = 0
+        self.remote_parses = 0
+        self.local_parses = 0
+        self.damage_skips = 0
+        self.round_trip_ms = 0.0
+
+    def parse(self, image: Union[Image.Image, Frame, str, bytes],
+              force_refresh: bool = False,
+              ocr_words: Optional[List[OcrWord]] = None,
+              previous_result: Optional[ParseResult] = None,
+              changed_regions: Optional[List[Tuple[int, int, int, int]]] = None,
+              goal: Optional[str] = None) -> ParseResult:
+        """Parse a screenshot (see OmniParserV2.parse)."""
+        self.total_parses += 1
+        frame = image if isinstance(image, Frame) else None
+        if frame is not None and self.cache_enabled and not force_refresh:
+            if self._last_frame_result is not None and frame.unchanged_since(self._last_frame):
+                self.damage_skips += 1
+                self._last_frame = frame
+                return self._track(self._last_frame_result)
+
+        if isinstance(image, str):
+            image = Image.open(image)
+        elif isinstance(image, bytes):
+            image = Image.open(BytesIO(image))
+        if frame is not None:
+            image = frame.image
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        current = frame if frame is not None else Frame.wrap(image)
+
+        if previous_result is not None and changed_regions is None:
+            changed_regions = self._changed_regions(current, previous_result)
+            if changed_regions is not None and not changed_regions:
+                self._remember(frame, current, previous_result)
+                return self._track(previous_result)  # nothing changed since previous_result
+
+        header = {
+            'op': 'parse',
+            'size': list(image.size),
+            'offset': list(current.offset),
+            'force_refresh': force_refresh,
+            'goal': goal,
+            'ocr_words': _encode_words(ocr_words),
+            'options': {name: self.options[name] for name in REMOTE_OPTIONS if name in self.options}
+        }
+        if previous_result is not None and changed_regions is not None:
+            header['previous_result'] = encode_result(previous_result)
+            header['changed_regions'] = [list(r) for r in changed_regions]
+
+        result = self._remote(header, image.tobytes())
+        if result is None:
+            result = self._local_parser().parse(current, force_refresh, ocr_words,
+                                                previous_result, changed_regions, goal)
+            self.local_parses += 1
+        self._remember(frame, current, result)
+        return self._track(result)
+
+    def _remote(self, header: Dict[str, Any], payload: bytes) -> Optional[ParseResult]:
+        """Parse on the server (None if it cannot be reached and local_fallback is on)."""
+        start = time.time()
+        with self._lock:
+            try:
+                sock = self._connect()
+                if sock is None:
+                    return None
+                _send(sock, header, payload)
+                response, _ = _recv(sock)
+            except OSError as e:  # includes ConnectionError and socket.timeout
+                self._disconnect()
+                self._retry_at = time.time() + RECONNECT_INTERVAL
+                logger.warning("Perception server request failed (%s)%s", e,
+                               " - parsing locally" if self.local_fallback else "")
+                if not self.local_fallback:
+                    raise
+                return None
+        if not response.get('ok'):
+            raise RuntimeError(f"Perception server error: {response.get('error')}")
+        self.remote_parses += 1
+        self.round_trip_ms += (time.time() - start) * 1000
+        return decode_result(response['result'])
+
+    def _connect(self) -> Optional[socket.socket]:
+        """Open socket, connecting if needed (None while waiting to retry)."""
+        if self._sock is not None:
+            return self._sock
+        if time.time() < self._retry_at:
+            if not self.local_fallback:
+                raise ConnectionError(f"Perception server {self.socket_path} unavailable")
+            return None
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        logger.info("Connected to perception server at %s", self.socket_path)
+        return sock
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _local_parser(self) -> OmniParserV2:
+        if self._local is None:
+            logger.warning("Perception server unavailable - loading OmniParser in-process")
+            self._local = OmniParserV2(**{**self.options, 'track_elements': False})
+        return self._local
+
+    def _changed_regions(self, current: Frame,
+                         previous_result: ParseResult) -> Optional[List[Tuple[int, int, int, int]]]:
+        """Regions changed since previous_result was parsed (None if unknown)."""
+        last_frame, last_result = self._last_parsed, self._last_parsed_result
+        if last_result is not previous_result or last_frame is None:
+            return None
+        if last_frame.size != current.size or last_frame.offset != current.offset:
+            return None
+        damage = current.damage_since(last_frame)
+        if damage is not None:
+            return damage
+        return get_change_detector().compare(last_frame, current).boxes
+
+    def _remember(self, frame: Optional[Frame], current: Frame, result: ParseResult):
+        if frame is not None:
+            self._last_frame = frame
+            self._last_frame_result = result
+        self._last_parsed = current
+        self._last_parsed_result = result
+
+    def _track(self, result: ParseResult) -> ParseResult:
+        """Match result elements to the previous parse and assign track IDs (on a copy)."""
+        if self.tracker is None:
+            return result
+        result = copy.copy(result)
+        result.elements = [copy.copy(e) for e in result.elements]
+        try:
+            result.tracking = self.tracker.update(result)
+        except Exception as e:
+            logger.debug("Element tracking failed: %s", e)
+        result.reindex()
+        return result
+
+    def server_stats(self) -> Optional[Dict[str, Any]]:
+        """The server's statistics (None if unreachable)."""
+        with self._lock:
+            try:
+                sock = self._connect()
+                if sock is None:
+                    return None
+                _send(sock, {'op': 'stats'})
+                response, _ = _recv(sock)
+            except OSError:
+                self._disconnect()
+                return None
+        return response.get('stats')
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get client statistics."""
+        return {
+            'total_parses': self.total_parses,
+            'remote_parses': self.remote_parses,
+            'local_parses': self.local_parses,
+            'damage_skips': self.damage_skips,
+            'avg_round_trip_ms': self.round_trip_ms / max(self.remote_parses, 1),
+            'tracking': self.tracker.get_stats() if self.tracker else None,
+            'local': self._local.get_stats() if self._local else None
+        }
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+
+def create_parser(**options) -> Union[PerceptionClient, OmniParserV2]:
+    """
+    Parser for an agent: a PerceptionClient when OMNIPARSER_USE_SERVER=1,
+    else an in-process OmniParserV2 with the same options.
+    """
+    if OMNIPARSER_USE_SERVER:
+        return PerceptionClient(**options)
+    return OmniParserV2(**options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OmniParser perception server")
+    parser.add_argument('--socket', default=OMNIPARSER_SERVER_SOCKET, help='Unix socket path')
+    parser.add_argument('--window-ms', type=float, default=OMNIPARSER_BATCH_WINDOW_MS,
+                        help='Batching window for model calls')
+    parser.add_argument('--max-batch', type=int, default=OMNIPARSER_MAX_BATCH,
+                        help='Most frames per YOLO call')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    server = PerceptionServer(args.socket, window_ms=args.window_ms, max_batch=args.max_batch)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
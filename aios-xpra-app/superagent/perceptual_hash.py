@@ -0,0 +1,239 @@
+"""
+Perceptual Hash - Near-duplicate screenshot fingerprints
+
+Exact digests (md5 of pixels) turn every cache lookup into a miss as soon
+as a caret blinks or a clock ticks. Perceptual hashes of a small grayscale
+thumbnail barely move for such changes, and the Hamming distance between
+two hashes measures how different the screens are.
+
+    h = dhash(frame)                      # 512-bit int, memoized on Frames
+    index = HammingIndex(radius=4)
+    index.add(h, cache_key)
+    for distance, key in index.find(dhash(new_frame)):
+        ...                               # nearest cached screens first
+
+HammingIndex uses multi-index hashing: the hash is split into radius + 1
+chunks, and by the pigeonhole principle any hash within the radius matches
+at least one chunk exactly, so lookups are a few dict probes instead of a
+scan over every entry.
+"""
+
+import os
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+from .frames import Frame
+
+# Thumbnail edge for dHash (2 x hash_size x hash_size bits)
+DEFAULT_HASH_SIZE = 16
+HASH_BITS = 2 * DEFAULT_HASH_SIZE * DEFAULT_HASH_SIZE
+
+# Hashes at most this many bits apart count as the same screen (0 = exact)
+DEFAULT_RADIUS = int(os.environ.get('AIOS_PHASH_RADIUS', '4'))
+
+_dct_matrices: Dict[int, np.ndarray] = {}
+
+
+def _gray_thumbnail(image: Union[Image.Image, Frame], size: Tuple[int, int]) -> np.ndarray:
+    """Grayscale (width, height) thumbnail as a float array, memoized on the frame."""
+    frame = Frame.wrap(image)
+
+    def compute():
+        small = frame.gray().resize(size, Image.Resampling.BOX)
+        return np.asarray(small, dtype=np.float32)
+
+    return frame.memo(('hash_thumbnail', size), compute)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def dhash(image: Union[Image.Image, Frame], hash_size: int = DEFAULT_HASH_SIZE) -> int:
+    """
+    Difference hash: one bit per adjacent thumbnail pixel pair, horizontally
+    and vertically.
+
+    Both directions are needed on flat UIs: a horizontal-only hash cannot
+    tell a solid box from the same box with a moved left edge.
+
+    Args:
+        image: PIL image or Frame
+        hash_size: Thumbnail edge (hash has 2 * hash_size**2 bits)
+
+    Returns:
+        Hash as a Python int
+    """
+    frame = Frame.wrap(image)
+
+    def compute():
+        pixels = _gray_thumbnail(frame, (hash_size + 1, hash_size + 1))
+        rows = pixels[:-1, 1:] > pixels[:-1, :-1]
+        cols = pixels[1:, :-1] > pixels[:-1, :-1]
+        return _bits_to_int(np.concatenate([rows.ravel(), cols.ravel()]))
+
+    return frame.memo(('dhash', hash_size), compute)
+
+
+def rect_bits(rects: List[Tuple[int, int, int, int]], image_size: Tuple[int, int],
+              hash_size: int = DEFAULT_HASH_SIZE) -> int:
+    """
+    dhash bits that depend on pixels inside any of `rects`.
+
+    Clearing these bits (h & ~bits) masks the regions out of a hash.
+
+    Args:
+        rects: (x, y, width, height) in image pixels
+        image_size: (width, height) of the hashed image
+        hash_size: Same as passed to dhash()
+
+    Returns:
+        Bit mask as a Python int
+    """
+    width, height = image_size
+    cells = hash_size + 1
+    touched = np.zeros((cells, cells), dtype=bool)
+    for x, y, w, h in rects:
+        c1, c2 = max(0, x * cells // width), min(cells, -(-(x + w) * cells // width))
+        r1, r2 = max(0, y * cells // height), min(cells, -(-(y + h) * cells // height))
+        touched[r1:r2, c1:c2] = True
+    rows = touched[:-1, 1:] | touched[:-1, :-1]
+    cols = touched[1:, :-1] | touched[:-1, :-1]
+    return _bits_to_int(np.concatenate([rows.ravel(), cols.ravel()]))
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II matrix of size n x n."""
+    matrix = _dct_matrices.get(n)
+    if matrix is None:
+        k = np.arange(n)[:, None]
+        i = np.arange(n)[None, :]
+        matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+        matrix[0] /= np.sqrt(2.0)
+        _dct_matrices[n] = matrix
+    return matrix
+
+
+def phash(image: Union[Image.Image, Frame], hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """
+    DCT hash: low-frequency DCT coefficients compared against their median.
+
+    More robust than dhash to global brightness/contrast changes.
+
+    Args:
+        image: PIL image or Frame
+        hash_size: Edge of the low-frequency block (hash has hash_size**2 bits)
+        highfreq_factor: Thumbnail edge is hash_size * highfreq_factor
+
+    Returns:
+        Hash as a Python int
+    """
+    frame = Frame.wrap(image)
+
+    def compute():
+        n = hash_size * highfreq_factor
+        pixels = _gray_thumbnail(frame, (n, n))
+        dct = _dct_matrix(n)
+        low = (dct @ pixels @ dct.T)[:hash_size, :hash_size]
+        median = np.median(low.ravel()[1:])  # skip the DC term
+        return _bits_to_int(low > median)
+
+    return frame.memo(('phash', hash_size, highfreq_factor), compute)
+
+
+def hamming(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count('1')
+
+
+def to_hex(h: int, bits: int = HASH_BITS) -> str:
+    """Fixed-width hex form of a hash (for cache keys and logs)."""
+    return format(h, f'0{bits // 4}x')
+
+
+class HammingIndex:
+    """
+    Maps hashes to keys and finds all keys within a Hamming radius.
+
+    Not thread-safe; callers that share an index guard it with their own lock.
+    """
+
+    def __init__(self, radius: int = DEFAULT_RADIUS, bits: int = HASH_BITS):
+        """
+        Args:
+            radius: Largest distance find() can search
+            bits: Hash length in bits
+        """
+        self.radius = max(0, radius)
+        self.bits = bits
+        chunks = min(self.radius + 1, bits)
+        bounds = [bits * i // chunks for i in range(chunks + 1)]
+        self._chunks = [(lo, (1 << (hi - lo)) - 1) for lo, hi in zip(bounds, bounds[1:])]
+        self._tables: List[Dict[int, Set[Hashable]]] = [{} for _ in self._chunks]
+        self._hashes: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._hashes
+
+    def _parts(self, h: int):
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            yield table, (h >> shift) & mask
+
+    def add(self, h: int, key: Hashable):
+        """Index `key` under hash `h` (replaces the key's previous hash)."""
+        if key in self._hashes:
+            self.remove(key)
+        self._hashes[key] = h
+        for table, part in self._parts(h):
+            table.setdefault(part, set()).add(key)
+
+    def remove(self, key: Hashable):
+        """Drop `key` from the index (no-op if absent)."""
+        h = self._hashes.pop(key, None)
+        if h is None:
+            return
+        for table, part in self._parts(h):
+            bucket = table.get(part)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del table[part]
+
+    def clear(self):
+        self._hashes.clear()
+        for table in self._tables:
+            table.clear()
+
+    def find(self, h: int, radius: Optional[int] = None) -> List[Tuple[int, Any]]:
+        """
+        All keys whose hash is within `radius` bits of `h`.
+
+        Args:
+            h: Query hash
+            radius: Search radius (default and maximum: the index radius)
+
+        Returns:
+            (distance, key) pairs, nearest first
+        """
+        radius = self.radius if radius is None else min(radius, self.radius)
+        candidates: Set[Hashable] = set()
+        for table, part in self._parts(h):
+            candidates |= table.get(part, set())
+
+        matches = []
+        for key in candidates:
+            distance = hamming(h, self._hashes[key])
+            if distance <= radius:
+                matches.append((distance, key))
+        matches.sort(key=lambda m: m[0])
+        return matches
+
+    def nearest(self, h: int, radius: Optional[int] = None) -> Optional[Tuple[int, Any]]:
+        """Closest (distance, key) within the radius, or None."""
+        matches = self.find(h, radius)
+        return matches[0] if matches else None
@@ -0,0 +1,677 @@
+"""
+Screen Source - One capture pipeline per X display
+
+ActionExecutor, FastAgent, ComputerUseAgent, the headless ScreenAgent and
+VisionAgent all need screenshots of the same display. ScreenSource is the
+single place that owns:
+- An ordered chain of capture backends (xshm -> xpra -> scrot, or file replay)
+- Per-backend latency counters
+- X Damage tracking and the frame grabber (one frame sequence per display)
+- Capture scope (whole screen, or just the target window)
+- Waiting for the screen to settle after an action
+
+One shared instance per display is handed out by get_screen_source(), so a
+capture optimization lands once and every engine benefits:
+
+    source = get_screen_source(':100')
+    frame = source.capture_frame()        # Frame with seq, offset and damage
+    image = source.capture()              # just the PIL image
+    source.wait_until_stable(quiet_ms=300, max_wait=5)   # instead of sleep(5)
+"""
+
+import os
+import glob
+import time
+import logging
+import threading
+import subprocess
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Tuple, Union
+
+from PIL import Image, ImageChops, ImageStat
+
+from .xshm_capture import XShmCapture, XDamageTracker, clip_rect
+from .frames import Frame
+from .frame_grabber import FrameGrabber
+
+logger = logging.getLogger(__name__)
+
+# Screen capture backend: auto (xshm -> xpra -> scrot), or one of xshm, xpra,
+# scrot and replay pinned strictly (no fallback when the pinned backend fails)
+CAPTURE_BACKEND = os.environ.get('AIOS_CAPTURE_BACKEND', 'auto')
+
+# Directory or file of screenshots to replay instead of grabbing the display
+CAPTURE_REPLAY_PATH = os.environ.get('AIOS_CAPTURE_REPLAY', '')
+
+# What a capture covers: the whole screen, or only the target window
+# (the focus-hinted app, else the active window)
+CAPTURE_SCOPE = os.environ.get('AIOS_CAPTURE_SCOPE', 'screen')
+
+# Background frame grabber sampling rate (0 = capture on demand only)
+FRAME_GRABBER_FPS = float(os.environ.get('AIOS_FRAME_GRABBER_FPS', '0'))
+
+# Attach X Damage rectangles to captured frames (set to 0 to disable)
+XDAMAGE_ENABLED = os.environ.get('AIOS_XDAMAGE', '1') != '0'
+
+# A frame proven unchanged by X Damage can stand in for a new capture for
+# this many seconds (e.g. an action's after-frame as the next observation)
+FRAME_REUSE_MAX_AGE = float(os.environ.get('AIOS_FRAME_REUSE_MAX_AGE', '5.0'))
+
+# Without damage tracking, frames younger than this are reused unverified
+# (0 = never reuse a frame nothing vouches for)
+FRAME_REUSE_UNVERIFIED_AGE = float(os.environ.get('AIOS_FRAME_REUSE_UNVERIFIED_AGE', '0'))
+
+# Stability waits: pause between polls, thumbnail used for pixel diffs, mean
+# per-channel difference (0-255) that counts as a change, and damage smaller
+# than this many pixels that is ignored (blinking carets)
+STABILITY_POLL_INTERVAL = float(os.environ.get('AIOS_STABILITY_POLL', '0.05'))
+STABILITY_THUMBNAIL = (96, 54)
+STABILITY_PIXEL_THRESHOLD = float(os.environ.get('AIOS_STABILITY_THRESHOLD', '1.0'))
+STABILITY_MIN_DAMAGE_AREA = 200
+
+# Window captures smaller than this fall back to the full screen
+MIN_WINDOW_CAPTURE = 64
+
+# Backends tried, in order, for each AIOS_CAPTURE_BACKEND setting (only
+# 'auto' falls back; a pinned backend that fails returns no image)
+BACKEND_CHAINS = {
+    'auto': ['xshm', 'xpra', 'scrot'],
+    'xshm': ['xshm'],
+    'xpra': ['xpra'],
+    'scrot': ['scrot'],
+    'replay': ['replay'],
+}
+
+
+class CaptureBackend:
+    """
+    Base class for a way of grabbing the screen.
+
+    Subclasses implement _grab(); grab() adds latency/failure accounting and
+    crops to the requested region for backends that can only grab everything.
+    """
+
+    name = "base"
+    supports_region = False
+
+    def __init__(self):
+        self.disabled = False  # set when the backend can never work here
+        self.total_captures = 0
+        self.failed_captures = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Image.Image]:
+        """
+        Grab the screen (or a region of it).
+
+        Args:
+            region: Optional (x, y, width, height) in screen pixels
+
+        Returns:
+            PIL RGB image, or None on failure
+        """
+        start = time.time()
+        try:
+            image = self._grab(region)
+        except Exception as e:
+            logger.debug(f"{self.name} capture error: {e}")
+            image = None
+
+        if image is not None and region is not None and not self.supports_region:
+            x, y, w, h = region
+            image = image.crop((x, y, x + w, y + h))
+
+        self.last_ms = (time.time() - start) * 1000
+        self.total_ms += self.last_ms
+        if image is None:
+            self.failed_captures += 1
+        else:
+            self.total_captures += 1
+        return image
+
+    def _grab(self, region: Optional[Tuple[int, int, int, int]]) -> Optional[Image.Image]:
+        raise NotImplementedError
+
+    def close(self):
+        """Release backend resources."""
+        pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get latency statistics for this backend."""
+        attempts = self.total_captures + self.failed_captures
+        return {
+            'backend': self.name,
+            'disabled': self.disabled,
+            'total_captures': self.total_captures,
+            'failed_captures': self.failed_captures,
+            'avg_capture_ms': self.total_ms / max(attempts, 1),
+            'last_capture_ms': self.last_ms
+        }
+
+
+class XShmBackend(CaptureBackend):
+    """In-process MIT-SHM grab (no subprocess, no file)."""
+
+    name = "xshm"
+    supports_region = True
+
+    def __init__(self, display: str):
+        super().__init__()
+        self.xshm = XShmCapture(display)
+
+    def _grab(self, region):
+        image = self.xshm.capture(region)
+        if image is None and not self.xshm.available:
+            # Extension or libraries missing - don't retry on every capture
+            logger.info("XShm unavailable on this display - disabling the XShm backend")
+            self.disabled = True
+        return image
+
+    def close(self):
+        self.xshm.close()
+
+
+class _FileCaptureBackend(CaptureBackend):
+    """Backend that shells out to a tool writing a PNG, then loads it."""
+
+    def __init__(self, display: str):
+        super().__init__()
+        self.display = display
+        # Per-process, per-backend path so concurrent captures never collide
+        self.screenshot_path = f"/tmp/aios_capture_{self.name}_{os.getpid()}.png"
+        self._lock = threading.Lock()
+
+    def _load(self) -> Optional[Image.Image]:
+        if not os.path.exists(self.screenshot_path):
+            return None
+        with Image.open(self.screenshot_path) as img:
+            img.load()
+            return img.convert('RGB') if img.mode != 'RGB' else img.copy()
+
+    def _remove_previous(self):
+        if os.path.exists(self.screenshot_path):
+            os.remove(self.screenshot_path)
+
+
+class XpraBackend(_FileCaptureBackend):
+    """`xpra screenshot` - exactly what the Xpra client sees (requires an active client)."""
+
+    name = "xpra"
+
+    def _grab(self, region):
+        with self._lock:
+            self._remove_previous()
+            result = subprocess.run(
+                ['xpra', 'screenshot', self.screenshot_path, self.display],
+                capture_output=True,
+                timeout=5,
+                check=False
+            )
+            if result.returncode != 0 or not os.path.exists(self.screenshot_path):
+                logger.warning(f"Xpra screenshot failed (code {result.returncode})")
+                return None
+
+            size_bytes = os.path.getsize(self.screenshot_path)
+            if size_bytes <= 50_000:  # Real screenshots are at least ~50KB
+                logger.warning(f"Xpra screenshot too small ({size_bytes} bytes) - falling back")
+                return None
+
+            logger.info(f"✅ Captured via Xpra ({size_bytes // 1024}KB)")
+            return self._load()
+
+
+class ScrotBackend(_FileCaptureBackend):
+    """scrot - last-resort grab of the X display."""
+
+    name = "scrot"
+
+    def _grab(self, region):
+        with self._lock:
+            self._remove_previous()
+            subprocess.run(
+                ['scrot', self.screenshot_path],
+                env={'DISPLAY': self.display},
+                check=True,
+                stderr=subprocess.DEVNULL,
+                timeout=3
+            )
+            img = self._load()
+            if img is None:
+                logger.error("Screenshot file not created")
+                return None
+            logger.info(f"📸 Screenshot captured via scrot: {img.size}")
+            return img
+
+
+class FileReplayBackend(CaptureBackend):
+    """
+    Replays saved screenshots instead of grabbing a display.
+
+    Useful for benchmarks and offline debugging of the perception stack.
+    Images are returned in name order and the sequence loops.
+    """
+
+    name = "replay"
+
+    def __init__(self, path: Union[str, List[str]], loop: bool = True):
+        """
+        Args:
+            path: Image file, directory of images, or list of image files
+            loop: Start over after the last image (otherwise keep returning it)
+        """
+        super().__init__()
+        if isinstance(path, (list, tuple)):
+            self.paths = list(path)
+        elif os.path.isdir(path):
+            self.paths = sorted(
+                p for ext in ('png', 'jpg', 'jpeg')
+                for p in glob.glob(os.path.join(path, f'*.{ext}'))
+            )
+        else:
+            self.paths = [path]
+        self.loop = loop
+        self._index = 0
+        self._lock = threading.Lock()
+        if not self.paths:
+            logger.warning(f"Replay source {path} has no images")
+            self.disabled = True
+
+    def _grab(self, region):
+        with self._lock:
+            if not self.paths:
+                return None
+            if self._index >= len(self.paths):
+                self._index = 0 if self.loop else len(self.paths) - 1
+            path = self.paths[self._index]
+            self._index += 1
+        with Image.open(path) as img:
+            return img.convert('RGB')
+
+
+@dataclass
+class StabilityResult:
+    """Outcome of ScreenSource.wait_until_stable()."""
+    stable: bool             # quiet window reached (False = gave up at max_wait)
+    settle_ms: float         # time until the last observed change
+    elapsed_ms: float        # total time spent waiting
+    polls: int = 0
+    changes: int = 0
+    method: str = "damage"   # 'damage' (X Damage polls) or 'pixels' (frame diffs)
+    quiet_ms: float = 0.0
+    frame: Optional[Frame] = None  # last frame sampled ('pixels' only)
+
+
+def _rects_overlap(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def create_backend(name: str, display: str, replay_path: str = CAPTURE_REPLAY_PATH) -> CaptureBackend:
+    """Instantiate a capture backend by name."""
+    if name == 'xshm':
+        return XShmBackend(display)
+    if name == 'xpra':
+        return XpraBackend(display)
+    if name == 'scrot':
+        return ScrotBackend(display)
+    if name == 'replay':
+        return FileReplayBackend(replay_path)
+    raise ValueError(f"Unknown capture backend: {name}")
+
+
+class ScreenSource:
+    """
+    Shared screen capture for one X display.
+
+    Features:
+    - Backend fallback chain with per-backend latency counters
+    - Frames with sequence numbers, screen offset and X Damage info
+    - Optional background frame grabber
+    - Whole-screen or target-window capture scope
+    """
+
+    def __init__(self,
+                 display: str = ':100',
+                 backend: str = CAPTURE_BACKEND,
+                 capture_scope: str = CAPTURE_SCOPE,
+                 screen_size: Tuple[int, int] = (1920, 1080),
+                 replay_path: str = CAPTURE_REPLAY_PATH):
+        """
+        Initialize screen source.
+
+        Args:
+            display: X display to capture
+            backend: Backend chain name (see BACKEND_CHAINS)
+            capture_scope: 'screen' or 'window'
+            screen_size: Screen size used when the display can't be queried
+            replay_path: Images for the 'replay' backend
+        """
+        if backend not in BACKEND_CHAINS:
+            raise ValueError(f"Unknown capture backend: {backend}")
+
+        self.display = display
+        self.backend = backend
+        self.capture_scope = capture_scope
+        self.screen_width, self.screen_height = screen_size
+        self.target_window: Optional[int] = None  # window id picked by the last focus
+
+        self.backends: List[CaptureBackend] = [
+            create_backend(name, display, replay_path) for name in BACKEND_CHAINS[backend]
+        ]
+
+        # XShm connection doubles as the window geometry source
+        self.xshm: Optional[XShmCapture] = None
+        for b in self.backends:
+            if isinstance(b, XShmBackend):
+                self.xshm = b.xshm
+
+        self.damage_tracker: Optional[XDamageTracker] = None
+        if XDAMAGE_ENABLED and self.xshm is not None:
+            self.damage_tracker = XDamageTracker(display)
+
+        self.grabber = FrameGrabber(
+            self._grab_scoped,
+            fps=FRAME_GRABBER_FPS or 5.0,
+            damage_tracker=self.damage_tracker
+        )
+        if FRAME_GRABBER_FPS > 0:
+            self.grabber.start()
+
+        self.frames_reused = 0
+        self.stability_waits = 0
+        self.stability_timeouts = 0
+        self.stability_wait_ms = 0.0
+
+        logger.info(f"ScreenSource ready on {display} "
+                    f"(backends: {' -> '.join(b.name for b in self.backends)}, scope: {capture_scope})")
+
+    # ------------------------------------------------------------------ capture
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Image.Image]:
+        """
+        Grab an image with the first working backend (no frame bookkeeping).
+
+        Args:
+            region: Optional (x, y, w, h) to grab instead of the full screen
+        """
+        for backend in self.backends:
+            if backend.disabled:
+                continue
+            image = backend.grab(region)
+            if image is not None:
+                return image
+        if self.backend != 'auto':
+            logger.warning(f"Pinned capture backend '{self.backend}' failed (no fallback)")
+        return None
+
+    def capture_frame(self, fresh: bool = False) -> Optional[Frame]:
+        """
+        Current screen as a Frame.
+
+        With the background grabber running this is the newest buffered
+        frame (waiting for a new one if it is stale, or if fresh=True);
+        otherwise a capture is taken now.
+        """
+        grabber = self.grabber
+        if grabber.running:
+            # A grab already in flight started before this call: skip it
+            now = time.time()
+            if fresh:
+                frame = grabber.wait_for_newer(grabber.latest_seq, timeout=1.0, captured_after=now)
+            else:
+                frame = grabber.latest()
+                if frame is None or frame.age > max(1.0, 3 * grabber.interval):
+                    frame = grabber.wait_for_newer(grabber.latest_seq, timeout=1.0, captured_after=now)
+            if frame is not None:
+                return frame
+        return grabber.capture_once()
+
+    def reuse_frame(self, frame: Optional[Frame], max_age: float = FRAME_REUSE_MAX_AGE) -> Optional[Frame]:
+        """
+        Return `frame` if it still shows what is on screen, else None.
+
+        A frame qualifies when it is younger than max_age and X Damage proves
+        nothing inside it has been repainted since it was captured. Without
+        damage tracking only frames younger than FRAME_REUSE_UNVERIFIED_AGE do.
+
+        Args:
+            frame: Previously captured frame (e.g. an action's after-frame)
+            max_age: Oldest frame, in seconds, that may be reused
+        """
+        if frame is None or frame.age > max_age:
+            return None
+        if self.grabber.still_current(frame):
+            self.frames_reused += 1
+            return frame
+        tracked = self.damage_tracker is not None and self.damage_tracker.available
+        if not tracked and frame.age <= FRAME_REUSE_UNVERIFIED_AGE:
+            self.frames_reused += 1
+            return frame
+        return None
+
+    def wait_until_stable(self,
+                          region: Optional[Tuple[int, int, int, int]] = None,
+                          quiet_ms: float = 300,
+                          max_wait: float = 5.0,
+                          require_change: bool = False) -> StabilityResult:
+        """
+        Block until the screen stops changing.
+
+        Polls X Damage when available (no pixels touched), otherwise samples
+        frames and compares small thumbnails. Returns as soon as nothing has
+        changed for quiet_ms, or at max_wait.
+
+        Args:
+            region: Optional (x, y, w, h) screen area to watch
+            quiet_ms: How long the screen must stay unchanged
+            max_wait: Give up after this many seconds
+            require_change: Only settle after at least one change was seen
+                (e.g. an app launch that has not painted yet)
+
+        Returns:
+            StabilityResult with the settle time
+        """
+        start = time.time()
+        deadline = start + max_wait
+        last_change = start
+        polls = changes = 0
+        prev: Optional[Frame] = None
+        tracker = self.damage_tracker
+        use_damage = not self.grabber.running and tracker is not None and tracker.available
+
+        while True:
+            moved = None
+            if use_damage:
+                damage = self.grabber.pending_damage()
+                if damage is None:
+                    use_damage = False
+                    continue
+                moved = any(
+                    w * h >= STABILITY_MIN_DAMAGE_AREA and (region is None or _rects_overlap((x, y, w, h), region))
+                    for x, y, w, h in damage
+                )
+            else:
+                frame = self._next_stability_frame(prev, deadline, start)
+                if frame is not None:
+                    if prev is not None:
+                        moved = self._frames_differ(prev, frame, region)
+                    prev = frame
+
+            now = time.time()
+            if moved is not None:
+                polls += 1
+                if moved:
+                    changes += 1
+                    last_change = now
+                if (now - last_change) * 1000 >= quiet_ms and (changes or not require_change):
+                    stable = True
+                    break
+            if now >= deadline:
+                stable = False
+                break
+            time.sleep(min(STABILITY_POLL_INTERVAL, max(0.0, deadline - now)))
+
+        result = StabilityResult(
+            stable=stable,
+            settle_ms=(last_change - start) * 1000,
+            elapsed_ms=(time.time() - start) * 1000,
+            polls=polls,
+            changes=changes,
+            method='damage' if use_damage else 'pixels',
+            quiet_ms=quiet_ms,
+            frame=prev
+        )
+        self.stability_waits += 1
+        self.stability_wait_ms += result.elapsed_ms
+        if not stable:
+            self.stability_timeouts += 1
+        logger.debug(f"Screen {'settled' if stable else 'still changing'} after {result.elapsed_ms:.0f}ms "
+                     f"({result.method}, {polls} polls, {changes} changes)")
+        return result
+
+    def _next_stability_frame(self, prev: Optional[Frame], deadline: float,
+                              start: float) -> Optional[Frame]:
+        """Next frame to compare (captured after `start`): from the running grabber, else a capture now."""
+        if self.grabber.running:
+            seq = prev.seq if prev is not None else self.grabber.latest_seq
+            return self.grabber.wait_for_newer(seq, timeout=max(0.0, deadline - time.time()),
+                                               captured_after=start)
+        return self.grabber.capture_once()
+
+    def _frames_differ(self, prev: Frame, frame: Frame,
+                       region: Optional[Tuple[int, int, int, int]]) -> bool:
+        """True if `frame` changed from `prev` (inside region, if given)."""
+        if prev.screen_rect != frame.screen_rect:
+            return True
+        damage = frame.damage_since(prev)
+        ox, oy = frame.offset
+        local = None
+        if region is not None:
+            local = clip_rect((region[0] - ox, region[1] - oy, region[2], region[3]), *frame.size)
+            if local[2] <= 0 or local[3] <= 0:
+                return False
+        if damage is not None:
+            return any(
+                w * h >= STABILITY_MIN_DAMAGE_AREA and (local is None or _rects_overlap((x, y, w, h), local))
+                for x, y, w, h in damage
+            )
+
+        if local is None:
+            a, b = prev.thumbnail(STABILITY_THUMBNAIL), frame.thumbnail(STABILITY_THUMBNAIL)
+        else:
+            box = (local[0], local[1], local[0] + local[2], local[1] + local[3])
+            a = prev.image.crop(box).resize(STABILITY_THUMBNAIL, Image.Resampling.BILINEAR)
+            b = frame.image.crop(box).resize(STABILITY_THUMBNAIL, Image.Resampling.BILINEAR)
+        if a.mode != b.mode:
+            a, b = a.convert('RGB'), b.convert('RGB')
+        diff = ImageStat.Stat(ImageChops.difference(a, b)).mean
+        return sum(diff) / len(diff) > STABILITY_PIXEL_THRESHOLD
+
+    def capture(self) -> Optional[Image.Image]:
+        """Current screen as a PIL image (see capture_frame)."""
+        frame = self.capture_frame()
+        return frame.image if frame is not None else None
+
+    def start_grabber(self, fps: float = 5.0, buffer_size: int = 8) -> FrameGrabber:
+        """Start sampling the display in the background."""
+        self.grabber.configure(fps=fps, buffer_size=buffer_size)
+        self.grabber.start()
+        return self.grabber
+
+    def stop_grabber(self):
+        """Stop background sampling and return to on-demand capture."""
+        self.grabber.stop()
+
+    # ------------------------------------------------------------------ scope
+
+    def set_capture_scope(self, scope: str):
+        """
+        Choose what captures cover.
+
+        Args:
+            scope: 'screen' for the whole display, or 'window' for just the
+                target window; window frames carry their screen offset
+        """
+        if scope not in ('screen', 'window'):
+            raise ValueError(f"Unknown capture scope: {scope}")
+        self.capture_scope = scope
+        logger.info(f"Capture scope set to {scope}")
+
+    def _grab_scoped(self):
+        """Grab for the frame grabber: an image, or (image, offset) for window captures."""
+        region = self.window_region() if self.capture_scope == 'window' else None
+        image = self.grab(region)
+        if image is None or region is None:
+            return image
+        return image, (region[0], region[1])
+
+    def window_region(self) -> Optional[Tuple[int, int, int, int]]:
+        """Screen rectangle of the target window, or None to capture the full screen."""
+        if self.xshm is None:
+            return None
+
+        rect = None
+        if self.target_window:
+            rect = self.xshm.window_rect(self.target_window)
+        if rect is None:
+            active = self.xshm.active_window()
+            if active:
+                rect = self.xshm.window_rect(active)
+        if rect is None:
+            return None
+
+        width = self.xshm.width or self.screen_width
+        height = self.xshm.height or self.screen_height
+        x, y, w, h = clip_rect(rect, width, height)
+        if w < MIN_WINDOW_CAPTURE or h < MIN_WINDOW_CAPTURE:
+            return None
+        if (w, h) == (width, height):
+            return None
+        return (x, y, w, h)
+
+    # ------------------------------------------------------------------ misc
+
+    def close(self):
+        """Stop the grabber and release X resources."""
+        self.grabber.stop()
+        if self.damage_tracker is not None:
+            self.damage_tracker.close()
+        for backend in self.backends:
+            backend.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get capture statistics, per backend."""
+        return {
+            'display': self.display,
+            'backend': self.backend,
+            'capture_scope': self.capture_scope,
+            'backends': [b.get_stats() for b in self.backends],
+            'xshm': self.xshm.get_stats() if self.xshm else None,
+            'frame_grabber': self.grabber.get_stats(),
+            'frames_reused': self.frames_reused,
+            'stability': {
+                'waits': self.stability_waits,
+                'timeouts': self.stability_timeouts,
+                'avg_wait_ms': self.stability_wait_ms / max(self.stability_waits, 1)
+            },
+            'xdamage': self.damage_tracker.get_stats() if self.damage_tracker else None
+        }
+
+
+# ═══════════════════════════════════════════════════════════════════════════════
+# Shared instances
+# ═══════════════════════════════════════════════════════════════════════════════
+
+_screen_sources: Dict[str, ScreenSource] = {}
+_screen_sources_lock = threading.Lock()
+
+
+def get_screen_source(display: Optional[str] = None) -> ScreenSource:
+    """Get or create the shared ScreenSource for a display (defaults to $DISPLAY)."""
+    display = display or os.environ.get('DISPLAY', ':100')
+    with _screen_sources_lock:
+        source = _screen_sources.get(display)
+        if source is None:
+            source = ScreenSource(display)
+            _screen_sources[display] = source
+        return source
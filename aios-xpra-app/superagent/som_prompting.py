@@ -32,9 +32,10 @@ import colorsys
 
 from PIL import Image, ImageDraw, ImageFont
 
+from .frames import Frame
 from .omniparser import (
     OmniParser, ParseResult, UIElement, BoundingBox,
-    ElementType, InteractionType
+    ElementType, InteractionType, ensure_captions
 )
 
 logger = logging.getLogger(__name__)
@@ -227,20 +228,24 @@ class MarkRenderer:
     def __init__(self, config: MarkConfig = None):
         self.config = config or MarkConfig()
     
-    def render(self, image: Image.Image, 
+    def render(self, image: Union[Image.Image, Frame], 
               elements: List[UIElement],
               parse_result: ParseResult) -> MarkedImage:
         """
         Render marks on an image.
         
         Args:
-            image: Source image
+            image: Source image, or a Frame (element boxes are then in
+                screen coordinates and drawn relative to the frame offset)
             elements: Elements to mark
             parse_result: Full parse result for context
             
         Returns:
             MarkedImage with overlaid marks
         """
+        frame = Frame.wrap(image)
+        image = frame.image
+        
         # Create a copy to draw on
         marked = image.copy()
         if marked.mode != 'RGBA':
@@ -260,13 +265,15 @@ class MarkRenderer:
         
         # Limit number of marks
         elements = elements[:self.config.max_marks]
+        if self.config.color_scheme == ColorScheme.CATEGORICAL:
+            ensure_captions(elements)  # captions decide the element type (color)
         
         # Track element map and positions
         element_map = {}
         mark_positions = {}
         
         # Calculate average background brightness
-        avg_brightness = self._calculate_brightness(image)
+        avg_brightness = self._calculate_brightness(frame)
         
         # Draw marks for each element
         for i, element in enumerate(elements):
@@ -278,7 +285,7 @@ class MarkRenderer:
             
             # Draw the mark based on style
             mark_pos = self._draw_mark(
-                draw, element, mark_id, color, font, badge_font
+                draw, element, mark_id, color, font, badge_font, frame.offset
             )
             mark_positions[mark_id] = mark_pos
         
@@ -329,11 +336,14 @@ class MarkRenderer:
     def _draw_mark(self, draw: ImageDraw.ImageDraw, element: UIElement,
                   mark_id: int, color: Tuple[int, int, int],
                   font: ImageFont.FreeTypeFont,
-                  badge_font: ImageFont.FreeTypeFont) -> Tuple[int, int]:
-        """Draw a mark for an element and return mark position."""
+                  badge_font: ImageFont.FreeTypeFont,
+                  offset: Tuple[int, int] = (0, 0)) -> Tuple[int, int]:
+        """Draw a mark for an element and return mark position (image coordinates)."""
         bbox = element.bbox
-        x1, y1, x2, y2 = int(bbox.x1), int(bbox.y1), int(bbox.x2), int(bbox.y2)
+        ox, oy = offset
+        x1, y1, x2, y2 = int(bbox.x1) - ox, int(bbox.y1) - oy, int(bbox.x2) - ox, int(bbox.y2) - oy
         cx, cy = bbox.center_int
+        cx, cy = cx - ox, cy - oy
         
         # Create RGBA color with opacity
         opacity = int(self.config.opacity * 255)
@@ -519,10 +529,10 @@ class MarkRenderer:
         
         return (x1, y1)
     
-    def _calculate_brightness(self, image: Image.Image) -> float:
+    def _calculate_brightness(self, image: Union[Image.Image, Frame]) -> float:
         """Calculate average brightness of image."""
-        # Sample pixels for speed
-        small = image.resize((50, 50), Image.Resampling.LANCZOS)
+        # Sample pixels for speed (thumbnail memoized on the frame)
+        small = Frame.wrap(image).thumbnail((50, 50))
         if small.mode != 'RGB':
             small = small.convert('RGB')
         
@@ -666,6 +676,7 @@ RESPONSE FORMAT (JSON only):
         # Sort by ID
         elements = list(marked_image.element_map.items())
         elements.sort(key=lambda x: x[0])
+        ensure_captions([element for _, element in elements[:self.max_elements]])
         
         for mark_id, element in elements[:self.max_elements]:
             line = self._format_element(mark_id, element)
@@ -860,7 +871,7 @@ class SetOfMarkPrompter:
         self.successful_groundings = 0
     
     def prepare_prompt(self, 
-                      image: Union[Image.Image, str, bytes],
+                      image: Union[Image.Image, Frame, str, bytes],
                       task: str,
                       state_context: str = "") -> Tuple[MarkedImage, str]:
         """
@@ -869,7 +880,7 @@ class SetOfMarkPrompter:
         This is the main method to call before sending to LLM.
         
         Args:
-            image: Screenshot to analyze
+            image: Screenshot to analyze (image, Frame, path or bytes)
             task: Current task description
             state_context: Additional context
             
@@ -881,6 +892,7 @@ class SetOfMarkPrompter:
             image = Image.open(image)
         elif isinstance(image, bytes):
             image = Image.open(BytesIO(image))
+        image = Frame.wrap(image)
         
         # Parse screenshot for elements
         parse_result = self.parser.parse(image)
@@ -11,14 +11,14 @@ Key optimizations:
 
 import os
 import time
-import base64
 import json
 import requests
-from io import BytesIO
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Union
 from PIL import Image
 import logging
 
+from .frames import Frame
+
 logger = logging.getLogger(__name__)
 
 
@@ -51,7 +51,7 @@ class VisionAPI:
         
     def analyze_screen(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any],
         mode: str = "action"
@@ -226,22 +226,10 @@ RESPOND (JSON only):
   }}
 }}"""
     
-    def _encode_image(self, screenshot: Image.Image) -> str:
-        """Encode image efficiently"""
-        
-        # Resize if too large (optimize speed vs quality)
-        max_size = 1920
-        if screenshot.width > max_size or screenshot.height > max_size:
-            ratio = max_size / max(screenshot.width, screenshot.height)
-            new_size = (int(screenshot.width * ratio), int(screenshot.height * ratio))
-            screenshot = screenshot.resize(new_size, Image.Resampling.LANCZOS)
-        
-        # Convert to PNG with compression
-        buffer = BytesIO()
-        screenshot.save(buffer, format='PNG', optimize=True)
-        img_bytes = buffer.getvalue()
-        
-        return base64.b64encode(img_bytes).decode('utf-8')
+    def _encode_image(self, screenshot: Union[Image.Image, Frame]) -> str:
+        """Encode image efficiently (PIL image or captured Frame)"""
+        # Resized to at most 1920px and PNG-encoded once per frame
+        return Frame.wrap(screenshot).base64('PNG', max_size=1920)
     
     def _call_api_with_retry(self, prompt: str, img_base64: str, max_retries: int = 3) -> Dict:
         """Call API with exponential backoff retry"""
@@ -365,7 +353,7 @@ RESPOND (JSON only):
     
     def get_action(
         self,
-        screenshot: Image.Image,
+        screenshot: Union[Image.Image, Frame],
         task: str,
         context: Dict[str, Any],
         mode: str = "action"
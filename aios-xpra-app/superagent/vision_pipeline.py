@@ -28,6 +28,7 @@ from concurrent.futures import ThreadPoolExecutor
 
 from PIL import Image
 
+from .frames import Frame
 from .omniparser import (
     OmniParser, OmniParserV2, ParseResult, UIElement,
     BoundingBox, ElementType, InteractionType, create_omniparser,
@@ -186,7 +187,7 @@ class VisionPipeline:
         self.response_parser = ResponseParser()
     
     def analyze(self, 
-               screenshot: Union[Image.Image, str, bytes],
+               screenshot: Union[Image.Image, Frame, str, bytes],
                task: str,
                context: ActionContext = None,
                call_vision_api: bool = True) -> VisionResult:
@@ -196,7 +197,8 @@ class VisionPipeline:
         This is the main entry point for screen analysis.
         
         Args:
-            screenshot: Screenshot to analyze
+            screenshot: Screenshot to analyze (a captured Frame keeps its
+                hashes and encodings shared across parser, SoM and LLM call)
             task: Current task description
             context: Additional context
             call_vision_api: Whether to call LLM (False for just parsing)
@@ -213,12 +215,14 @@ class VisionPipeline:
         elif isinstance(screenshot, bytes):
             screenshot = Image.open(BytesIO(screenshot))
         
-        if screenshot.mode != 'RGB':
+        if not isinstance(screenshot, Frame) and screenshot.mode != 'RGB':
             screenshot = screenshot.convert('RGB')
+        frame = Frame.wrap(screenshot)
+        screenshot = frame.rgb()
         
         # Phase 1: Parse screenshot for UI elements
         parse_start = time.time()
-        parse_result = self.parser.parse(screenshot)
+        parse_result = self.parser.parse(frame, goal=task)
         parse_time = (time.time() - parse_start) * 1000
         
         logger.info("Parsed %d elements (%d clickable) in %.1fms",
@@ -231,7 +235,7 @@ class VisionPipeline:
         if self.config.use_som and self.som_prompter:
             mark_start = time.time()
             marked_image, _ = self.som_prompter.prepare_prompt(
-                screenshot, task, 
+                frame, task, 
                 context.screen_description if context else ""
             )
             mark_time = (time.time() - mark_start) * 1000
@@ -285,7 +289,7 @@ class VisionPipeline:
             
             try:
                 # Get the image to send (marked or original)
-                image_to_send = marked_image.image if marked_image else screenshot
+                image_to_send = marked_image.image if marked_image else frame
                 
                 # Call vision API
                 api_response = self._call_vision_api(
@@ -326,18 +330,13 @@ class VisionPipeline:
         
         return result
     
-    def _call_vision_api(self, image: Image.Image, 
+    def _call_vision_api(self, image: Union[Image.Image, Frame], 
                         user_prompt: str,
                         system_prompt: str = "") -> str:
-        """Call the vision API with image and prompt."""
+        """Call the vision API with image and prompt (the client encodes it)."""
         if not self.vision_api:
             raise ValueError("No vision API configured")
         
-        # Convert image to bytes
-        buffer = BytesIO()
-        image.save(buffer, format='JPEG', quality=85)
-        image_bytes = buffer.getvalue()
-        
         # Call API (adapt to your vision API interface)
         if hasattr(self.vision_api, 'analyze_with_vision_api'):
             # GeminiVisionAPI style
@@ -354,7 +353,7 @@ class VisionPipeline:
         
         elif hasattr(self.vision_api, 'analyze'):
             # Generic interface
-            return self.vision_api.analyze(image, user_prompt)
+            return self.vision_api.analyze(Frame.wrap(image).image, user_prompt)
         
         else:
             raise ValueError("Vision API does not have analyze method")
@@ -375,7 +374,7 @@ class VisionPipeline:
             
             self._last_call_time = time.time()
     
-    def parse_only(self, screenshot: Union[Image.Image, str, bytes]) -> ParseResult:
+    def parse_only(self, screenshot: Union[Image.Image, Frame, str, bytes]) -> ParseResult:
         """
         Parse screenshot without LLM call.
         
@@ -442,7 +441,7 @@ class LegacyVisionAdapter:
         self.pipeline = pipeline
     
     def analyze_with_vision_api(self,
-                               screenshot: Image.Image,
+                               screenshot: Union[Image.Image, Frame],
                                task: str,
                                context: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -0,0 +1,318 @@
+"""
+Volatile Masks - Screen regions excluded from frame fingerprints
+
+Some regions make every frame unique even with perceptual hashing: loading
+spinners, the system clock, blinking carets, video thumbnails, relative
+timestamps ("2 min ago"). Masking them out of the fingerprint lets caches
+hit on screens that are otherwise identical.
+
+Masks come from two places:
+- Declared per app in the AppLauncher configs:
+      "volatile_regions": [{"label": "tab spinner", "rect": [0, 0, 260, 40]}]
+  (rects are [x, y, width, height] in screen pixels)
+- Learned per app: tiles that keep changing between consecutive frames
+  that are otherwise identical become volatile after a few sightings
+
+    masks = get_volatile_masks()
+    masks.set_active_app("Gmail")
+    fp = masks.fingerprint(frame)          # fp.hash has volatile bits cleared
+    ...
+    if masks.confirm_hit(cached_snapshot, frame):   # no real change outside the masks
+        masks.record_lookup("omniparser", fp, cached_raw_hash)
+
+A fingerprint match alone is not proof: a typed word or a small new icon
+moves a 512-bit dHash by only a few bits, so caches keep a snapshot() of
+each cached screen and reuse it only when confirm_hit() finds nothing
+bigger than a caret or a couple of glyphs changed outside the volatile
+regions (a blink the masks have not learned yet still hits).
+
+record_lookup() attributes hits that only happened because of a mask to the
+regions responsible, so get_stats() shows what each mask contributes.
+"""
+
+import threading
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Tuple, Union
+
+from PIL import Image
+
+from .frames import Frame
+from .perceptual_hash import dhash, hamming, rect_bits, DEFAULT_RADIUS
+from .change_detection import ScreenSnapshot, get_change_detector
+
+logger = logging.getLogger(__name__)
+
+# Rectangle as (x, y, width, height)
+Rect = Tuple[int, int, int, int]
+
+
+@dataclass
+class VolatileRegion:
+    """One masked screen region."""
+    label: str
+    rect: Rect                  # screen coordinates
+    source: str = "declared"    # 'declared' or 'learned'
+    app: Optional[str] = None   # None = applies to every app
+    saves: int = 0              # cache hits that needed this mask
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'label': self.label,
+            'rect': self.rect,
+            'source': self.source,
+            'app': self.app,
+            'saves': self.saves
+        }
+
+
+@dataclass
+class Fingerprint:
+    """Masked and unmasked perceptual hash of one screenshot."""
+    hash: int                   # dhash with volatile bits cleared (cache key)
+    raw: int                    # unmasked dhash
+    app: Optional[str] = None
+    regions: List[Tuple[VolatileRegion, int]] = field(default_factory=list)  # (region, hash bits)
+
+    @property
+    def masked(self) -> bool:
+        return bool(self.regions)
+
+
+class VolatileMaskRegistry:
+    """
+    Per-app volatile regions, declared or learned from frame diffs.
+
+    Features:
+    - Declared regions from app configs
+    - Learning from ChangeReports of consecutive, nearly identical frames
+    - Masked fingerprints for caches, with per-region hit attribution
+    """
+
+    def __init__(self,
+                 learn_threshold: int = 3,
+                 max_learned: int = 12,
+                 max_tiles_per_observation: int = 2):
+        """
+        Initialize registry.
+
+        Args:
+            learn_threshold: Sightings before a tile becomes a learned region
+            max_learned: Cap on learned regions per app
+            max_tiles_per_observation: Diffs touching more tiles than this are
+                real screen changes and are not learned from
+        """
+        self.learn_threshold = learn_threshold
+        self.max_learned = max_learned
+        self.max_tiles_per_observation = max_tiles_per_observation
+
+        self.active_app: Optional[str] = None
+        self._regions: Dict[Optional[str], List[VolatileRegion]] = {}
+        self._sightings: Dict[Tuple[Optional[str], Rect], int] = {}
+        self._bits_cache: Dict[Tuple[Rect, Tuple[int, int]], int] = {}
+        self._lookups: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(app: Optional[str]) -> Optional[str]:
+        return app.strip().lower() if app else None  # config names vs inferred names
+
+    def set_active_app(self, app: Optional[str]):
+        """Set the app whose masks apply when callers don't name one."""
+        self.active_app = app
+
+    def declare(self, app: Optional[str], regions: List[Union[Dict[str, Any], List[int]]]):
+        """
+        Declare volatile regions for an app.
+
+        Args:
+            app: App name (None for regions volatile in every app)
+            regions: {"label": ..., "rect": [x, y, w, h]} dicts or bare [x, y, w, h] lists
+        """
+        with self._lock:
+            app_regions = self._regions.setdefault(self._key(app), [])
+            for i, region in enumerate(regions):
+                try:
+                    if isinstance(region, dict):
+                        label = region.get('label', f'{app or "global"}#{i}')
+                        rect = tuple(int(v) for v in region['rect'])
+                    else:
+                        label, rect = f'{app or "global"}#{i}', tuple(int(v) for v in region)
+                    if len(rect) != 4:
+                        raise ValueError(f"expected [x, y, width, height], got {rect}")
+                except (KeyError, TypeError, ValueError) as e:
+                    logger.warning(f"Ignoring volatile region {region!r} for {app}: {e}")
+                    continue
+                app_regions.append(VolatileRegion(label=label, rect=rect, app=app))
+
+    def load_app_configs(self, apps: Dict[str, Dict[str, Any]]):
+        """Declare the "volatile_regions" of every AppLauncher config that has them."""
+        for name, config in apps.items():
+            regions = config.get('volatile_regions')
+            if regions:
+                self.declare(name, regions)
+                logger.info(f"🎭 {len(regions)} volatile regions declared for {name}")
+
+    def regions_for(self, app: Optional[str] = None) -> List[VolatileRegion]:
+        """Global regions plus those of `app` (default: the active app)."""
+        app = app or self.active_app
+        with self._lock:
+            regions = list(self._regions.get(None, []))
+            if app is not None:
+                regions += self._regions.get(self._key(app), [])
+        return regions
+
+    def image_rects(self, image: Union[Image.Image, Frame], app: Optional[str] = None) -> List[Rect]:
+        """Volatile regions in the image's own coordinates, clipped to it."""
+        frame = Frame.wrap(image)
+        return [rect for _, rect in self._clipped(frame, self.regions_for(app))]
+
+    def _clipped(self, frame: Frame, regions: List[VolatileRegion]) -> List[Tuple[VolatileRegion, Rect]]:
+        ox, oy = frame.offset
+        width, height = frame.size
+        clipped = []
+        for region in regions:
+            x, y, w, h = region.rect
+            x1, y1 = max(0, x - ox), max(0, y - oy)
+            x2, y2 = min(width, x - ox + w), min(height, y - oy + h)
+            if x2 > x1 and y2 > y1:
+                clipped.append((region, (x1, y1, x2 - x1, y2 - y1)))
+        return clipped
+
+    def fingerprint(self, image: Union[Image.Image, Frame], app: Optional[str] = None) -> Fingerprint:
+        """
+        Perceptual hash with the app's volatile regions masked out.
+
+        Args:
+            image: PIL image or Frame
+            app: App whose masks apply (default: the active app)
+
+        Returns:
+            Fingerprint (hash is the masked dhash, raw the unmasked one)
+        """
+        frame = Frame.wrap(image)
+        app = app or self.active_app
+        raw = dhash(frame)
+        masked = []
+        for region, rect in self._clipped(frame, self.regions_for(app)):
+            key = (rect, frame.size)
+            bits = self._bits_cache.get(key)
+            if bits is None:
+                bits = self._bits_cache[key] = rect_bits([rect], frame.size)
+            masked.append((region, bits))
+
+        mask = 0
+        for _, bits in masked:
+            mask |= bits
+        return Fingerprint(hash=raw & ~mask, raw=raw, app=app, regions=masked)
+
+    def observe(self, report, offset: Tuple[int, int] = (0, 0), app: Optional[str] = None):
+        """
+        Learn from a ChangeReport of two consecutive frames.
+
+        Only small diffs (a few tiles, e.g. a clock or spinner) are learned
+        from; tiles seen changing learn_threshold times become regions.
+
+        Args:
+            report: ChangeReport from the change detector
+            offset: Screen position of the compared images
+            app: App on screen (default: the active app)
+        """
+        changed = report.changed_tiles()
+        if not changed or len(changed) > self.max_tiles_per_observation:
+            return
+        app = self._key(app or self.active_app)
+        ox, oy = offset
+        with self._lock:
+            app_regions = self._regions.setdefault(app, [])
+            known = {r.rect for r in app_regions}
+            learned = sum(1 for r in app_regions if r.source == 'learned')
+            for row, col in changed:
+                x, y, w, h = report.tile_bbox(row, col)
+                rect = (x + ox, y + oy, w, h)
+                if rect in known:
+                    continue
+                count = self._sightings.get((app, rect), 0) + 1
+                self._sightings[(app, rect)] = count
+                if count >= self.learn_threshold and learned < self.max_learned:
+                    app_regions.append(VolatileRegion(
+                        label=f"learned@{rect[0]},{rect[1]}", rect=rect, source='learned', app=app))
+                    del self._sightings[(app, rect)]
+                    learned += 1
+                    logger.info(f"🎭 Learned volatile region {rect} for {app or 'all apps'}")
+
+    def snapshot(self, image: Union[Image.Image, Frame]) -> ScreenSnapshot:
+        """Pixels a cache keeps with an entry to confirm later hits against."""
+        return get_change_detector().snapshot(image)
+
+    def confirm_hit(self, snapshot: Optional[ScreenSnapshot], image: Union[Image.Image, Frame],
+                    app: Optional[str] = None) -> bool:
+        """
+        True if `image` shows the cached screen: outside the app's volatile
+        regions nothing bigger than a caret or a couple of glyphs changed
+        (see ChangeDetector.unchanged).
+        """
+        return get_change_detector().unchanged(snapshot, image, ignore=self.image_rects(image, app))
+
+    def record_lookup(self, consumer: str, fingerprint: Fingerprint, cached_raw: Optional[int] = None,
+                      radius: int = DEFAULT_RADIUS):
+        """
+        Count a cache lookup and credit masks that turned it into a hit.
+
+        Args:
+            consumer: Cache name (e.g. 'omniparser')
+            fingerprint: Fingerprint used for the lookup
+            cached_raw: Unmasked hash of the entry that matched (None on a miss)
+            radius: Hamming radius the cache matches within
+        """
+        with self._lock:
+            stats = self._lookups.setdefault(consumer, {'lookups': 0, 'hits': 0, 'mask_hits': 0})
+            stats['lookups'] += 1
+            if cached_raw is None:
+                return
+            stats['hits'] += 1
+            if hamming(fingerprint.raw, cached_raw) <= radius:
+                return  # would have hit without any mask
+            stats['mask_hits'] += 1
+            diff = fingerprint.raw ^ cached_raw
+            for region, bits in fingerprint.regions:
+                if diff & bits:
+                    region.saves += 1
+
+    def clear_learned(self, app: Optional[str] = None):
+        """Forget learned regions (of one app, or all)."""
+        app = self._key(app)
+        with self._lock:
+            for name, regions in self._regions.items():
+                if app is None or name == app:
+                    regions[:] = [r for r in regions if r.source != 'learned']
+            self._sightings = {k: v for k, v in self._sightings.items()
+                               if app is not None and k[0] != app}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-cache hit rates (with mask-only hits) and per-region contributions."""
+        with self._lock:
+            consumers = {}
+            for name, stats in self._lookups.items():
+                consumers[name] = dict(stats)
+                consumers[name]['hit_rate'] = stats['hits'] / max(stats['lookups'], 1)
+                consumers[name]['mask_hit_rate'] = stats['mask_hits'] / max(stats['lookups'], 1)
+            regions = [r.to_dict() for rs in self._regions.values() for r in rs]
+        return {
+            'active_app': self.active_app,
+            'consumers': consumers,
+            'regions': regions,
+            'pending_tiles': len(self._sightings)
+        }
+
+
+# Singleton instance
+_registry: Optional[VolatileMaskRegistry] = None
+
+
+def get_volatile_masks() -> VolatileMaskRegistry:
+    """Get or create the shared volatile mask registry."""
+    global _registry
+    if _registry is None:
+        _registry = VolatileMaskRegistry()
+    return _registry
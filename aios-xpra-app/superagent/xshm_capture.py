@@ -0,0 +1,713 @@
+"""
+XShm Capture - In-process X11 screen grabbing over MIT-SHM
+
+Grabs the X display directly into a shared-memory segment that is allocated
+once and reused for every capture. Compared to `xpra screenshot` / `scrot`
+this avoids:
+- Spawning a subprocess per capture
+- PNG encode to /tmp and PNG decode back
+- RGBA -> RGB conversion of a decoded file
+
+Also provides XDamageTracker, which subscribes to X Damage events on the root
+window and reports the rectangles repainted since the previous poll, so the
+perception stack can tell which parts of the screen changed without diffing.
+
+Only libX11 / libXext / libXdamage / libXfixes (already present in the
+container for xpra and Chrome) are required - bindings are done with ctypes
+so no extra pip package is needed.
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+# X11 / SysV IPC constants
+_ZPIXMAP = 2
+_XDAMAGE_REPORT_NON_EMPTY = 3
+_XEVENT_SIZE = 192  # sizeof(XEvent) on 64-bit Xlib
+_ALL_PLANES = 0xFFFFFFFFFFFFFFFF
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+
+
+class _XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ('shmseg', ctypes.c_ulong),
+        ('shmid', ctypes.c_int),
+        ('shmaddr', ctypes.c_void_p),
+        ('readOnly', ctypes.c_int),
+    ]
+
+
+class _XImage(ctypes.Structure):
+    # Only the leading fields are accessed; the trailing function table is
+    # never touched from Python, so it is left out of the layout.
+    _fields_ = [
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('xoffset', ctypes.c_int),
+        ('format', ctypes.c_int),
+        ('data', ctypes.c_void_p),
+        ('byte_order', ctypes.c_int),
+        ('bitmap_unit', ctypes.c_int),
+        ('bitmap_bit_order', ctypes.c_int),
+        ('bitmap_pad', ctypes.c_int),
+        ('depth', ctypes.c_int),
+        ('bytes_per_line', ctypes.c_int),
+        ('bits_per_pixel', ctypes.c_int),
+        ('red_mask', ctypes.c_ulong),
+        ('green_mask', ctypes.c_ulong),
+        ('blue_mask', ctypes.c_ulong),
+    ]
+
+
+class _XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_int),
+        ('display', ctypes.c_void_p),
+        ('resourceid', ctypes.c_ulong),
+        ('serial', ctypes.c_ulong),
+        ('error_code', ctypes.c_ubyte),
+        ('request_code', ctypes.c_ubyte),
+        ('minor_code', ctypes.c_ubyte),
+    ]
+
+
+class _XRectangle(ctypes.Structure):
+    _fields_ = [
+        ('x', ctypes.c_short),
+        ('y', ctypes.c_short),
+        ('width', ctypes.c_ushort),
+        ('height', ctypes.c_ushort),
+    ]
+
+
+_XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(_XErrorEvent))
+
+_libs: Optional[Dict[str, Any]] = None
+_libs_lock = threading.Lock()
+_last_x_error: Optional[int] = None
+
+
+def _on_x_error(display, event):
+    """Record X protocol errors instead of letting Xlib abort the process."""
+    global _last_x_error
+    _last_x_error = event.contents.error_code
+    return 0
+
+
+# Keep a module-level reference so the callback is never garbage collected
+_error_handler = _XErrorHandler(_on_x_error)
+
+
+def _load_libs() -> Optional[Dict[str, Any]]:
+    """Load and prototype libX11, libXext and libc (once per process)."""
+    global _libs
+    with _libs_lock:
+        if _libs is not None:
+            return _libs or None
+
+        try:
+            x11 = ctypes.CDLL(ctypes.util.find_library('X11') or 'libX11.so.6')
+            xext = ctypes.CDLL(ctypes.util.find_library('Xext') or 'libXext.so.6')
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        except OSError as e:
+            logger.debug(f"XShm libraries unavailable: {e}")
+            _libs = {}
+            return None
+
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XSetErrorHandler.argtypes = [_XErrorHandler]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        x11.XPending.argtypes = [ctypes.c_void_p]
+        x11.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        x11.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        x11.XInternAtom.restype = ctypes.c_ulong
+        x11.XGetWindowProperty.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_long, ctypes.c_long,
+            ctypes.c_int, ctypes.c_ulong, ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_void_p)
+        ]
+        x11.XGetGeometry.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(ctypes.c_ulong),
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint),
+            ctypes.POINTER(ctypes.c_uint), ctypes.POINTER(ctypes.c_uint)
+        ]
+        x11.XTranslateCoordinates.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_int, ctypes.c_int,
+            ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int),
+            ctypes.POINTER(ctypes.c_ulong)
+        ]
+
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+            ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo),
+            ctypes.c_uint, ctypes.c_uint
+        ]
+        xext.XShmCreateImage.restype = ctypes.POINTER(_XImage)
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(_XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(_XImage),
+            ctypes.c_int, ctypes.c_int, ctypes.c_ulong
+        ]
+
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+        x11.XSetErrorHandler(_error_handler)
+
+        _libs = {'x11': x11, 'xext': xext, 'libc': libc}
+
+        # Damage tracking is optional - capture works without it
+        try:
+            xdamage = ctypes.CDLL(ctypes.util.find_library('Xdamage') or 'libXdamage.so.1')
+            xfixes = ctypes.CDLL(ctypes.util.find_library('Xfixes') or 'libXfixes.so.3')
+        except OSError as e:
+            logger.debug(f"XDamage libraries unavailable: {e}")
+        else:
+            int_p = ctypes.POINTER(ctypes.c_int)
+            xdamage.XDamageQueryExtension.argtypes = [ctypes.c_void_p, int_p, int_p]
+            xdamage.XDamageQueryVersion.argtypes = [ctypes.c_void_p, int_p, int_p]
+            xdamage.XDamageCreate.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int]
+            xdamage.XDamageCreate.restype = ctypes.c_ulong
+            xdamage.XDamageSubtract.argtypes = [
+                ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong
+            ]
+            xdamage.XDamageDestroy.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+
+            xfixes.XFixesQueryExtension.argtypes = [ctypes.c_void_p, int_p, int_p]
+            xfixes.XFixesQueryVersion.argtypes = [ctypes.c_void_p, int_p, int_p]
+            xfixes.XFixesCreateRegion.argtypes = [
+                ctypes.c_void_p, ctypes.POINTER(_XRectangle), ctypes.c_int
+            ]
+            xfixes.XFixesCreateRegion.restype = ctypes.c_ulong
+            xfixes.XFixesFetchRegion.argtypes = [ctypes.c_void_p, ctypes.c_ulong, int_p]
+            xfixes.XFixesFetchRegion.restype = ctypes.POINTER(_XRectangle)
+            xfixes.XFixesDestroyRegion.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+
+            _libs['xdamage'] = xdamage
+            _libs['xfixes'] = xfixes
+
+        return _libs
+
+
+class XShmCapture:
+    """
+    Shared-memory screen grabber for a single X display.
+
+    The shared-memory segment and XImage are created on first use and reused
+    for every subsequent capture. Region grabs share the same segment (sized
+    for the full screen) with one small XImage header per region size.
+    Instances are thread-safe; one X connection is held per instance.
+
+    Usage:
+        grabber = XShmCapture(':100')
+        image = grabber.capture()   # PIL RGB image or None
+
+        window = grabber.active_window()
+        rect = grabber.window_rect(window)          # (x, y, w, h) on screen
+        image = grabber.capture(region=rect)        # just that window
+    """
+
+    _MAX_REGION_IMAGES = 8
+
+    def __init__(self, display: str = ':100'):
+        self.display_name = display
+        self._lock = threading.Lock()
+        self._display = None
+        self._root = 0
+        self._image = None
+        self._shminfo: Optional[_XShmSegmentInfo] = None
+        self._region_images: Dict[Tuple[int, int], Any] = {}
+        self._net_active_window = 0
+        self.width = 0
+        self.height = 0
+        self._failed = False
+
+        # Performance tracking
+        self.total_captures = 0
+        self.total_capture_ms = 0.0
+
+    @property
+    def available(self) -> bool:
+        """True if the display supports MIT-SHM (opens the connection lazily)."""
+        with self._lock:
+            return self._ensure_open()
+
+    def _ensure_open(self) -> bool:
+        """Open the display and allocate the shared segment if not done yet."""
+        if self._image is not None:
+            return True
+        if self._failed:
+            return False
+
+        libs = _load_libs()
+        if not libs:
+            self._failed = True
+            return False
+
+        x11, xext, libc = libs['x11'], libs['xext'], libs['libc']
+
+        display = x11.XOpenDisplay(self.display_name.encode())
+        if not display:
+            logger.warning(f"XShm: cannot open display {self.display_name}")
+            self._failed = True
+            return False
+
+        if not xext.XShmQueryExtension(display):
+            logger.warning(f"XShm: MIT-SHM extension not available on {self.display_name}")
+            x11.XCloseDisplay(display)
+            self._failed = True
+            return False
+
+        screen = x11.XDefaultScreen(display)
+        width = x11.XDisplayWidth(display, screen)
+        height = x11.XDisplayHeight(display, screen)
+
+        shminfo = _XShmSegmentInfo()
+        image = xext.XShmCreateImage(
+            display,
+            x11.XDefaultVisual(display, screen),
+            x11.XDefaultDepth(display, screen),
+            _ZPIXMAP,
+            None,
+            ctypes.byref(shminfo),
+            width,
+            height
+        )
+        if not image:
+            logger.warning("XShm: XShmCreateImage failed")
+            x11.XCloseDisplay(display)
+            self._failed = True
+            return False
+
+        size = image.contents.bytes_per_line * image.contents.height
+        shminfo.shmid = libc.shmget(_IPC_PRIVATE, size, _IPC_CREAT | 0o600)
+        if shminfo.shmid < 0:
+            logger.warning(f"XShm: shmget failed (errno {ctypes.get_errno()})")
+            x11.XFree(image)
+            x11.XCloseDisplay(display)
+            self._failed = True
+            return False
+
+        addr = libc.shmat(shminfo.shmid, None, 0)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            logger.warning(f"XShm: shmat failed (errno {ctypes.get_errno()})")
+            libc.shmctl(shminfo.shmid, _IPC_RMID, None)
+            x11.XFree(image)
+            x11.XCloseDisplay(display)
+            self._failed = True
+            return False
+
+        shminfo.shmaddr = addr
+        shminfo.readOnly = 0
+        image.contents.data = addr
+
+        if not xext.XShmAttach(display, ctypes.byref(shminfo)):
+            logger.warning("XShm: XShmAttach failed")
+            libc.shmdt(addr)
+            libc.shmctl(shminfo.shmid, _IPC_RMID, None)
+            x11.XFree(image)
+            x11.XCloseDisplay(display)
+            self._failed = True
+            return False
+        x11.XSync(display, 0)
+
+        # Mark the segment for removal now - it stays alive until the last
+        # detach, so it can never leak if the process dies
+        libc.shmctl(shminfo.shmid, _IPC_RMID, None)
+
+        self._display = display
+        self._root = x11.XRootWindow(display, screen)
+        self._net_active_window = x11.XInternAtom(display, b'_NET_ACTIVE_WINDOW', 0)
+        self._image = image
+        self._shminfo = shminfo
+        self.width = width
+        self.height = height
+
+        logger.info(f"XShm capture ready on {self.display_name} ({width}x{height}, "
+                    f"{image.contents.bits_per_pixel}bpp)")
+        return True
+
+    def capture(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Image.Image]:
+        """
+        Grab the full screen, or a rectangle of it.
+
+        Args:
+            region: Optional (x, y, width, height) in screen pixels; clipped
+                to the screen
+
+        Returns:
+            PIL RGB image, or None if MIT-SHM is unavailable or the grab failed
+        """
+        global _last_x_error
+
+        with self._lock:
+            if not self._ensure_open():
+                return None
+
+            libs = _libs
+            start = time.time()
+
+            x, y, ximage = 0, 0, self._image
+            if region is not None:
+                x, y, w, h = clip_rect(region, self.width, self.height)
+                if w <= 0 or h <= 0:
+                    return None
+                if (w, h) != (self.width, self.height):
+                    ximage = self._region_image(w, h)
+                    if ximage is None:
+                        return None
+
+            _last_x_error = None
+            ok = libs['xext'].XShmGetImage(self._display, self._root, ximage, x, y, _ALL_PLANES)
+            if not ok or _last_x_error is not None:
+                logger.warning(f"XShm: XShmGetImage failed (X error {_last_x_error})")
+                return None
+
+            img = ximage.contents
+            if img.bits_per_pixel != 32:
+                logger.warning(f"XShm: unsupported pixel format ({img.bits_per_pixel}bpp)")
+                return None
+
+            # Single copy: decode BGRX from the shared segment into a new RGB image
+            stride = img.bytes_per_line
+            buffer = (ctypes.c_char * (stride * img.height)).from_address(img.data)
+            image = Image.frombuffer(
+                'RGB', (img.width, img.height), buffer, 'raw', 'BGRX', stride, 1
+            )
+
+            self.total_captures += 1
+            self.total_capture_ms += (time.time() - start) * 1000
+            return image
+
+    def _region_image(self, width: int, height: int):
+        """XImage header of the given size backed by the shared segment (cached)."""
+        ximage = self._region_images.get((width, height))
+        if ximage is not None:
+            return ximage
+
+        libs = _libs
+        x11 = libs['x11']
+        if len(self._region_images) >= self._MAX_REGION_IMAGES:
+            oldest = next(iter(self._region_images))
+            x11.XFree(self._region_images.pop(oldest))
+
+        screen = x11.XDefaultScreen(self._display)
+        ximage = libs['xext'].XShmCreateImage(
+            self._display,
+            x11.XDefaultVisual(self._display, screen),
+            x11.XDefaultDepth(self._display, screen),
+            _ZPIXMAP,
+            None,
+            ctypes.byref(self._shminfo),
+            width,
+            height
+        )
+        if not ximage:
+            logger.warning(f"XShm: XShmCreateImage failed for {width}x{height} region")
+            return None
+        ximage.contents.data = self._shminfo.shmaddr
+        self._region_images[(width, height)] = ximage
+        return ximage
+
+    def active_window(self) -> Optional[int]:
+        """Window id from the root's _NET_ACTIVE_WINDOW property (EWMH), or None."""
+        with self._lock:
+            if not self._ensure_open():
+                return None
+
+            x11 = _libs['x11']
+            actual_type = ctypes.c_ulong()
+            actual_format = ctypes.c_int()
+            nitems = ctypes.c_ulong()
+            bytes_after = ctypes.c_ulong()
+            prop = ctypes.c_void_p()
+            status = x11.XGetWindowProperty(
+                self._display, self._root, self._net_active_window, 0, 1, 0, 0,
+                ctypes.byref(actual_type), ctypes.byref(actual_format),
+                ctypes.byref(nitems), ctypes.byref(bytes_after), ctypes.byref(prop)
+            )
+            if status != 0 or not prop.value:
+                return None
+            try:
+                if nitems.value < 1 or actual_format.value != 32:
+                    return None
+                # Format-32 properties are returned as C longs
+                window = ctypes.cast(prop, ctypes.POINTER(ctypes.c_ulong))[0]
+                return window or None
+            finally:
+                x11.XFree(prop)
+
+    def window_rect(self, window: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        On-screen rectangle of a window's client area.
+
+        Args:
+            window: X window id
+
+        Returns:
+            (x, y, width, height) in root coordinates, or None if the window
+            does not exist
+        """
+        global _last_x_error
+
+        with self._lock:
+            if not self._ensure_open():
+                return None
+
+            x11 = _libs['x11']
+            root = ctypes.c_ulong()
+            x, y = ctypes.c_int(), ctypes.c_int()
+            width, height = ctypes.c_uint(), ctypes.c_uint()
+            border, depth = ctypes.c_uint(), ctypes.c_uint()
+            abs_x, abs_y = ctypes.c_int(), ctypes.c_int()
+            child = ctypes.c_ulong()
+
+            _last_x_error = None
+            ok = x11.XGetGeometry(
+                self._display, window, ctypes.byref(root), ctypes.byref(x), ctypes.byref(y),
+                ctypes.byref(width), ctypes.byref(height), ctypes.byref(border), ctypes.byref(depth)
+            )
+            if ok:
+                ok = x11.XTranslateCoordinates(
+                    self._display, window, self._root, 0, 0,
+                    ctypes.byref(abs_x), ctypes.byref(abs_y), ctypes.byref(child)
+                )
+            x11.XSync(self._display, 0)
+            if not ok or _last_x_error is not None:
+                logger.debug(f"XShm: no geometry for window {window:#x} (X error {_last_x_error})")
+                return None
+            return (abs_x.value, abs_y.value, width.value, height.value)
+
+    def close(self):
+        """Detach the shared segment and close the X connection."""
+        with self._lock:
+            if self._image is None:
+                return
+            libs = _libs
+            for ximage in self._region_images.values():
+                libs['x11'].XFree(ximage)
+            self._region_images.clear()
+            libs['xext'].XShmDetach(self._display, ctypes.byref(self._shminfo))
+            libs['x11'].XSync(self._display, 0)
+            libs['libc'].shmdt(self._shminfo.shmaddr)
+            libs['x11'].XFree(self._image)
+            libs['x11'].XCloseDisplay(self._display)
+            self._image = None
+            self._display = None
+            self._shminfo = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get capture statistics."""
+        return {
+            'backend': 'xshm',
+            'display': self.display_name,
+            'total_captures': self.total_captures,
+            'avg_capture_ms': self.total_capture_ms / max(self.total_captures, 1),
+            'screen_size': (self.width, self.height)
+        }
+
+
+def xshm_supported() -> bool:
+    """Check whether libX11/libXext can be loaded in this process."""
+    return _load_libs() is not None
+
+
+class XDamageTracker:
+    """
+    Reports which screen rectangles were repainted between polls.
+
+    Uses the X Damage extension in ReportNonEmpty mode: the server accumulates
+    damage on the root window and collect() moves it into an XFixes region
+    and returns its rectangles, clearing the accumulated damage.
+
+    Usage:
+        tracker = XDamageTracker(':100')
+        tracker.collect()            # prime - discard damage so far
+        ... screen updates ...
+        rects = tracker.collect()    # [(x, y, w, h), ...] or [] if nothing changed
+    """
+
+    def __init__(self, display: str = ':100', max_rects: int = 256):
+        """
+        Args:
+            display: X display to watch
+            max_rects: Collapse to a single bounding box above this many rects
+        """
+        self.display_name = display
+        self.max_rects = max_rects
+        self._lock = threading.Lock()
+        self._display = None
+        self._damage = 0
+        self._failed = False
+        self._event_buf = ctypes.create_string_buffer(_XEVENT_SIZE)
+
+        # Statistics
+        self.total_polls = 0
+        self.empty_polls = 0
+
+    @property
+    def available(self) -> bool:
+        """True if the display supports XDamage + XFixes (opens lazily)."""
+        with self._lock:
+            return self._ensure_open()
+
+    def _ensure_open(self) -> bool:
+        if self._display is not None:
+            return True
+        if self._failed:
+            return False
+
+        libs = _load_libs()
+        if not libs or 'xdamage' not in libs:
+            self._failed = True
+            return False
+
+        x11, xdamage, xfixes = libs['x11'], libs['xdamage'], libs['xfixes']
+
+        display = x11.XOpenDisplay(self.display_name.encode())
+        if not display:
+            logger.warning(f"XDamage: cannot open display {self.display_name}")
+            self._failed = True
+            return False
+
+        a, b = ctypes.c_int(), ctypes.c_int()
+        if not xdamage.XDamageQueryExtension(display, ctypes.byref(a), ctypes.byref(b)) or \
+                not xfixes.XFixesQueryExtension(display, ctypes.byref(a), ctypes.byref(b)):
+            logger.warning(f"XDamage: Damage/XFixes extension missing on {self.display_name}")
+            x11.XCloseDisplay(display)
+            self._failed = True
+            return False
+
+        # Version negotiation is mandatory before using either extension
+        major, minor = ctypes.c_int(1), ctypes.c_int(1)
+        xdamage.XDamageQueryVersion(display, ctypes.byref(major), ctypes.byref(minor))
+        major, minor = ctypes.c_int(5), ctypes.c_int(0)
+        xfixes.XFixesQueryVersion(display, ctypes.byref(major), ctypes.byref(minor))
+
+        root = x11.XRootWindow(display, x11.XDefaultScreen(display))
+        self._damage = xdamage.XDamageCreate(display, root, _XDAMAGE_REPORT_NON_EMPTY)
+        x11.XSync(display, 0)
+        self._display = display
+
+        logger.info(f"XDamage tracking active on {self.display_name}")
+        return True
+
+    def collect(self) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        Return rectangles damaged since the previous call and reset.
+
+        Returns:
+            List of (x, y, w, h) rects ([] if nothing changed), or None if
+            damage tracking is unavailable
+        """
+        with self._lock:
+            if not self._ensure_open():
+                return None
+
+            libs = _libs
+            x11, xdamage, xfixes = libs['x11'], libs['xdamage'], libs['xfixes']
+            display = self._display
+
+            # Drain DamageNotify events so the client queue never grows
+            while x11.XPending(display):
+                x11.XNextEvent(display, self._event_buf)
+
+            region = xfixes.XFixesCreateRegion(display, None, 0)
+            xdamage.XDamageSubtract(display, self._damage, 0, region)
+
+            count = ctypes.c_int()
+            rect_ptr = xfixes.XFixesFetchRegion(display, region, ctypes.byref(count))
+            rects = []
+            if rect_ptr:
+                for i in range(count.value):
+                    r = rect_ptr[i]
+                    if r.width and r.height:
+                        rects.append((r.x, r.y, r.width, r.height))
+                x11.XFree(rect_ptr)
+            xfixes.XFixesDestroyRegion(display, region)
+
+            self.total_polls += 1
+            if not rects:
+                self.empty_polls += 1
+            elif len(rects) > self.max_rects:
+                rects = [bounding_rect(rects)]
+            return rects
+
+    def close(self):
+        """Destroy the damage object and close the X connection."""
+        with self._lock:
+            if self._display is None:
+                return
+            libs = _libs
+            libs['xdamage'].XDamageDestroy(self._display, self._damage)
+            libs['x11'].XCloseDisplay(self._display)
+            self._display = None
+            self._damage = 0
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get damage tracking statistics."""
+        return {
+            'display': self.display_name,
+            'total_polls': self.total_polls,
+            'unchanged_polls': self.empty_polls,
+            'unchanged_rate': self.empty_polls / max(self.total_polls, 1)
+        }
+
+
+def clip_rect(rect: Tuple[int, int, int, int], width: int, height: int) -> Tuple[int, int, int, int]:
+    """Clip an (x, y, w, h) rect to a width x height screen."""
+    x1, y1 = max(0, rect[0]), max(0, rect[1])
+    x2 = min(width, rect[0] + rect[2])
+    y2 = min(height, rect[1] + rect[3])
+    return (x1, y1, max(0, x2 - x1), max(0, y2 - y1))
+
+
+def bounding_rect(rects: List[Tuple[int, int, int, int]]) -> Tuple[int, int, int, int]:
+    """Smallest (x, y, w, h) rect covering all given rects."""
+    x1 = min(r[0] for r in rects)
+    y1 = min(r[1] for r in rects)
+    x2 = max(r[0] + r[2] for r in rects)
+    y2 = max(r[1] + r[3] for r in rects)
+    return (x1, y1, x2 - x1, y2 - y1)
@@ -9,12 +9,15 @@ import sys
 import time
 import base64
 import logging
-import subprocess
 from io import BytesIO
 from PIL import Image
 import pyautogui
 from openai import OpenAI
 
+# Shared screen capture (same pipeline as the SuperAgent engines)
+sys.path.insert(0, '/opt/lumina-search-flow-main')
+from superagent.screen_source import get_screen_source
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -30,6 +33,7 @@ class VisionAgent:
     def __init__(self, display=":100", api_key=None):
         self.display = display
         os.environ['DISPLAY'] = display
+        self.screen = get_screen_source(display)
         
         # Initialize OpenAI client
         self.api_key = api_key or os.environ.get('OPENAI_API_KEY')
@@ -47,33 +51,11 @@ class VisionAgent:
     def take_screenshot(self) -> Image.Image:
         """Capture current screen using Xvfb display"""
         try:
-            # Use scrot to capture screenshot
-            screenshot_path = "/tmp/screenshot.png"
-            
-            # Remove old screenshot if exists
-            if os.path.exists(screenshot_path):
-                os.remove(screenshot_path)
-            
-            result = subprocess.run([
-                'scrot', screenshot_path
-            ], env={'DISPLAY': self.display}, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                logger.error(f"Scrot failed: {result.stderr}")
-                raise RuntimeError(f"Screenshot failed: {result.stderr}")
-            
-            # Wait for file to be created
-            import time
-            for _ in range(10):  # Wait up to 1 second
-                if os.path.exists(screenshot_path):
-                    break
-                time.sleep(0.1)
-            
-            if not os.path.exists(screenshot_path):
-                raise FileNotFoundError(f"Screenshot was not created at {screenshot_path}")
+            # Shared ScreenSource: XShm first, xpra/scrot as fallback
+            img = self.screen.capture()
+            if img is None:
+                raise RuntimeError("Screenshot failed: no capture backend succeeded")
             
-            # Load and return image
-            img = Image.open(screenshot_path)
             logger.info(f"Screenshot captured: {img.size}")
             return img
         except Exception as e:
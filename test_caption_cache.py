@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Test the caption cache - SQLite tier pruning and model namespaces.
+
+Checks that the database tier stays under its row cap by dropping the
+least recently used captions (memory-tier hits count as uses), and that
+int8 and float caption models never share entries. Uses a temporary
+SQLite file, no models or display needed.
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+from superagent.caption_cache import CaptionCache
+from superagent.omniparser import OmniParserV2, OmniParserModelLoader
+
+
+def _keys(cache):
+    return {row[0] for row in cache._db.execute("SELECT key FROM captions")}
+
+
+def test_round_trip():
+    """Test captions survive in the database tier without the memory tier."""
+    print("\n=== Testing Database Round Trip ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'captions.sqlite3')
+        cache = CaptionCache(path=path, memory_entries=0, namespace="test")
+        cache.put_many({'a': "save icon", 'b': "", 'c': "close button"})
+        assert cache.disk_entries() == 2, "Empty captions are not stored"
+        cache.close()
+
+        reopened = CaptionCache(path=path, memory_entries=0, namespace="test")
+        assert reopened.get_many(['a', 'b', 'c']) == {'a': "save icon", 'c': "close button"}
+        assert reopened.disk_hits == 2 and reopened.memory_hits == 0
+        reopened.close()
+    print("[OK] Captions read back from the SQLite file after reopening")
+    return True
+
+
+def test_prune_lru():
+    """Test writes past max_rows drop the least recently used rows."""
+    print("\n=== Testing LRU Pruning ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = CaptionCache(path=os.path.join(tmp, 'captions.sqlite3'), memory_entries=0,
+                             max_rows=10)
+        for i in range(10):
+            cache.put_many({f"k{i}": f"caption {i}"})
+        assert cache.evicted == 0 and cache.disk_entries() == 10
+        cache.get_many(['k0'])  # a disk hit makes k0 recent
+        cache.put_many({'k10': "caption 10"})
+        assert _keys(cache) == {f"k{i}" for i in (0, 3, 4, 5, 6, 7, 8, 9, 10)}, sorted(_keys(cache))
+        assert cache.evicted == 2 and cache.get_stats()['evicted'] == 2
+        print(f"[OK] 11 rows pruned to {cache.disk_entries()}, oldest two dropped, k0 kept")
+        cache.close()
+
+        # Hits served by the memory tier refresh their rows on the next write
+        cache = CaptionCache(path=os.path.join(tmp, 'memory.sqlite3'), memory_entries=100,
+                             max_rows=10)
+        for i in range(10):
+            cache.put_many({f"k{i}": f"caption {i}"})
+        assert cache.get_many(['k0']) == {'k0': "caption 0"} and cache.memory_hits == 1
+        cache.put_many({'k10': "caption 10"})
+        assert 'k0' in _keys(cache) and 'k1' not in _keys(cache)
+        hits = cache._db.execute("SELECT hits FROM captions WHERE key = 'k0'").fetchone()[0]
+        assert hits == 1, f"Got {hits}"
+        cache.close()
+        print("[OK] Memory-tier hits count as uses")
+
+        unbounded = CaptionCache(path=os.path.join(tmp, 'unbounded.sqlite3'), max_rows=0)
+        unbounded.put_many({f"k{i}": "x" for i in range(50)})
+        assert unbounded.disk_entries() == 50 and unbounded.evicted == 0
+        unbounded.close()
+    print("[OK] max_rows=0 never prunes")
+    return True
+
+
+def test_namespace_precision():
+    """Test the parser's caption namespace changes with the caption precision."""
+    print("\n=== Testing Caption Namespace ===")
+
+    loader = OmniParserModelLoader()
+    namespaces = {}
+    saved = loader.caption_precision
+    try:
+        for precision in ('fp32', 'int8', None):
+            loader.caption_precision = precision
+            parser = OmniParserV2(cache_enabled=False, auto_download=False, track_elements=False)
+            namespaces[precision] = parser.caption_cache.namespace
+    finally:
+        loader.caption_precision = saved
+    assert len(set(namespaces.values())) == 3, f"Got {namespaces}"
+    assert namespaces['int8'].startswith("florence2-") and "-int8:" in namespaces['int8']
+    print(f"[OK] Namespaces: {sorted(namespaces.values())}")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Caption Cache Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Round Trip Test", test_round_trip),
+        ("LRU Pruning Test", test_prune_lru),
+        ("Namespace Test", test_namespace_precision),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test ElementIndex - spatial and text lookups over parsed elements.
+
+Checks every ElementIndex query against a linear scan over random
+elements. Pure Python, no models or display needed.
+"""
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+from superagent.element_index import ElementIndex, trigrams
+
+
+WORDS = ["save", "save as", "sve as", "open", "open file", "cancel", "ok", "file",
+         "settings", "search", "x", "", "Save As...", "new tab", "close tab"]
+
+
+def _random_elements(rng, count):
+    elements = []
+    for i in range(count):
+        x, y = rng.randint(0, 1800), rng.randint(0, 1000)
+        # Mostly small boxes, some panels spanning many grid cells
+        w, h = (rng.randint(600, 1900), rng.randint(300, 1000)) if i % 10 == 0 else \
+            (rng.randint(1, 200), rng.randint(1, 60))
+        elements.append({'id': i, 'box': (x, y, x + w, y + h), 'text': rng.choice(WORDS)})
+    return elements
+
+
+def _index(elements):
+    return ElementIndex(elements, box=lambda e: e['box'], text=lambda e: e['text'])
+
+
+def test_index_spatial():
+    """Test ElementIndex.at/overlapping against a linear scan."""
+    print("\n=== Testing ElementIndex Spatial Queries ===")
+
+    rng = random.Random(3)
+    elements = _random_elements(rng, 300)
+    index = _index(elements)
+    for _ in range(300):
+        x, y = rng.randint(0, 1920), rng.randint(0, 1080)
+        expected = [e for e in elements
+                    if e['box'][0] <= x <= e['box'][2] and e['box'][1] <= y <= e['box'][3]]
+        assert index.at(x, y) == expected, f"at({x}, {y})"
+
+        region = (x, y, x + rng.randint(1, 400), y + rng.randint(1, 300))
+        expected = [e for e in elements
+                    if e['box'][0] < region[2] and e['box'][2] > region[0]
+                    and e['box'][1] < region[3] and e['box'][3] > region[1]]
+        assert index.overlapping(region) == expected, f"overlapping({region})"
+    print("[OK] at() and overlapping() match a linear scan for 300 queries")
+    return True
+
+
+def test_index_text():
+    """Test ElementIndex.contains/within/similar against a linear scan."""
+    print("\n=== Testing ElementIndex Text Queries ===")
+
+    rng = random.Random(5)
+    elements = _random_elements(rng, 200)
+    index = _index(elements)
+    queries = WORDS + ["sav", "a", "tab", "Open File Now", "please click save as here", "zzz"]
+
+    for query in queries:
+        q = query.lower()
+        expected = [e for e in elements if q in e['text'].lower()]
+        assert index.contains(query) == expected, f"contains({query!r})"
+
+        expected = [e for e in elements if e['text'] and e['text'].lower() in q]
+        assert index.within(query) == expected, f"within({query!r})"
+    print(f"[OK] contains() and within() match a linear scan for {len(queries)} queries")
+
+    for query in queries:
+        q = query.lower()
+        grams = trigrams(q)
+        if not grams:
+            continue
+        scored = []
+        for i, e in enumerate(elements):
+            other = trigrams(e['text'].lower())
+            shared = len(grams & other)
+            score = 2.0 * shared / (len(grams) + len(other)) if shared else 0.0
+            if shared and score >= 0.4:
+                scored.append((-score, i))
+        expected = [(elements[i], -s) for s, i in sorted(scored)[:10]]
+        got = index.similar(query, min_similarity=0.4, limit=10)
+        assert [e['id'] for e, _ in got] == [e['id'] for e, _ in expected], f"similar({query!r})"
+        assert all(abs(a - b) < 1e-9 for (_, a), (_, b) in zip(got, expected))
+
+    best, score = index.similar("Sve as", min_similarity=0.4)[0]
+    assert best['text'] == "sve as" and score == 1.0
+    print("[OK] similar() matches a linear Dice scan and ranks best first")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Element Index Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Index Spatial Test", test_index_spatial),
+        ("Index Text Test", test_index_text),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
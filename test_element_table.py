@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Test ElementTable - the columnar element store of the fast agent.
+
+Checks that take/concat/from_rows carry the per-row extras to the right
+rows and copy the columns. Pure numpy, no models or display needed.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+import numpy as np
+
+from superagent.element_table import ElementTable
+
+
+def test_table_take_extras():
+    """Test ElementTable.take remaps extras to the new row numbers."""
+    print("\n=== Testing ElementTable.take Extras ===")
+
+    table = ElementTable.from_xywh([[0, 0, 10, 10], [10, 0, 10, 10], [20, 0, 10, 10], [30, 0, 10, 10]],
+                                   'text', ['a', 'b', 'c', 'd'], [0.9, 0.8, 0.7, 0.6],
+                                   extra={1: {'source': 'ocr-b'}, 3: {'source': 'ocr-d'}})
+    taken = table.take([3, 0, 1])
+    assert taken.text == ['d', 'a', 'b']
+    assert taken.extra == {0: {'source': 'ocr-d'}, 2: {'source': 'ocr-b'}}, f"Got {taken.extra}"
+    assert taken[0].attributes['source'] == 'ocr-d' and 'source' not in taken[1].attributes
+    print(f"[OK] take([3, 0, 1]) extras: {taken.extra}")
+
+    assert table.take([2]).extra == {}
+    taken.boxes += 5
+    assert table.boxes[3, 0] == 30, "take() must copy the columns"
+    print("[OK] Dropped rows lose their extras and columns are copies")
+    return True
+
+
+def test_table_concat_extras():
+    """Test ElementTable.concat offsets extras by the preceding rows."""
+    print("\n=== Testing ElementTable.concat Extras ===")
+
+    first = ElementTable.from_xywh([[0, 0, 5, 5], [5, 0, 5, 5]], 'text', ['a', 'b'], 0.9,
+                                   extra={0: {'source': 'first'}})
+    empty = ElementTable.empty()
+    second = ElementTable.from_xywh([[0, 5, 5, 5], [5, 5, 5, 5], [10, 5, 5, 5]], 'icon',
+                                    ['c', 'd', 'e'], 0.5, extra={2: {'source': 'second'}})
+    merged = ElementTable.concat([first, empty, second])
+    assert len(merged) == 5 and merged.text == ['a', 'b', 'c', 'd', 'e']
+    assert merged.extra == {0: {'source': 'first'}, 4: {'source': 'second'}}, f"Got {merged.extra}"
+    assert [row.element_type for row in merged] == ['text', 'text', 'icon', 'icon', 'icon']
+    print(f"[OK] concat extras: {merged.extra}")
+
+    single = ElementTable.concat([empty, second])
+    assert single.extra == second.extra and single.boxes is not second.boxes
+    assert len(ElementTable.concat([])) == 0
+    np.testing.assert_array_equal(ElementTable.from_rows([second[2], first[0]]).boxes,
+                                  np.array([[10, 5, 15, 10], [0, 0, 5, 5]], dtype=np.float32))
+    assert ElementTable.from_rows([second[2], first[0]]).extra == {0: {'source': 'second'},
+                                                                   1: {'source': 'first'}}
+    print("[OK] Single-table concat copies and from_rows keeps extras")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Element Table Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Table Take Test", test_table_take_extras),
+        ("Table Concat Test", test_table_concat_extras),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test element tracking - stable track IDs and attribute carry-over.
+
+Checks that matched elements inherit captions and OCR text only while
+their crop is unchanged, so a cleared input or a swapped icon never keeps
+stale text. Uses the heuristic fallback detector, no models or display.
+"""
+
+import os
+import sys
+import copy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+from PIL import Image, ImageDraw, ImageFont
+
+from superagent.omniparser import OmniParserV2, UIElement, BoundingBox, ElementType, ParseResult
+from superagent.element_tracker import ElementTracker
+
+
+def _element(element_id, box, crop_hash=None, **kwargs):
+    return UIElement(id=element_id, element_type=ElementType.INTERACTABLE, bbox=BoundingBox(*box),
+                     confidence=0.9, crop_hash=crop_hash, **kwargs)
+
+
+def _result(elements):
+    return ParseResult(elements=elements, screen_size=(1280, 720), parse_time_ms=0,
+                       element_count=len(elements), interactable_count=len(elements))
+
+
+def test_carry_over():
+    """Test captions and OCR text carry over only between identical crops."""
+    print("\n=== Testing Carry-Over ===")
+
+    tracker = ElementTracker()
+    tracker.update(_result([
+        _element(1, (10, 10, 210, 40), 'aa', text="hello", ocr_text="hello"),
+        _element(2, (300, 10, 324, 34), 'bb', description="bell icon"),
+        _element(3, (400, 10, 424, 34), 'cc', description="star icon"),
+        _element(4, (500, 10, 600, 40), None, text="Send"),
+    ]))
+
+    cleared = _element(1, (10, 10, 210, 40), 'a0')       # input field emptied
+    swapped = _element(2, (300, 10, 324, 34), 'b0')      # badge dismissed, icon repainted
+    swapped.caption_pending = True
+    same = _element(3, (400, 10, 424, 34), 'cc')
+    unhashed = _element(4, (500, 10, 600, 40), None)
+    update = tracker.update(_result([cleared, swapped, same, unhashed]))
+
+    assert [e.track_id for e in (cleared, swapped, same, unhashed)] == [1, 2, 3, 4]
+    assert cleared.text == "" and cleared.ocr_text == "", "Cleared input kept its old text"
+    assert swapped.cached_description == "" and swapped.caption_pending, \
+        "Repainted icon got a stale caption"
+    assert unhashed.text == "", "Elements without crop hashes never inherit"
+    assert same.description == "star icon" and update.carried == 1
+    print("[OK] Only the unchanged icon inherits, all keep their track ids")
+
+    # The same result tracked again (e.g. a cache hit) keeps ids and attributes
+    again = [copy.copy(e) for e in (cleared, swapped, same, unhashed)]
+    update = tracker.update(_result(again))
+    assert [e.track_id for e in again] == [1, 2, 3, 4] and not update.changed
+    assert tracker.get_stats()['updates'] == 3
+    print("[OK] Re-tracking a copy matches every element")
+    return True
+
+
+def _screen(field_text, icon):
+    font = ImageFont.load_default(size=14)
+    image = Image.new('RGB', (1280, 720), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((100, 100, 400, 132), outline=(90, 90, 90), fill=(240, 240, 240))
+    if field_text:
+        draw.text((110, 108), field_text, fill='black', font=font)
+    draw.rectangle((600, 100, 720, 132), outline=(90, 90, 90), fill=(230, 230, 230))
+    draw.text((612, 108), "Send", fill='black', font=font)
+    if icon == 'circle':
+        draw.ellipse((900, 100, 932, 132), outline='black', width=3)
+    else:
+        draw.rectangle((900, 100, 932, 132), outline='black', width=3)
+    return image
+
+
+def _at(result, x, y):
+    return next(e for e in result.elements if e.bbox.contains_point(x, y))
+
+
+def test_parse_carry_over():
+    """Test parse() hashes crops so repainted elements inherit nothing."""
+    print("\n=== Testing Carry-Over Through parse() ===")
+
+    parser = OmniParserV2(cache_enabled=False, auto_download=False, caption_cache=False,
+                          ocr_labels=False)
+    first = parser.parse(_screen("hello", 'circle'))
+    assert all(e.crop_hash for e in first.elements)
+    field, send, icon = _at(first, 250, 116), _at(first, 660, 116), _at(first, 916, 116)
+    field.text, send.text, icon.description = "hello", "Send", "circle icon"
+    print(f"[OK] {len(first.elements)} elements parsed with crop hashes")
+
+    second = parser.parse(_screen("", 'square'))
+    field, send, icon = _at(second, 250, 116), _at(second, 660, 116), _at(second, 916, 116)
+    assert send.text == "Send", "Unchanged button lost its text"
+    assert field.text == "", "Cleared input kept its old text"
+    assert icon.cached_description == "", "Changed icon got the old caption"
+    assert second.tracking.carried == 1
+    print("[OK] Unchanged button inherits, cleared input and changed icon do not")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Element Tracker Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Carry-Over Test", test_carry_over),
+        ("Parse Carry-Over Test", test_parse_carry_over),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Test the heuristic fallback detector used without YOLO weights.
+
+Checks run-length component labeling against a flood fill and that
+detect_boxes finds drawn controls with the OmniParser detection layout.
+Pure numpy/PIL, no models or display needed.
+"""
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from superagent.fallback_detector import label_components, component_boxes, detect_boxes
+
+
+def _flood_labels(mask):
+    """Reference labels: flood fill from each unlabeled cell in row-major order."""
+    rows, cols = mask.shape
+    labels = np.full(mask.shape, mask.size, dtype=np.int64)
+    for y, x in zip(*np.nonzero(mask)):
+        if labels[y, x] != mask.size:
+            continue
+        labels[y, x] = y * cols + x
+        stack = [(y, x)]
+        while stack:
+            cy, cx = stack.pop()
+            for ny, nx in ((cy - 1, cx), (cy + 1, cx), (cy, cx - 1), (cy, cx + 1)):
+                if 0 <= ny < rows and 0 <= nx < cols and mask[ny, nx] and labels[ny, nx] == mask.size:
+                    labels[ny, nx] = y * cols + x
+                    stack.append((ny, nx))
+    return labels
+
+
+def test_label_components():
+    """Test label_components against a flood fill on random and shaped grids."""
+    print("\n=== Testing label_components ===")
+
+    rng = np.random.default_rng(0)
+    for density in (0.2, 0.45, 0.6, 0.9):
+        mask = rng.random((45, 70)) < density
+        assert np.array_equal(label_components(mask), _flood_labels(mask)), f"density {density}"
+    print("[OK] Random grids match a flood fill")
+
+    # A spiral joins cells far apart in row-major order; a U joins two columns late
+    spiral = np.zeros((9, 9), dtype=bool)
+    spiral[0, :] = spiral[:, 8] = spiral[8, :] = spiral[2:, 0] = True
+    spiral[2, :7] = spiral[2:7, 6] = spiral[6, 2:7] = spiral[4:7, 2] = True
+    u_shape = np.zeros((5, 5), dtype=bool)
+    u_shape[:, 0] = u_shape[:, 4] = u_shape[4, :] = True
+    diagonal = np.eye(4, dtype=bool)
+    for mask in (spiral, u_shape, diagonal):
+        assert np.array_equal(label_components(mask), _flood_labels(mask))
+    assert len(np.unique(label_components(u_shape)[u_shape])) == 1
+    assert len(np.unique(label_components(diagonal)[diagonal])) == 4
+    print("[OK] Spiral, U shape and diagonal (not 4-connected)")
+
+    empty = np.zeros((3, 4), dtype=bool)
+    assert (label_components(empty) == empty.size).all()
+    boxes = component_boxes(label_components(u_shape), u_shape)
+    assert boxes.tolist() == [[0, 0, 5, 5]], f"Got {boxes.tolist()}"
+    print("[OK] Empty grid and component boxes")
+    return True
+
+
+def test_detect_boxes():
+    """Test detect_boxes finds drawn buttons as interactable detections."""
+    print("\n=== Testing detect_boxes ===")
+
+    font = ImageFont.load_default(size=14)
+    rng = random.Random(2)
+    image = Image.new('RGB', (1280, 720), 'white')
+    draw = ImageDraw.Draw(image)
+    buttons = []
+    for i in range(12):
+        x, y = 40 + (i % 4) * 300, 60 + (i // 4) * 200 + rng.randint(0, 40)
+        draw.rectangle((x, y, x + 120, y + 32), outline=(90, 90, 90), fill=(230, 230, 230))
+        draw.text((x + 12, y + 9), f"Button {i}", fill='black', font=font)
+        buttons.append((x, y, x + 121, y + 33))
+
+    detections = detect_boxes(image)
+    assert detections.dtype == np.float32 and detections.shape[1] == 6
+    for x1, y1, x2, y2 in buttons:
+        hit = ((detections[:, 0] <= x1 + 4) & (detections[:, 1] <= y1 + 4) &
+               (detections[:, 2] >= x2 - 4) & (detections[:, 3] >= y2 - 4) &
+               (detections[:, 2] - detections[:, 0] <= x2 - x1 + 8) & (detections[:, 5] == 0))
+        assert hit.any(), f"Button {(x1, y1, x2, y2)} not detected"
+    print(f"[OK] All 12 buttons found as interactable boxes ({len(detections)} detections)")
+
+    # Button labels lie inside their buttons and are dropped as nested
+    assert len(detections) == len(buttons), f"Expected one box per button, got {len(detections)}"
+    assert len(detect_boxes(Image.new('RGB', (640, 480), 'white'))) == 0
+    print("[OK] Nested labels dropped, blank screen has no boxes")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Fallback Detector Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Label Components Test", test_label_components),
+        ("Detect Boxes Test", test_detect_boxes),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
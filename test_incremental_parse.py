@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Test incremental parsing - region dilation, element NMS and the
+re-detection of changed regions.
+
+Checks the box helpers directly and that _parse_incremental detects crops
+at the previous result's scale without touching the imgsz ladder. YOLO is
+replaced by a recording predictor, so no models or display are needed.
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+import numpy as np
+from PIL import Image
+
+from superagent.omniparser import (OmniParserV2, UIElement, BoundingBox, ElementType, ParseResult,
+                                   _dilate_regions, _nms)
+
+
+def _element(element_id, box, confidence, **kwargs):
+    return UIElement(id=element_id, element_type=ElementType.BUTTON,
+                     bbox=BoundingBox(*box), confidence=confidence, **kwargs)
+
+
+def test_dilate_regions():
+    """Test _dilate_regions pads, covers touched elements and merges windows."""
+    print("\n=== Testing _dilate_regions ===")
+
+    no_elements = np.zeros((0, 4), dtype=np.float32)
+    windows = _dilate_regions([(100, 100, 50, 20)], no_elements, (1920, 1080), margin=8)
+    assert windows == [(92, 92, 158, 128)], f"Got {windows}"
+    print(f"[OK] Padded by the margin: {windows}")
+
+    windows = _dilate_regions([(0, 1070, 30, 30), (10, 10, 0, 5)], no_elements, (1920, 1080), margin=8)
+    assert windows == [(0, 1062, 38, 1080)], f"Got {windows}"
+    print("[OK] Clipped to the image, empty regions dropped")
+
+    # The region touches element A, whose growth then touches element B
+    boxes = np.array([[135, 100, 300, 130],    # A: overlaps the padded region
+                      [290, 120, 400, 160],    # B: overlaps A only
+                      [900, 900, 950, 950]],   # far away
+                     dtype=np.float32)
+    windows = _dilate_regions([(100, 100, 30, 20)], boxes, (1920, 1080), margin=10)
+    assert windows == [(90, 90, 400, 160)], f"Got {windows}"
+    print(f"[OK] Grown to cover chained elements: {windows}")
+
+    # Two regions whose windows overlap merge into one
+    windows = _dilate_regions([(100, 100, 40, 40), (150, 150, 40, 40)], no_elements, (1920, 1080),
+                              margin=10)
+    assert windows == [(90, 90, 200, 200)], f"Got {windows}"
+    windows = _dilate_regions([(100, 100, 40, 40), (500, 500, 40, 40)], no_elements, (1920, 1080),
+                              margin=10)
+    assert len(windows) == 2
+    print("[OK] Overlapping windows merge, distant ones stay separate")
+    return True
+
+
+def test_nms():
+    """Test _nms keeps the most confident of overlapping elements in input order."""
+    print("\n=== Testing _nms ===")
+
+    a = _element(1, (0, 0, 100, 40), 0.6)
+    b = _element(2, (5, 0, 105, 40), 0.9)      # overlaps a, more confident
+    c = _element(3, (300, 300, 340, 340), 0.5)  # alone
+    d = _element(4, (0, 0, 100, 40), 0.6)       # duplicate of a, same confidence
+    kept = _nms([a, b, c, d], iou_threshold=0.5)
+    assert [e.id for e in kept] == [2, 3], f"Got {[e.id for e in kept]}"
+    print("[OK] Overlapping boxes suppressed by the most confident")
+
+    kept = _nms([a, d], iou_threshold=0.5)
+    assert [e.id for e in kept] == [1], "Input order breaks confidence ties"
+    kept = _nms([a, b], iou_threshold=0.95)
+    assert [e.id for e in kept] == [1, 2], "IoU below the threshold keeps both"
+    assert _nms([], 0.5) == [] and _nms([c], 0.5) == [c]
+    print("[OK] Ties, threshold and trivial inputs")
+    return True
+
+
+class _RecordingModel:
+    """Stands in for the YOLO model: finds nothing, records each call's input sizes."""
+
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, source, conf, verbose, imgsz=None):
+        self.calls.append(([image.size for image in source], imgsz))
+        return [None] * len(source)
+
+
+def test_incremental_scale():
+    """Test changed regions are detected at the previous scale, outside the ladder."""
+    print("\n=== Testing Incremental Detection Scale ===")
+
+    parser = OmniParserV2(cache_enabled=False, auto_download=False, track_elements=False,
+                          caption_cache=False, ocr_labels=False)
+    parser.imgsz_ladder = [640, 960, 1280]
+    model = _RecordingModel()
+    # Not the loader singleton: other tests must still see no detector
+    parser.model_loader = SimpleNamespace(icon_detect_model=model, has_detection=True, has_caption=False)
+
+    image = Image.new('RGB', (1920, 1080), 'white')
+    previous = ParseResult(elements=[_element(1, (1500, 900, 1600, 940), 0.9),
+                                     _element(2, (100, 100, 180, 130), 0.8)],
+                           screen_size=(1920, 1080), parse_time_ms=0, element_count=2,
+                           interactable_count=0, imgsz=960)
+    result = parser._parse_incremental(image, (0, 0), previous, [(110, 105, 40, 10)], None)
+    assert result is not None and result.imgsz == 960, f"Got {result and result.imgsz}"
+    assert [e.id for e in result.elements] == [1], "Touched element is re-detected, not kept"
+    sizes, imgsz = model.calls[0]
+    assert len(model.calls) == 1 and sizes[0] == (94, 58) and imgsz == 64, f"Got {model.calls}"
+    print(f"[OK] {sizes[0]} crop detected at imgsz={imgsz} (half scale, like imgsz=960)")
+
+    assert parser.ladder_passes == 0 and not parser.ladder_rungs and not parser._ladder_history
+    print("[OK] Ladder passes, rungs and history untouched")
+
+    fallbacks = parser.incremental_fallbacks
+    assert parser._parse_incremental(image, (0, 0), previous, [(110, 105, 40, 10)], None,
+                                     goal="click the star icon") is None
+    assert parser.incremental_fallbacks == fallbacks + 1 and len(model.calls) == 1
+    assert parser._parse_incremental(image, (0, 0), previous, [(110, 105, 40, 10)], None,
+                                     goal="open the file menu") is not None
+    print("[OK] A small-target goal falls back to a full parse above a coarse result")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Incremental Parse Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Dilate Regions Test", test_dilate_regions),
+        ("NMS Test", test_nms),
+        ("Incremental Scale Test", test_incremental_scale),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Test OCR labels - word assignment, element-box masking and when OCR runs.
+
+Checks assign_labels gives each word to the innermost element box, that
+the OCR input keeps only the pixels under element boxes, and that a
+parser without captions never runs OCR. No tesseract, models or display
+needed.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from superagent.ocr_labels import words_from_boxes, assign_labels, _mask_to_boxes
+from superagent.omniparser import OmniParserV2, UIElement, BoundingBox, ElementType
+
+
+def _element(element_id, box, **kwargs):
+    return UIElement(id=element_id, element_type=ElementType.INTERACTABLE, bbox=BoundingBox(*box),
+                     confidence=0.9, **kwargs)
+
+
+def test_assign_labels():
+    """Test words go to the innermost box in reading order."""
+    print("\n=== Testing assign_labels ===")
+
+    toolbar = _element(1, (0, 0, 800, 60))
+    save = _element(2, (10, 10, 110, 50))
+    icon = _element(3, (200, 10, 240, 50))
+    named = _element(4, (300, 10, 400, 50), text="Keep")
+    words = words_from_boxes([
+        ("As", (70, 20, 20, 16), 90),       # second word of "Save As"
+        ("Save", (20, 20, 40, 16), 95),
+        ("x", (210, 20, 10, 16), 80),       # OCR noise on an icon
+        ("Print", (300, 20, 40, 16), 90),
+        ("Help", (600, 20, 40, 16), 90),    # only the toolbar contains it
+        ("low", (500, 20, 30, 16), 20),     # below the confidence cut
+        ("edge", (105, 20, 40, 16), 90),    # mostly outside every button
+    ])
+    labeled = assign_labels([toolbar, save, icon, named], words)
+
+    assert save.text == "Save As" and save.ocr_text == "Save As"
+    print("[OK] Words joined in reading order inside the innermost box")
+    assert icon.ocr_text == "x" and icon.text == "", "Illegible OCR is not a label"
+    assert named.text == "Keep" and named.ocr_text == "Print", "Existing text is kept"
+    assert toolbar.text == "edge Help", f"Got {toolbar.text!r}"
+    assert labeled == 3
+    print("[OK] Noise, existing text, container words and the count")
+
+    moved = _element(5, (1010, 510, 1110, 550))
+    assert assign_labels([moved], words_from_boxes([("Open", (20, 20, 40, 16), 90)]),
+                         offset=(990, 490)) == 1 and moved.text == "Open"
+    assert assign_labels([moved], []) == 0 and assign_labels([], words) == 0
+    print("[OK] Offset images and empty inputs")
+    return True
+
+
+def test_mask_to_boxes():
+    """Test the OCR input is the boxes' union with everything else blanked."""
+    print("\n=== Testing Element-Box Masking ===")
+
+    image = Image.new('RGB', (400, 300), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((50, 50, 99, 79), fill=(200, 0, 0))
+    draw.rectangle((200, 150, 249, 169), fill=(0, 200, 0))
+    draw.rectangle((120, 100, 169, 129), fill=(0, 0, 200))   # body content, no element
+    canvas, origin = _mask_to_boxes(image, np.array([[50, 50, 100, 80], [200, 150, 250, 170]]), pad=2)
+    pixels = np.asarray(canvas)
+
+    assert origin == (48, 48) and canvas.size == (204, 124), f"Got {origin}, {canvas.size}"
+    assert tuple(pixels[10, 10]) == (200, 0, 0) and tuple(pixels[110, 160]) == (0, 200, 0)
+    assert tuple(pixels[60, 90]) == (30, 30, 30), "Content outside the boxes must be blanked"
+    assert tuple(pixels[0, 0]) == (30, 30, 30), "Padding keeps the surroundings"
+    print(f"[OK] {canvas.size} canvas at {origin}, only element pixels kept")
+
+    assert _mask_to_boxes(image, np.zeros((0, 4))) is None
+    assert _mask_to_boxes(image, np.array([[500, 500, 600, 600]])) is None
+    canvas, origin = _mask_to_boxes(image, np.array([[-10, -10, 20, 20]]), pad=4)
+    assert origin == (0, 0) and canvas.size == (24, 24)
+    print("[OK] Empty, off-screen and edge boxes")
+    return True
+
+
+def test_ocr_skipped_without_captions():
+    """Test a parser that can't caption never runs OCR but uses given words."""
+    print("\n=== Testing OCR Gating ===")
+
+    image = Image.new('RGB', (640, 480), 'white')
+    ImageDraw.Draw(image).rectangle((100, 100, 220, 132), outline=(90, 90, 90), fill=(230, 230, 230))
+    for generate_captions in (False, True):  # True: no caption model is loaded here
+        parser = OmniParserV2(cache_enabled=False, auto_download=False, track_elements=False,
+                              caption_cache=False, generate_captions=generate_captions)
+        parser.ocr_labels = True  # as if pytesseract were installed
+        result = parser.parse(image)
+        assert parser.ocr_runs == 0 and 'ocr' not in result.timings, f"captions={generate_captions}"
+    print("[OK] No OCR pass with captions off or no caption model")
+
+    words = words_from_boxes([("Submit", (130, 108, 50, 16), 90)])
+    result = parser.parse(image, ocr_words=words)
+    assert parser.ocr_runs == 0 and any(e.text == "Submit" for e in result.elements)
+    print("[OK] Caller-supplied words still label elements")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("OCR Labels Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Assign Labels Test", test_assign_labels),
+        ("Element-Box Masking Test", test_mask_to_boxes),
+        ("OCR Gating Test", test_ocr_skipped_without_captions),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
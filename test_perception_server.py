@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test perception server helpers - the wire format and request batching.
+
+Covers the encode_result/decode_result round trip of a ParseResult
+through JSON and how MicroBatcher coalesces concurrent calls. No models,
+sockets or display needed.
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+from superagent.omniparser import UIElement, BoundingBox, ElementType, InteractionType, ParseResult
+from superagent.perception_server import encode_result, decode_result, MicroBatcher
+
+
+def _element(element_id, box, confidence, **kwargs):
+    return UIElement(id=element_id, element_type=ElementType.BUTTON,
+                     bbox=BoundingBox(*box), confidence=confidence, **kwargs)
+
+
+def test_result_round_trip():
+    """Test decode_result(encode_result(r)) through JSON reproduces the result."""
+    print("\n=== Testing encode_result/decode_result ===")
+
+    elements = [
+        _element(1, (10.5, 20, 110, 60), 0.93, text="Save", description="save icon",
+                 interaction_types=[InteractionType.CLICKABLE], ocr_text="Save", track_id=7,
+                 crop_hash="00ff"),
+        _element(2, (200, 300, 260, 330), 0.41, is_interactable=False),
+    ]
+    elements[1].element_type = ElementType.TEXT
+    result = ParseResult(elements=elements, screen_size=(1280, 720), parse_time_ms=42.5,
+                         element_count=2, interactable_count=1,
+                         raw_detections=[{'bbox': [10, 20, 110, 60], 'conf': 0.93}],
+                         offset=(100, 50), imgsz=1280, timings={'detect': 30.0, 'ocr': 9.5})
+
+    decoded = decode_result(json.loads(json.dumps(encode_result(result))))
+    assert decoded.elements == result.elements, "Elements differ"
+    for before, after in zip(result.elements, decoded.elements):
+        assert after.description == before.description and after.track_id == before.track_id
+        assert after.crop_hash == before.crop_hash
+        assert after.interaction_types == before.interaction_types
+    for name in ('screen_size', 'parse_time_ms', 'element_count', 'interactable_count',
+                 'model_version', 'raw_detections', 'offset', 'imgsz', 'timings'):
+        assert getattr(decoded, name) == getattr(result, name), f"{name} differs"
+    assert isinstance(decoded.screen_size, tuple) and isinstance(decoded.offset, tuple)
+    print(f"[OK] Round trip of {len(elements)} elements through JSON")
+
+    assert decoded.get_element_by_track(7).text == "Save"
+    print("[OK] Decoded result indexes by track id")
+    return True
+
+
+def _submit_all(batcher, requests):
+    """Submit (key, items) requests from one thread each, released together."""
+    outputs = [None] * len(requests)
+    start = threading.Barrier(len(requests))
+
+    def worker(i, key, items):
+        start.wait()
+        try:
+            outputs[i] = batcher.submit(key, items)
+        except Exception as e:
+            outputs[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i, key, items))
+               for i, (key, items) in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return outputs
+
+
+def test_batcher_coalesces():
+    """Test concurrent submits share batched calls, grouped by key."""
+    print("\n=== Testing MicroBatcher Coalescing ===")
+
+    calls = []
+
+    def run(key, items):
+        calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    batcher = MicroBatcher(run, window_ms=300, max_batch=100)
+    requests = [('a', [i, i + 100]) for i in range(6)] + [('b', [i]) for i in range(3)]
+    outputs = _submit_all(batcher, requests)
+    for (key, items), output in zip(requests, outputs):
+        assert output == [f"{key}:{item}" for item in items], f"Got {output}"
+    print("[OK] Every caller gets the outputs of its own items, in order")
+
+    assert {key for key, _ in calls} == {'a', 'b'} and len(calls) <= 4, f"Got {len(calls)} calls"
+    stats = batcher.get_stats()
+    assert stats['requests'] == 9 and stats['items'] == 15 and stats['batches'] == len(calls)
+    print(f"[OK] 9 requests ran as {len(calls)} calls, one per key and window")
+    batcher.close()
+    return True
+
+
+def test_batcher_limits():
+    """Test max_batch ends the wait early, errors reach every caller, close rejects."""
+    print("\n=== Testing MicroBatcher Limits and Errors ===")
+
+    batcher = MicroBatcher(lambda key, items: [item * 2 for item in items], window_ms=5000, max_batch=4)
+    start = time.monotonic()
+    assert batcher.submit(None, [1, 2, 3, 4]) == [2, 4, 6, 8]
+    assert batcher.submit(None, list(range(10))) == [i * 2 for i in range(10)]
+    assert time.monotonic() - start < 2, "A full batch must not wait out the window"
+    assert batcher.largest_batch == 10 and batcher.submit(None, []) == []
+    print("[OK] Full batches run at once, oversized requests run whole")
+
+    batcher.close()
+    try:
+        batcher.submit(None, [1])
+        assert False, "submit() after close() must fail"
+    except RuntimeError:
+        pass
+    print("[OK] Closed batcher rejects new requests")
+
+    def failing(key, items):
+        if key == 'short':
+            return items[:-1]
+        raise ValueError("model crashed")
+
+    batcher = MicroBatcher(failing, window_ms=100, max_batch=100)
+    outputs = _submit_all(batcher, [('boom', [1]), ('boom', [2, 3]), ('short', [4, 5])])
+    assert all(isinstance(o, ValueError) for o in outputs[:2]), f"Got {outputs}"
+    assert isinstance(outputs[2], RuntimeError) and "1 outputs for 2 items" in str(outputs[2])
+    assert batcher.batches == 0
+    batcher.close()
+    print("[OK] Failures and output-count mismatches are raised to every caller")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Perception Server Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Result Round Trip Test", test_result_round_trip),
+        ("Batcher Coalescing Test", test_batcher_coalesces),
+        ("Batcher Limits Test", test_batcher_limits),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Test screen caching helpers - perceptual hash index and change detection.
+
+Checks HammingIndex radius lookups against brute force, the tile merging
+of ChangeDetector._boxes and the snapshot check cache hits are confirmed
+with. Pure numpy/PIL, no models or display needed.
+"""
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from superagent.perceptual_hash import HammingIndex, hamming
+from superagent.change_detection import ChangeDetector
+from superagent.element_table import ElementTable
+from superagent.fast_agent import ElementCache
+
+
+def _flip(h, bits, positions):
+    for p in positions:
+        h ^= 1 << p
+    return h
+
+
+def test_hamming_index_radius():
+    """Test HammingIndex.find returns exactly the keys within the radius."""
+    print("\n=== Testing HammingIndex Radius ===")
+
+    rng = random.Random(7)
+    bits = 64
+    index = HammingIndex(radius=4, bits=bits)
+    base = rng.getrandbits(bits)
+    hashes = {}
+    # Neighbours at every distance 0..8 (some across chunk boundaries)
+    for distance in range(9):
+        for n in range(3):
+            key = f"d{distance}-{n}"
+            hashes[key] = _flip(base, bits, rng.sample(range(bits), distance))
+            index.add(hashes[key], key)
+    for n in range(50):
+        hashes[f"r{n}"] = rng.getrandbits(bits)
+        index.add(hashes[f"r{n}"], f"r{n}")
+
+    for radius in (0, 2, 4):
+        found = index.find(base, radius)
+        expected = {k for k, h in hashes.items() if hamming(base, h) <= radius}
+        assert {k for _, k in found} == expected, f"radius {radius}: {found} != {expected}"
+        distances = [d for d, _ in found]
+        assert distances == sorted(distances), "Matches must be nearest first"
+        print(f"[OK] radius {radius}: {len(found)} keys, nearest first")
+
+    # The index radius caps a larger request
+    assert {k for _, k in index.find(base, 8)} == {k for _, k in index.find(base, 4)}
+    print("[OK] Requested radius is capped at the index radius")
+    return True
+
+
+def test_hamming_index_pigeonhole():
+    """Test that every key within the radius shares a chunk with the query."""
+    print("\n=== Testing HammingIndex Pigeonhole ===")
+
+    rng = random.Random(11)
+    bits = 512
+    for radius in (1, 4, 7):
+        index = HammingIndex(radius=radius, bits=bits)
+        assert len(index._chunks) == radius + 1
+        for trial in range(200):
+            query = rng.getrandbits(bits)
+            # radius + 1 chunks: some chunk survives any radius flips intact
+            distance = rng.randint(0, radius)
+            h = _flip(query, bits, rng.sample(range(bits), distance))
+            index.clear()
+            index.add(h, trial)
+            assert index.find(query) == [(hamming(query, h), trial)], \
+                f"radius {radius}: key at distance {distance} not found"
+        print(f"[OK] radius {radius}: all 200 keys within the radius found")
+
+    # Replacing and removing keep the buckets consistent
+    index = HammingIndex(radius=2, bits=64)
+    index.add(0b111, 'a')
+    index.add(2 ** 40, 'a')
+    assert index.find(0b111) == [] and index.find(2 ** 40) == [(0, 'a')]
+    index.remove('a')
+    assert len(index) == 0 and all(not table for table in index._tables)
+    print("[OK] add() replaces and remove() empties the chunk tables")
+    return True
+
+
+def test_change_boxes():
+    """Test ChangeDetector._boxes merges 4-connected tiles."""
+    print("\n=== Testing ChangeDetector._boxes ===")
+
+    detector = ChangeDetector(grid=(4, 3))
+    tiles = np.array([[1, 1, 0, 0],
+                      [0, 1, 0, 1],
+                      [0, 0, 0, 1]], dtype=bool)
+    boxes = sorted(detector._boxes(tiles, (400, 300)))
+    assert boxes == [(0, 0, 200, 200), (300, 100, 100, 200)], f"Got {boxes}"
+    print(f"[OK] Two regions: {boxes}")
+
+    # Diagonal neighbours are separate regions
+    tiles = np.array([[1, 0, 0, 0],
+                      [0, 1, 0, 0],
+                      [0, 0, 0, 0]], dtype=bool)
+    boxes = sorted(detector._boxes(tiles, (400, 300)))
+    assert boxes == [(0, 0, 100, 100), (100, 100, 100, 100)], f"Got {boxes}"
+    print("[OK] Diagonal tiles stay separate")
+
+    # Uneven sizes: tiles cover the whole image without gaps
+    boxes = detector._boxes(np.ones((3, 4), dtype=bool), (403, 301))
+    assert boxes == [(0, 0, 403, 301)], f"Got {boxes}"
+    assert detector._boxes(np.zeros((3, 4), dtype=bool), (400, 300)) == []
+    print("[OK] Full and empty tile maps")
+    return True
+
+
+def _mail_screen(clock="10:41", draw=None):
+    """1080p mail-client-like screen: title bar with a clock, sidebar, 25 text rows, an input."""
+    font = ImageFont.load_default(size=14)
+    image = Image.new('RGB', (1920, 1080), (245, 245, 245))
+    canvas = ImageDraw.Draw(image)
+    canvas.rectangle((0, 0, 1920, 40), fill=(60, 60, 70))
+    canvas.text((1840, 12), clock, fill='white', font=font)
+    canvas.rectangle((0, 40, 250, 1080), fill=(230, 230, 235))
+    for i in range(25):
+        canvas.text((280, 60 + i * 38), f"Sender {i}  subject line {i} - preview text", fill='black', font=font)
+    canvas.rectangle((300, 1000, 900, 1030), outline='gray', fill='white')
+    if draw:
+        draw(canvas, font)
+    return image
+
+
+def test_snapshot_unchanged():
+    """Test that snapshots tolerate a caret or clock tick but reject words and icons."""
+    print("\n=== Testing Snapshot Confirmation ===")
+
+    detector = ChangeDetector()
+    base = _mail_screen()
+    snapshot = detector.snapshot(base)
+
+    assert detector.unchanged(snapshot, base.copy())
+    print("[OK] Identical screen is unchanged")
+
+    caret = _mail_screen(draw=lambda c, f: c.line((310, 1005, 310, 1024), fill='black'))
+    assert detector.unchanged(snapshot, caret)
+    assert detector.unchanged(snapshot, _mail_screen(clock="10:42"))
+    both = _mail_screen(clock="10:42", draw=lambda c, f: c.line((310, 1005, 310, 1024), fill='black'))
+    assert detector.unchanged(snapshot, both)
+    print("[OK] Caret blink and clock tick still hit")
+
+    typed = _mail_screen(draw=lambda c, f: c.text((310, 1008), "hello", fill='black', font=f))
+    assert not detector.unchanged(snapshot, typed)
+    print("[OK] Typed word is a change")
+
+    for shape in (lambda c, f: c.rectangle((1000, 500, 1015, 515), fill='red'),
+                  lambda c, f: c.ellipse((1000, 500, 1015, 515), outline=(120, 120, 120), width=2)):
+        assert not detector.unchanged(snapshot, _mail_screen(draw=shape))
+    print("[OK] 16px icons are a change")
+
+    icon = _mail_screen(draw=lambda c, f: c.rectangle((1000, 500, 1015, 515), fill='red'))
+    assert detector.unchanged(snapshot, icon, ignore=[(980, 480, 60, 60)])
+    print("[OK] Change inside an ignored region is not")
+
+    blinks = _mail_screen(draw=lambda c, f: [c.line((x, 600, x, 615), fill='black')
+                                             for x in range(1000, 1800, 150)])
+    assert not detector.unchanged(snapshot, blinks)
+    print("[OK] Many small changes together are a change")
+
+    assert not detector.unchanged(None, base)
+    assert not detector.unchanged(snapshot, base.resize((960, 540)))
+    print("[OK] Missing snapshot or other size never confirms")
+    return True
+
+
+def test_element_cache_hits():
+    """Test ElementCache hits through a caret blink and misses on a typed word."""
+    print("\n=== Testing ElementCache Confirmation ===")
+
+    cache = ElementCache(max_age_seconds=60, max_entries=3)
+    cache.set(_mail_screen(), ElementTable.from_xywh([[300, 1000, 600, 30]], 'input', [''], 0.9))
+    caret = _mail_screen(clock="10:42", draw=lambda c, f: c.line((310, 1005, 310, 1024), fill='black'))
+    assert cache.get(caret) is not None
+    typed = _mail_screen(draw=lambda c, f: c.text((310, 1008), "hello", fill='black', font=f))
+    assert cache.get(typed) is None
+    assert cache.hits == 1 and cache.misses == 1
+    print(f"[OK] hits={cache.hits} misses={cache.misses} rejects={cache.rejects}")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Screen Cache Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("HammingIndex Radius Test", test_hamming_index_radius),
+        ("HammingIndex Pigeonhole Test", test_hamming_index_pigeonhole),
+        ("Change Boxes Test", test_change_boxes),
+        ("Snapshot Confirmation Test", test_snapshot_unchanged),
+        ("Element Cache Confirmation Test", test_element_cache_hits),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test tiled detection - the cross-tile merge and the resolution recorded
+for tiled results.
+
+Checks _merge_tiled keeps whole boxes over cut ones and that a tiled
+result satisfies small-target goals without a re-detect. The YOLO call
+is replaced by an empty predictor, so no models or display are needed.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'aios-xpra-app'))
+
+import numpy as np
+from PIL import Image
+
+from superagent.omniparser import OmniParserV2, _merge_tiled
+
+
+def test_merge_tiled():
+    """Test _merge_tiled prefers whole boxes and suppresses cut-off halves."""
+    print("\n=== Testing _merge_tiled ===")
+
+    # [x1, y1, x2, y2, conf, cls]
+    detections = np.array([
+        [600, 100, 700, 140, 0.95, 0],   # 0: cut by a tile edge, most confident
+        [600, 100, 700, 140, 0.70, 0],   # 1: same box, whole
+        [600, 100, 640, 140, 0.90, 0],   # 2: left part of it (cut), low IoU
+        [100, 100, 150, 150, 0.40, 0],   # 3: alone
+    ], dtype=np.float32)
+    cut = np.array([True, False, True, False])
+    keep = _merge_tiled(detections, cut, iou_threshold=0.5)
+    assert keep.tolist() == [1, 3], f"Got {keep.tolist()}"
+    print("[OK] Whole box beats a more confident cut one, cut half suppressed")
+
+    keep = _merge_tiled(detections, np.zeros(4, dtype=bool), iou_threshold=0.5)
+    assert keep.tolist() == [0, 3], f"Got {keep.tolist()}"
+    print("[OK] Without cuts the most confident wins")
+
+    keep = _merge_tiled(detections[[1, 2]], np.array([False, True]), iou_threshold=0.5,
+                        containment=1.01)
+    assert keep.tolist() == [0, 1], "Containment above 1 never suppresses"
+    assert _merge_tiled(detections[:1], cut[:1], 0.5).tolist() == [0]
+    assert _merge_tiled(np.zeros((0, 6), dtype=np.float32), np.zeros(0, dtype=bool), 0.5).tolist() == []
+    print("[OK] Containment threshold and trivial inputs")
+    return True
+
+
+def test_tiled_imgsz():
+    """Test tiled results record the native size and pass the small-target check."""
+    print("\n=== Testing Tiled Result Resolution ===")
+
+    parser = OmniParserV2(cache_enabled=False, auto_download=False, track_elements=False,
+                          caption_cache=False, tiled_detection=True, tile_size=640)
+    parser.imgsz_ladder = [640, 960, 1280]
+    parser._yolo_predict = lambda images, imgsz=None: [None] * len(images)
+    goal = "click the settings icon"
+
+    image = Image.new('RGB', (1920, 1080), 'white')
+    result = parser._detect_tiled(image)
+    assert result.imgsz == 1920, f"Got imgsz={result.imgsz}"
+    assert not parser._too_coarse_for(result, image, goal)
+    print(f"[OK] 1920x1080 tiled result has imgsz={result.imgsz}, not too coarse")
+
+    result = parser._detect_tiled(Image.new('RGB', (1366, 768), 'white'))
+    assert result.imgsz == 1376, f"Got imgsz={result.imgsz}"
+    print("[OK] Native size is rounded up to the model stride")
+
+    result.imgsz = 640
+    assert parser._too_coarse_for(result, image, goal)
+    assert not parser._too_coarse_for(result, image, "open the file menu")
+    print("[OK] A 640 ladder result is still too coarse for an icon goal")
+    return True
+
+
+def main():
+    """Run all tests."""
+    print("=" * 60)
+    print("Tiled Detection Test Suite")
+    print("=" * 60)
+
+    tests = [
+        ("Tiled Merge Test", test_merge_tiled),
+        ("Tiled Resolution Test", test_tiled_imgsz),
+    ]
+
+    results = []
+    for name, test_func in tests:
+        try:
+            success = test_func()
+            results.append((name, success))
+        except Exception as e:
+            print(f"[FAIL] {name}: {e}")
+            import traceback
+            traceback.print_exc()
+            results.append((name, False))
+
+    print("\n" + "=" * 60)
+    print("Test Results:")
+    print("=" * 60)
+
+    all_passed = True
+    for name, success in results:
+        status = "PASS" if success else "FAIL"
+        print(f"  {status}: {name}")
+        if not success:
+            all_passed = False
+
+    print("=" * 60)
+    if all_passed:
+        print("All tests passed!")
+        return 0
+    else:
+        print("Some tests failed!")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())